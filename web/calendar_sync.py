@@ -1,8 +1,10 @@
 import logging
 import os
+import uuid
 from datetime import datetime, timedelta
 
 from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
@@ -10,13 +12,21 @@ from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from icalendar import Calendar, Event, vText
 
-from .models import Enrollment, Session
+from .models import CalendarSyncOperation, Session
+from .services.background import run_once_in_background
 
 logger = logging.getLogger(__name__)
 
 # If modifying these scopes, delete the file token.json.
 SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
+# Session changes are queued in CalendarSyncOperation and sent by a single background worker
+OUTBOX_WORKER_LOCK_KEY = "calendar_outbox_worker"
+OUTBOX_BATCH_SIZE = 50
+MAX_OUTBOX_ATTEMPTS = 5
+# A claim older than this belongs to a worker that died, and its entries are picked up again
+OUTBOX_CLAIM_TIMEOUT = timedelta(minutes=10)
+
 
 def generate_ical_feed(user):
     """
@@ -39,12 +49,12 @@ def generate_ical_feed(user):
     cal.add("x-wr-calname", f"{site_name} - Course Schedule")
     cal.add("x-wr-timezone", "UTC")
 
-    # Get all sessions for the user
+    # Get all sessions for the user, with their course and teacher in the same query
     if user.profile.is_teacher:
         sessions = Session.objects.filter(course__teacher=user)
     else:
-        enrollments = Enrollment.objects.filter(student=user, status="approved")
-        sessions = Session.objects.filter(course__enrollments__in=enrollments)
+        sessions = Session.objects.filter(course__enrollments__student=user, course__enrollments__status="approved")
+    sessions = sessions.select_related("course__teacher").order_by("start_time")
 
     for session in sessions:
         event = Event()
@@ -180,6 +190,33 @@ def google_calendar_api():
         return None
 
 
+def _event_body(session):
+    """Build the Google Calendar event resource for a session."""
+    event = {
+        "summary": f"{session.course.title} - {session.title}",
+        "description": session.description,
+        "start": {
+            "dateTime": session.start_time.isoformat(),
+            "timeZone": settings.TIME_ZONE,
+        },
+        "end": {
+            "dateTime": session.end_time.isoformat(),
+            "timeZone": settings.TIME_ZONE,
+        },
+    }
+
+    if session.is_virtual:
+        event["conferenceData"] = {
+            "createRequest": {
+                "requestId": f"event-{session.id}",
+                "conferenceSolutionKey": {"type": "hangoutsMeet"},
+            }
+        }
+    else:
+        event["location"] = session.location
+    return event
+
+
 def create_calendar_event(session):
     """Create a Google Calendar event for a session."""
     service = google_calendar_api()
@@ -187,34 +224,11 @@ def create_calendar_event(session):
         return None
 
     try:
-        event = {
-            "summary": f"{session.course.title} - {session.title}",
-            "description": session.description,
-            "start": {
-                "dateTime": session.start_time.isoformat(),
-                "timeZone": settings.TIME_ZONE,
-            },
-            "end": {
-                "dateTime": session.end_time.isoformat(),
-                "timeZone": settings.TIME_ZONE,
-            },
-        }
-
-        if session.is_virtual:
-            event["conferenceData"] = {
-                "createRequest": {
-                    "requestId": f"event-{session.id}",
-                    "conferenceSolutionKey": {"type": "hangoutsMeet"},
-                }
-            }
-        else:
-            event["location"] = session.location
-
         event = (
             service.events()
             .insert(
                 calendarId="primary",
-                body=event,
+                body=_event_body(session),
                 conferenceDataVersion=1 if session.is_virtual else 0,
             )
             .execute()
@@ -280,33 +294,10 @@ def update_calendar_event(session):
         return False
 
     try:
-        event = {
-            "summary": f"{session.course.title} - {session.title}",
-            "description": session.description,
-            "start": {
-                "dateTime": session.start_time.isoformat(),
-                "timeZone": settings.TIME_ZONE,
-            },
-            "end": {
-                "dateTime": session.end_time.isoformat(),
-                "timeZone": settings.TIME_ZONE,
-            },
-        }
-
-        if session.is_virtual:
-            event["conferenceData"] = {
-                "createRequest": {
-                    "requestId": f"event-{session.id}",
-                    "conferenceSolutionKey": {"type": "hangoutsMeet"},
-                }
-            }
-        else:
-            event["location"] = session.location
-
         service.events().update(
             calendarId="primary",
             eventId=session.meeting_id,
-            body=event,
+            body=_event_body(session),
             conferenceDataVersion=1 if session.is_virtual else 0,
         ).execute()
         return True
@@ -327,3 +318,132 @@ def delete_calendar_event(session):
     except Exception as e:
         logger.error(f"Failed to delete calendar event: {str(e)}")
         return False
+
+
+def start_outbox_worker():
+    """Send queued calendar changes in a background thread, unless a worker is already running."""
+    return run_once_in_background(OUTBOX_WORKER_LOCK_KEY, process_calendar_outbox)
+
+
+def _outbox_request(service, action, session, meeting_id):
+    events = service.events()
+    if action == "delete":
+        return events.delete(calendarId="primary", eventId=meeting_id)
+    if session.meeting_id:
+        return events.update(
+            calendarId="primary", eventId=session.meeting_id, body=_event_body(session), conferenceDataVersion=1
+        )
+    return events.insert(calendarId="primary", body=_event_body(session), conferenceDataVersion=1)
+
+
+def _send_outbox_batch(service, calls):
+    """
+    Send ``{session_id: (action, session, meeting_id)}`` as one batch request.
+
+    Returns ``{session_id: (response, error)}`` for every call in the batch.
+    """
+    results = {}
+
+    def collect(request_id, response, exception):
+        results[int(request_id)] = (response, exception)
+
+    batch = service.new_batch_http_request(callback=collect)
+    for session_id, (action, session, meeting_id) in calls.items():
+        batch.add(_outbox_request(service, action, session, meeting_id), request_id=str(session_id))
+    try:
+        batch.execute()
+    except Exception as e:
+        return {session_id: (None, e) for session_id in calls}
+    return {session_id: results.get(session_id, (None, "No response in batch")) for session_id in calls}
+
+
+def _claim_outbox(limit=None):
+    """
+    Claim pending entries for this run so the background worker and the command never send them both.
+
+    Sessions that another live run has entries of are skipped, so one session is only synced by one
+    run at a time. The claim is a conditional ``update()``; only the rows it changed are returned.
+    """
+    now = timezone.now()
+    live_claim = Q(claimed_at__gte=now - OUTBOX_CLAIM_TIMEOUT)
+    pending = CalendarSyncOperation.objects.filter(processed_at__isnull=True)
+    busy_sessions = pending.filter(live_claim).values("session_id")
+    candidates = pending.exclude(live_claim).exclude(session_id__in=busy_sessions).values_list("pk", flat=True)
+    if limit is not None:
+        candidates = candidates[:limit]
+    token = uuid.uuid4().hex
+    claimed = (
+        CalendarSyncOperation.objects.filter(pk__in=list(candidates), processed_at__isnull=True)
+        .exclude(live_claim)
+        .update(claimed_by=token, claimed_at=now)
+    )
+    if not claimed:
+        return []
+    return list(CalendarSyncOperation.objects.filter(claimed_by=token, processed_at__isnull=True))
+
+
+def process_calendar_outbox(service=None, limit=None):
+    """
+    Send pending ``CalendarSyncOperation`` entries to Google Calendar.
+
+    Entries are coalesced per session so a session edited several times costs one API call, and
+    the calls are sent in batch requests of up to ``OUTBOX_BATCH_SIZE``. Failed entries stay
+    queued until they have been tried ``MAX_OUTBOX_ATTEMPTS`` times. Without Google credentials
+    nothing is claimed, so the entries wait for a configured run. Returns the number of
+    sessions synced.
+    """
+    if not CalendarSyncOperation.objects.filter(processed_at__isnull=True).exists():
+        return 0
+    service = service or google_calendar_api()
+    if service is None:
+        logger.warning("Google Calendar is not configured; leaving calendar changes queued")
+        return 0
+
+    operations = _claim_outbox(limit)
+    if not operations:
+        return 0
+
+    by_session = {}
+    for op in operations:
+        by_session.setdefault(op.session_id, []).append(op)
+    sessions = Session.objects.select_related("course").in_bulk(list(by_session))
+
+    calls = {}
+    for session_id, ops in by_session.items():
+        # The latest entry decides what happens: an upsert syncs the session as it is now
+        last = ops[-1]
+        session = sessions.get(session_id)
+        if last.action == "delete":
+            if last.meeting_id:
+                calls[session_id] = ("delete", None, last.meeting_id)
+        elif session is not None and session.is_virtual:
+            calls[session_id] = ("upsert", session, "")
+
+    done = [op for session_id, ops in by_session.items() if session_id not in calls for op in ops]
+    failed = []
+    session_ids = list(calls)
+    for start in range(0, len(session_ids), OUTBOX_BATCH_SIZE):
+        chunk = {session_id: calls[session_id] for session_id in session_ids[start : start + OUTBOX_BATCH_SIZE]}
+        for session_id, (response, error) in _send_outbox_batch(service, chunk).items():
+            if error is not None:
+                logger.error(f"Failed to sync calendar event for session {session_id}: {error}")
+                for op in by_session[session_id]:
+                    op.last_error = str(error)
+                    failed.append(op)
+                continue
+            action, session, _ = chunk[session_id]
+            if action == "upsert" and not session.meeting_id and response and response.get("id"):
+                Session.objects.filter(pk=session_id).update(meeting_id=response["id"])
+            done.extend(by_session[session_id])
+
+    now = timezone.now()
+    for op in done:
+        op.processed_at = now
+    for op in failed:
+        op.attempts += 1
+        # Released so the next run retries it
+        op.claimed_at = None
+        if op.attempts >= MAX_OUTBOX_ATTEMPTS:
+            op.processed_at = now
+    CalendarSyncOperation.objects.bulk_update(done + failed, ["attempts", "last_error", "processed_at", "claimed_at"])
+    return len(calls) - len({op.session_id for op in failed})
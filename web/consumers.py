@@ -0,0 +1,192 @@
+import asyncio
+import logging
+
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer, AsyncWebsocketConsumer
+
+from .services import presence, whiteboard
+from .services.live_updates import unread_counts, user_group
+
+logger = logging.getLogger(__name__)
+
+# Application close codes (4000-4999 are free for applications)
+CLOSE_UNAUTHENTICATED = 4401
+CLOSE_FORBIDDEN = 4403
+CLOSE_ROOM_FULL = 4429
+
+
+class NotificationConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Push a signed-in user's notifications, messages, invites and unread counters.
+
+    The client receives the current counters on connect and one JSON event per change after
+    that, so it never has to poll.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+
+        self.group_name = user_group(user.id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        counts = await database_sync_to_async(unread_counts)(user.id)
+        await self.send_json({"type": "counts", "data": {}, "counts": counts})
+
+    async def disconnect(self, code):
+        if hasattr(self, "group_name"):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        # Lets clients behind proxies with idle timeouts keep the socket open
+        if content.get("type") == "ping":
+            await self.send_json({"type": "pong"})
+
+    async def notify_event(self, event):
+        await self.send_json(event["payload"])
+
+
+class WaitingRoomConsumer(AsyncJsonWebsocketConsumer):
+    """
+    Live presence for one waiting room.
+
+    Participants count as online while their socket is open and heartbeating. The teacher and
+    the room's creator may watch without being counted. Everyone connected receives the
+    participant and online counts whenever they change.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        self.room_id = self.scope["url_route"]["kwargs"]["room_id"]
+        self.role = await database_sync_to_async(presence.member_role)(self.room_id, user.id)
+        if self.role is None:
+            await self.close(code=CLOSE_FORBIDDEN)
+            return
+
+        self.group_name = presence.room_group(self.room_id)
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        if self.role == "participant":
+            await database_sync_to_async(presence.touch)(self.room_id, user.id)
+            await self.broadcast_state()
+        else:
+            await self.send_json(await database_sync_to_async(presence.room_state)(self.room_id))
+
+    async def disconnect(self, code):
+        if not hasattr(self, "group_name"):
+            return
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+        if self.role == "participant":
+            await database_sync_to_async(presence.drop)(self.room_id, self.scope["user"].id)
+            await self.broadcast_state()
+
+    async def receive_json(self, content, **kwargs):
+        if content.get("type") != "ping":
+            return
+        if self.role == "participant":
+            arrived = await database_sync_to_async(presence.touch)(self.room_id, self.scope["user"].id)
+            if arrived:
+                # The presence entry had expired, e.g. after the tab slept through heartbeats
+                await self.broadcast_state()
+        await self.send_json({"type": "pong"})
+
+    async def broadcast_state(self):
+        state = await database_sync_to_async(presence.room_state)(self.room_id)
+        await self.channel_layer.group_send(self.group_name, {"type": "presence.update", "state": state})
+
+    async def presence_update(self, event):
+        await self.send_json(event["state"])
+
+
+class WhiteboardConsumer(AsyncWebsocketConsumer):
+    """
+    Relay binary stroke frames between the members of one whiteboard room.
+
+    New members receive the board's snapshot and the strokes stored since. Each checked frame is
+    forwarded unchanged to the rest of the room first and stored for later joiners afterwards,
+    batched per connection so a busy room costs one insert per ``STORE_DELAY`` rather than one
+    per frame.
+    """
+
+    unsaved = None
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=CLOSE_UNAUTHENTICATED)
+            return
+        self.slug = self.scope["url_route"]["kwargs"]["board"]
+        if len(self.slug) > whiteboard.MAX_SLUG_LENGTH:
+            await self.close()
+            return
+        if not await database_sync_to_async(whiteboard.join_room)(self.slug):
+            await self.close(code=CLOSE_ROOM_FULL)
+            return
+        self.joined = True
+
+        # Join before loading so no stroke drawn meanwhile is missed
+        self.group_name = f"whiteboard_{self.slug}"
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+        board, frames = await database_sync_to_async(whiteboard.open_board)(self.slug, user)
+        self.board_id = board.id
+        self.can_clear = await database_sync_to_async(whiteboard.can_clear)(board, user)
+        self.unsaved = []
+        for frame in frames:
+            await self.send(bytes_data=frame)
+
+    async def disconnect(self, code):
+        if getattr(self, "joined", False):
+            await self.channel_layer.group_discard(self.group_name, self.channel_name)
+            await self.store_unsaved()
+            await database_sync_to_async(whiteboard.leave_room)(self.slug)
+
+    async def receive(self, text_data=None, bytes_data=None):
+        if text_data is not None:
+            if text_data == "ping":
+                await self.send(text_data="pong")
+            return
+        if not bytes_data or not hasattr(self, "board_id"):
+            return
+
+        if bytes_data[0] == whiteboard.CLEAR and len(bytes_data) == 1:
+            if not self.can_clear:
+                logger.debug(f"Dropping clear on {self.slug} from a member who may not clear it")
+                return
+            self.unsaved.clear()
+            await database_sync_to_async(whiteboard.clear_board)(self.board_id)
+        else:
+            try:
+                whiteboard.decode_strokes(bytes_data)
+            except (ValueError, UnicodeDecodeError) as e:
+                logger.debug(f"Dropping malformed whiteboard frame on {self.slug}: {e}")
+                return
+
+        await self.channel_layer.group_send(
+            self.group_name, {"type": "board.frame", "data": bytes_data, "sender": self.channel_name}
+        )
+        if bytes_data[0] == whiteboard.STROKES:
+            if not self.unsaved:
+                self.store_task = asyncio.create_task(self.store_later())
+            self.unsaved.append(bytes_data)
+
+    async def store_later(self):
+        await asyncio.sleep(whiteboard.STORE_DELAY)
+        await self.store_unsaved()
+
+    async def store_unsaved(self):
+        if self.unsaved:
+            frames, self.unsaved = self.unsaved, []
+            await database_sync_to_async(whiteboard.store_frames)(self.board_id, frames)
+
+    async def board_frame(self, event):
+        if event["data"] == bytes([whiteboard.CLEAR]) and self.unsaved:
+            # Strokes this member has not stored yet were drawn before the clear
+            self.unsaved.clear()
+        if event["sender"] != self.channel_name:
+            await self.send(bytes_data=event["data"])
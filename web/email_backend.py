@@ -2,10 +2,11 @@ import json
 import logging
 from typing import List, Optional, Tuple
 
-import requests
 from django.conf import settings
 from django.core.mail.backends.console import EmailBackend as ConsoleBackend
 
+from web.services import http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -128,7 +129,7 @@ class SlackNotificationEmailBackend:
             }
 
             # Send the notification to Slack
-            response = requests.post(
+            response = http_client.post(
                 self.webhook_url, data=json.dumps(slack_message), headers={"Content-Type": "application/json"}
             )
 
@@ -201,7 +202,7 @@ class SlackNotificationEmailBackend:
                 continue
 
         url = f"{self.mailgun_api_base}/v3/{domain}/messages"
-        resp = requests.post(url, auth=("api", api_key), data=data, files=files if files else None, timeout=15)
+        resp = http_client.post(url, auth=("api", api_key), data=data, files=files if files else None, timeout=15)
         if resp.status_code >= 200 and resp.status_code < 300:
             return True
         # Log and return False to trigger fallback logging for this message
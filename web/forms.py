@@ -1814,20 +1814,23 @@ QuizOptionFormSet = forms.inlineformset_factory(
 class TakeQuizForm(forms.Form):
     """Form for taking quizzes. Dynamically generated based on questions."""
 
-    def __init__(self, *args, quiz=None, **kwargs):
+    def __init__(self, *args, quiz=None, questions=None, **kwargs):
         super().__init__(*args, **kwargs)
         if quiz:
-            for question in quiz.questions.all().order_by("order"):
+            # Callers that already loaded the questions can pass them (with prefetched options)
+            if questions is None:
+                questions = quiz.questions.all().order_by("order").prefetch_related("options")
+            for question in questions:
                 if question.question_type == "multiple":
                     # For multiple choice, add a multi-select field
-                    options = question.options.all().order_by("order")
+                    options = question.options.all()
                     choices = [(str(option.id), option.text) for option in options]
                     self.fields[f"question_{question.id}"] = forms.MultipleChoiceField(
                         label=question.text, choices=choices, widget=forms.CheckboxSelectMultiple, required=False
                     )
                 elif question.question_type == "true_false":
                     # For true/false, add a radio select field
-                    options = question.options.all().order_by("order")
+                    options = question.options.all()
                     choices = [(str(option.id), option.text) for option in options]
                     self.fields[f"question_{question.id}"] = forms.ChoiceField(
                         label=question.text, choices=choices, widget=forms.RadioSelect, required=False
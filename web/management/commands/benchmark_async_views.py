@@ -0,0 +1,89 @@
+import asyncio
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from web.services import http_client
+
+
+class Command(BaseCommand):
+    help = "Compare how many slow-upstream requests one worker serves with thread-per-request and async handling"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=100, help="Concurrent requests to send")
+        parser.add_argument("--threads", type=int, default=8, help="Threads of the simulated sync worker")
+        parser.add_argument("--min-latency", type=float, default=1.0, help="Shortest simulated upstream call (s)")
+        parser.add_argument("--max-latency", type=float, default=2.0, help="Longest simulated upstream call (s)")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def upstream(self, options):
+        rng = random.Random(options["seed"])
+
+        def handler(request):
+            time.sleep(rng.uniform(options["min_latency"], options["max_latency"]))
+            return http_client.mock_response(200, json_data={"type": "free"})
+
+        return handler
+
+    def run_sync(self, url, count, threads):
+        """Each request holds one of ``threads`` for its whole duration, like a WSGI worker."""
+        client = Client()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(lambda _: client.get(url).status_code, range(count)))
+
+    def run_async(self, url, count):
+        """All requests share one event loop; only the upstream calls wait on pool threads."""
+        client = AsyncClient()
+
+        async def send_all():
+            responses = await asyncio.gather(*(client.get(url) for _ in range(count)))
+            return [response.status_code for response in responses]
+
+        return asyncio.run(send_all())
+
+    def measure(self, run, options):
+        with http_client.mock_transport(self.upstream(options)):
+            started = time.monotonic()
+            statuses = run()
+            elapsed = time.monotonic() - started
+        return {"elapsed": elapsed, "ok": statuses.count(200), "rate": len(statuses) / elapsed}
+
+    def handle(self, *args, **options):
+        count = options["requests"]
+        url = reverse("system_status")
+        original_limit = http_client.client.max_per_host
+        # Measure the view layer only: no request tracking writes, and no per-host cap on the fake upstream
+        http_client.client.max_per_host = count
+        try:
+            with (
+                override_settings(MIDDLEWARE=[], ALLOWED_HOSTS=["testserver"]),
+                patch.dict(os.environ, {"SENDGRID_PASSWORD": "benchmark"}),
+            ):
+                results = [
+                    (
+                        "thread-per-request",
+                        self.measure(lambda: self.run_sync(url, count, options["threads"]), options),
+                    ),
+                    ("async", self.measure(lambda: self.run_async(url, count), options)),
+                ]
+        finally:
+            http_client.client.max_per_host = original_limit
+
+        mean_latency = (options["min_latency"] + options["max_latency"]) / 2
+        self.stdout.write(
+            f"{count} concurrent requests to {url}, upstream latency "
+            f"{options['min_latency']:.1f}-{options['max_latency']:.1f} s, {options['threads']} sync threads"
+        )
+        for label, result in results:
+            self.stdout.write(
+                f"{label:>18}: {result['ok']}/{count} ok in {result['elapsed']:.1f} s, "
+                f"{result['rate']:.1f} req/s, ~{result['rate'] * mean_latency:.0f} requests in flight"
+            )
+        sync, concurrent = results[0][1], results[1][1]
+        self.stdout.write(self.style.SUCCESS(f"Async handled {concurrent['rate'] / sync['rate']:.1f}x the throughput"))
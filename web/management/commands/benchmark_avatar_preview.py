@@ -0,0 +1,61 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from python_avatars import Avatar
+
+from web.services.avatar_render import AVATAR_FIELDS, clear_local_cache, normalize_attributes, render_avatar_svg
+
+
+class Command(BaseCommand):
+    help = "Compare avatar preview latency with and without the render cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--previews", type=int, default=300, help="Number of preview requests to simulate")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def previews(self, count, seed):
+        """Simulate users changing one control at a time, often going back to earlier choices."""
+        rng = random.Random(seed)
+        choices = {
+            field: [member.name.lower() for member in enum] if enum else ["#ffffff", "#000000", "#0000ff", "#ff0000"]
+            for field, (enum, _) in AVATAR_FIELDS.items()
+        }
+        current = {field: values[0] for field, values in choices.items()}
+        for _ in range(count):
+            field = rng.choice(["top", "eyes", "mouth", "clothing"])
+            current = dict(current, **{field: rng.choice(choices[field][:3])})
+            yield current
+
+    def measure(self, render, previews):
+        timings = []
+        size = 0
+        for attributes in previews:
+            started = time.perf_counter()
+            svg = render(attributes)
+            timings.append((time.perf_counter() - started) * 1000)
+            size += len(svg)
+        timings.sort()
+        return {
+            "mean": statistics.mean(timings),
+            "p50": timings[len(timings) // 2],
+            "p95": timings[int(len(timings) * 0.95)],
+            "bytes": size // len(timings),
+        }
+
+    def handle(self, *args, **options):
+        previews = list(self.previews(options["previews"], options["seed"]))
+
+        before = self.measure(lambda attributes: Avatar(**normalize_attributes(attributes)).render(), previews)
+        # Start from an empty in-process cache; renders already in the shared cache still count as hits
+        clear_local_cache()
+        after = self.measure(lambda attributes: render_avatar_svg(attributes)[0], previews)
+
+        self.stdout.write(f"{len(previews)} previews, {len({tuple(p.values()) for p in previews})} distinct avatars")
+        for label, result in [("uncached", before), ("cached", after)]:
+            self.stdout.write(
+                f"{label:>9}: mean {result['mean']:.2f} ms, p50 {result['p50']:.2f} ms, "
+                f"p95 {result['p95']:.2f} ms, {result['bytes']} bytes/SVG"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Mean preview latency {before['mean'] / after['mean']:.1f}x faster"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from web.services.whiteboard import compact_whiteboards
+
+
+class Command(BaseCommand):
+    help = "Fold the stored strokes of every shared whiteboard into its snapshot"
+
+    def handle(self, *args, **options):
+        compacted = compact_whiteboards()
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} whiteboards"))
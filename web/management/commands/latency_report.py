@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from web.services.request_timing import CATEGORIES, SUMMARY_MAX_AGE, merged_summaries
+
+
+class Command(BaseCommand):
+    help = "Show per-view latency percentiles from the summaries ServerTimingMiddleware writes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", default=settings.SERVER_TIMING_SUMMARY_DIR, help="Summary directory to read")
+        parser.add_argument("--limit", type=int, default=20, help="Number of views to show")
+        parser.add_argument(
+            "--max-age", type=int, default=SUMMARY_MAX_AGE, help="Skip processes that have not written for this long"
+        )
+
+    def handle(self, *args, **options):
+        directory = Path(options["dir"])
+        if not directory.is_dir():
+            raise CommandError(f"No latency summaries in {directory}; set SERVER_TIMING=True and serve requests first")
+        views = merged_summaries(directory, options["max_age"])
+
+        columns = "".join(f"{category + ' ms':>12}" for category in CATEGORIES)
+        self.stdout.write(f"{'p50':>8} {'p95':>8} {'p99':>8}{columns} {'requests':>8}  view")
+        for view in views[: options["limit"]]:
+            means = "".join(f"{view[f'{category}_ms']:>12.1f}" for category in CATEGORIES)
+            self.stdout.write(
+                f"{view['p50_ms']:>8.1f} {view['p95_ms']:>8.1f} {view['p99_ms']:>8.1f}{means} "
+                f"{view['requests']:>8}  {view['view']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(views)} views in {directory}"))
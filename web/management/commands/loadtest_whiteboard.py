@@ -0,0 +1,153 @@
+import asyncio
+import json
+import random
+import time
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from channels.routing import URLRouter
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+from django.utils.crypto import get_random_string
+
+from web.models import WhiteboardBoard
+from web.routing import websocket_urlpatterns
+from web.services import whiteboard
+
+
+class Command(BaseCommand):
+    help = "Simulate clients drawing on one shared whiteboard and report fan-out latency and frame sizes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=30, help="Simulated members of the room")
+        parser.add_argument("--frames", type=int, default=20, help="Stroke batches each client sends")
+        parser.add_argument("--points", type=int, default=15, help="Points per batch (50 ms of drawing)")
+        parser.add_argument("--seed", type=int, default=0)
+
+    def batches(self, rng, count, points):
+        x, y = rng.randrange(whiteboard.BOARD_WIDTH), rng.randrange(whiteboard.BOARD_HEIGHT)
+        for _ in range(count):
+            stroke = [(x, y)]
+            for _ in range(points - 1):
+                x = min(whiteboard.BOARD_WIDTH, max(0, x + rng.randint(-6, 6)))
+                y = min(whiteboard.BOARD_HEIGHT, max(0, y + rng.randint(-6, 6)))
+                stroke.append((x, y))
+            yield whiteboard.Stroke(whiteboard.TOOLS.index("pen"), 3, (20, 20, 20), stroke)
+
+    async def connect(self, application, path, number):
+        client = ApplicationCommunicator(
+            application,
+            {"type": "websocket", "path": path, "headers": [], "subprotocols": [], "user": User(username=f"c{number}")},
+        )
+        await client.send_input({"type": "websocket.connect"})
+        accepted = (await client.receive_output())["type"] == "websocket.accept"
+        return client if accepted else None
+
+    async def drain(self, client, expected, received_at):
+        """Collect frames until ``expected`` have arrived or the room goes quiet."""
+        received = 0
+        while received < expected:
+            try:
+                message = await client.receive_output(timeout=5)
+            except asyncio.TimeoutError:
+                # The communicator stops the consumer on a timeout, so this client is done
+                break
+            if message.get("bytes"):
+                received_at.append((message["bytes"], time.perf_counter()))
+                received += 1
+        return received
+
+    async def run(self, options, slug):
+        application = URLRouter(websocket_urlpatterns)
+        path = f"/ws/whiteboard/{slug}/"
+        rng = random.Random(options["seed"])
+        frames = {
+            number: [
+                whiteboard.encode_strokes([stroke])
+                for stroke in self.batches(rng, options["frames"], options["points"])
+            ]
+            for number in range(options["clients"])
+        }
+
+        clients = [await self.connect(application, path, number) for number in range(options["clients"])]
+        members = [client for client in clients if client is not None]
+        rejected = len(clients) - len(members)
+        sent_at = {}
+        received_at = []
+
+        async def draw(client, batches):
+            for frame in batches:
+                sent_at[frame] = time.perf_counter()
+                await client.send_input({"type": "websocket.receive", "bytes": frame})
+                await asyncio.sleep(0.05)
+
+        expected = (len(members) - 1) * options["frames"]
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(draw(client, frames[number]) for number, client in enumerate(members)),
+            *(self.drain(client, expected, received_at) for client in members),
+        )
+        elapsed = time.perf_counter() - started
+        # Let the last batched writes land before measuring storage
+        await asyncio.sleep(2 * whiteboard.STORE_DELAY)
+        delivered = sum(result for result in results[len(members) :])
+
+        board = await WhiteboardBoard.objects.aget(slug=slug)
+        drawn = [frames[number] for number in range(len(members))]
+        tail_frames = sum(len(batches) for batches in drawn)
+        tail_bytes = sum(len(frame) for batches in drawn for frame in batches)
+        await sync_to_async(whiteboard.compact_board)(board.id)
+        await board.arefresh_from_db()
+
+        for client in members:
+            if not client.future.done():
+                await client.send_input({"type": "websocket.disconnect", "code": 1000})
+                await client.wait()
+
+        latencies = sorted((at - sent_at[frame]) * 1000 for frame, at in received_at if frame in sent_at)
+        sample = next(iter(frames.values()))[0]
+        decoded = whiteboard.decode_strokes(sample)[0]
+        as_json = json.dumps({"tool": "pen", "width": 3, "color": "#141414", "points": decoded.points})
+        return {
+            "members": len(members),
+            "rejected": rejected,
+            "expected": expected * len(members),
+            "delivered": delivered,
+            "elapsed": elapsed,
+            "p50": latencies[len(latencies) // 2] if latencies else 0,
+            "p95": latencies[int(len(latencies) * 0.95)] if latencies else 0,
+            "binary": len(sample) / options["points"],
+            "json": len(as_json) / options["points"],
+            "tail_frames": tail_frames,
+            "tail_bytes": tail_bytes,
+            "snapshot_bytes": len(bytes(board.snapshot)),
+        }
+
+    def handle(self, *args, **options):
+        slug = f"loadtest-{get_random_string(8).lower()}"
+        try:
+            with override_settings(
+                CHANNEL_LAYERS={
+                    "default": {"BACKEND": "channels.layers.InMemoryChannelLayer", "CONFIG": {"capacity": 1000}}
+                }
+            ):
+                result = asyncio.run(self.run(options, slug))
+        finally:
+            WhiteboardBoard.objects.filter(slug=slug).delete()
+
+        self.stdout.write(
+            f"{result['members']} clients in one room ({result['rejected']} rejected by the "
+            f"{whiteboard.MAX_MEMBERS}-member cap), {options['frames']} batches of {options['points']} points each"
+        )
+        self.stdout.write(
+            f"Delivered {result['delivered']}/{result['expected']} frames in {result['elapsed']:.1f} s; "
+            f"fan-out latency p50 {result['p50']:.1f} ms, p95 {result['p95']:.1f} ms"
+        )
+        self.stdout.write(f"Wire size: {result['binary']:.1f} bytes/point binary vs {result['json']:.1f} as JSON")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Late joiner: one {result['snapshot_bytes']} byte snapshot instead of replaying "
+                f"{result['tail_frames']} frames ({result['tail_bytes']} bytes)"
+            )
+        )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from web.calendar_sync import process_calendar_outbox
+
+
+class Command(BaseCommand):
+    help = "Send queued session changes to Google Calendar in batch requests"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Maximum number of queued changes to send")
+
+    def handle(self, *args, **options):
+        synced = process_calendar_outbox(limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Synced {synced} sessions to Google Calendar"))
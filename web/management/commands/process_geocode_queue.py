@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from web.services.geocoding import process_geocode_queue
+
+
+class Command(BaseCommand):
+    help = "Geocode queued session locations, one Nominatim request per second"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Maximum number of addresses to geocode")
+
+    def handle(self, *args, **options):
+        processed = process_geocode_queue(limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} queued addresses"))
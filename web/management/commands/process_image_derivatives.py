@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from web.services.image_derivatives import process_image_queue, queue_existing_images, requeue_all
+
+
+class Command(BaseCommand):
+    help = "Generate WebP and JPEG derivatives for queued course, meme, product, blog and story images"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Maximum number of images to process")
+        parser.add_argument(
+            "--recheck",
+            action="store_true",
+            help="Re-hash every image and regenerate derivatives for those whose content changed",
+        )
+
+    def handle(self, *args, **options):
+        queued = queue_existing_images()
+        if queued:
+            self.stdout.write(f"Queued {queued} images uploaded before derivatives existed")
+        if options["recheck"]:
+            requeue_all()
+        processed = process_image_queue(limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} images"))
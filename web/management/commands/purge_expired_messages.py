@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from web.services.message_retention import PURGE_CHUNK_SIZE, purge_expired_messages
+
+
+class Command(BaseCommand):
+    help = "Delete direct messages past their expiry, in small primary-key ranges"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=PURGE_CHUNK_SIZE, help="Rows per delete transaction")
+        parser.add_argument(
+            "--include-starred", action="store_true", help="Also delete expired messages their receiver starred"
+        )
+
+    def handle(self, *args, **options):
+        deleted = purge_expired_messages(chunk_size=options["chunk_size"], include_starred=options["include_starred"])
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} expired messages"))
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from web.services.query_audit import rank_routes
+
+
+class Command(BaseCommand):
+    help = "Rank URL patterns by queries per request, from the log QueryAuditMiddleware writes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--log", default=settings.QUERY_AUDIT_LOG, help="Query audit log to read")
+        parser.add_argument("--limit", type=int, default=20, help="Number of routes to show")
+        parser.add_argument("--min-requests", type=int, default=1, help="Skip routes requested fewer times")
+
+    def handle(self, *args, **options):
+        path = Path(options["log"])
+        if not path.exists():
+            raise CommandError(f"No query audit log at {path}; set QUERY_AUDIT=True and browse the site first")
+        with path.open() as log_file:
+            ranked = [route for route in rank_routes(log_file) if route["requests"] >= options["min_requests"]]
+
+        self.stdout.write(f"{'mean':>7} {'max':>5} {'db ms':>8} {'N+1':>5} {'requests':>8}  route")
+        for route in ranked[: options["limit"]]:
+            self.stdout.write(
+                f"{route['mean']:>7.1f} {route['max']:>5} {route['db_ms']:>8.1f} {route['repeated']:>5} "
+                f"{route['requests']:>8}  {route['method']} {route['route']}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"{len(ranked)} routes in {path}"))
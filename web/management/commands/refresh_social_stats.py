@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from web.social import NitterClient
+
+
+class Command(BaseCommand):
+    help = "Probe Nitter instances and refresh the stored X/Twitter stats (run every few minutes from cron)"
+
+    def handle(self, *args, **options):
+        client = NitterClient(settings.TWITTER_USERNAME)
+        healthy = client.probe_instances()
+        self.stdout.write(f"{len(healthy)} of {len(client.NITTER_INSTANCES)} Nitter instances are healthy")
+
+        stats = client.refresh_profile_stats()
+        if stats.get("error"):
+            self.stdout.write(self.style.ERROR(f"Error refreshing X stats: {stats['error']}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed X stats for {settings.TWITTER_USERNAME}"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from web.services.video_metadata import link_videos, refresh_video_metadata
+
+
+class Command(BaseCommand):
+    help = "Fetch missing or stale YouTube/Vimeo oEmbed metadata in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=None, help="Maximum number of videos to refresh")
+
+    def handle(self, *args, **options):
+        linked = link_videos()
+        if linked:
+            self.stdout.write(f"Linked {linked} videos to metadata")
+        refreshed = refresh_video_metadata(limit=options["limit"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed metadata for {refreshed} videos"))
@@ -30,6 +30,41 @@ class Command(BaseCommand):
             call_command("cleanup_abandoned_drafts")
             self.stdout.write(self.style.SUCCESS("Successfully completed cleanup_abandoned_drafts"))
 
+            # Sync GitHub pull requests for the contributors page
+            self.stdout.write("Running sync_github_contributors...")
+            call_command("sync_github_contributors")
+            self.stdout.write(self.style.SUCCESS("Successfully completed sync_github_contributors"))
+
+            # Geocode any session locations the background worker has not reached
+            self.stdout.write("Running process_geocode_queue...")
+            call_command("process_geocode_queue")
+            self.stdout.write(self.style.SUCCESS("Successfully completed process_geocode_queue"))
+
+            # Retry calendar changes that failed or were queued while a worker was busy
+            self.stdout.write("Running process_calendar_outbox...")
+            call_command("process_calendar_outbox")
+            self.stdout.write(self.style.SUCCESS("Successfully completed process_calendar_outbox"))
+
+            # Keep video titles and thumbnails current
+            self.stdout.write("Running refresh_video_metadata...")
+            call_command("refresh_video_metadata")
+            self.stdout.write(self.style.SUCCESS("Successfully completed refresh_video_metadata"))
+
+            # Generate image derivatives the background worker has not reached
+            self.stdout.write("Running process_image_derivatives...")
+            call_command("process_image_derivatives")
+            self.stdout.write(self.style.SUCCESS("Successfully completed process_image_derivatives"))
+
+            # Fold whiteboard strokes into snapshots so late joiners load one image
+            self.stdout.write("Running compact_whiteboards...")
+            call_command("compact_whiteboards")
+            self.stdout.write(self.style.SUCCESS("Successfully completed compact_whiteboards"))
+
+            # Delete direct messages past their 7-day expiry
+            self.stdout.write("Running purge_expired_messages...")
+            call_command("purge_expired_messages")
+            self.stdout.write(self.style.SUCCESS("Successfully completed purge_expired_messages"))
+
         except Exception as e:
             self.stdout.write(self.style.ERROR(f"Error running daily tasks: {str(e)}"))
             raise e
@@ -0,0 +1,21 @@
+import requests
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from web.services.github_sync import sync_pull_requests
+
+
+class Command(BaseCommand):
+    help = "Sync pull requests from GitHub into the local table used by the contributors page"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repo", default=settings.GITHUB_REPO, help="Repository in owner/name form")
+
+    def handle(self, *args, **options):
+        try:
+            synced = sync_pull_requests(options["repo"])
+        except requests.RequestException as e:
+            self.stdout.write(self.style.ERROR(f"Error syncing pull requests: {str(e)}"))
+            return
+
+        self.stdout.write(self.style.SUCCESS(f"Synced {synced} pull requests from {options['repo']}"))
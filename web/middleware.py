@@ -1,30 +1,194 @@
 import logging
+import random
 import traceback
 
 import sentry_sdk
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
 from django.http import Http404
 from django.shortcuts import render
 from django.urls import Resolver404, resolve
+from whitenoise.middleware import WhiteNoiseMiddleware
 
 from .models import Course, WebRequest
+from .services.query_audit import append_summary, format_frame, record_queries, request_summary
+from .services.request_timing import install as install_request_timing
+from .services.request_timing import save_profile, start_profile, stop_profile, timing, windows
 from .views import send_slack_message
 
 logger = logging.getLogger(__name__)
 
 
-class HostnameRewriteMiddleware:
+class HybridMiddleware:
+    """
+    Base for middleware that runs in whichever mode the rest of the stack uses.
+
+    A sync-only middleware makes Django hand the whole request to a thread, even when the view is
+    async. Subclasses implement ``__call__`` for WSGI and ``__acall__`` for ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise that serves static files in either mode and awaits the next layer under ASGI."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class HostnameRewriteMiddleware(HybridMiddleware):
+    def rewrite(self, request):
         # Rewrite the hostname only if it contains alphaonelabs99282llkb
         if "alphaonelabs99282llkb" in request.META.get("HTTP_HOST", ""):
             request.META["HTTP_HOST"] = "alphaonelabs.com"
 
-        # Proceed with the request
-        response = self.get_response(request)
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.rewrite(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        self.rewrite(request)
+        return await self.get_response(request)
+
+
+class QueryAuditMiddleware(HybridMiddleware):
+    """
+    Record each request's queries when ``QUERY_AUDIT`` is on.
+
+    A likely N+1 is logged as a warning with its stack, and a summary line per request is
+    appended to ``QUERY_AUDIT_LOG`` for the ``query_report`` command.
+    """
+
+    def __init__(self, get_response):
+        if not settings.QUERY_AUDIT:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with record_queries() as log:
+            response = self.get_response(request)
+        self.report(request, response, log)
+        return response
+
+    async def __acall__(self, request):
+        with record_queries() as log:
+            response = await self.get_response(request)
+        await sync_to_async(self.report)(request, response, log)
         return response
 
+    def report(self, request, response, log):
+        summary = request_summary(request, response, log)
+        repeated = log.repeated()
+        for repeat in repeated:
+            stack = "\n".join(f"    at {format_frame(frame)}" for frame in repeat["stack"])
+            logger.warning(
+                f"Possible N+1 on {request.method} {summary['route']}: {repeat['count']} queries shaped like "
+                f"{repeat['shape']}\n{stack}"
+            )
+        try:
+            append_summary(summary)
+        except OSError as e:
+            logger.error(f"Could not write the query audit log: {e}")
+
+
+class ServerTimingMiddleware(HybridMiddleware):
+    """
+    Time each request by category when ``SERVER_TIMING`` is on.
+
+    Staff get the breakdown in a ``Server-Timing`` header. Every request feeds the per-view latency
+    windows, and a sampled share of slow requests leaves a profile (see ``web.services.request_timing``).
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        install_request_timing()
+
+    def start_profile(self):
+        threshold = settings.SERVER_TIMING_PROFILE_THRESHOLD_MS
+        if threshold and random.random() < settings.SERVER_TIMING_PROFILE_SAMPLE_RATE:
+            return start_profile()
+        return None
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profiler = self.start_profile()
+        with timing() as request_timing:
+            response = self.get_response(request)
+        if profiler is not None:
+            stop_profile(profiler)
+        view = self.record(request, response, request_timing, getattr(request, "user", None))
+        write_summary = windows.write_due()
+        if profiler is not None or write_summary:
+            self.persist(view, request_timing, profiler, write_summary)
+        return response
+
+    async def __acall__(self, request):
+        profiler = self.start_profile()
+        with timing() as request_timing:
+            response = await self.get_response(request)
+        if profiler is not None:
+            stop_profile(profiler)
+        user = await request.auser() if hasattr(request, "auser") else None
+        view = self.record(request, response, request_timing, user)
+        write_summary = windows.write_due()
+        if profiler is not None or write_summary:
+            await sync_to_async(self.persist)(view, request_timing, profiler, write_summary)
+        return response
+
+    def record(self, request, response, request_timing, user):
+        match = getattr(request, "resolver_match", None)
+        view = match.view_name if match else "<unresolved>"
+        windows.record(view, request_timing)
+        if user is not None and user.is_staff:
+            existing = response.headers.get("Server-Timing")
+            header = request_timing.header()
+            response["Server-Timing"] = f"{existing}, {header}" if existing else header
+        return view
+
+    def persist(self, view, request_timing, profiler, write_summary):
+        try:
+            if profiler is not None and request_timing.total * 1000 >= settings.SERVER_TIMING_PROFILE_THRESHOLD_MS:
+                path = save_profile(profiler, view, request_timing)
+                logger.info(f"Profiled {view} ({request_timing.total * 1000:.0f} ms) to {path}")
+            if write_summary:
+                windows.write()
+        except OSError as e:
+            logger.error(f"Could not write request timings: {e}")
+
 
 class GlobalExceptionMiddleware:
     def __init__(self, get_response):
@@ -70,15 +234,31 @@ class GlobalExceptionMiddleware:
         return None
 
 
-class WebRequestMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
+class WebRequestMiddleware(HybridMiddleware):
+    """Count requests per client and path in ``WebRequest``; under ASGI the write runs off the event loop."""
 
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        self.track(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        await sync_to_async(self.track)(request, response)
+        return response
+
+    def track(self, request, response):
         # Skip tracking for static files
         if request.path.startswith("/static/"):
             logger.debug(f"Skipping tracking for static file: {request.path}")
-            return self.get_response(request)
+            return
+
+        # Only track successful responses and 404s
+        logger.debug(f"Response status code: {response.status_code}")
+        if response.status_code >= 500:
+            return
 
         try:
             # Try to resolve the URL to get the view name
@@ -105,39 +285,29 @@ class WebRequestMiddleware:
                     logger.debug("Course not found, will create WebRequest without course association")
                     # Don't return here, continue to create WebRequest without course
 
-            # Get the response first
-            response = self.get_response(request)
-            logger.debug(f"Response status code: {response.status_code}")
-
-            # Only track successful responses and 404s
-            if response.status_code < 500:
-                # Create or update web request
-                web_request, created = WebRequest.objects.get_or_create(
-                    ip_address=ip_address,
-                    user=user,
-                    agent=agent,
-                    path=request.path,
-                    course=course,
-                    defaults={"referer": referer, "count": 1},
-                )
-
-                if not created:
-                    web_request.count += 1
-                    web_request.referer = referer  # Update referer
-                    web_request.save()
-                    logger.debug(f"Updated existing web request, new count: {web_request.count}")
-                else:
-                    logger.debug("Created new web request")
-
-            return response
+            # Create or update web request
+            web_request, created = WebRequest.objects.get_or_create(
+                ip_address=ip_address,
+                user=user,
+                agent=agent,
+                path=request.path,
+                course=course,
+                defaults={"referer": referer, "count": 1},
+            )
+
+            if not created:
+                web_request.count += 1
+                web_request.referer = referer  # Update referer
+                web_request.save()
+                logger.debug(f"Updated existing web request, new count: {web_request.count}")
+            else:
+                logger.debug("Created new web request")
 
         except (Http404, Resolver404) as e:
-            # Let Django handle 404 errors
+            # Paths Django could not route are not tracked
             logger.debug(f"Caught 404 error: {str(e)}")
-            return self.get_response(request)
         except Exception as e:
-            # Log and report unexpected errors before letting Django handle them
+            # Log and report unexpected errors; tracking never changes the response
             logger.error(f"Unexpected error in middleware: {str(e)}")
             # Report to Sentry
             sentry_sdk.capture_exception(e)
-            return self.get_response(request)
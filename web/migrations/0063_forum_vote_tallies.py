@@ -0,0 +1,82 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:17
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def backfill_forum_tallies(apps, schema_editor):
+    """Populate the denormalized vote, reply and activity columns from existing rows."""
+    ForumTopic = apps.get_model("web", "ForumTopic")
+    ForumReply = apps.get_model("web", "ForumReply")
+
+    upvotes = Count("votes", filter=Q(votes__vote_type="up"), distinct=True)
+    downvotes = Count("votes", filter=Q(votes__vote_type="down"), distinct=True)
+
+    for reply in ForumReply.objects.annotate(up=upvotes, down=downvotes):
+        if reply.up or reply.down:
+            ForumReply.objects.filter(pk=reply.pk).update(upvotes=reply.up, downvotes=reply.down)
+
+    topics = ForumTopic.objects.annotate(up=upvotes, down=downvotes, replies_total=Count("replies", distinct=True))
+    for topic in topics:
+        last_reply = ForumReply.objects.filter(topic_id=topic.pk).order_by("-created_at", "-pk").first()
+        ForumTopic.objects.filter(pk=topic.pk).update(
+            upvotes=topic.up,
+            downvotes=topic.down,
+            reply_count=topic.replies_total,
+            last_reply=last_reply,
+            last_activity_at=last_reply.created_at if last_reply else topic.created_at,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0062_update_waitingroom_for_sessions"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="forumreply",
+            name="downvotes",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="forumreply",
+            name="upvotes",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="forumtopic",
+            name="downvotes",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="forumtopic",
+            name="last_activity_at",
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name="forumtopic",
+            name="last_reply",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="web.forumreply",
+            ),
+        ),
+        migrations.AddField(
+            model_name="forumtopic",
+            name="reply_count",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="forumtopic",
+            name="upvotes",
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_forum_tallies, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0063_forum_vote_tallies"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContributorMetrics",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("username", models.CharField(max_length=100, unique=True)),
+                ("profile", models.JSONField(blank=True, default=dict)),
+                ("prs_created", models.PositiveIntegerField(default=0)),
+                ("prs_merged", models.PositiveIntegerField(default=0)),
+                ("issues_created", models.PositiveIntegerField(default=0)),
+                ("pr_reviews", models.PositiveIntegerField(default=0)),
+                ("pr_comments", models.PositiveIntegerField(default=0)),
+                ("issue_comments", models.PositiveIntegerField(default=0)),
+                ("issue_assignments", models.PositiveIntegerField(default=0)),
+                ("lines_added", models.PositiveIntegerField(default=0)),
+                ("lines_deleted", models.PositiveIntegerField(default=0)),
+                ("first_contribution_at", models.DateTimeField(blank=True, null=True)),
+                ("refreshed_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "verbose_name_plural": "Contributor metrics",
+            },
+        ),
+    ]
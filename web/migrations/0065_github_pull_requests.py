@@ -0,0 +1,43 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0064_contributor_metrics"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GitHubSyncState",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("key", models.CharField(max_length=200, unique=True)),
+                ("etag", models.CharField(blank=True, max_length=200)),
+                ("cursor", models.DateTimeField(blank=True, null=True)),
+                ("last_synced_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GitHubPullRequest",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("repo", models.CharField(max_length=200)),
+                ("number", models.PositiveIntegerField()),
+                ("title", models.CharField(blank=True, max_length=500)),
+                ("state", models.CharField(choices=[("open", "Open"), ("closed", "Closed")], max_length=10)),
+                ("author_login", models.CharField(db_index=True, max_length=100)),
+                ("author_avatar_url", models.URLField(blank=True, max_length=500)),
+                ("author_profile_url", models.URLField(blank=True, max_length=500)),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("merged_at", models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                "ordering": ["-updated_at"],
+                "unique_together": {("repo", "number")},
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0066_geocode_cache"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CalendarSyncOperation",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("session_id", models.PositiveIntegerField(db_index=True)),
+                (
+                    "action",
+                    models.CharField(choices=[("upsert", "Create or update"), ("delete", "Delete")], max_length=10),
+                ),
+                ("meeting_id", models.CharField(blank=True, max_length=100)),
+                ("attempts", models.PositiveSmallIntegerField(default=0)),
+                ("last_error", models.TextField(blank=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("processed_at", models.DateTimeField(blank=True, db_index=True, null=True)),
+            ],
+            options={
+                "ordering": ["id"],
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.1.15 on 2026-10-18 21:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0067_calendar_sync_outbox"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="VideoMetadata",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("provider", models.CharField(choices=[("youtube", "YouTube"), ("vimeo", "Vimeo")], max_length=10)),
+                ("video_id", models.CharField(help_text="Canonical video ID on the provider", max_length=32)),
+                ("title", models.CharField(blank=True, max_length=200)),
+                ("description", models.TextField(blank=True)),
+                ("thumbnail_url", models.URLField(blank=True)),
+                (
+                    "duration",
+                    models.PositiveIntegerField(blank=True, help_text="Length in seconds, when known", null=True),
+                ),
+                ("fetched_at", models.DateTimeField(blank=True, db_index=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                "verbose_name_plural": "Video metadata",
+                "unique_together": {("provider", "video_id")},
+            },
+        ),
+        migrations.AddField(
+            model_name="educationalvideo",
+            name="metadata",
+            field=models.ForeignKey(
+                blank=True,
+                help_text="Set from video_url on save",
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="videos",
+                to="web.videometadata",
+            ),
+        ),
+    ]
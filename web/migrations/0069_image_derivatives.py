@@ -0,0 +1,46 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0068_video_metadata"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ImageManifest",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("source", models.CharField(max_length=255, unique=True)),
+                ("spec", models.CharField(max_length=30)),
+                ("content_hash", models.CharField(blank=True, max_length=64)),
+                ("derivatives", models.JSONField(blank=True, default=dict)),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("processing", "Processing"),
+                            ("ready", "Ready"),
+                            ("failed", "Failed"),
+                        ],
+                        db_index=True,
+                        default="pending",
+                        max_length=12,
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="course",
+            name="image",
+            field=models.ImageField(
+                blank=True, help_text="Course image (shown cropped to a square)", upload_to="course_images"
+            ),
+        ),
+    ]
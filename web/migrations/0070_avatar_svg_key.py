@@ -0,0 +1,20 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0069_image_derivatives"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="avatar",
+            name="svg_key",
+            field=models.CharField(
+                blank=True, help_text="Content address of the attributes svg was rendered from", max_length=64
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.15 on 2026-10-18 22:57
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0071_whiteboard_boards"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="peermessage",
+            index=models.Index(fields=["receiver", "created_at"], name="web_peermes_receive_4510d3_idx"),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0072_peermessage_receiver_created_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="profile",
+            name="calendar_token",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Secret for the iCal feed URL",
+                max_length=64,
+                null=True,
+                unique=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0073_profile_calendar_token"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="session",
+            index=models.Index(fields=["latitude", "longitude"], name="web_session_latitud_87f9f8_idx"),
+        ),
+    ]
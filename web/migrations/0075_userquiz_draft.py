@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0074_session_coordinates_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="userquiz",
+            name="draft",
+            field=models.JSONField(blank=True, help_text="Autosaved draft of an attempt still in progress", null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0075_userquiz_draft"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="calendarsyncoperation",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="calendarsyncoperation",
+            name="claimed_by",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+    ]
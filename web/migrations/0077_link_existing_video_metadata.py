@@ -0,0 +1,51 @@
+# Generated manually
+
+import re
+from urllib.parse import parse_qs, urlparse
+
+from django.db import migrations
+
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+
+
+def parse_video_url(url):
+    """``(provider, video_id)`` for a YouTube or Vimeo URL, as web.services.video_metadata parsed it at 0068."""
+    parsed = urlparse((url or "").strip())
+    host = parsed.netloc.lower()
+    path = parsed.path.strip("/")
+
+    if host in ("youtu.be", "www.youtu.be"):
+        vid = path.split("/")[0]
+    elif host in ("youtube.com", "www.youtube.com", "m.youtube.com"):
+        vid = parse_qs(parsed.query).get("v", [""])[0]
+        if not vid and path.startswith(("embed/", "shorts/")):
+            vid = path.split("/")[1]
+    elif host in ("vimeo.com", "www.vimeo.com", "player.vimeo.com"):
+        vid = path.split("/")[-1]
+        return ("vimeo", vid) if vid.isdigit() else None
+    else:
+        return None
+    return ("youtube", vid) if YOUTUBE_ID.match(vid) else None
+
+
+def link_existing_videos(apps, schema_editor):
+    """Point videos saved before 0068 at metadata rows; run_daily fetches the new, unfetched rows."""
+    EducationalVideo = apps.get_model("web", "EducationalVideo")
+    VideoMetadata = apps.get_model("web", "VideoMetadata")
+    for video in EducationalVideo.objects.filter(metadata__isnull=True).only("id", "video_url").iterator():
+        key = parse_video_url(video.video_url)
+        if key is None:
+            continue
+        metadata, _ = VideoMetadata.objects.get_or_create(provider=key[0], video_id=key[1])
+        EducationalVideo.objects.filter(pk=video.pk).update(metadata=metadata)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0076_calendarsyncoperation_claim"),
+    ]
+
+    operations = [
+        migrations.RunPython(link_existing_videos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 00:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0077_link_existing_video_metadata"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imagemanifest",
+            name="claimed_at",
+            field=models.DateTimeField(blank=True, help_text="When a worker started processing it", null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.15 on 2026-10-19 00:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("web", "0078_imagemanifest_claimed_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="geocodecache",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
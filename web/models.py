@@ -5,7 +5,6 @@ import time
 import uuid
 from datetime import datetime, timedelta
 from io import BytesIO
-from urllib.parse import parse_qs, urlparse
 
 from allauth.account.signals import user_signed_up
 from django.conf import settings
@@ -14,8 +13,8 @@ from django.core.exceptions import ValidationError
 from django.core.files.base import ContentFile
 from django.core.mail import send_mail
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Avg
+from django.db import models, transaction
+from django.db.models import Avg, Count
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.urls import reverse
@@ -66,6 +65,9 @@ class Profile(models.Model):
     slack_username = models.CharField(max_length=50, blank=True, help_text="Your Slack username")
     github_username = models.CharField(max_length=50, blank=True, help_text="Your GitHub username (without @)")
     referral_code = models.CharField(max_length=20, unique=True, blank=True)
+    calendar_token = models.CharField(
+        max_length=64, unique=True, null=True, blank=True, editable=False, help_text="Secret for the iCal feed URL"
+    )
     referred_by = models.ForeignKey("self", on_delete=models.SET_NULL, null=True, blank=True, related_name="referrals")
     referral_earnings = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     stripe_account_id = models.CharField(max_length=100, blank=True)
@@ -151,6 +153,9 @@ class Avatar(models.Model):
     clothing = models.CharField(max_length=50, default="hoodie")
     clothing_color = models.CharField(max_length=7, default="#0000FF")
     svg = models.TextField(blank=True, help_text="Stored SVG string of the custom avatar")
+    svg_key = models.CharField(
+        max_length=64, blank=True, help_text="Content address of the attributes svg was rendered from"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -158,41 +163,12 @@ class Avatar(models.Model):
         return f"Avatar for {self.profile.user.username if hasattr(self, 'profile') and self.profile else 'No Profile'}"
 
     def save(self, *args, **kwargs):
-        from python_avatars import (
-            AccessoryType,
-        )
-        from python_avatars import Avatar as PythonAvatar
-        from python_avatars import (
-            AvatarStyle,
-            ClothingType,
-            EyebrowType,
-            EyeType,
-            FacialHairType,
-            HairType,
-            MouthType,
-            NoseType,
-            SkinColor,
-        )
-
-        # Create avatar using python_avatars
-        avatar = PythonAvatar(
-            style=getattr(AvatarStyle, self.style.upper(), AvatarStyle.CIRCLE),
-            background_color=self.background_color,
-            top=getattr(HairType, self.top.upper(), HairType.SHORT_FLAT),
-            eyebrows=getattr(EyebrowType, self.eyebrows.upper(), EyebrowType.DEFAULT),
-            eyes=getattr(EyeType, self.eyes.upper(), EyeType.DEFAULT),
-            nose=getattr(NoseType, self.nose.upper(), NoseType.DEFAULT),
-            mouth=getattr(MouthType, self.mouth.upper(), MouthType.DEFAULT),
-            facial_hair=getattr(FacialHairType, self.facial_hair.upper(), FacialHairType.NONE),
-            skin_color=getattr(SkinColor, self.skin_color.upper(), SkinColor.LIGHT),
-            hair_color=self.hair_color,
-            accessory=getattr(AccessoryType, self.accessory.upper(), AccessoryType.NONE),
-            clothing=getattr(ClothingType, self.clothing.upper(), ClothingType.HOODIE),
-            clothing_color=self.clothing_color,
-        )
+        from .services.avatar_render import AVATAR_FIELDS, render_avatar_svg, render_key
 
-        # Save SVG string
-        self.svg = avatar.render()
+        # Identical attribute combinations share one cached render; unchanged avatars skip it entirely
+        attributes = {field: getattr(self, field) for field in AVATAR_FIELDS}
+        if not self.svg or render_key(attributes) != self.svg_key:
+            self.svg, self.svg_key = render_avatar_svg(attributes)
         super().save(*args, **kwargs)
 
 
@@ -242,7 +218,7 @@ class Course(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, max_length=200)
     image = models.ImageField(
-        upload_to="course_images", help_text="Course image (will be resized to 300x300 pixels)", blank=True
+        upload_to="course_images", help_text="Course image (shown cropped to a square)", blank=True
     )
     teacher = models.ForeignKey(User, on_delete=models.CASCADE, related_name="courses_teaching")
     description = MarkdownxField()
@@ -288,30 +264,6 @@ class Course(models.Model):
                 counter += 1
             self.slug = slug
 
-        # Handle image resizing
-        if self.image:
-            img = Image.open(self.image)
-            # Convert to RGB if necessary
-            if img.mode != "RGB":
-                img = img.convert("RGB")
-            # Crop image to a square format
-            width, height = img.size
-            min_dim = min(width, height)
-            left = (width - min_dim) / 2
-            top = (height - min_dim) / 2
-            right = (width + min_dim) / 2
-            bottom = (height + min_dim) / 2
-            img = img.crop((left, top, right, bottom))
-            # Resize the image to 300x300 pixels
-            img = img.resize((500, 500), Image.Resampling.LANCZOS)
-            # Save the resized image
-            buffer = BytesIO()
-            img.save(buffer, format="JPEG", quality=90)
-            # Update the ImageField
-            file_name = self.image.name
-            self.image.delete(save=False)  # Delete old image
-            self.image.save(file_name, ContentFile(buffer.getvalue()), save=False)
-
         super().save(*args, **kwargs)
 
     def delete(self, *args, **kwargs):
@@ -328,7 +280,11 @@ class Course(models.Model):
 
     @property
     def average_rating(self):
-        avg = float(self.reviews.aggregate(avg=Avg("rating"))["avg"] or 0)
+        # Listings annotate avg_rating=Avg("reviews__rating") rather than query per course
+        if hasattr(self, "avg_rating"):
+            avg = float(self.avg_rating or 0)
+        else:
+            avg = float(self.reviews.aggregate(avg=Avg("rating"))["avg"] or 0)
         return round(avg, 2)
 
 
@@ -402,11 +358,27 @@ class Session(models.Model):
 
     class Meta:
         ordering = ["start_time"]
+        indexes = [models.Index(fields=["latitude", "longitude"])]
 
     def __str__(self):
         return f"{self.course.title} - {self.title}"
 
+    # Fields that appear on the session's Google Calendar event
+    CALENDAR_FIELDS = ("title", "description", "start_time", "end_time", "location", "is_virtual")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember what the calendar event was last built from, so save() needs no extra query
+        instance._calendar_snapshot = instance._calendar_values()
+        return instance
+
+    def _calendar_values(self):
+        return tuple(self.__dict__.get(field) for field in self.CALENDAR_FIELDS)
+
     def save(self, *args, **kwargs):
+        from .calendar_sync import start_outbox_worker
+
         # Store original times when first created
         # calculate the lat and longitiude dynamically
 
@@ -417,28 +389,17 @@ class Session(models.Model):
             self.original_start_time = self.start_time
             self.original_end_time = self.end_time
 
-        # Handle virtual meeting creation/updates
         is_new = self._state.adding
-        old_instance = None if is_new else Session.objects.get(pk=self.pk)
-
-        # First save to get the ID
-        super().save(*args, **kwargs)
+        calendar_changed = is_new or getattr(self, "_calendar_snapshot", None) != self._calendar_values()
 
-        if self.is_virtual:
-            from .calendar_sync import create_calendar_event, update_calendar_event
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
-            if is_new:
-                event_id = create_calendar_event(self)
-                if event_id:
-                    self.meeting_id = event_id
-                    # Update without triggering save() again
-                    Session.objects.filter(pk=self.pk).update(meeting_id=event_id)
-            elif old_instance and (
-                old_instance.start_time != self.start_time
-                or old_instance.end_time != self.end_time
-                or old_instance.title != self.title
-            ):
-                update_calendar_event(self)
+            # Virtual meetings are synced to Google Calendar by the outbox worker after commit
+            if self.is_virtual and calendar_changed:
+                CalendarSyncOperation.objects.create(session_id=self.pk, action="upsert")
+                transaction.on_commit(start_outbox_worker)
+        self._calendar_snapshot = self._calendar_values()
 
     def roll_forward(self):
         """Roll the session forward based on the rollover pattern."""
@@ -470,34 +431,32 @@ class Session(models.Model):
         return True
 
     def delete(self, *args, **kwargs):
-        # Delete associated calendar event if exists
-        if self.is_virtual and self.meeting_id:
-            from .calendar_sync import delete_calendar_event
+        from .calendar_sync import start_outbox_worker
 
-            delete_calendar_event(self)
-        super().delete(*args, **kwargs)
+        session_id = self.pk
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            # Queue removal of the calendar event; pending updates for the session are dropped by the worker
+            if self.is_virtual and self.meeting_id:
+                CalendarSyncOperation.objects.create(session_id=session_id, action="delete", meeting_id=self.meeting_id)
+                transaction.on_commit(start_outbox_worker)
+        return result
 
     def fetch_coordinates(self):
-        """Fetch latitude and longitude using OpenStreetMap's Nominatim API."""
-        from .utils import geocode_address
+        """
+        Use stored coordinates for this session's location, or queue the location for geocoding.
+
+        Queued locations are geocoded by a background worker, which fills in the coordinates afterwards.
+        """
+        from .services.geocoding import cached_coordinates, enqueue_addresses
 
         if not self.location:
             return
-        try:
-            coordinates = geocode_address(self.location)
-            if coordinates:
-                self.latitude, self.longitude = coordinates
-                print("location store:", self.latitude, self.longitude)
-            else:
-                print(
-                    f"Skipping session {self.id} due to invalid coordinates:",
-                    f"lat={self.latitude}, \n lng={self.longitude}",
-                )
-        except Exception as e:
-            import logging
-
-            logger = logging.getLogger(__name__)
-            logger.error("Error geocoding session %s location '%s': %s", self.id, self.location, str(e))
+        coordinates = cached_coordinates(self.location)
+        if coordinates:
+            self.latitude, self.longitude = coordinates
+        else:
+            enqueue_addresses([self.location])
 
     def is_live(self):
         """Returns True if the session is live right now."""
@@ -631,18 +590,33 @@ class SessionAttendance(models.Model):
         return f"{self.student.username} - {self.session.title} ({self.status})"
 
 
+class CourseProgressQuerySet(models.QuerySet):
+    def with_completion(self):
+        """Annotate the counts ``completion_percentage`` needs, so listing progress does not query per row."""
+        return self.annotate(
+            session_total=Count("enrollment__course__sessions", distinct=True),
+            completed_total=Count("completed_sessions", distinct=True),
+        )
+
+
 class CourseProgress(models.Model):
     enrollment = models.OneToOneField(Enrollment, on_delete=models.CASCADE, related_name="progress")
     completed_sessions = models.ManyToManyField(Session, related_name="completed_by")
     last_accessed = models.DateTimeField(auto_now=True)
     notes = models.TextField(blank=True)
 
+    objects = CourseProgressQuerySet.as_manager()
+
     @property
     def completion_percentage(self):
-        total_sessions = self.enrollment.course.sessions.count()
+        total_sessions = getattr(self, "session_total", None)
+        if total_sessions is None:
+            total_sessions = self.enrollment.course.sessions.count()
         if total_sessions == 0:
             return 0
-        completed = self.completed_sessions.count()
+        completed = getattr(self, "completed_total", None)
+        if completed is None:
+            completed = self.completed_sessions.count()
         return int((completed / total_sessions) * 100)
 
     @property
@@ -661,6 +635,31 @@ class CourseProgress(models.Model):
         return f"{self.enrollment.student.username}'s progress in {self.enrollment.course.title}"
 
 
+class VideoMetadata(models.Model):
+    """oEmbed details for a YouTube or Vimeo video, shared by every EducationalVideo that links to it."""
+
+    PROVIDER_CHOICES = [
+        ("youtube", "YouTube"),
+        ("vimeo", "Vimeo"),
+    ]
+
+    provider = models.CharField(max_length=10, choices=PROVIDER_CHOICES)
+    video_id = models.CharField(max_length=32, help_text="Canonical video ID on the provider")
+    title = models.CharField(max_length=200, blank=True)
+    description = models.TextField(blank=True)
+    thumbnail_url = models.URLField(blank=True)
+    duration = models.PositiveIntegerField(null=True, blank=True, help_text="Length in seconds, when known")
+    fetched_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = ["provider", "video_id"]
+        verbose_name_plural = "Video metadata"
+
+    def __str__(self):
+        return f"{self.provider}:{self.video_id}"
+
+
 class EducationalVideo(models.Model):
     """Model for educational videos shared by users."""
 
@@ -676,6 +675,14 @@ class EducationalVideo(models.Model):
         blank=True,
         help_text="User who uploaded the video. If null, the submission is considered anonymous.",
     )
+    metadata = models.ForeignKey(
+        VideoMetadata,
+        on_delete=models.SET_NULL,
+        related_name="videos",
+        null=True,
+        blank=True,
+        help_text="Set from video_url on save",
+    )
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -686,12 +693,21 @@ class EducationalVideo(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Parse the URL once here so templates never have to
+        from .services.video_metadata import metadata_for_url
+
+        self.metadata = metadata_for_url(self.video_url, current=self.metadata if self.metadata_id else None)
+        super().save(*args, **kwargs)
+
     @property
     def thumbnail_url(self):
         """
-        Build the URL for YouTube’s high-quality default thumbnail.
-        Returns None if this isn’t a YouTube video.
+        Return the stored thumbnail, or YouTube's high-quality default thumbnail.
+        Returns None if neither is available.
         """
+        if self.metadata and self.metadata.thumbnail_url:
+            return self.metadata.thumbnail_url
         vid = self.youtube_id
         if vid:
             return f"https://img.youtube.com/vi/{vid}/hqdefault.jpg"
@@ -699,24 +715,15 @@ class EducationalVideo(models.Model):
 
     @property
     def youtube_id(self):
-        """
-        Extract the YouTube video ID, whether it's a long or short URL.
-        Returns None if not a YouTube link.
-        """
-        parsed = urlparse(self.video_url)
-        host = parsed.netloc.lower()
-
-        # youtu.be/<id>
-        if host in ("youtu.be", "www.youtu.be"):
-            return parsed.path.lstrip("/")
-
-        # youtube.com/watch?v=<id>
-        if host in ("youtube.com", "www.youtube.com"):
-            try:
-                return parse_qs(parsed.query).get("v", [None])[0]
-            except Exception:
-                return None
-
+        """Return the YouTube video ID, or None if this is not a YouTube video."""
+        if self.metadata_id is None:
+            # Not linked to metadata yet, e.g. saved before URLs were parsed on save
+            from .services.video_metadata import parse_video_url
+
+            key = parse_video_url(self.video_url)
+            return key[1] if key and key[0] == "youtube" else None
+        if self.metadata.provider == "youtube":
+            return self.metadata.video_id
         return None
 
 
@@ -843,17 +850,23 @@ class ForumTopic(models.Model):
     github_issue_url = models.URLField(blank=True, default="", help_text="Link to related GitHub issue")
     github_milestone_url = models.URLField(blank=True, default="", help_text="Link to related GitHub milestone")
     views = models.IntegerField(default=0)
+    # Denormalized tallies, maintained by topic_vote and the ForumReply signals
+    upvotes = models.IntegerField(default=0)
+    downvotes = models.IntegerField(default=0)
+    reply_count = models.IntegerField(default=0)
+    last_reply = models.ForeignKey("ForumReply", on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    last_activity_at = models.DateTimeField(default=timezone.now, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     # Add these methods to the ForumTopic class
     def upvote_count(self):
         """Return the number of upvotes for this topic."""
-        return self.votes.filter(vote_type="up").count()
+        return self.upvotes
 
     def downvote_count(self):
         """Return the number of downvotes for this topic."""
-        return self.votes.filter(vote_type="down").count()
+        return self.downvotes
 
     def vote_score(self):
         """Return the total vote score (upvotes - downvotes)."""
@@ -883,17 +896,20 @@ class ForumReply(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="forum_replies")
     content = models.TextField()
     is_solution = models.BooleanField(default=False)
+    # Denormalized tallies, maintained by reply_vote
+    upvotes = models.IntegerField(default=0)
+    downvotes = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     # Add the same methods to the ForumReply class
     def upvote_count(self):
         """Return the number of upvotes for this reply."""
-        return self.votes.filter(vote_type="up").count()
+        return self.upvotes
 
     def downvote_count(self):
         """Return the number of downvotes for this reply."""
-        return self.votes.filter(vote_type="down").count()
+        return self.downvotes
 
     def vote_score(self):
         """Return the total vote score (upvotes - downvotes)."""
@@ -954,6 +970,7 @@ class PeerMessage(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [models.Index(fields=["receiver", "created_at"])]
 
     def __str__(self):
         return f"Message from {self.sender.username} to {self.receiver.username}"
@@ -2219,6 +2236,7 @@ class UserQuiz(models.Model):
     start_time = models.DateTimeField(auto_now_add=True)
     end_time = models.DateTimeField(null=True, blank=True)
     answers = models.JSONField(default=dict, blank=True, help_text="JSON storing the user's answers and question IDs")
+    draft = models.JSONField(null=True, blank=True, help_text="Autosaved draft of an attempt still in progress")
 
     class Meta:
         ordering = ["-start_time"]
@@ -3085,3 +3103,194 @@ class Response(models.Model):
 
     def __str__(self):
         return f"Response by {self.user.username} to {self.question.text}"
+
+
+class ContributorMetrics(models.Model):
+    """GitHub activity for one contributor, refreshed in the background and read by the contributor page."""
+
+    username = models.CharField(max_length=100, unique=True)
+    profile = models.JSONField(default=dict, blank=True)
+    prs_created = models.PositiveIntegerField(default=0)
+    prs_merged = models.PositiveIntegerField(default=0)
+    issues_created = models.PositiveIntegerField(default=0)
+    pr_reviews = models.PositiveIntegerField(default=0)
+    pr_comments = models.PositiveIntegerField(default=0)
+    issue_comments = models.PositiveIntegerField(default=0)
+    issue_assignments = models.PositiveIntegerField(default=0)
+    lines_added = models.PositiveIntegerField(default=0)
+    lines_deleted = models.PositiveIntegerField(default=0)
+    first_contribution_at = models.DateTimeField(null=True, blank=True)
+    refreshed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = "Contributor metrics"
+
+    def __str__(self):
+        return f"GitHub metrics for {self.username}"
+
+    def is_stale(self, max_age):
+        return self.refreshed_at is None or timezone.now() - self.refreshed_at > max_age
+
+
+class GitHubPullRequest(models.Model):
+    """Local copy of a repository's pull requests, kept current by ``sync_github_contributors``."""
+
+    STATE_CHOICES = [
+        ("open", "Open"),
+        ("closed", "Closed"),
+    ]
+
+    repo = models.CharField(max_length=200)
+    number = models.PositiveIntegerField()
+    title = models.CharField(max_length=500, blank=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES)
+    author_login = models.CharField(max_length=100, db_index=True)
+    author_avatar_url = models.URLField(max_length=500, blank=True)
+    author_profile_url = models.URLField(max_length=500, blank=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    merged_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ["repo", "number"]
+        ordering = ["-updated_at"]
+
+    def __str__(self):
+        return f"{self.repo}#{self.number}"
+
+
+class GitHubSyncState(models.Model):
+    """Cursor and ETag for an incremental GitHub sync, so each run only fetches what changed."""
+
+    key = models.CharField(max_length=200, unique=True)
+    etag = models.CharField(max_length=200, blank=True)
+    cursor = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.key
+
+
+class GeocodeCache(models.Model):
+    """
+    Geocoding results shared by every worker process, keyed by a digest of the normalized address.
+
+    Rows start out ``pending`` and double as the geocoding queue drained by ``process_geocode_queue``.
+    Failed lookups wait until ``next_attempt_at`` before they are tried again.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("ok", "Found"),
+        ("not_found", "Not Found"),
+        ("failed", "Failed"),
+    ]
+
+    address_digest = models.CharField(max_length=64, unique=True)
+    address = models.TextField()
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending", db_index=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = "Geocode cache"
+
+    def __str__(self):
+        return f"{self.address} ({self.status})"
+
+
+class CalendarSyncOperation(models.Model):
+    """
+    Outbox entry for a Google Calendar change to a session.
+
+    Written in the same transaction as the session change and sent later by
+    ``calendar_sync.process_calendar_outbox``, which coalesces entries per session.
+    """
+
+    ACTION_CHOICES = [
+        ("upsert", "Create or update"),
+        ("delete", "Delete"),
+    ]
+
+    session_id = models.PositiveIntegerField(db_index=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    meeting_id = models.CharField(max_length=100, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    claimed_by = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    class Meta:
+        ordering = ["id"]
+
+    def __str__(self):
+        return f"{self.action} session {self.session_id}"
+
+
+class ImageManifest(models.Model):
+    """
+    Resized WebP and JPEG copies of an uploaded image.
+
+    ``derivatives`` maps each format to ``[[width, storage name], ...]``, smallest first. Rows are
+    keyed by the original's storage name and only reprocessed when its content hash changes.
+    """
+
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("processing", "Processing"),
+        ("ready", "Ready"),
+        ("failed", "Failed"),
+    ]
+
+    source = models.CharField(max_length=255, unique=True)
+    spec = models.CharField(max_length=30)
+    content_hash = models.CharField(max_length=64, blank=True)
+    derivatives = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default="pending", db_index=True)
+    claimed_at = models.DateTimeField(null=True, blank=True, help_text="When a worker started processing it")
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} ({self.status})"
+
+
+class WhiteboardBoard(models.Model):
+    """
+    A shared whiteboard room.
+
+    ``snapshot`` is a PNG of every stroke compacted so far. Strokes drawn since then are kept as
+    encoded ``WhiteboardFrame`` rows until the next compaction. Only the ``owner``, who opened
+    the board first, and the teacher of the linked ``session`` may clear it.
+    """
+
+    slug = models.SlugField(max_length=64, unique=True)
+    owner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name="whiteboard_boards")
+    session = models.ForeignKey(
+        Session, on_delete=models.SET_NULL, null=True, blank=True, related_name="whiteboard_boards"
+    )
+    snapshot = models.BinaryField(blank=True, default=b"")
+    snapshot_version = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.slug
+
+
+class WhiteboardFrame(models.Model):
+    """One binary batch of strokes, stored until it is compacted into the board's snapshot."""
+
+    board = models.ForeignKey(WhiteboardBoard, on_delete=models.CASCADE, related_name="frames")
+    data = models.BinaryField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.board.slug} frame {self.id}"
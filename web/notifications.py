@@ -10,6 +10,7 @@ from django.urls import reverse
 from django.utils import timezone
 
 from .models import CourseMaterial, Enrollment, Notification, NotificationPreference, Session
+from .services.live_updates import push_counts
 from .slack import send_slack_notification
 
 logger = logging.getLogger(__name__)
@@ -41,8 +42,8 @@ def send_notification(user, notification_data):
 def get_user_notifications(user, mark_as_read=False):
     """Get all notifications for a user."""
     notifications = Notification.objects.filter(user=user).order_by("-created_at")
-    if mark_as_read:
-        notifications.filter(read=False).update(read=True)
+    if mark_as_read and notifications.filter(read=False).update(read=True):
+        push_counts(user.id)
     return notifications
 
 
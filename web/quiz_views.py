@@ -1,15 +1,15 @@
 import json
-import random
 
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
 from django.db.models import Count, Q
-from django.http import HttpResponseForbidden
+from django.http import HttpResponseForbidden, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
 from django.utils import timezone
 from django.utils.crypto import get_random_string
+from django.views.decorators.http import require_POST
 
 from .forms import (
     QuizForm,
@@ -18,6 +18,23 @@ from .forms import (
     TakeQuizForm,
 )
 from .models import Quiz, QuizQuestion, UserQuiz
+from .services.quiz_drafts import (
+    DRAFT_TIMEOUT,
+    attempts_exhausted,
+    create_draft,
+    discard_draft,
+    draft_cookie_name,
+    draft_form_data,
+    draft_started_at,
+    draft_token,
+    extract_answers,
+    load_draft,
+    remaining_seconds,
+    save_draft,
+    start_attempt,
+    time_is_up,
+)
+from .services.quiz_grading import get_answer_key, grade_submission, load_answers, score_answers
 
 
 @login_required
@@ -302,36 +319,48 @@ def take_quiz(request, quiz_id):
 
 def _process_quiz_taking(request, quiz):
     """Helper function to process quiz taking for both routes."""
+    # Get the questions with their options in one go
+    questions = {question.id: question for question in quiz.questions.order_by("order").prefetch_related("options")}
+
     # Check if the quiz has questions
-    if not quiz.questions.exists():
+    if not questions:
         messages.error(request, "This quiz does not have any questions yet.")
         return redirect("quiz_list")
 
-    # Get the questions in the correct order
-    questions = list(quiz.questions.order_by("order"))
+    user = request.user if request.user.is_authenticated else None
 
-    # Shuffle questions if quiz settings require it
-    if quiz.randomize_questions:
-        random.shuffle(questions)
+    # Re-use the draft from a previous page load so refreshes keep their order and answers
+    if request.method == "POST":
+        token = request.POST.get("draft_token")
+    else:
+        token = request.COOKIES.get(draft_cookie_name(quiz))
+    draft = load_draft(token, quiz, user)
 
-    # Create a new UserQuiz attempt record
-    user = request.user if request.user.is_authenticated else None
+    if draft is None:
+        # Check if user has already reached max attempts
+        if attempts_exhausted(quiz, user):
+            messages.error(
+                request, f"You have reached the maximum number of attempts ({quiz.max_attempts}) for this quiz."
+            )
+            return redirect("quiz_detail", quiz_id=quiz.id)
 
-    # Check if user has already reached max attempts
-    if user and quiz.max_attempts > 0:
-        attempt_count = UserQuiz.objects.filter(quiz=quiz, user=user).count()
-        if attempt_count >= quiz.max_attempts:
+        draft = create_draft(quiz, user, questions.values())
+        token = draft_token(draft)
+        # A timed attempt starts with the timer, so the server knows when time runs out
+        if quiz.time_limit and start_attempt(draft, quiz, user) is None:
             messages.error(
                 request, f"You have reached the maximum number of attempts ({quiz.max_attempts}) for this quiz."
             )
             return redirect("quiz_detail", quiz_id=quiz.id)
 
-    user_quiz = UserQuiz(quiz=quiz, user=user)
-    user_quiz.save()
+    # Follow the draft's order; questions added since the draft was started go last
+    question_order = [question_id for question_id in draft["question_order"] if question_id in questions]
+    question_order += [question_id for question_id in questions if question_id not in question_order]
 
     # Prepare questions and options for display
     prepared_questions = []
-    for question in questions:
+    for question_id in question_order:
+        question = questions[question_id]
         q_dict = {
             "id": question.id,
             "text": question.text,
@@ -340,12 +369,14 @@ def _process_quiz_taking(request, quiz):
             "points": question.points,
         }
 
-        # Get options but create new objects that don't have is_correct attribute at all
-        options = list(question.options.all())
+        # Order the options the way the draft shuffled them
+        option_positions = {
+            option_id: position for position, option_id in enumerate(draft["option_order"].get(str(question.id), []))
+        }
+        options = sorted(
+            question.options.all(), key=lambda option: option_positions.get(option.id, len(option_positions))
+        )
 
-        # Shuffle options if quiz has option randomization setting
-        if quiz.randomize_questions:
-            random.shuffle(options)
         # Create plain dictionaries instead of objects to ensure no is_correct data reaches the template
         # This is the most definitive way to prevent any trace of correctness information
         clean_options = []
@@ -355,84 +386,32 @@ def _process_quiz_taking(request, quiz):
             clean_options.append(clean_option)
 
         q_dict["options"] = clean_options
+
+        # Restore any answer autosaved in the draft
+        q_dict["saved_answer"] = draft["answers"].get(f"question_{question.id}", [])
         prepared_questions.append(q_dict)
 
     if request.method == "POST":
-        form = TakeQuizForm(request.POST, quiz=quiz)
+        form = TakeQuizForm(request.POST, quiz=quiz, questions=list(questions.values()))
 
         if form.is_valid():
-            # Process answers
-            answers = {}
-            score = 0
-            total_points = 0
-
-            for question in prepared_questions:
-                q_id = str(question["id"])
-                question_obj = QuizQuestion.objects.get(id=question["id"])
-                total_points += question_obj.points
-
-                if question_obj.question_type == "multiple":
-                    user_answer = form.cleaned_data.get(f"question_{q_id}", None)
-
-                    # Handle case when user_answer is a list (multiple selections)
-                    if isinstance(user_answer, list):
-                        user_answer_ids = [int(ans) for ans in user_answer] if user_answer else []
-                        correct_options = list(
-                            question_obj.options.filter(is_correct=True).values_list("id", flat=True)
-                        )
-
-                        # Check if all user answers are in correct options AND all correct options are selected
-                        is_correct = False
-                        if user_answer_ids and correct_options:
-                            # For strict checking: all correct options must be selected and no incorrect ones
-                            is_correct = set(user_answer_ids) == set(correct_options)
-
-                        answers[q_id] = {
-                            "user_answer": user_answer,
-                            "correct_answer": correct_options,
-                            "is_correct": is_correct,
-                        }
-                    # Handle case when user_answer is a single value (e.g., from radio button)
-                    else:
-                        user_answer_id = int(user_answer) if user_answer is not None else None
-                        correct_options = list(
-                            question_obj.options.filter(is_correct=True).values_list("id", flat=True)
-                        )
-
-                        answers[q_id] = {
-                            "user_answer": user_answer,
-                            "correct_answer": correct_options[0] if correct_options else None,
-                            "is_correct": user_answer_id in correct_options if user_answer_id is not None else False,
-                        }
-
-                    if answers[q_id]["is_correct"]:
-                        score += question_obj.points
-
-                elif question_obj.question_type == "true_false":
-                    user_answer = form.cleaned_data.get(f"question_{q_id}", None)
-                    correct_answer = question_obj.options.filter(is_correct=True).first()
-
-                    # For true/false, the view is receiving the option ID, not the text
-                    correct_id = str(correct_answer.id) if correct_answer else None
-
-                    answers[q_id] = {
-                        "user_answer": user_answer,
-                        "correct_answer": correct_id,
-                        "is_correct": user_answer == correct_id if user_answer else False,
-                    }
-
-                    if answers[q_id]["is_correct"]:
-                        score += question_obj.points
-
-                elif question_obj.question_type == "short":
-                    user_answer = form.cleaned_data.get(f"question_{q_id}", "")
-                    answers[q_id] = {
-                        "user_answer": user_answer,
-                        "is_graded": False,  # Short answers need manual grading
-                    }
-
-            # Calculate percentage score
-            percentage = (score / total_points * 100) if total_points > 0 else 0
+            user_quiz = start_attempt(draft, quiz, user)
+            if user_quiz is None:
+                messages.error(
+                    request, f"You have reached the maximum number of attempts ({quiz.max_attempts}) for this quiz."
+                )
+                return redirect("quiz_detail", quiz_id=quiz.id)
+            if user_quiz.completed:
+                return redirect("quiz_results", user_quiz_id=user_quiz.id)
+            if time_is_up(quiz, user_quiz.start_time):
+                # Too late: only the answers autosaved before time ran out count
+                form = TakeQuizForm(draft_form_data(draft), quiz=quiz, questions=list(questions.values()))
+                form.is_valid()
+                messages.warning(request, "Time ran out before you submitted; your autosaved answers were graded.")
+
+            # Grade against the cached answer key instead of querying each question
+            answer_key = get_answer_key(quiz)
+            answers, percentage = grade_submission(answer_key, form.cleaned_data, question_ids=question_order)
 
             # Update the UserQuiz record
             user_quiz.answers = json.dumps(answers)
@@ -440,22 +419,53 @@ def _process_quiz_taking(request, quiz):
             user_quiz.end_time = timezone.now()
             user_quiz.completed = True
             user_quiz.save()
+            discard_draft(draft)
 
             # Redirect to results page
-            return redirect("quiz_results", user_quiz_id=user_quiz.id)
+            response = redirect("quiz_results", user_quiz_id=user_quiz.id)
+            response.delete_cookie(draft_cookie_name(quiz))
+            return response
     else:
-        form = TakeQuizForm(quiz=quiz)
+        form = TakeQuizForm(quiz=quiz, questions=list(questions.values()))
 
     context = {
         "quiz": quiz,
         "questions": prepared_questions,
         "form": form,
-        "user_quiz_id": user_quiz.id,
-        "user_quiz": user_quiz,
+        "draft_token": token,
+        "user_quiz_id": draft["user_quiz_id"],
         "time_limit": quiz.time_limit,
+        "remaining_seconds": remaining_seconds(draft, quiz),
     }
 
-    return render(request, "web/quiz/take_quiz.html", context)
+    response = render(request, "web/quiz/take_quiz.html", context)
+    response.set_cookie(draft_cookie_name(quiz), token, max_age=DRAFT_TIMEOUT, httponly=True, samesite="Lax")
+    return response
+
+
+@require_POST
+def autosave_quiz_draft(request, quiz_id):
+    """Store the in-progress answers of a quiz draft; the first answer starts an untimed attempt."""
+    quiz = get_object_or_404(Quiz, id=quiz_id)
+    user = request.user if request.user.is_authenticated else None
+
+    if quiz.status != "published" or (user is None and not quiz.allow_anonymous):
+        return JsonResponse({"error": "This quiz is not available."}, status=403)
+
+    draft = load_draft(request.POST.get("draft_token"), quiz, user)
+    if draft is None:
+        return JsonResponse({"error": "This quiz draft has expired. Please reload the page."}, status=410)
+
+    if time_is_up(quiz, draft_started_at(draft)):
+        return JsonResponse({"error": "Time is up for this quiz."}, status=403)
+
+    draft["answers"] = extract_answers(request.POST, draft["question_order"])
+    if draft["answers"] and not draft["user_quiz_id"]:
+        if start_attempt(draft, quiz, user) is None:
+            return JsonResponse({"error": "You have reached the maximum number of attempts."}, status=403)
+    save_draft(draft)
+
+    return JsonResponse({"saved": True, "answered": len(draft["answers"]), "user_quiz_id": draft["user_quiz_id"]})
 
 
 def quiz_results(request, user_quiz_id):
@@ -475,10 +485,10 @@ def quiz_results(request, user_quiz_id):
             return redirect("take_quiz", quiz_id=quiz.id)
 
     # Parse the answers JSON
-    answers = json.loads(user_quiz.answers) if user_quiz.answers else {}
+    answers = load_answers(user_quiz)
 
     # Calculate stats
-    total_questions = quiz.questions.count()
+    total_questions = len(get_answer_key(quiz).questions)
 
     # Only count questions that have actual answers (not empty or None)
     questions_attempted = 0
@@ -503,9 +513,14 @@ def quiz_results(request, user_quiz_id):
     else:
         duration = "N/A"
 
+    # Load the questions and their options once for both sections below
+    quiz_questions = list(quiz.questions.order_by("order").prefetch_related("options"))
+
     # Get the questions with their correct answers
     questions = []
-    for question in quiz.questions.order_by("order"):
+    for question in quiz_questions:
+        options = list(question.options.all())
+        correct_options = [option for option in options if option.is_correct]
         q_dict = {
             "id": question.id,
             "text": question.text,
@@ -515,12 +530,12 @@ def quiz_results(request, user_quiz_id):
         }
 
         if question.question_type == "multiple":
-            q_dict["options"] = list(question.options.all())
-            q_dict["correct_options"] = list(question.options.filter(is_correct=True))
+            q_dict["options"] = options
+            q_dict["correct_options"] = correct_options
 
         elif question.question_type == "true_false":
-            q_dict["options"] = list(question.options.all())
-            q_dict["correct_option"] = question.options.filter(is_correct=True).first()
+            q_dict["options"] = options
+            q_dict["correct_option"] = correct_options[0] if correct_options else None
 
         # Add user's answer if available
         q_id = str(question.id)
@@ -532,7 +547,7 @@ def quiz_results(request, user_quiz_id):
 
     # Get all questions for the quiz to display in the questions section
     all_quiz_questions = []
-    for question in quiz.questions.order_by("order"):
+    for question in quiz_questions:
         q_info = {
             "id": question.id,
             "text": question.text,
@@ -616,20 +631,9 @@ def grade_short_answer(request, user_quiz_id, question_id):
             answers[q_id]["points_awarded"] = points_awarded
             answers[q_id]["is_correct"] = points_awarded == question.points
 
-            # Calculate new total score
-            total_points = sum(q.points for q in user_quiz.quiz.questions.all())
-            current_score = sum(
-                (
-                    answers.get(str(q.id), {}).get("points_awarded", 0)
-                    if answers.get(str(q.id), {}).get("is_graded", False)
-                    else (question.points if answers.get(str(q.id), {}).get("is_correct", False) else 0)
-                )
-                for q in user_quiz.quiz.questions.all()
-            )
-
-            # Update the UserQuiz record
+            # Update the UserQuiz record with the new total score
             user_quiz.answers = json.dumps(answers)
-            user_quiz.score = (current_score / total_points * 100) if total_points > 0 else 0
+            user_quiz.score = score_answers(get_answer_key(user_quiz.quiz_id), answers)
             user_quiz.save()
 
             messages.success(
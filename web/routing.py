@@ -0,0 +1,9 @@
+from django.urls import path
+
+from .consumers import NotificationConsumer, WaitingRoomConsumer, WhiteboardConsumer
+
+websocket_urlpatterns = [
+    path("ws/notifications/", NotificationConsumer.as_asgi()),
+    path("ws/waiting-room/<int:room_id>/", WaitingRoomConsumer.as_asgi()),
+    path("ws/whiteboard/<slug:board>/", WhiteboardConsumer.as_asgi()),
+]
@@ -1,19 +1,33 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from threading import Lock
+
 from cryptography.fernet import Fernet
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
 from django.core.mail import send_mail
+from django.db.models import Q
 from django.http import HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.utils import timezone
 
 from .models import PeerMessage
+from .services.live_updates import push_counts
+from .services.message_retention import MESSAGE_LIFETIME, live_messages
 
 # Initialize Fernet with the master key from settings
 master_fernet = Fernet(settings.SECURE_MESSAGE_KEY)
 
+INBOX_PAGE_SIZE = 25
+# Unwrapped data keys stay in this process only, never in the shared cache
+DATA_KEY_TTL = 300
+DATA_KEY_CACHE_SIZE = 1024
+
 # --- Envelope Encryption Utility Functions ---
 
 
@@ -41,6 +55,43 @@ def decrypt_message_with_random_key(encrypted_message: str, encrypted_random_key
     return plaintext.decode("utf-8")
 
 
+class _DataKeyCache:
+    """Unwrapped per-message data keys, scoped to their receiver and expiring after ``DATA_KEY_TTL``."""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, user_id, encrypted_key):
+        key = (user_id, encrypted_key)
+        now = time.monotonic()
+        with self.lock:
+            entry = self.items.get(key)
+            if entry is not None and entry[0] > now:
+                return entry[1]
+        fernet = Fernet(master_fernet.decrypt(encrypted_key.encode("utf-8")))
+        with self.lock:
+            self.items[key] = (now + self.ttl, fernet)
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+        return fernet
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_data_keys = _DataKeyCache(DATA_KEY_CACHE_SIZE, DATA_KEY_TTL)
+
+
+def decrypt_for_user(user_id, encrypted_message: str, encrypted_random_key: str) -> str:
+    """Like ``decrypt_message_with_random_key``, reusing the receiver's recently unwrapped data keys."""
+    return _data_keys.get(user_id, encrypted_random_key).decrypt(encrypted_message.encode("utf-8")).decode("utf-8")
+
+
 # --- Simple Encryption Utility Functions (if needed) ---
 def encrypt_message(message: str) -> bytes:
     return master_fernet.encrypt(message.encode("utf-8"))
@@ -62,48 +113,100 @@ def send_secure_teacher_message(email_to: str, message: str):
     send_mail(subject, message_body, settings.DEFAULT_FROM_EMAIL, [email_to])
 
 
-# --- Secure Messaging Views Using Envelope Encryption ---
+# --- Inbox pagination ---
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
 
-@login_required
-def messaging_dashboard(request):
+
+def _encode_cursor(message):
+    delta = message.created_at - _EPOCH
+    return f"{(delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds}-{message.id}"
+
+
+def _decode_cursor(cursor):
+    """Return ``(created_at, id)`` for a cursor, or None if it is malformed."""
+    try:
+        micros, message_id = (int(part) for part in cursor.split("-"))
+    except (AttributeError, ValueError):
+        return None
+    return _EPOCH + timedelta(microseconds=micros), message_id
+
+
+def _expires_in(msg, now):
+    if msg.starred:
+        return "never (starred)"
+    created_at = msg.created_at
+    time_remaining = created_at + MESSAGE_LIFETIME - now
+    hours, remainder = divmod(time_remaining.seconds, 3600)
+    minutes, _ = divmod(remainder, 60)
+    return f"{time_remaining.days}d {hours}h {minutes}m"
+
+
+def inbox_page(user, cursor=None):
     """
-    Renders a messaging dashboard that doubles as the inbox.
-    It immediately displays all messages (decrypted) for the logged-in user,
-    marks them as read, and computes an expiration countdown (messages expire 7 days after creation).
+    Return one page of a user's inbox, newest first, starting before ``cursor``.
+
+    Only the page is fetched and decrypted, and its unread messages are marked read with a single
+    UPDATE. Returns ``(messages, next_cursor)``; ``next_cursor`` is None on the last page.
     """
-    messages_qs = PeerMessage.objects.filter(receiver=request.user).order_by("created_at")
-    message_list = []
     now = timezone.now()
-    for msg in messages_qs:
-        # Mark message as read and update read receipt
-        if not msg.is_read:
-            msg.is_read = True
-            msg.read_at = now
-            msg.save(update_fields=["is_read", "read_at"])
+    messages_qs = (
+        live_messages(PeerMessage.objects.filter(receiver=user), now)
+        .select_related("sender")
+        .only("content", "encrypted_key", "is_read", "starred", "created_at", "sender__username")
+        .order_by("-created_at", "-id")
+    )
+    position = _decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, message_id = position
+        messages_qs = messages_qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=message_id))
+    page = list(messages_qs[: INBOX_PAGE_SIZE + 1])
+    next_cursor = _encode_cursor(page[INBOX_PAGE_SIZE - 1]) if len(page) > INBOX_PAGE_SIZE else None
+    page = page[:INBOX_PAGE_SIZE]
+
+    unread = [msg.id for msg in page if not msg.is_read]
+    if unread:
+        # Read receipts for the whole page at once; update() sends no signals, so refresh the badges
+        PeerMessage.objects.filter(id__in=unread).update(is_read=True, read_at=now)
+        push_counts(user.id)
+
+    message_list = []
+    for msg in page:
         try:
-            decrypted_message = decrypt_message_with_random_key(msg.content, msg.encrypted_key)
+            decrypted_message = decrypt_for_user(user.id, msg.content, msg.encrypted_key)
         except Exception:
             decrypted_message = "[Error decrypting message]"
-        expires_at = msg.created_at + timezone.timedelta(days=7)
-        time_remaining = expires_at - now
-        days = time_remaining.days
-        hours, remainder = divmod(time_remaining.seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
-        expiration_str = f"{days}d {hours}h {minutes}m"
         message_list.append(
             {
                 "id": msg.id,
                 "sender": msg.sender.username,
                 "content": decrypted_message,
                 "sent_at": msg.created_at,
-                "expires_in": expiration_str,
+                "expires_in": _expires_in(msg, now),
                 "starred": msg.starred,
+                "is_read": True,
             }
         )
+    return message_list, next_cursor
+
+
+# --- Secure Messaging Views Using Envelope Encryption ---
+
+
+@login_required
+def messaging_dashboard(request):
+    """
+    Renders a messaging dashboard that doubles as the inbox.
+    It displays one page of decrypted messages for the logged-in user, marks them as read,
+    and computes an expiration countdown (messages expire 7 days after creation).
+    """
+    message_list, next_cursor = inbox_page(request.user, request.GET.get("before"))
+    received = live_messages(PeerMessage.objects.filter(receiver=request.user))
     context = {
         "messages": message_list,
-        "inbox_count": len(message_list),
+        "next_cursor": next_cursor,
+        "inbox_count": received.count(),
+        "unread_count": received.filter(is_read=False).count(),
     }
     return render(request, "web/messaging/dashboard.html", context)
 
@@ -168,40 +271,11 @@ def send_encrypted_message(request):
 @login_required
 def inbox(request):
     """
-    Renders an inbox page displaying decrypted messages for the logged-in user.
+    Renders an inbox page displaying one page of decrypted messages for the logged-in user.
     Also computes an expiration countdown (messages expire 7 days after creation).
     """
-    messages_qs = PeerMessage.objects.filter(receiver=request.user).order_by("created_at")
-    message_list = []
-    now = timezone.now()
-    for msg in messages_qs:
-        # Mark message as read and update read receipt
-        if not msg.is_read:
-            msg.is_read = True
-            msg.read_at = now
-            msg.save(update_fields=["is_read", "read_at"])
-        try:
-            decrypted_message = decrypt_message_with_random_key(msg.content, msg.encrypted_key)
-        except Exception:
-            decrypted_message = "[Error decrypting message]"
-        expires_at = msg.created_at + timezone.timedelta(days=7)
-        time_remaining = expires_at - now
-        days = time_remaining.days
-        hours, remainder = divmod(time_remaining.seconds, 3600)
-        minutes, _ = divmod(remainder, 60)
-        expiration_str = f"{days}d {hours}h {minutes}m"
-        message_list.append(
-            {
-                "id": msg.id,
-                "sender": msg.sender.username,
-                "content": decrypted_message,
-                "sent_at": msg.created_at.isoformat(),
-                "expires_in": expiration_str,
-                "starred": msg.starred,
-                "is_read": msg.is_read,
-            }
-        )
-    return render(request, "web/peer/inbox.html", {"messages": message_list})
+    message_list, next_cursor = inbox_page(request.user, request.GET.get("before"))
+    return render(request, "web/peer/inbox.html", {"messages": message_list, "next_cursor": next_cursor})
 
 
 @login_required
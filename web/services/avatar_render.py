@@ -0,0 +1,133 @@
+"""
+Memoized avatar rendering.
+
+``python_avatars`` output depends only on the 13 style attributes, and many users share the same
+combination. Renders are therefore content-addressed. The attributes are normalized to the enum
+members ``python_avatars`` would actually use, then hashed. A hit is served from a per-process
+LRU first, then from the shared Django cache, before anything is rendered. Rendered SVGs are
+minified before they are stored.
+"""
+
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from python_avatars import (
+    AccessoryType,
+    Avatar,
+    AvatarStyle,
+    ClothingType,
+    EyebrowType,
+    EyeType,
+    FacialHairType,
+    HairType,
+    MouthType,
+    NoseType,
+    SkinColor,
+)
+
+LRU_SIZE = 512
+CACHE_PREFIX = "avatar_svg"
+CACHE_TIMEOUT = 60 * 60 * 24 * 30
+
+# Style attribute -> (python_avatars enum, default member); None means a free-form colour
+AVATAR_FIELDS = {
+    "style": (AvatarStyle, AvatarStyle.CIRCLE),
+    "background_color": (None, "#FFFFFF"),
+    "top": (HairType, HairType.SHORT_FLAT),
+    "eyebrows": (EyebrowType, EyebrowType.DEFAULT),
+    "eyes": (EyeType, EyeType.DEFAULT),
+    "nose": (NoseType, NoseType.DEFAULT),
+    "mouth": (MouthType, MouthType.DEFAULT),
+    "facial_hair": (FacialHairType, FacialHairType.NONE),
+    "skin_color": (SkinColor, SkinColor.LIGHT),
+    "hair_color": (None, "#000000"),
+    "accessory": (AccessoryType, AccessoryType.NONE),
+    "clothing": (ClothingType, ClothingType.HOODIE),
+    "clothing_color": (None, "#0000FF"),
+}
+
+_COMMENTS = re.compile(r"<!--.*?-->", re.DOTALL)
+
+
+class _LRU:
+    def __init__(self, size):
+        self.size = size
+        self.items = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.items.get(key)
+            if value is not None:
+                self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = value
+            self.items.move_to_end(key)
+            while len(self.items) > self.size:
+                self.items.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.items.clear()
+
+
+_renders = _LRU(LRU_SIZE)
+
+
+def normalize_attributes(attributes):
+    """Resolve attribute values the way ``python_avatars`` would: enums by name, colours lowercased."""
+    normalized = {}
+    for field, (enum, default) in AVATAR_FIELDS.items():
+        value = attributes.get(field)
+        if enum is None:
+            normalized[field] = (value or default).strip().lower()
+        else:
+            normalized[field] = getattr(enum, str(value or "").upper(), default)
+    return normalized
+
+
+def render_key(attributes):
+    """Return the SHA-256 content address of an attribute combination."""
+    normalized = normalize_attributes(attributes)
+    parts = [value if isinstance(value, str) else value.name for value in normalized.values()]
+    return hashlib.sha256(json.dumps(parts).encode()).hexdigest()
+
+
+def minify_svg(svg):
+    """Drop comments and collapse whitespace; whitespace between tags is removed entirely."""
+    if "<!--" in svg:
+        svg = _COMMENTS.sub("", svg)
+    return " ".join(svg.split()).replace("> <", "><")
+
+
+def _render(normalized):
+    return minify_svg(Avatar(**normalized).render())
+
+
+def render_avatar_svg(attributes):
+    """
+    Return the minified SVG for a dict of avatar attributes, rendering only on a cache miss.
+
+    Returns ``(svg, key)`` so callers can store the key and skip the next render.
+    """
+    key = render_key(attributes)
+    svg = _renders.get(key)
+    if svg is None:
+        cache_key = f"{CACHE_PREFIX}:{key}"
+        svg = cache.get(cache_key)
+        if svg is None:
+            svg = _render(normalize_attributes(attributes))
+            cache.set(cache_key, svg, CACHE_TIMEOUT)
+        _renders.set(key, svg)
+    return svg, key
+
+
+def clear_local_cache():
+    _renders.clear()
@@ -0,0 +1,38 @@
+"""
+Fire-and-forget background work.
+
+Used for refreshing stored third-party data after a request has been served from the
+last good copy. A cache lock makes sure only one refresh per key runs at a time, across
+threads and, with a shared cache, across workers.
+"""
+
+import logging
+import threading
+
+from django.core.cache import cache
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+def run_once_in_background(lock_key, target, *args, lock_timeout=300):
+    """
+    Run ``target(*args)`` in a daemon thread unless work under ``lock_key`` is already running.
+
+    Returns whether the work was started. The lock expires after ``lock_timeout`` seconds even if
+    the thread dies without releasing it.
+    """
+    if not cache.add(lock_key, True, lock_timeout):
+        return False
+
+    def run():
+        try:
+            target(*args)
+        except Exception:
+            logger.exception(f"Background task {lock_key} failed")
+        finally:
+            cache.delete(lock_key)
+            close_old_connections()
+
+    threading.Thread(target=run, name=lock_key, daemon=True).start()
+    return True
@@ -0,0 +1,77 @@
+"""
+Cached iCal feeds.
+
+Calendar clients poll a feed URL every few minutes, usually without a login session. Each user
+therefore gets a secret feed token, and the serialized feed is cached under the user's schedule
+version. Session, enrollment, course and profile changes replace the version for every user
+they affect (see ``web.signals``), so a poll only rebuilds the feed after something changed.
+Between changes it costs one cache read, or just a 304 when the client sends the ETag back.
+Versions and feeds live in the shared cache (Redis), so a change made through one worker is
+seen by all of them.
+
+A version is a random value rather than a counter. If the cache drops it, or it expires after
+``VERSION_TIMEOUT``, the next read starts a new one instead of reusing a number an older feed was
+cached under.
+"""
+
+import hashlib
+import secrets
+
+from django.core.cache import cache
+
+from web.models import Enrollment, Profile
+
+FEED_TIMEOUT = 60 * 60 * 24
+VERSION_TIMEOUT = FEED_TIMEOUT
+
+
+def _version_key(user_id):
+    return f"ical_schedule_version:{user_id}"
+
+
+def schedule_version(user_id):
+    version = cache.get(_version_key(user_id))
+    if version is None:
+        version = secrets.token_hex(8)
+        # Another request may have started a version meanwhile; use whichever was stored first
+        if not cache.add(_version_key(user_id), version, VERSION_TIMEOUT):
+            version = cache.get(_version_key(user_id), version)
+    return version
+
+
+def bump_schedules(user_ids):
+    """Invalidate the cached feeds of these users."""
+    cache.set_many({_version_key(user_id): secrets.token_hex(8) for user_id in set(user_ids)}, VERSION_TIMEOUT)
+
+
+def course_audience(course):
+    """The users whose feed shows this course's sessions: its teacher and approved students."""
+    students = Enrollment.objects.filter(course=course, status="approved").values_list("student_id", flat=True)
+    return [course.teacher_id, *students]
+
+
+def cached_feed(user):
+    """Return ``(etag, body)`` for a user's feed, generating it only when their schedule changed."""
+    from web.calendar_sync import generate_ical_feed
+
+    key = f"ical_feed:{user.id}:{schedule_version(user.id)}"
+    cached = cache.get(key)
+    if cached is None:
+        body = generate_ical_feed(user)
+        cached = (f'"{hashlib.sha256(body).hexdigest()[:32]}"', body)
+        cache.set(key, cached, FEED_TIMEOUT)
+    return cached
+
+
+def feed_token(profile):
+    """Return the secret token of a user's feed URL, creating it on first use."""
+    if not profile.calendar_token:
+        profile.calendar_token = secrets.token_urlsafe(32)
+        Profile.objects.filter(pk=profile.pk).update(calendar_token=profile.calendar_token)
+    return profile.calendar_token
+
+
+def reset_feed_token(profile):
+    """Issue a new token; the old feed URL stops working."""
+    profile.calendar_token = None
+    return feed_token(profile)
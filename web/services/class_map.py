@@ -0,0 +1,245 @@
+"""
+Viewport queries for the classes map.
+
+The map asks for the in-person sessions inside its visible bounding box at its current zoom.
+The world is split into square tiles of ``360 / 2**zoom`` degrees. Each tile's payload is
+cached separately, so panning only loads the tiles that came into view. Missing tiles are
+fetched together with one latitude/longitude range query, which the ``Session`` coordinate
+index serves.
+
+Below ``CLUSTER_BELOW_ZOOM`` a tile holds clusters rather than sessions. The tile is split
+into a ``CLUSTER_GRID`` x ``CLUSTER_GRID`` grid, and each occupied cell is returned as its
+centroid and session count. From that zoom on, the tile holds the individual sessions.
+
+Tiles are cached under a random version that ``web.signals`` replaces on every session or
+course change. Their short timeout covers sessions that stop being upcoming, and coordinates
+the geocoding worker fills in with ``bulk_update``.
+"""
+
+import math
+import secrets
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+from web.models import Session
+from web.services.geocoding import apply_cached_coordinates, enqueue_addresses
+
+CLUSTER_BELOW_ZOOM = 12
+CLUSTER_GRID = 8
+MAX_ZOOM = 18
+MAX_TILES = 64
+TILE_TIMEOUT = 60
+VERSION_KEY = "class_map_version"
+WORLD = (-180.0, -90.0, 180.0, 90.0)
+
+
+def invalidate_tiles():
+    cache.set(VERSION_KEY, secrets.token_hex(8), None)
+
+
+def _version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        version = secrets.token_hex(8)
+        if not cache.add(VERSION_KEY, version, None):
+            version = cache.get(VERSION_KEY, version)
+    return version
+
+
+def parse_viewport(params):
+    """
+    Read ``bbox`` ("west,south,east,north", as Leaflet's ``toBBoxString``) and ``zoom``.
+
+    Without a bbox the whole world is used, and without a zoom individual sessions are returned.
+    Raises ValueError for malformed values.
+    """
+    bbox = params.get("bbox")
+    if bbox:
+        west, south, east, north = (float(value) for value in bbox.split(","))
+        if not all(math.isfinite(value) for value in (west, south, east, north)):
+            raise ValueError("bbox must be finite")
+        west, east = max(west, -180.0), min(east, 180.0)
+        south, north = max(south, -90.0), min(north, 90.0)
+        if west > east or south > north:
+            raise ValueError("bbox is empty")
+    else:
+        west, south, east, north = WORLD
+    zoom = int(params.get("zoom", CLUSTER_BELOW_ZOOM))
+    return (west, south, east, north), min(max(zoom, 0), MAX_ZOOM)
+
+
+def _tile_size(zoom):
+    return 360.0 / 2**zoom
+
+
+def _tile_of(lng, lat, zoom):
+    size = _tile_size(zoom)
+    last_x, last_y = 2**zoom - 1, math.ceil(180.0 / size) - 1
+    return min(int((lng + 180.0) // size), last_x), min(int((lat + 90.0) // size), last_y)
+
+
+def tiles_for(bbox, zoom):
+    """
+    Return ``(tile_zoom, [(x, y), ...])`` for the tiles covering a bbox.
+
+    A viewport that would need more than ``MAX_TILES`` tiles uses coarser tiles instead.
+    """
+    west, south, east, north = bbox
+    tile_zoom = zoom
+    while True:
+        min_x, min_y = _tile_of(west, south, tile_zoom)
+        max_x, max_y = _tile_of(east, north, tile_zoom)
+        if (max_x - min_x + 1) * (max_y - min_y + 1) <= MAX_TILES or tile_zoom == 0:
+            break
+        tile_zoom -= 1
+    return tile_zoom, [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+
+def parse_filters(params):
+    """Read the map page's ``course``, ``age_group`` and ``teaching_style`` filters; raises ValueError."""
+    course_id = params.get("course")
+    return {
+        "course_id": int(course_id) if course_id else None,
+        "age_group": params.get("age_group") or None,
+        "teaching_style": params.get("teaching_style") or None,
+    }
+
+
+def upcoming_sessions(course_id=None, age_group=None, teaching_style=None):
+    """Future or live in-person sessions, with the map page's filters applied."""
+    now = timezone.now()
+    sessions = Session.objects.filter(Q(start_time__gte=now) | Q(start_time__lte=now, end_time__gte=now)).filter(
+        is_virtual=False
+    )
+    sessions = sessions.exclude(location="")
+    if course_id:
+        sessions = sessions.filter(course_id=course_id, course__status="published")
+    if age_group:
+        sessions = sessions.filter(course__level=age_group)
+    if teaching_style:
+        sessions = sessions.filter(teaching_style=teaching_style)
+    return sessions
+
+
+def session_marker(session):
+    teacher = session.course.teacher
+    return {
+        "id": session.id,
+        "title": session.title,
+        "course_title": session.course.title,
+        "teacher": teacher.get_full_name() or teacher.username,
+        "start_time": session.start_time.isoformat(),
+        "end_time": session.end_time.isoformat(),
+        "location": session.location,
+        "lat": float(session.latitude),
+        "lng": float(session.longitude),
+        "price": str(session.price or session.course.price),
+        "url": session.get_absolute_url(),
+        "course": session.course.title,
+        "level": session.course.get_level_display(),
+        "is_virtual": session.is_virtual,
+    }
+
+
+def _clusters(points, tile_zoom):
+    cell_size = _tile_size(tile_zoom) / CLUSTER_GRID
+    cells = {}
+    for lat, lng in points:
+        cell = cells.setdefault((int((lng + 180.0) // cell_size), int((lat + 90.0) // cell_size)), [0, 0.0, 0.0])
+        cell[0] += 1
+        cell[1] += lat
+        cell[2] += lng
+    return [
+        {"lat": round(lat_sum / count, 6), "lng": round(lng_sum / count, 6), "count": count}
+        for count, lat_sum, lng_sum in cells.values()
+    ]
+
+
+def _load_tiles(sessions, tiles, tile_zoom, clustered):
+    """Fetch the given tiles with one range query over the rectangle that contains them."""
+    size = _tile_size(tile_zoom)
+    xs, ys = [x for x, _ in tiles], [y for _, y in tiles]
+    in_rectangle = sessions.filter(
+        longitude__gte=min(xs) * size - 180.0,
+        longitude__lte=(max(xs) + 1) * size - 180.0,
+        latitude__gte=min(ys) * size - 90.0,
+        latitude__lte=(max(ys) + 1) * size - 90.0,
+    )
+    if clustered:
+        rows = ((float(lat), float(lng)) for lat, lng in in_rectangle.values_list("latitude", "longitude"))
+    else:
+        rows = in_rectangle.select_related("course__teacher").order_by("start_time", "id")
+
+    found = {tile: [] for tile in tiles}
+    for row in rows:
+        lat, lng = row if clustered else (float(row.latitude), float(row.longitude))
+        tile = found.get(_tile_of(lng, lat, tile_zoom))
+        if tile is not None:
+            tile.append(row if clustered else session_marker(row))
+    if clustered:
+        return {tile: _clusters(points, tile_zoom) for tile, points in found.items()}
+    return found
+
+
+def queue_missing_coordinates(sessions, filters):
+    """
+    Fill in or queue coordinates for sessions the map cannot place yet.
+
+    Runs at most once per ``TILE_TIMEOUT`` for each filter, as most requests would find nothing new.
+    Returns how many addresses were queued.
+    """
+    if not cache.add(f"class_map_geocode_sweep:{filters}", 1, TILE_TIMEOUT):
+        return 0
+    unplaced = list(
+        sessions.filter(Q(latitude__isnull=True) | Q(longitude__isnull=True)).only(
+            "id", "location", "latitude", "longitude"
+        )
+    )
+    if apply_cached_coordinates(unplaced):
+        invalidate_tiles()
+    return enqueue_addresses([s.location for s in unplaced if s.latitude is None or s.longitude is None])
+
+
+def map_tiles(bbox, zoom, course_id=None, age_group=None, teaching_style=None):
+    """
+    Return the map payload for a viewport.
+
+    ``{"zoom", "tile_zoom", "clustered", "clusters", "sessions", "queued"}``: at cluster zooms
+    ``clusters`` holds ``{"lat", "lng", "count"}`` for every tile touching the viewport and
+    ``sessions`` is empty. Otherwise ``sessions`` holds the sessions inside the viewport.
+    ``queued`` counts addresses newly queued for geocoding.
+    """
+    clustered = zoom < CLUSTER_BELOW_ZOOM
+    tile_zoom, tiles = tiles_for(bbox, zoom)
+    filters = f"{course_id or ''}:{age_group or ''}:{teaching_style or ''}"
+    sessions = upcoming_sessions(course_id, age_group, teaching_style)
+    # Before the keys are built, as filling in coordinates replaces the version
+    queued = queue_missing_coordinates(sessions, filters)
+    prefix = f"class_map:{_version()}:{filters}:{tile_zoom}:{int(clustered)}"
+    keys = {tile: f"{prefix}:{tile[0]}:{tile[1]}" for tile in tiles}
+
+    cached = cache.get_many(keys.values())
+    payloads = {tile: cached[key] for tile, key in keys.items() if key in cached}
+    missing = [tile for tile in tiles if tile not in payloads]
+    if missing:
+        loaded = _load_tiles(sessions, missing, tile_zoom, clustered)
+        cache.set_many({keys[tile]: payload for tile, payload in loaded.items()}, TILE_TIMEOUT)
+        payloads.update(loaded)
+
+    data = {
+        "zoom": zoom,
+        "tile_zoom": tile_zoom,
+        "clustered": clustered,
+        "clusters": [],
+        "sessions": [],
+        "queued": queued,
+    }
+    items = [item for tile in tiles for item in payloads[tile]]
+    if clustered:
+        data["clusters"] = items
+    else:
+        west, south, east, north = bbox
+        data["sessions"] = [item for item in items if west <= item["lng"] <= east and south <= item["lat"] <= north]
+    return data
@@ -0,0 +1,272 @@
+"""
+Gateway between the virtual lab code editor and the Piston code execution API.
+
+A classroom pressing Run at the same time must not tie up every worker or trip Piston's
+rate limit, so each run passes through four steps:
+
+* a result cache keyed by a digest of ``(language, version, code, stdin)``, so identical
+  examples are executed once. The version is the concrete runtime Piston reports, not ``*``;
+* a per-user (or per-IP) rate limit of ``RATE_LIMIT`` runs per ``RATE_WINDOW`` seconds,
+  which cached results do not count against;
+* at most ``MAX_IN_FLIGHT`` runs per language in flight from each process. Further runs wait
+  in a FIFO queue of at most ``MAX_QUEUED`` and are told their position while they wait;
+* the executor, which calls Piston through the shared HTTP client on a worker thread.
+
+``run_code`` is an async generator of events, so the view can stream queue positions
+before the result. Tests swap the executor with ``fake_executor(handler)``.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from web.services import http_client
+
+logger = logging.getLogger(__name__)
+
+PISTON_API_BASE = "https://emkc.org/api/v2/piston"
+RUNTIMES_CACHE_KEY = "piston_runtimes"
+RUNTIMES_CACHE_TIMEOUT = 60 * 60
+RESULT_CACHE_TIMEOUT = 24 * 60 * 60
+RESULT_CACHE_PREFIX = "code_result"
+
+RATE_LIMIT = 10
+RATE_WINDOW = 60
+MAX_IN_FLIGHT = 3
+MAX_QUEUED = 30
+QUEUE_TIMEOUT = 30.0
+POLL_INTERVAL = 0.1
+EXECUTE_TIMEOUT = (3.05, 15)
+
+LANG_FILE_EXT = {
+    "python": "py",
+    "javascript": "js",
+    "c": "c",
+    "cpp": "cpp",
+}
+
+UNAVAILABLE_MESSAGE = "Code execution service is currently unavailable. Please try again later."
+
+
+class ExecutionUnavailable(Exception):
+    """Raised by executors when a run could not be completed."""
+
+
+class PistonExecutor:
+    """Runs code on the public Piston API."""
+
+    def runtimes(self):
+        """Return ``{language: version}`` for the runtimes Piston offers, cached for an hour."""
+        versions = cache.get(RUNTIMES_CACHE_KEY)
+        if versions is None:
+            try:
+                response = http_client.get(f"{PISTON_API_BASE}/runtimes")
+                response.raise_for_status()
+                versions = {}
+                for runtime in response.json():
+                    for name in [runtime["language"], *runtime.get("aliases", [])]:
+                        versions.setdefault(name, runtime["version"])
+            except (requests.RequestException, ValueError, KeyError) as e:
+                logger.warning(f"Could not load Piston runtimes: {e}")
+                return {}
+            cache.set(RUNTIMES_CACHE_KEY, versions, RUNTIMES_CACHE_TIMEOUT)
+        return versions
+
+    def version(self, language):
+        return self.runtimes().get(language, "*")
+
+    def execute(self, language, version, code, stdin):
+        payload = {
+            "language": language,
+            "version": version,
+            "files": [{"name": f"main.{LANG_FILE_EXT.get(language, 'txt')}", "content": code}],
+            "stdin": stdin,
+            "args": [],
+        }
+        try:
+            response = http_client.post(f"{PISTON_API_BASE}/execute", json=payload, timeout=EXECUTE_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise ExecutionUnavailable(str(e)) from e
+
+        # Piston returns { language, version, run: { stdout, stderr, code, signal, output } }
+        run = response.json().get("run", {})
+        return {"stdout": run.get("stdout", run.get("output", "")), "stderr": run.get("stderr", "")}
+
+
+class FakeExecutor:
+    """
+    Local executor for tests.
+
+    ``handler(language, code, stdin)`` returns ``{"stdout", "stderr"}`` or raises
+    ``ExecutionUnavailable``. Runs are recorded in ``calls``.
+    """
+
+    def __init__(self, handler, version="0.0.0"):
+        self.handler = handler
+        self.fixed_version = version
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def version(self, language):
+        return self.fixed_version
+
+    def execute(self, language, version, code, stdin):
+        with self._lock:
+            self.calls.append((language, code, stdin))
+        return self.handler(language, code, stdin)
+
+
+class LanguageQueue:
+    """FIFO admission control: at most ``limit`` runs in flight, at most ``max_queued`` waiting."""
+
+    def __init__(self, limit, max_queued):
+        self.limit = limit
+        self.max_queued = max_queued
+        self.running = 0
+        self.waiting = deque()
+        self._lock = threading.Lock()
+
+    def join(self, ticket):
+        """Take a slot or a place in the queue; returns False if the queue is full."""
+        with self._lock:
+            if len(self.waiting) >= self.max_queued:
+                return False
+            self.waiting.append(ticket)
+            return True
+
+    def try_acquire(self, ticket):
+        """Return 0 once ``ticket`` holds a slot, otherwise its 1-based position in the queue."""
+        with self._lock:
+            if self.waiting[0] == ticket and self.running < self.limit:
+                self.waiting.popleft()
+                self.running += 1
+                return 0
+            return self.waiting.index(ticket) + 1
+
+    def leave(self, ticket):
+        with self._lock:
+            self.waiting.remove(ticket)
+
+    def release(self):
+        with self._lock:
+            self.running -= 1
+
+
+executor = PistonExecutor()
+_queues = {}
+_queues_lock = threading.Lock()
+_tickets = itertools.count(1)
+
+
+def language_queue(language):
+    with _queues_lock:
+        if language not in _queues:
+            _queues[language] = LanguageQueue(MAX_IN_FLIGHT, MAX_QUEUED)
+        return _queues[language]
+
+
+def result_cache_key(language, version, code, stdin):
+    digest = hashlib.sha256(json.dumps([language, version, code, stdin]).encode()).hexdigest()
+    return f"{RESULT_CACHE_PREFIX}:{digest}"
+
+
+async def check_rate_limit(client_key):
+    """Count a run against ``client_key``; returns False once it is over the limit for this window."""
+    key = f"code_runs:{client_key}"
+    await cache.aadd(key, 0, RATE_WINDOW)
+    try:
+        runs = await cache.aincr(key)
+    except ValueError:
+        # The window expired between add and incr
+        await cache.aset(key, 1, RATE_WINDOW)
+        runs = 1
+    return runs <= RATE_LIMIT
+
+
+async def run_code(language, code, stdin, client_key):
+    """
+    Execute code through the gateway, yielding event dicts.
+
+    Events are ``{"queue_position": n}`` while waiting and then exactly one result:
+    ``{"stdout", "stderr", "cached"}`` or ``{"error", "status"}``.
+    """
+    runner = executor
+    version = await sync_to_async(runner.version, thread_sensitive=False)(language)
+    cache_key = result_cache_key(language, version, code, stdin)
+
+    result = await cache.aget(cache_key)
+    if result is not None:
+        yield dict(result, cached=True)
+        return
+
+    if not await check_rate_limit(client_key):
+        yield {"error": "You are running code too often. Please wait a minute and try again.", "status": 429}
+        return
+
+    queue = language_queue(language)
+    ticket = next(_tickets)
+    if not queue.join(ticket):
+        yield {"error": "The code runner is busy. Please try again shortly.", "status": 503}
+        return
+
+    acquired = False
+    try:
+        last_position = None
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + QUEUE_TIMEOUT
+        while True:
+            position = queue.try_acquire(ticket)
+            if position == 0:
+                acquired = True
+                break
+            if position != last_position:
+                last_position = position
+                yield {"queue_position": position}
+            if loop.time() >= deadline:
+                yield {"error": "The code runner is busy. Please try again shortly.", "status": 503}
+                return
+            await asyncio.sleep(POLL_INTERVAL)
+
+        # Another request may have run the same code while this one waited
+        result = await cache.aget(cache_key)
+        if result is not None:
+            yield dict(result, cached=True)
+            return
+
+        try:
+            result = await sync_to_async(runner.execute, thread_sensitive=False)(language, version, code, stdin)
+        except ExecutionUnavailable:
+            logger.exception("Code execution failed")
+            yield {"error": UNAVAILABLE_MESSAGE, "status": 502}
+            return
+        await cache.aset(cache_key, result, RESULT_CACHE_TIMEOUT)
+        yield dict(result, cached=False)
+    finally:
+        if acquired:
+            queue.release()
+        else:
+            queue.leave(ticket)
+
+
+@contextmanager
+def fake_executor(handler, version="0.0.0"):
+    """Route every run to ``handler`` instead of Piston for the duration of the block."""
+    global executor
+    original = executor
+    executor = FakeExecutor(handler, version)
+    _queues.clear()
+    try:
+        yield executor
+    finally:
+        executor = original
+        _queues.clear()
@@ -0,0 +1,267 @@
+"""
+GitHub contributor metrics.
+
+The contributor page reads a ``ContributorMetrics`` row instead of calling GitHub while it renders.
+Rows are refreshed in a background thread once they are older than ``METRICS_MAX_AGE``.
+A refresh fans out its GitHub calls concurrently under a single deadline:
+
+* with a token, all search counts, the oldest PR and the first page of merged-PR line counts
+  come from one GraphQL query, and only the remaining line-count pages are fetched afterwards;
+* without a token (GraphQL requires one), the REST search calls run in parallel.
+
+Whatever has not finished by the deadline is left at its previously stored value.
+"""
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from web.models import ContributorMetrics, GitHubPullRequest
+from web.services import http_client
+from web.services.background import run_once_in_background
+
+logger = logging.getLogger(__name__)
+
+GITHUB_REPO = "alphaonelabs/alphaonelabs-education-website"
+GITHUB_API_BASE = "https://api.github.com"
+GITHUB_GRAPHQL_URL = f"{GITHUB_API_BASE}/graphql"
+
+METRICS_MAX_AGE = timedelta(hours=1)
+REFRESH_DEADLINE = 15
+MAX_WORKERS = 8
+
+SEARCH_QUALIFIERS = {
+    "prs_created": "author:{username} type:pr",
+    "prs_merged": "author:{username} type:pr is:merged",
+    "issues_created": "author:{username} type:issue",
+    "pr_reviews": "reviewer:{username} type:pr",
+    "pr_comments": "commenter:{username} type:pr",
+    "issue_comments": "commenter:{username} type:issue",
+    "issue_assignments": "assignee:{username} type:issue",
+}
+
+MERGED_PRS_FRAGMENT = """
+    merged: search(query: $merged, type: ISSUE, first: 100, after: $after) {
+      pageInfo { hasNextPage endCursor }
+      nodes { ... on PullRequest { additions deletions } }
+    }
+"""
+
+
+def _search_query(field, username):
+    return f"{SEARCH_QUALIFIERS[field].format(username=username)} repo:{GITHUB_REPO}"
+
+
+def _summary_query():
+    counts = "\n".join(
+        f"    {field}: search(query: ${field}, type: ISSUE) {{ issueCount }}" for field in SEARCH_QUALIFIERS
+    )
+    variables = ", ".join(f"${field}: String!" for field in SEARCH_QUALIFIERS)
+    return f"""
+query({variables}, $oldest: String!, $merged: String!, $after: String) {{
+{counts}
+    oldest: search(query: $oldest, type: ISSUE, first: 1) {{
+      nodes {{ ... on PullRequest {{ createdAt }} }}
+    }}
+{MERGED_PRS_FRAGMENT}
+}}
+"""
+
+
+MERGED_PAGE_QUERY = f"""
+query($merged: String!, $after: String) {{
+{MERGED_PRS_FRAGMENT}
+}}
+"""
+
+
+class _Deadline:
+    def __init__(self, seconds):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+def _rest_json(url, headers, deadline, params=None):
+    response = http_client.get(url, params=params, headers=headers, timeout=(3.05, max(1.0, deadline.remaining())))
+    response.raise_for_status()
+    return response.json()
+
+
+def _graphql(query, variables, token, deadline):
+    response = http_client.post(
+        GITHUB_GRAPHQL_URL,
+        json={"query": query, "variables": variables},
+        headers={"Authorization": f"Bearer {token}"},
+        timeout=(3.05, max(1.0, deadline.remaining())),
+    )
+    response.raise_for_status()
+    payload = response.json()
+    if payload.get("errors"):
+        raise ValueError(payload["errors"])
+    return payload["data"]
+
+
+def _fetch_profile(username, headers, deadline):
+    return {"profile": _rest_json(f"{GITHUB_API_BASE}/users/{username}", headers, deadline)}
+
+
+def _fetch_search_count(field, username, headers, deadline):
+    data = _rest_json(
+        f"{GITHUB_API_BASE}/search/issues", headers, deadline, params={"q": _search_query(field, username)}
+    )
+    return {field: data.get("total_count", 0)}
+
+
+def _fetch_oldest_pr(username, headers, deadline):
+    data = _rest_json(
+        f"{GITHUB_API_BASE}/search/issues",
+        headers,
+        deadline,
+        params={"q": _search_query("prs_created", username), "sort": "created", "order": "asc", "per_page": 1},
+    )
+    items = data.get("items") or []
+    return {"first_contribution_at": parse_datetime(items[0]["created_at"]) if items else None}
+
+
+def _fetch_graphql_summary(username, token, deadline):
+    """Fetch every count, the oldest PR and all merged-PR line counts, paging only the line counts."""
+    variables = {field: _search_query(field, username) for field in SEARCH_QUALIFIERS}
+    variables["oldest"] = f"{_search_query('prs_created', username)} sort:created-asc"
+    variables["merged"] = _search_query("prs_merged", username)
+    variables["after"] = None
+
+    data = _graphql(_summary_query(), variables, token, deadline)
+    result = {field: data[field]["issueCount"] for field in SEARCH_QUALIFIERS}
+    oldest = data["oldest"]["nodes"]
+    result["first_contribution_at"] = parse_datetime(oldest[0]["createdAt"]) if oldest else None
+
+    lines_added = lines_deleted = 0
+    merged = data["merged"]
+    while True:
+        for pr in merged["nodes"]:
+            lines_added += pr.get("additions", 0)
+            lines_deleted += pr.get("deletions", 0)
+        if not merged["pageInfo"]["hasNextPage"]:
+            break
+        if not deadline.remaining():
+            # Out of time: keep the counts, but leave the stored line totals untouched
+            return result
+        page_variables = {"merged": variables["merged"], "after": merged["pageInfo"]["endCursor"]}
+        merged = _graphql(MERGED_PAGE_QUERY, page_variables, token, deadline)["merged"]
+
+    result.update(lines_added=lines_added, lines_deleted=lines_deleted)
+    return result
+
+
+def collect_contributor_metrics(username, token=None, deadline=REFRESH_DEADLINE):
+    """
+    Fetch a contributor's metrics from GitHub concurrently, giving up after ``deadline`` seconds.
+
+    Returns ``(fields, complete)``, where ``fields`` holds only the values that were fetched.
+    """
+    deadline = _Deadline(deadline)
+    headers = {"Authorization": f"token {token}"} if token else {}
+
+    executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="github-metrics")
+    futures = [executor.submit(_fetch_profile, username, headers, deadline)]
+    if token:
+        futures.append(executor.submit(_fetch_graphql_summary, username, token, deadline))
+    else:
+        futures.extend(
+            executor.submit(_fetch_search_count, field, username, headers, deadline) for field in SEARCH_QUALIFIERS
+        )
+        futures.append(executor.submit(_fetch_oldest_pr, username, headers, deadline))
+
+    done, pending = wait(futures, timeout=deadline.remaining())
+    executor.shutdown(wait=False, cancel_futures=True)
+
+    fields = {}
+    complete = not pending
+    for future in done:
+        try:
+            fields.update(future.result())
+        except (requests.RequestException, ValueError, KeyError, TypeError) as e:
+            logger.error(f"GitHub metrics request for {username} failed: {e}")
+            complete = False
+    if pending:
+        logger.warning(f"GitHub metrics for {username}: {len(pending)} requests missed the deadline")
+    if token and "lines_added" not in fields:
+        complete = False
+    return fields, complete
+
+
+def refresh_contributor_metrics(username, deadline=REFRESH_DEADLINE):
+    """Fetch fresh metrics from GitHub and store them, keeping old values for anything that failed."""
+    token = getattr(settings, "GITHUB_TOKEN", None)
+    fields, complete = collect_contributor_metrics(username, token=token, deadline=deadline)
+    if complete:
+        fields["refreshed_at"] = timezone.now()
+    metrics, _ = ContributorMetrics.objects.update_or_create(username=username.lower(), defaults=fields)
+    return metrics
+
+
+def schedule_refresh(username):
+    """Refresh a contributor's metrics in a background thread unless a refresh is already running."""
+    lock_key = f"contributor_metrics_refresh_{username.lower()}"
+    return run_once_in_background(lock_key, refresh_contributor_metrics, username, lock_timeout=REFRESH_DEADLINE * 4)
+
+
+def is_known_contributor(username):
+    """True if the user authored one of the synced pull requests."""
+    return GitHubPullRequest.objects.filter(author_login__iexact=username).exists()
+
+
+def get_contributor_metrics(username):
+    """
+    Return the stored metrics for a contributor, scheduling a background refresh when they are stale.
+
+    Only a contributor who has never been fetched is loaded inline, still bounded by the refresh deadline.
+    Returns None for anyone without a synced pull request, so arbitrary names never create rows or
+    spend GitHub quota.
+    """
+    if not is_known_contributor(username):
+        return None
+    metrics = ContributorMetrics.objects.filter(username=username.lower()).first()
+    if metrics is None:
+        return refresh_contributor_metrics(username)
+    if metrics.is_stale(METRICS_MAX_AGE):
+        schedule_refresh(username)
+    return metrics
+
+
+def contributor_context(metrics):
+    """Build the contributor page context from stored metrics."""
+    first_contribution_date = metrics.first_contribution_at.isoformat() if metrics.first_contribution_at else "N/A"
+    user_data = dict(metrics.profile)
+    user_data.setdefault("login", metrics.username)
+    user_data.update(
+        {
+            "reactions_received": user_data.get("reactions_received", 0),
+            "mentorship_score": user_data.get("mentorship_score", 0),
+            "collaboration_score": user_data.get("collaboration_score", 0),
+            "issue_assignments": metrics.issue_assignments,
+        }
+    )
+    chart_data = {
+        "prs_created": metrics.prs_created,
+        "prs_merged": metrics.prs_merged,
+        "pr_reviews": metrics.pr_reviews,
+        "issues_created": metrics.issues_created,
+        "issue_assignments": metrics.issue_assignments,
+        "pr_comments": metrics.pr_comments,
+        "issue_comments": metrics.issue_comments,
+        "lines_added": metrics.lines_added,
+        "lines_deleted": metrics.lines_deleted,
+        "first_contribution_date": first_contribution_date,
+    }
+    context = {key: value for key, value in chart_data.items() if key != "issue_assignments"}
+    context.update(user=user_data, chart_data=chart_data, refreshed_at=metrics.refreshed_at)
+    return context
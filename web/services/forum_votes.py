@@ -0,0 +1,86 @@
+"""
+Denormalized forum tallies.
+
+Vote counts live on ``ForumTopic``/``ForumReply`` and reply counts and last activity live on
+``ForumTopic``, so listing pages read plain columns instead of counting ``ForumVote`` and
+``ForumReply`` rows per topic. Every change goes through an F-expression update so concurrent
+votes and replies never overwrite each other.
+"""
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+
+from web.models import ForumReply, ForumTopic, ForumVote
+
+
+def cast_vote(user, vote_type, topic=None, reply=None):
+    """
+    Record a user's vote on a topic or reply and update its tallies.
+
+    Voting the same way twice removes the vote; voting the other way switches it.
+    Returns ``(user_vote, vote_score)`` after the change.
+    """
+    target = topic if topic is not None else reply
+    target_field = "topic" if topic is not None else "reply"
+    delta = {"up": 0, "down": 0}
+
+    with transaction.atomic():
+        vote, created = ForumVote.objects.select_for_update().get_or_create(
+            user=user, defaults={"vote_type": vote_type}, **{target_field: target}
+        )
+
+        if created:
+            delta[vote_type] += 1
+            user_vote = vote_type
+        elif vote.vote_type == vote_type:
+            # Same vote type, so remove the vote
+            vote.delete()
+            delta[vote_type] -= 1
+            user_vote = None
+        else:
+            # Different vote type, so switch the vote
+            delta[vote.vote_type] -= 1
+            delta[vote_type] += 1
+            vote.vote_type = vote_type
+            vote.save(update_fields=["vote_type", "updated_at"])
+            user_vote = vote_type
+
+        tallies = type(target).objects.filter(pk=target.pk)
+        tallies.update(upvotes=F("upvotes") + delta["up"], downvotes=F("downvotes") + delta["down"])
+        target.upvotes, target.downvotes = tallies.values_list("upvotes", "downvotes").get()
+
+    return user_vote, target.vote_score()
+
+
+def thread_votes_for_user(user, topic):
+    """Return ``(topic_vote, {reply_id: vote_type})`` for a user's votes on a thread in one query."""
+    if not user.is_authenticated:
+        return None, {}
+
+    topic_vote = None
+    reply_votes = {}
+    votes = ForumVote.objects.filter(Q(topic=topic) | Q(reply__topic=topic), user=user)
+    for topic_id, reply_id, vote_type in votes.values_list("topic_id", "reply_id", "vote_type"):
+        if topic_id:
+            topic_vote = vote_type
+        else:
+            reply_votes[reply_id] = vote_type
+    return topic_vote, reply_votes
+
+
+def record_reply_added(reply):
+    """Bump the topic's reply count and mark the reply as its latest activity."""
+    ForumTopic.objects.filter(pk=reply.topic_id).update(
+        reply_count=F("reply_count") + 1, last_reply=reply, last_activity_at=reply.created_at
+    )
+
+
+def record_reply_removed(reply):
+    """Drop the topic's reply count and point its last activity at the newest remaining reply."""
+    latest = ForumReply.objects.filter(topic_id=reply.topic_id).order_by("-created_at", "-pk").first()
+    ForumTopic.objects.filter(pk=reply.topic_id).update(
+        reply_count=Greatest(F("reply_count") - 1, 0),
+        last_reply=latest,
+        last_activity_at=latest.created_at if latest else F("created_at"),
+    )
@@ -0,0 +1,192 @@
+"""
+Geocoding queue and persistent geocode cache.
+
+Nominatim allows one request per second, so requests never geocode inline. Addresses are
+enqueued as ``pending`` rows in ``GeocodeCache``, keyed by a SHA-256 digest of the normalized
+address so every worker process shares the same entries. A single worker drains the queue
+at the rate limit. It is started after the enqueuing transaction commits, or by the
+``process_geocode_queue`` command. Once an address resolves, the worker copies the
+coordinates onto any sessions at that location.
+
+A failed lookup is retried after ``RETRY_BACKOFF``, doubling with each attempt. After
+``MAX_ATTEMPTS`` the entry is marked ``failed`` and is queued again the next time its address
+is enqueued after ``FAILED_COOL_OFF``, so a Nominatim outage does not leave addresses unplaced.
+
+The rate limit holds across processes: before each request a worker must take the
+``REQUEST_SLOT_KEY`` key with ``cache.add``, which is atomic in the shared Redis cache and
+expires after ``MIN_REQUEST_INTERVAL``. The background worker and the command can run at
+the same time without exceeding one request per second between them.
+"""
+
+import hashlib
+import logging
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from web.models import GeocodeCache, Session
+from web.services import http_client
+from web.services.background import run_once_in_background
+
+logger = logging.getLogger(__name__)
+
+NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
+NOMINATIM_HEADERS = {"User-Agent": "AlphaOneEducation/1.0 (support@alphaonelabs.com)"}
+MIN_REQUEST_INTERVAL = 1
+SLOT_POLL_INTERVAL = 0.1
+REQUEST_SLOT_KEY = "nominatim_request_slot"
+MAX_ATTEMPTS = 3
+RETRY_BACKOFF = timedelta(minutes=1)
+FAILED_COOL_OFF = timedelta(days=1)
+STALE_CLAIM_AFTER = timedelta(minutes=5)
+WORKER_LOCK_KEY = "geocode_queue_worker"
+
+
+def normalize_address(address):
+    return " ".join((address or "").lower().split())
+
+
+def address_digest(address):
+    return hashlib.sha256(normalize_address(address).encode()).hexdigest()
+
+
+def lookup_address(address):
+    """
+    Ask Nominatim for an address, waiting as needed to keep to one request per second.
+
+    Returns ``(lat, lng)`` or None when there is no match; request errors propagate.
+    """
+    while not cache.add(REQUEST_SLOT_KEY, True, MIN_REQUEST_INTERVAL):
+        time.sleep(SLOT_POLL_INTERVAL)
+
+    response = http_client.get(
+        NOMINATIM_URL, params={"q": address, "format": "json", "limit": 1}, headers=NOMINATIM_HEADERS
+    )
+    response.raise_for_status()
+    data = response.json()
+    if not data:
+        return None
+    return float(data[0]["lat"]), float(data[0]["lon"])
+
+
+def cached_coordinates(address):
+    """Return stored ``(lat, lng)`` for an address, or None if it has not been resolved."""
+    entry = GeocodeCache.objects.filter(address_digest=address_digest(address), status="ok").first()
+    if entry is None:
+        return None
+    return entry.latitude, entry.longitude
+
+
+def start_worker():
+    return run_once_in_background(WORKER_LOCK_KEY, process_geocode_queue, lock_timeout=10 * 60)
+
+
+def enqueue_addresses(addresses):
+    """
+    Queue addresses that have no cache entry yet and re-queue failed ones whose cool-off has passed.
+
+    The worker starts once the transaction commits if any of the addresses is due for a lookup.
+    Returns how many addresses were queued.
+    """
+    by_digest = {address_digest(address): address.strip() for address in addresses if normalize_address(address)}
+    if not by_digest:
+        return 0
+    now = timezone.now()
+    known = GeocodeCache.objects.filter(address_digest__in=by_digest)
+    requeued = known.filter(status="failed", next_attempt_at__lte=now).update(
+        status="pending", attempts=0, next_attempt_at=None, updated_at=now
+    )
+    known_digests = set(known.values_list("address_digest", flat=True))
+    new_entries = [
+        GeocodeCache(address_digest=digest, address=address)
+        for digest, address in by_digest.items()
+        if digest not in known_digests
+    ]
+    if new_entries:
+        GeocodeCache.objects.bulk_create(new_entries, ignore_conflicts=True)
+    if new_entries or requeued or known.filter(_due(now)).exists():
+        transaction.on_commit(start_worker)
+    return len(new_entries) + requeued
+
+
+def apply_cached_coordinates(sessions):
+    """Fill in coordinates for sessions whose address is already resolved; returns the sessions updated."""
+    missing = [s for s in sessions if s.location and (s.latitude is None or s.longitude is None)]
+    if not missing:
+        return []
+    resolved = {
+        digest: (lat, lng)
+        for digest, lat, lng in GeocodeCache.objects.filter(
+            address_digest__in={address_digest(s.location) for s in missing}, status="ok"
+        ).values_list("address_digest", "latitude", "longitude")
+    }
+    updated = []
+    for session in missing:
+        coordinates = resolved.get(address_digest(session.location))
+        if coordinates:
+            session.latitude, session.longitude = coordinates
+            updated.append(session)
+    if updated:
+        Session.objects.bulk_update([s for s in updated if s.pk], ["latitude", "longitude"])
+    return updated
+
+
+def _due(now):
+    """Entries waiting for a lookup: pending ones past their backoff, and claims a dead worker left behind."""
+    retry_due = Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now)
+    return (Q(status="pending") & retry_due) | Q(status="processing", updated_at__lt=now - STALE_CLAIM_AFTER)
+
+
+def _claim_next():
+    """Claim the oldest due entry so no other worker geocodes it at the same time."""
+    candidates = GeocodeCache.objects.filter(_due(timezone.now())).order_by("created_at")
+    for entry in candidates[:5]:
+        claimed = GeocodeCache.objects.filter(pk=entry.pk, status=entry.status, updated_at=entry.updated_at).update(
+            status="processing", updated_at=timezone.now()
+        )
+        if claimed:
+            return entry
+    return None
+
+
+def process_geocode_queue(limit=None):
+    """Geocode pending addresses one at a time within the rate limit; returns how many were processed."""
+    processed = 0
+    while limit is None or processed < limit:
+        entry = _claim_next()
+        if entry is None:
+            break
+        processed += 1
+        entry.attempts += 1
+        try:
+            coordinates = lookup_address(entry.address)
+        except Exception as e:
+            logger.error(f"Geocoding '{entry.address}' failed: {e}")
+            if entry.attempts >= MAX_ATTEMPTS:
+                entry.status = "failed"
+                entry.next_attempt_at = timezone.now() + FAILED_COOL_OFF
+            else:
+                entry.status = "pending"
+                entry.next_attempt_at = timezone.now() + RETRY_BACKOFF * 2 ** (entry.attempts - 1)
+            entry.save(update_fields=["status", "attempts", "next_attempt_at", "updated_at"])
+            continue
+
+        if coordinates is None:
+            logger.warning(f"No geocoding results found for address: {entry.address}")
+            entry.status = "not_found"
+        else:
+            entry.status = "ok"
+            entry.latitude, entry.longitude = (round(value, 6) for value in coordinates)
+        entry.next_attempt_at = None
+        entry.save(update_fields=["status", "attempts", "next_attempt_at", "latitude", "longitude", "updated_at"])
+
+        if entry.status == "ok":
+            # Sessions written with other spacing are picked up by apply_cached_coordinates on the map
+            Session.objects.filter(location__iexact=entry.address).filter(
+                Q(latitude__isnull=True) | Q(longitude__isnull=True)
+            ).update(latitude=entry.latitude, longitude=entry.longitude)
+    return processed
@@ -0,0 +1,180 @@
+"""
+Incremental sync of GitHub pull requests into ``GitHubPullRequest``.
+
+Pull requests are listed most-recently-updated first, and paging stops at the first one that is
+older than the stored cursor, so a routine run fetches one page. The first page is requested with
+``If-None-Match`` and the stored ETag, and a ``304 Not Modified`` reply ends the run without
+counting against the API rate limit. The cursor only advances once a run has reached it,
+so an interrupted sync picks up the missed pull requests next time.
+"""
+
+import logging
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from web.models import GitHubPullRequest, GitHubSyncState
+from web.services import http_client
+from web.services.contributor_metrics import GITHUB_API_BASE
+
+logger = logging.getLogger(__name__)
+
+PER_PAGE = 100
+EXCLUDED_AUTHORS = ["A1L13N"]
+SYNCED_FIELDS = [
+    "title",
+    "state",
+    "author_login",
+    "author_avatar_url",
+    "author_profile_url",
+    "created_at",
+    "updated_at",
+    "merged_at",
+]
+
+
+def _request_headers():
+    headers = {"Accept": "application/vnd.github+json"}
+    token = getattr(settings, "GITHUB_TOKEN", "")
+    if token:
+        headers["Authorization"] = f"token {token}"
+    return headers
+
+
+def _pull_request_from_api(repo, data):
+    user = data.get("user") or {}
+    return GitHubPullRequest(
+        repo=repo,
+        number=data["number"],
+        title=(data.get("title") or "")[:500],
+        state=data["state"],
+        author_login=user.get("login", ""),
+        author_avatar_url=user.get("avatar_url", ""),
+        author_profile_url=user.get("html_url", ""),
+        created_at=parse_datetime(data["created_at"]),
+        updated_at=parse_datetime(data["updated_at"]),
+        merged_at=parse_datetime(data["merged_at"]) if data.get("merged_at") else None,
+    )
+
+
+def _store_pull_requests(repo, pull_requests):
+    existing = dict(
+        GitHubPullRequest.objects.filter(repo=repo, number__in=[pr.number for pr in pull_requests]).values_list(
+            "number", "id"
+        )
+    )
+    for pr in pull_requests:
+        pr.id = existing.get(pr.number)
+    with transaction.atomic():
+        GitHubPullRequest.objects.bulk_create([pr for pr in pull_requests if pr.id is None])
+        GitHubPullRequest.objects.bulk_update([pr for pr in pull_requests if pr.id is not None], SYNCED_FIELDS)
+
+
+def sync_pull_requests(repo=None):
+    """
+    Fetch pull requests updated since the last sync and store them.
+
+    Returns the number of pull requests created or updated. Errors from GitHub propagate.
+    """
+    repo = repo or settings.GITHUB_REPO
+    state, _ = GitHubSyncState.objects.get_or_create(key=f"pulls:{repo}")
+    headers = _request_headers()
+    url = f"{GITHUB_API_BASE}/repos/{repo}/pulls"
+
+    etag = state.etag
+    newest = state.cursor
+    synced = 0
+    page = 1
+    while True:
+        page_headers = dict(headers)
+        if page == 1 and state.etag and state.cursor:
+            page_headers["If-None-Match"] = state.etag
+        response = http_client.get(
+            url,
+            params={"state": "all", "sort": "updated", "direction": "desc", "per_page": PER_PAGE, "page": page},
+            headers=page_headers,
+        )
+        if response.status_code == 304:
+            logger.info(f"Pull requests for {repo} unchanged since {state.cursor}")
+            break
+        response.raise_for_status()
+        if page == 1:
+            etag = response.headers.get("ETag", "")
+
+        batch = response.json()
+        pull_requests = [_pull_request_from_api(repo, data) for data in batch]
+        fresh = [pr for pr in pull_requests if state.cursor is None or pr.updated_at >= state.cursor]
+        if fresh:
+            _store_pull_requests(repo, fresh)
+            synced += len(fresh)
+            newest = max([pr.updated_at for pr in fresh] + ([newest] if newest else []))
+
+        # Results are newest first, so anything older than the cursor means we have caught up
+        if len(fresh) < len(pull_requests) or len(batch) < PER_PAGE:
+            break
+        page += 1
+
+    state.etag = etag
+    state.cursor = newest
+    state.last_synced_at = timezone.now()
+    state.save()
+    return synced
+
+
+def contributor_stats(repo=None):
+    """
+    Return per-author pull request counts and smart scores, best contributors first.
+
+    The counts come from one aggregate query over the synced pull requests; authors without a
+    merged pull request and bots are left out.
+    """
+    repo = repo or settings.GITHUB_REPO
+    rows = (
+        GitHubPullRequest.objects.filter(repo=repo)
+        .exclude(author_login__contains="[bot]")
+        .exclude(author_login__contains="dependabot")
+        .exclude(author_login__in=EXCLUDED_AUTHORS)
+        .values("author_login")
+        .annotate(
+            merged_pr_count=Count("id", filter=Q(merged_at__isnull=False)),
+            closed_pr_count=Count("id", filter=Q(state="closed", merged_at__isnull=True)),
+            open_pr_count=Count("id", filter=Q(state="open")),
+            avatar_url=Max("author_avatar_url"),
+            profile_url=Max("author_profile_url"),
+        )
+        .filter(merged_pr_count__gt=0)
+        .order_by()
+    )
+
+    contributors = []
+    for row in rows:
+        merged, closed, opened = row["merged_pr_count"], row["closed_pr_count"], row["open_pr_count"]
+        total = merged + closed + opened
+
+        # Prioritise merged PRs, but penalise many unmerged closed PRs (quality) and open ones (abandonment)
+        smart_score = merged * 10
+        if closed > merged / 2:
+            smart_score -= (closed - merged / 2) * 2
+        if opened > merged:
+            smart_score -= opened - merged
+
+        contributors.append(
+            {
+                "username": row["author_login"],
+                "avatar_url": row["avatar_url"],
+                "profile_url": row["profile_url"],
+                "merged_pr_count": merged,
+                "closed_pr_count": closed,
+                "open_pr_count": opened,
+                "total_pr_count": total,
+                "contribution_ratio": merged / total,
+                "smart_score": smart_score,
+                "prs_url": f"https://github.com/{repo}/pulls?q=is:pr+author:{row['author_login']}",
+            }
+        )
+
+    contributors.sort(key=lambda x: (x["smart_score"], x["merged_pr_count"]), reverse=True)
+    return contributors
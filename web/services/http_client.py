@@ -0,0 +1,408 @@
+"""
+Shared client for outbound HTTP calls.
+
+Every call to a third party (GitHub, Nominatim, Nitter, oEmbed providers, Piston, Slack,
+SendGrid, Mailgun) goes through one pooled ``requests.Session``, so connections are kept
+alive and reused per host instead of being opened for each call. On top of that the client adds:
+
+* a default ``(connect, read)`` timeout, so no call can hang a worker indefinitely;
+* retries with exponential backoff and full jitter. Only idempotent methods are retried,
+  on connection errors and on 429/502/503/504;
+* a circuit breaker per host. After repeated failures (5xx responses or any error raised by
+  the call), calls to that host fail fast with ``CircuitOpenError`` until a cool-down has passed;
+* a limit on concurrent calls per host. Excess callers wait for ``pool_timeout`` and
+  then get ``HostBusyError``;
+* per-host latency and error metrics (see ``metrics()``). Time spent on calls also counts
+  toward the current request's ``http`` timing (see ``web.services.request_timing``).
+
+Both errors subclass ``requests.exceptions.ConnectionError``, so existing
+``except requests.RequestException`` handlers keep working unchanged.
+
+URLs that users supply go through ``get_user_supplied``/``aget_user_supplied``, which share the
+pooled session but keep no per-host state, so arbitrary hostnames neither grow memory nor show
+up in ``metrics()``.
+
+Async views use ``arequest``/``aget``/``apost``. They run the same client on a dedicated thread
+pool sized for waiting on the network, so a slow upstream never blocks the event loop and
+all the protections above still apply.
+
+Tests can run any integration offline with ``mock_transport(handler)``, which routes every
+request to ``handler(prepared_request)`` instead of the network.
+"""
+
+import json
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from web.services.request_timing import measure
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT = (3.05, 10)
+DEFAULT_RETRIES = 2
+BACKOFF_FACTOR = 0.25
+MAX_BACKOFF = 5.0
+MAX_CONNECTIONS_PER_HOST = 10
+POOL_TIMEOUT = 5.0
+FAILURE_THRESHOLD = 5
+RESET_TIMEOUT = 30.0
+LATENCY_SAMPLES = 200
+# Threads available to async callers; they only wait on sockets, so this can be well above the CPU count
+ASYNC_WORKERS = 64
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 502, 503, 504})
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a host's circuit breaker is open."""
+
+
+class HostBusyError(requests.exceptions.ConnectionError):
+    """Raised when a host already has the maximum number of calls in flight."""
+
+
+@dataclass
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open trial call."""
+
+    failure_threshold: int = FAILURE_THRESHOLD
+    reset_timeout: float = RESET_TIMEOUT
+    failures: int = 0
+    opened_at: float = None
+    trial_in_flight: bool = False
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def release_trial(self):
+        """Give up a half-open trial that never reached the host."""
+        with self.lock:
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class HostMetrics:
+    """Running counters and recent latencies for one host."""
+
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    rejected: int = 0
+    total_latency: float = 0.0
+    latencies: deque = field(default_factory=lambda: deque(maxlen=LATENCY_SAMPLES))
+
+    def snapshot(self):
+        samples = sorted(self.latencies)
+
+        def percentile(p):
+            if not samples:
+                return None
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))] * 1000, 1)
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "avg_ms": round(self.total_latency / self.requests * 1000, 1) if self.requests else None,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+        }
+
+
+class HttpClient:
+    """Pooled HTTP client with timeouts, retries, circuit breaking and per-host limits."""
+
+    def __init__(
+        self,
+        timeout=DEFAULT_TIMEOUT,
+        retries=DEFAULT_RETRIES,
+        backoff_factor=BACKOFF_FACTOR,
+        max_per_host=MAX_CONNECTIONS_PER_HOST,
+        pool_timeout=POOL_TIMEOUT,
+        failure_threshold=FAILURE_THRESHOLD,
+        reset_timeout=RESET_TIMEOUT,
+    ):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_per_host = max_per_host
+        self.pool_timeout = pool_timeout
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.session = self._build_session()
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._slots = {}
+        self._metrics = {}
+
+    def _build_session(self):
+        session = requests.Session()
+        # The session is shared by unrelated callers, so never carry cookies between them
+        session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=self.max_per_host)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def _host_state(self, host):
+        with self._lock:
+            if host not in self._breakers:
+                self._breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+                self._slots[host] = threading.BoundedSemaphore(self.max_per_host)
+                self._metrics[host] = HostMetrics()
+            return self._breakers[host], self._slots[host], self._metrics[host]
+
+    def _backoff(self, attempt, response=None):
+        delay = random.uniform(0, min(MAX_BACKOFF, self.backoff_factor * (2**attempt)))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(MAX_BACKOFF, int(retry_after)))
+        if delay:
+            time.sleep(delay)
+
+    def request(self, method, url, retries=None, **kwargs):
+        """
+        Send a request through the shared session; takes the same keyword arguments as ``requests``.
+
+        ``retries`` overrides the default number of retries; non-idempotent methods are only
+        retried when it is passed explicitly.
+        """
+        method = method.upper()
+        host = urlsplit(url).netloc.lower()
+        kwargs.setdefault("timeout", self.timeout)
+        if retries is None:
+            retries = self.retries if method in IDEMPOTENT_METHODS else 0
+
+        breaker, slots, metrics = self._host_state(host)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                metrics.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {host}")
+            if not slots.acquire(timeout=self.pool_timeout):
+                metrics.rejected += 1
+                breaker.release_trial()
+                raise HostBusyError(f"Too many concurrent requests to {host}")
+
+            started = time.monotonic()
+            response = error = None
+            try:
+                with measure("http"):
+                    response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
+                error = exc
+            except Exception:
+                # Not retried, but still recorded, so a half-open trial never stays in flight
+                metrics.errors += 1
+                breaker.record_failure()
+                raise
+            finally:
+                slots.release()
+                elapsed = time.monotonic() - started
+                metrics.requests += 1
+                metrics.total_latency += elapsed
+                metrics.latencies.append(elapsed)
+
+            failed = error is not None or response.status_code >= 500
+            if failed:
+                metrics.errors += 1
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+
+            retryable = error is not None or response.status_code in RETRY_STATUSES
+            if not retryable or attempt >= retries:
+                if error is not None:
+                    raise error
+                return response
+
+            attempt += 1
+            metrics.retries += 1
+            logger.debug("Retrying %s %s (attempt %s): %s", method, url, attempt, error or response.status_code)
+            self._backoff(attempt, response)
+
+    def request_untracked(self, method, url, **kwargs):
+        """
+        Send one request without retries, circuit breaking, host limits or metrics.
+
+        For URLs users supply: per-host state is never dropped, so arbitrary hosts must not create it.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        with measure("http"):
+            return self.session.request(method.upper(), url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def metrics(self):
+        """Return per-host request metrics and circuit states."""
+        with self._lock:
+            hosts = list(self._metrics)
+        return {host: dict(self._metrics[host].snapshot(), circuit=self._breakers[host].state) for host in hosts}
+
+    def reset(self):
+        """Forget all circuit breaker state and metrics."""
+        with self._lock:
+            self._breakers.clear()
+            self._slots.clear()
+            self._metrics.clear()
+
+
+class MockTransport(BaseAdapter):
+    """
+    Offline transport for tests.
+
+    ``handler`` receives each ``PreparedRequest`` and returns a response built with
+    ``mock_response`` or raises a ``requests`` exception. Sent requests are kept in ``calls``
+    and the timeout each one was sent with in ``timeouts``.
+    """
+
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+        self.calls = []
+        self.timeouts = []
+
+    def send(self, request, **kwargs):
+        self.calls.append(request)
+        self.timeouts.append(kwargs.get("timeout"))
+        response = self.handler(request)
+        response.request = request
+        response.url = response.url or request.url
+        return response
+
+    def close(self):
+        pass
+
+
+def mock_response(status=200, json_data=None, text="", headers=None):
+    """Build a ``requests.Response`` for ``MockTransport`` handlers."""
+    response = requests.Response()
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers or {})
+    if json_data is not None:
+        text = json.dumps(json_data)
+        response.headers.setdefault("Content-Type", "application/json")
+    response._content = text.encode()
+    response.encoding = "utf-8"
+    return response
+
+
+def _client_from_settings():
+    options = getattr(settings, "OUTBOUND_HTTP", {})
+    return HttpClient(**options)
+
+
+client = _client_from_settings()
+
+
+def request(method, url, **kwargs):
+    return client.request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return client.get(url, **kwargs)
+
+
+def post(url, **kwargs):
+    return client.post(url, **kwargs)
+
+
+def get_user_supplied(url, **kwargs):
+    return client.request_untracked("GET", url, **kwargs)
+
+
+def metrics():
+    return client.metrics()
+
+
+_async_executor = ThreadPoolExecutor(max_workers=ASYNC_WORKERS, thread_name_prefix="http-client")
+
+
+async def arequest(method, url, **kwargs):
+    """Awaitable ``request`` for async views; the call waits on a pool thread instead of the event loop."""
+    return await sync_to_async(client.request, thread_sensitive=False, executor=_async_executor)(method, url, **kwargs)
+
+
+async def aget(url, **kwargs):
+    return await arequest("GET", url, **kwargs)
+
+
+async def apost(url, **kwargs):
+    return await arequest("POST", url, **kwargs)
+
+
+async def aget_user_supplied(url, **kwargs):
+    """Awaitable ``get_user_supplied``, waiting on the same pool as ``arequest``."""
+    return await sync_to_async(get_user_supplied, thread_sensitive=False, executor=_async_executor)(url, **kwargs)
+
+
+@contextmanager
+def mock_transport(handler):
+    """
+    Route every request made through the shared client to ``handler`` for the duration of the block.
+
+    Retry backoff is disabled and breaker state is reset on entry and exit, so tests stay fast and isolated.
+    """
+    transport = MockTransport(handler)
+    original_adapters = client.session.adapters.copy()
+    original_backoff = client.backoff_factor
+    client.session.mount("https://", transport)
+    client.session.mount("http://", transport)
+    client.backoff_factor = 0
+    client.reset()
+    try:
+        yield transport
+    finally:
+        client.session.adapters.clear()
+        client.session.adapters.update(original_adapters)
+        client.backoff_factor = original_backoff
+        client.reset()
@@ -0,0 +1,183 @@
+"""
+Responsive image derivatives.
+
+Uploaded course, meme, product, blog and success story images are stored as uploaded. After the
+saving transaction commits, a background worker writes resized WebP and JPEG copies at the widths
+of the image's spec, and records them in an ``ImageManifest``. The ``responsive_image`` template
+tag turns a manifest into ``srcset`` attributes. Until the manifest is ready it falls back to
+the original.
+
+Derivatives are stored under the SHA-256 of the original's content. An image whose hash has not
+changed is never processed again, and identical uploads share the same files.
+"""
+
+import hashlib
+import logging
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from web.models import BlogPost, Course, ImageManifest, Meme, ProductImage, SuccessStory
+from web.services.background import run_once_in_background
+
+logger = logging.getLogger(__name__)
+
+WORKER_LOCK_KEY = "image_derivative_worker"
+# A manifest processing for longer than this was left by a worker that died, and is claimed again
+STALE_CLAIM_AFTER = timedelta(minutes=10)
+MANIFEST_CACHE_PREFIX = "image_manifest"
+MANIFEST_CACHE_TIMEOUT = 60 * 60 * 24
+PENDING_CACHE_TIMEOUT = 60
+DERIVATIVE_ROOT = "derivatives"
+
+# Widths to generate per kind of image; "square" crops to the centre square first
+IMAGE_SPECS = {
+    "course": {"widths": (160, 320, 500), "crop": "square"},
+    "meme": {"widths": (320, 640, 960)},
+    "product": {"widths": (96, 480, 960)},
+    "blog": {"widths": (480, 800, 1280)},
+    "story": {"widths": (480, 800, 1280)},
+}
+# (model, image field, spec) for every image that gets derivatives
+IMAGE_FIELDS = [
+    (Course, "image", "course"),
+    (Meme, "image", "meme"),
+    (ProductImage, "image", "product"),
+    (BlogPost, "featured_image", "blog"),
+    (SuccessStory, "featured_image", "story"),
+]
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+
+def manifest_cache_key(source):
+    return f"{MANIFEST_CACHE_PREFIX}:{hashlib.sha256(source.encode()).hexdigest()}"
+
+
+def start_worker():
+    return run_once_in_background(WORKER_LOCK_KEY, process_image_queue, lock_timeout=10 * 60)
+
+
+def queue_image(image, spec):
+    """
+    Queue derivatives for an image field's current file.
+
+    Does nothing when the file already has a manifest. Re-saving a model without a new upload
+    costs one lookup.
+    """
+    if not image or not image.name:
+        return None
+    manifest, created = ImageManifest.objects.get_or_create(source=image.name, defaults={"spec": spec})
+    if created:
+        transaction.on_commit(start_worker)
+    return manifest
+
+
+def _render(image, width, options):
+    buffer = BytesIO()
+    if image.width > width:
+        image = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def generate_derivatives(manifest):
+    """Write the derivatives for one manifest; returns False if the content was unchanged."""
+    with default_storage.open(manifest.source, "rb") as source:
+        data = source.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    if content_hash == manifest.content_hash and manifest.derivatives:
+        return False
+
+    spec = IMAGE_SPECS[manifest.spec]
+    image = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    image = image.convert("RGB")
+    if spec.get("crop") == "square":
+        image = ImageOps.fit(image, (min(image.size),) * 2)
+
+    # Never upscale: widths beyond the original collapse into one copy at the original width
+    widths = sorted({min(width, image.width) for width in spec["widths"]})
+    derivatives = {}
+    for name, options in FORMATS.items():
+        derivatives[name] = []
+        for width in widths:
+            path = f"{DERIVATIVE_ROOT}/{content_hash[:2]}/{content_hash}/{manifest.spec}-{width}.{name}"
+            if not default_storage.exists(path):
+                default_storage.save(path, ContentFile(_render(image, width, options)))
+            derivatives[name].append([width, path])
+
+    manifest.content_hash = content_hash
+    manifest.derivatives = derivatives
+    return True
+
+
+def _claim_next():
+    """Claim the oldest pending manifest, or one whose worker died while processing it."""
+    stale = timezone.now() - STALE_CLAIM_AFTER
+    candidates = ImageManifest.objects.filter(
+        Q(status="pending") | Q(status="processing", claimed_at__lt=stale) | Q(status="processing", claimed_at=None)
+    ).order_by("id")
+    for manifest in candidates[:5]:
+        claimed = ImageManifest.objects.filter(
+            pk=manifest.pk, status=manifest.status, claimed_at=manifest.claimed_at
+        ).update(status="processing", claimed_at=timezone.now())
+        if claimed:
+            return manifest
+    return None
+
+
+def process_image_queue(limit=None):
+    """Generate derivatives for pending manifests one at a time; returns how many were processed."""
+    processed = 0
+    while limit is None or processed < limit:
+        manifest = _claim_next()
+        if manifest is None:
+            break
+        processed += 1
+        try:
+            generate_derivatives(manifest)
+            manifest.status = "ready"
+        except Exception as e:
+            logger.error(f"Could not generate derivatives for {manifest.source}: {e}")
+            manifest.status = "failed"
+        manifest.save(update_fields=["content_hash", "derivatives", "status", "updated_at"])
+        cache.delete(manifest_cache_key(manifest.source))
+    return processed
+
+
+def queue_existing_images():
+    """Create manifests for images uploaded before derivatives existed; returns how many were queued."""
+    known = set(ImageManifest.objects.values_list("source", flat=True))
+    new = []
+    for model, field, spec in IMAGE_FIELDS:
+        for name in model.objects.exclude(**{field: ""}).values_list(field, flat=True):
+            if name and name not in known:
+                known.add(name)
+                new.append(ImageManifest(source=name, spec=spec))
+    ImageManifest.objects.bulk_create(new, ignore_conflicts=True)
+    return len(new)
+
+
+def requeue_all():
+    """Queue every manifest again; only originals whose content hash changed are re-encoded."""
+    return ImageManifest.objects.exclude(status="pending").update(status="pending")
+
+
+def ready_derivatives(source):
+    """Return the derivatives of a ready manifest, or None; cached so templates rarely hit the database."""
+    key = manifest_cache_key(source)
+    derivatives = cache.get(key)
+    if derivatives is None:
+        manifest = ImageManifest.objects.filter(source=source, status="ready").only("derivatives").first()
+        derivatives = manifest.derivatives if manifest else {}
+        cache.set(key, derivatives, MANIFEST_CACHE_TIMEOUT if derivatives else PENDING_CACHE_TIMEOUT)
+    return derivatives or None
@@ -0,0 +1,79 @@
+"""
+Live notification updates over WebSocket.
+
+Each signed-in browser holds one connection to ``NotificationConsumer``, which joins a channel
+group for its user. When a notification, direct message or study-group invite is saved for a
+user, an event is sent to that group after the transaction commits. The event carries the
+user's current unread counters, so pages no longer count anything while rendering and the
+badges stay correct across tabs.
+
+Pushing is best-effort. If the channel layer is unreachable, the save still succeeds and the
+counters are fixed by the next event or reconnect.
+"""
+
+import logging
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.db import transaction
+
+from web.models import Notification, PeerMessage, StudyGroupInvite
+from web.services.message_retention import live_messages
+
+logger = logging.getLogger(__name__)
+
+GROUP_PREFIX = "notifications_user"
+
+
+def user_group(user_id):
+    return f"{GROUP_PREFIX}_{user_id}"
+
+
+def unread_counts(user_id):
+    """Return the counters shown in the navigation bar for a user."""
+    return {
+        "notifications": Notification.objects.filter(user_id=user_id, read=False).count(),
+        "messages": live_messages(PeerMessage.objects.filter(receiver_id=user_id, is_read=False)).count(),
+        "invites": StudyGroupInvite.objects.filter(recipient_id=user_id, status="pending").count(),
+    }
+
+
+def send_event(user_id, kind, data=None):
+    """Send an event with fresh counters to every connection of a user, right now."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    payload = {"type": kind, "data": data or {}, "counts": unread_counts(user_id)}
+    try:
+        async_to_sync(layer.group_send)(user_group(user_id), {"type": "notify.event", "payload": payload})
+    except Exception as e:
+        logger.warning(f"Could not push {kind} event to user {user_id}: {e}")
+
+
+def push_event(user_id, kind, data=None):
+    """Send an event once the current transaction commits, so clients never see rolled-back rows."""
+    transaction.on_commit(lambda: send_event(user_id, kind, data))
+
+
+def push_counts(user_id):
+    """Refresh a user's counters, e.g. after a bulk ``update()`` that sends no signals."""
+    push_event(user_id, "counts")
+
+
+def notification_payload(notification):
+    return {
+        "id": notification.id,
+        "title": notification.title,
+        "message": notification.message,
+        "notification_type": notification.notification_type,
+        "created_at": notification.created_at.isoformat(),
+    }
+
+
+def message_payload(message):
+    # Message bodies may be encrypted at rest and are only shown on the inbox page
+    return {"id": message.id, "sender_id": message.sender_id, "created_at": message.created_at.isoformat()}
+
+
+def invite_payload(invite):
+    return {"id": str(invite.id), "group_id": invite.group_id, "sender_id": invite.sender_id}
@@ -0,0 +1,59 @@
+"""
+Retention for direct messages.
+
+A ``PeerMessage`` expires ``MESSAGE_LIFETIME`` after it was sent unless its receiver starred it;
+starred messages are kept until they are unstarred or downloaded. Inbox queries filter with
+``live_messages`` so they only read rows that are still shown, and the daily
+``purge_expired_messages`` job deletes the rest.
+
+The purge walks the table in primary-key ranges of ``PURGE_CHUNK_SIZE`` rows, each deleted in its
+own short transaction, so it never holds a long lock on a large table. Ids grow with
+``created_at``, so the walk stops at the first range that already contains unexpired messages.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from web.models import PeerMessage
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_LIFETIME = timedelta(days=7)
+PURGE_CHUNK_SIZE = 1000
+
+
+def expiry_cutoff(now=None):
+    """Messages sent before this moment have expired."""
+    return (now or timezone.now()) - MESSAGE_LIFETIME
+
+
+def live_messages(queryset=None, now=None):
+    """Restrict a ``PeerMessage`` queryset to messages that have not expired."""
+    queryset = PeerMessage.objects.all() if queryset is None else queryset
+    return queryset.filter(Q(created_at__gte=expiry_cutoff(now)) | Q(starred=True))
+
+
+def purge_expired_messages(chunk_size=PURGE_CHUNK_SIZE, include_starred=False, now=None):
+    """Delete expired messages in primary-key ranges; returns how many were deleted."""
+    cutoff = expiry_cutoff(now)
+    expired = PeerMessage.objects.filter(created_at__lt=cutoff)
+    if not include_starred:
+        expired = expired.filter(starred=False)
+
+    deleted = 0
+    low = PeerMessage.objects.aggregate(low=Min("id"))["low"]
+    while low is not None:
+        high = low + chunk_size
+        with transaction.atomic():
+            count, _ = expired.filter(id__gte=low, id__lt=high).delete()
+        deleted += count
+        if PeerMessage.objects.filter(id__gte=low, id__lt=high, created_at__gte=cutoff).exists():
+            break
+        # Skip over gaps left by downloaded messages and earlier purges
+        low = PeerMessage.objects.filter(id__gte=high).aggregate(low=Min("id"))["low"]
+    logger.info(f"Purged {deleted} expired messages sent before {cutoff}")
+    return deleted
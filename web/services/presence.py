@@ -0,0 +1,99 @@
+"""
+Live presence for waiting rooms.
+
+Participants with a waiting room's page open hold a WebSocket to ``WaitingRoomConsumer`` and send
+a heartbeat every ``HEARTBEAT_INTERVAL`` seconds. Each participant's last heartbeat is its own key
+in the shared cache (Redis), so no table is written per heartbeat and workers never overwrite each
+other's entries. The keys expire after ``PRESENCE_TIMEOUT``, which also covers sockets that died
+without a disconnect. The online count reads the keys of the room's participants in one call.
+
+Whenever someone joins, leaves, connects or disconnects, the room's channel group receives the
+participant and online counts. The course teacher and the room's creator watch that group, so
+their page stays current without refreshing.
+"""
+
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.cache import cache
+from django.db import transaction
+
+from web.models import WaitingRoom
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_INTERVAL = 20
+PRESENCE_TIMEOUT = 3 * HEARTBEAT_INTERVAL
+
+
+def room_group(room_id):
+    return f"waiting_room_{room_id}"
+
+
+def is_participant(room_id, user_id):
+    """Check membership through the unique (room, user) index instead of loading every participant."""
+    return WaitingRoom.participants.through.objects.filter(waitingroom_id=room_id, user_id=user_id).exists()
+
+
+def member_role(room_id, user_id):
+    """Return ``"watcher"`` for the room's teacher or creator, ``"participant"``, or None for anyone else."""
+    room = WaitingRoom.objects.filter(pk=room_id, status="open").values("creator_id", "course__teacher_id").first()
+    if room is None:
+        return None
+    if user_id in (room["creator_id"], room["course__teacher_id"]):
+        return "watcher"
+    if is_participant(room_id, user_id):
+        return "participant"
+    return None
+
+
+def _seen_key(room_id, user_id):
+    return f"waiting_room_seen:{room_id}:{user_id}"
+
+
+def touch(room_id, user_id):
+    """Record a heartbeat; returns True when the user was not already counted as online."""
+    now = time.time()
+    key = _seen_key(room_id, user_id)
+    if cache.add(key, now, PRESENCE_TIMEOUT):
+        return True
+    last_seen = cache.get(key)
+    cache.set(key, now, PRESENCE_TIMEOUT)
+    return last_seen is None or now - last_seen >= PRESENCE_TIMEOUT
+
+
+def drop(room_id, user_id):
+    cache.delete(_seen_key(room_id, user_id))
+
+
+def online_count(room_id):
+    now = time.time()
+    user_ids = WaitingRoom.participants.through.objects.filter(waitingroom_id=room_id).values_list("user_id", flat=True)
+    seen = cache.get_many([_seen_key(room_id, user_id) for user_id in user_ids])
+    return sum(1 for at in seen.values() if now - at < PRESENCE_TIMEOUT)
+
+
+def room_state(room_id):
+    return {
+        "type": "presence",
+        "participants": WaitingRoom.participants.through.objects.filter(waitingroom_id=room_id).count(),
+        "online": online_count(room_id),
+    }
+
+
+def send_room_state(room_id):
+    """Push the current counts to everyone watching the room, right now."""
+    layer = get_channel_layer()
+    if layer is None:
+        return
+    try:
+        async_to_sync(layer.group_send)(room_group(room_id), {"type": "presence.update", "state": room_state(room_id)})
+    except Exception as e:
+        logger.warning(f"Could not push presence for waiting room {room_id}: {e}")
+
+
+def push_room_state(room_id):
+    """Push the counts once the current transaction commits."""
+    transaction.on_commit(lambda: send_room_state(room_id))
@@ -0,0 +1,198 @@
+"""
+Per-request query recording and N+1 detection.
+
+``record_queries()`` collects every statement run inside it, on any thread serving the same
+request, into a ``QueryLog``. A single execute wrapper is installed on each database
+connection (see ``web.signals``). It only records while a log is active in the current
+context, so outside a recording it costs one context-variable lookup per query.
+
+Each query is stored with its shape: the SQL with literals and ``IN`` lists collapsed. It also
+keeps the project frames that ran it. A shape repeated ``REPEAT_THRESHOLD`` or more times in one
+request is reported as a likely N+1, with the stack of its first occurrence.
+
+``QueryAuditMiddleware`` records each request when ``settings.QUERY_AUDIT`` is on, and appends
+a summary line to ``settings.QUERY_AUDIT_LOG``. The ``query_report`` command ranks URL patterns
+from that file.
+"""
+
+import json
+import re
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+
+REPEAT_THRESHOLD = 5
+BASE_DIR = str(Path(__file__).resolve().parents[2])
+PROJECT_DIR = str(Path(__file__).resolve().parents[1])
+THIS_FILE = str(Path(__file__).resolve())
+_TRANSACTION_CONTROL = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT", "BEGIN", "COMMIT", "ROLLBACK")
+
+_active_log = ContextVar("query_audit_log", default=None)
+
+_IN_LIST = re.compile(r"\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)", re.IGNORECASE)
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_SPACE = re.compile(r"\s+")
+
+
+def query_shape(sql):
+    """The SQL with literal values and ``IN`` lists replaced, so queries differing only in values match."""
+    shape = _STRING.sub("?", sql)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("IN (...)", shape)
+    return _SPACE.sub(" ", shape).strip()
+
+
+def _project_stack():
+    """``(file, line, function)`` for each project frame calling the database, innermost first."""
+    frames = []
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(PROJECT_DIR) and filename != THIS_FILE and "/migrations/" not in filename:
+            frames.append((filename[len(BASE_DIR) + 1 :], frame.f_lineno, frame.f_code.co_name))
+        frame = frame.f_back
+    return tuple(frames)
+
+
+class QueryLog:
+    """The queries of one recording, in execution order."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __len__(self):
+        return len(self.queries)
+
+    @property
+    def duration(self):
+        return sum(query["duration"] for query in self.queries)
+
+    def add(self, sql, duration, stack):
+        self.queries.append({"sql": sql, "shape": query_shape(sql), "duration": duration, "stack": stack})
+
+    def repeated(self, threshold=REPEAT_THRESHOLD):
+        """Shapes run at least ``threshold`` times, most repeated first: ``[{"shape", "count", "stack"}]``."""
+        by_shape = defaultdict(list)
+        for query in self.queries:
+            by_shape[query["shape"]].append(query)
+        repeats = [
+            {"shape": shape, "count": len(queries), "stack": queries[0]["stack"]}
+            for shape, queries in by_shape.items()
+            if len(queries) >= threshold
+        ]
+        return sorted(repeats, key=lambda repeat: -repeat["count"])
+
+    def by_call_site(self):
+        """``{"file:line in function": count}`` for the innermost project frame of each query."""
+        sites = defaultdict(int)
+        for query in self.queries:
+            sites[format_frame(query["stack"][0]) if query["stack"] else "<outside the project>"] += 1
+        return dict(sorted(sites.items(), key=lambda site: -site[1]))
+
+    def report(self, threshold=REPEAT_THRESHOLD):
+        """A readable breakdown by call site, with the stack of every likely N+1."""
+        lines = [f"{len(self)} queries in {self.duration * 1000:.1f} ms"]
+        lines.extend(f"  {count:>4}  {site}" for site, count in self.by_call_site().items())
+        for repeat in self.repeated(threshold):
+            lines.append(f"Possible N+1: {repeat['count']} queries shaped like\n    {repeat['shape']}")
+            lines.extend(f"    at {format_frame(frame)}" for frame in repeat["stack"])
+        return "\n".join(lines)
+
+
+def format_frame(frame):
+    filename, lineno, function = frame
+    return f"{filename}:{lineno} in {function}"
+
+
+def _record(execute, sql, params, many, context):
+    log = _active_log.get()
+    if log is None or sql.lstrip().upper().startswith(_TRANSACTION_CONTROL):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        log.add(sql, time.perf_counter() - started, _project_stack())
+
+
+def install(connection):
+    """Add the recording wrapper to a connection once."""
+    if _record not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record)
+
+
+@contextmanager
+def record_queries():
+    """Collect the queries run inside the block, including by ``sync_to_async`` threads it awaits."""
+    for connection in connections.all():
+        install(connection)
+    log = QueryLog()
+    token = _active_log.set(log)
+    try:
+        yield log
+    finally:
+        _active_log.reset(token)
+
+
+def request_summary(request, response, log, threshold=REPEAT_THRESHOLD):
+    """The line ``QueryAuditMiddleware`` writes for a request."""
+    match = getattr(request, "resolver_match", None)
+    return {
+        "route": f"/{match.route}" if match else request.path,
+        "view": match.view_name if match else "",
+        "method": request.method,
+        "status": response.status_code,
+        "queries": len(log),
+        "db_ms": round(log.duration * 1000, 2),
+        "repeated": [{"shape": r["shape"], "count": r["count"]} for r in log.repeated(threshold)],
+    }
+
+
+def append_summary(summary, path=None):
+    path = Path(path or settings.QUERY_AUDIT_LOG)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as log_file:
+        log_file.write(json.dumps(summary) + "\n")
+
+
+def rank_routes(lines):
+    """
+    Aggregate summary lines per route and method, heaviest first.
+
+    Returns ``[{"route", "method", "requests", "mean", "max", "db_ms", "repeated"}]`` sorted by
+    mean queries per request. ``repeated`` counts the requests that had a likely N+1.
+    """
+    totals = {}
+    for line in lines:
+        try:
+            summary = json.loads(line)
+        except ValueError:
+            continue
+        entry = totals.setdefault(
+            (summary["route"], summary["method"]), {"requests": 0, "queries": 0, "max": 0, "db_ms": 0.0, "repeated": 0}
+        )
+        entry["requests"] += 1
+        entry["queries"] += summary["queries"]
+        entry["max"] = max(entry["max"], summary["queries"])
+        entry["db_ms"] += summary["db_ms"]
+        entry["repeated"] += bool(summary["repeated"])
+    ranked = [
+        {
+            "route": route,
+            "method": method,
+            "requests": entry["requests"],
+            "mean": entry["queries"] / entry["requests"],
+            "max": entry["max"],
+            "db_ms": entry["db_ms"] / entry["requests"],
+            "repeated": entry["repeated"],
+        }
+        for (route, method), entry in totals.items()
+    ]
+    return sorted(ranked, key=lambda route: (-route["mean"], -route["max"]))
@@ -0,0 +1,183 @@
+"""
+Server-side drafts for quiz attempts.
+
+Opening the take-quiz page only creates a cache-backed draft holding the (possibly shuffled)
+question and option order, the autosaved answers and the time the timer started. The draft
+is addressed by a signed token, so refreshing the page re-uses it without re-shuffling or
+re-counting attempts. A ``UserQuiz`` row is only created once the first answer is autosaved
+or the quiz is submitted, which keeps abandoned page loads out of the database.
+
+Timed quizzes are the exception: their attempt is created as soon as the page opens, so the
+server holds the start time the timer counts from. Autosaves after the limit are refused, and
+a submission arriving later than ``SUBMIT_GRACE`` seconds past it is graded on the answers
+autosaved in time instead of the ones it carries.
+
+From then on every save also writes the draft to ``UserQuiz.draft``. The cache stays the fast
+path, but answers survive an evicted key or a restarted Redis: a cache miss falls back to the
+attempt row.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta
+
+from django.core import signing
+from django.core.cache import cache
+from django.http import QueryDict
+from django.utils import timezone
+
+from web.models import UserQuiz
+
+DRAFT_TIMEOUT = 60 * 60 * 6
+DRAFT_SALT = "web.quiz_drafts"
+# Lets the timer's automatic submission arrive after the limit runs out
+SUBMIT_GRACE = 30
+
+
+def draft_cookie_name(quiz):
+    return f"quiz_draft_{quiz.id}"
+
+
+def _cache_key(draft_id):
+    return f"quiz_draft_{draft_id}"
+
+
+def attempts_exhausted(quiz, user):
+    """Return True if the user has used up the allowed attempts for the quiz."""
+    if not user or not quiz.max_attempts:
+        return False
+    return UserQuiz.objects.filter(quiz=quiz, user=user).count() >= quiz.max_attempts
+
+
+def create_draft(quiz, user, questions):
+    """Create and store a new draft for ``questions`` (options should be prefetched)."""
+    questions = list(questions)
+    question_order = [question.id for question in questions]
+    option_order = {str(question.id): [option.id for option in question.options.all()] for question in questions}
+
+    # Shuffle once per draft so refreshing the page keeps the same order
+    if quiz.randomize_questions:
+        random.shuffle(question_order)
+        for option_ids in option_order.values():
+            random.shuffle(option_ids)
+
+    draft = {
+        "id": uuid.uuid4().hex,
+        "quiz_id": quiz.id,
+        "user_id": user.id if user else None,
+        "question_order": question_order,
+        "option_order": option_order,
+        "answers": {},
+        "started_at": timezone.now().isoformat(),
+        "user_quiz_id": None,
+    }
+    save_draft(draft)
+    return draft
+
+
+def draft_token(draft):
+    """Return the signed token identifying a draft."""
+    return signing.dumps({"quiz": draft["quiz_id"], "draft": draft["id"]}, salt=DRAFT_SALT)
+
+
+def load_draft(token, quiz, user):
+    """Return the draft addressed by ``token`` if it belongs to this quiz and user, else None."""
+    if not token:
+        return None
+    try:
+        payload = signing.loads(token, salt=DRAFT_SALT, max_age=DRAFT_TIMEOUT)
+    except signing.BadSignature:
+        return None
+    if payload.get("quiz") != quiz.id:
+        return None
+
+    draft_id = payload.get("draft")
+    draft = cache.get(_cache_key(draft_id))
+    if draft is None:
+        # Once answers were saved the attempt row holds a copy
+        draft = (
+            UserQuiz.objects.filter(quiz=quiz, user=user, completed=False, draft__id=draft_id)
+            .values_list("draft", flat=True)
+            .first()
+        )
+        if draft is not None:
+            cache.set(_cache_key(draft_id), draft, DRAFT_TIMEOUT)
+    if draft is None or draft["user_id"] != (user.id if user else None):
+        return None
+    return draft
+
+
+def save_draft(draft):
+    cache.set(_cache_key(draft["id"]), draft, DRAFT_TIMEOUT)
+    if draft["user_quiz_id"]:
+        UserQuiz.objects.filter(id=draft["user_quiz_id"], completed=False).update(draft=draft)
+
+
+def discard_draft(draft):
+    cache.delete(_cache_key(draft["id"]))
+    if draft["user_quiz_id"]:
+        UserQuiz.objects.filter(id=draft["user_quiz_id"]).update(draft=None)
+
+
+def extract_answers(data, question_ids):
+    """Pull the answered questions out of submitted form data as ``{field name: [values]}``."""
+    answers = {}
+    for question_id in question_ids:
+        field = f"question_{question_id}"
+        values = [value for value in data.getlist(field) if value.strip()]
+        if values:
+            answers[field] = values
+    return answers
+
+
+def draft_started_at(draft):
+    return datetime.fromisoformat(draft["started_at"])
+
+
+def remaining_seconds(draft, quiz):
+    """Seconds left on the quiz timer, measured from when the draft was started."""
+    if not quiz.time_limit:
+        return None
+    elapsed = (timezone.now() - draft_started_at(draft)).total_seconds()
+    return max(0, int(quiz.time_limit * 60 - elapsed))
+
+
+def time_is_up(quiz, started_at):
+    """True once a timed attempt started at ``started_at`` is past its limit and ``SUBMIT_GRACE``."""
+    if not quiz.time_limit:
+        return False
+    return timezone.now() > started_at + timedelta(minutes=quiz.time_limit, seconds=SUBMIT_GRACE)
+
+
+def draft_form_data(draft):
+    """The draft's autosaved answers as form data for ``TakeQuizForm``."""
+    data = QueryDict(mutable=True)
+    for field, values in draft["answers"].items():
+        data.setlist(field, values)
+    return data
+
+
+def start_attempt(draft, quiz, user):
+    """
+    Return the ``UserQuiz`` for a draft, creating it on first use.
+
+    Returns None when the user has no attempts left. The attempt's start time is backdated
+    to when the draft was started so durations still cover the whole attempt.
+    """
+    if draft["user_quiz_id"]:
+        user_quiz = UserQuiz.objects.filter(id=draft["user_quiz_id"], quiz=quiz).first()
+        if user_quiz is not None:
+            return user_quiz
+
+    if attempts_exhausted(quiz, user):
+        return None
+
+    user_quiz = UserQuiz.objects.create(quiz=quiz, user=user)
+    started_at = draft_started_at(draft)
+    # start_time is auto_now_add, so it can only be backdated after the insert
+    UserQuiz.objects.filter(id=user_quiz.id).update(start_time=started_at)
+    user_quiz.start_time = started_at
+
+    draft["user_quiz_id"] = user_quiz.id
+    save_draft(draft)
+    return user_quiz
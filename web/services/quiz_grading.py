@@ -0,0 +1,206 @@
+"""
+Compiled answer keys for quiz grading.
+
+An answer key holds everything needed to grade an attempt (question types, points and
+the IDs of the correct options). It is loaded with a single query, cached per quiz and
+dropped by the signals in ``web.signals`` whenever a question or option changes, so
+grading a submission is a pure in-memory set comparison.
+"""
+
+import hashlib
+import json
+from dataclasses import dataclass
+
+from django.core.cache import cache
+
+from web.models import QuizQuestion, UserQuiz
+
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+@dataclass(frozen=True)
+class QuestionKey:
+    id: int
+    question_type: str
+    points: int
+    correct_option_ids: tuple  # ordered like the options are displayed
+
+    @property
+    def correct_option_set(self):
+        return set(self.correct_option_ids)
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    quiz_id: int
+    version: str
+    questions: dict  # question id -> QuestionKey, in question order
+
+    @property
+    def total_points(self):
+        return sum(question.points for question in self.questions.values())
+
+
+def _cache_key(quiz_id):
+    return f"quiz_answer_key_{quiz_id}"
+
+
+def build_answer_key(quiz_id):
+    """Compile the answer key for a quiz straight from the database in one query."""
+    rows = (
+        QuizQuestion.objects.filter(quiz_id=quiz_id)
+        .order_by("order", "id", "options__order", "options__id")
+        .values_list("id", "question_type", "points", "options__id", "options__is_correct")
+    )
+
+    compiled = {}
+    for question_id, question_type, points, option_id, is_correct in rows:
+        entry = compiled.setdefault(question_id, {"type": question_type, "points": points, "correct": []})
+        if option_id is not None and is_correct:
+            entry["correct"].append(option_id)
+
+    questions = {
+        question_id: QuestionKey(
+            id=question_id,
+            question_type=entry["type"],
+            points=entry["points"],
+            correct_option_ids=tuple(entry["correct"]),
+        )
+        for question_id, entry in compiled.items()
+    }
+
+    # The version changes whenever anything that affects grading changes, which lets
+    # callers tell whether stored attempts were scored against an older key.
+    fingerprint = json.dumps(
+        [[q.id, q.question_type, q.points, list(q.correct_option_ids)] for q in questions.values()]
+    )
+    version = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:12]
+
+    return AnswerKey(quiz_id=quiz_id, version=version, questions=questions)
+
+
+def get_answer_key(quiz):
+    """Return the cached answer key for a quiz (or quiz ID), compiling it on a miss."""
+    quiz_id = getattr(quiz, "id", quiz)
+    answer_key = cache.get(_cache_key(quiz_id))
+    if answer_key is None:
+        answer_key = build_answer_key(quiz_id)
+        cache.set(_cache_key(quiz_id), answer_key, ANSWER_KEY_CACHE_TIMEOUT)
+    return answer_key
+
+
+def invalidate_answer_key(quiz_id):
+    """Drop the cached answer key so the next grading run recompiles it."""
+    cache.delete(_cache_key(quiz_id))
+
+
+def grade_question(question_key, user_answer):
+    """Grade a single answer and return the dict stored in ``UserQuiz.answers``."""
+    if question_key.question_type == "multiple":
+        correct_options = list(question_key.correct_option_ids)
+
+        # Multiple selections: all correct options must be selected and no incorrect ones
+        if isinstance(user_answer, list):
+            user_answer_ids = {int(ans) for ans in user_answer}
+            return {
+                "user_answer": user_answer,
+                "correct_answer": correct_options,
+                "is_correct": bool(user_answer_ids and correct_options)
+                and user_answer_ids == question_key.correct_option_set,
+            }
+
+        # Single value (e.g. from a radio button)
+        user_answer_id = int(user_answer) if user_answer not in (None, "") else None
+        return {
+            "user_answer": user_answer,
+            "correct_answer": correct_options[0] if correct_options else None,
+            "is_correct": user_answer_id in question_key.correct_option_set if user_answer_id is not None else False,
+        }
+
+    if question_key.question_type == "true_false":
+        # For true/false the form submits the option ID, not the text
+        correct_id = str(question_key.correct_option_ids[0]) if question_key.correct_option_ids else None
+        return {
+            "user_answer": user_answer,
+            "correct_answer": correct_id,
+            "is_correct": user_answer == correct_id if user_answer else False,
+        }
+
+    # Short answers need manual grading
+    return {"user_answer": user_answer if user_answer is not None else "", "is_graded": False}
+
+
+def grade_submission(answer_key, cleaned_data, question_ids=None):
+    """
+    Grade a submitted TakeQuizForm.
+
+    Returns ``(answers, percentage)`` where ``answers`` is keyed by the question ID as a string.
+    ``question_ids`` controls the order answers are recorded in (e.g. a shuffled order).
+    """
+    answers = {}
+    for question_id in question_ids or answer_key.questions.keys():
+        question_key = answer_key.questions.get(question_id)
+        if question_key is None:
+            continue
+        user_answer = cleaned_data.get(f"question_{question_id}", None)
+        answers[str(question_id)] = grade_question(question_key, user_answer)
+
+    return answers, score_answers(answer_key, answers)
+
+
+def score_answers(answer_key, answers):
+    """Return the percentage score for a set of graded answers, honouring manual grades."""
+    total_points = answer_key.total_points
+    if total_points <= 0:
+        return 0
+
+    earned = 0
+    for question_id, question_key in answer_key.questions.items():
+        answer = answers.get(str(question_id), {})
+        if answer.get("is_graded", False) and "points_awarded" in answer:
+            earned += answer["points_awarded"]
+        elif answer.get("is_correct", False):
+            earned += question_key.points
+
+    return earned / total_points * 100
+
+
+def load_answers(user_quiz):
+    """Return the answers of an attempt as a dict (they are stored as a JSON string)."""
+    answers = user_quiz.answers
+    if not answers:
+        return {}
+    if isinstance(answers, str):
+        return json.loads(answers)
+    return answers
+
+
+def regrade_attempts(quiz, batch_size=500):
+    """
+    Re-score every completed attempt of a quiz against its current answer key.
+
+    Useful after the correct options of a question have been changed. Manually graded
+    short answers keep their awarded points. Returns the number of attempts updated.
+    """
+    answer_key = get_answer_key(quiz)
+    changed = []
+
+    attempts = UserQuiz.objects.filter(quiz_id=answer_key.quiz_id, completed=True).only("id", "answers", "score")
+    for attempt in attempts.iterator(chunk_size=batch_size):
+        answers = load_answers(attempt)
+        for q_id, answer in answers.items():
+            question_key = answer_key.questions.get(int(q_id))
+            if question_key is None or question_key.question_type == "short":
+                continue
+            answer.update(grade_question(question_key, answer.get("user_answer")))
+
+        # score is an integer column, so compare against the truncated percentage
+        score = int(score_answers(answer_key, answers))
+        serialized = json.dumps(answers)
+        if serialized != attempt.answers or score != attempt.score:
+            attempt.answers = serialized
+            attempt.score = score
+            changed.append(attempt)
+
+    UserQuiz.objects.bulk_update(changed, ["answers", "score"], batch_size=batch_size)
+    return len(changed)
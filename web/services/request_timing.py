@@ -0,0 +1,313 @@
+"""
+Per-request timing breakdown, rolling per-view latency percentiles and sampled profiles.
+
+While ``timing()`` is active it adds up time spent in each of these categories:
+
+* ``db``: every statement, through an execute wrapper on each connection (see ``web.signals``);
+* ``template``: Django template rendering. Nested ``{% include %}`` renders count once;
+* ``cache``: calls on the configured cache backends;
+* ``http``: outbound calls through ``web.services.http_client``.
+
+The categories can overlap. A query run while a template renders counts in both ``db`` and
+``template``. Outside a timing, each instrumented call costs one context-variable lookup.
+
+``ServerTimingMiddleware`` times every request when ``settings.SERVER_TIMING`` is on. For staff
+it sends the breakdown as a ``Server-Timing`` header, which the browser's network panel shows.
+Each process keeps the last ``LATENCY_SAMPLES`` requests per view and writes them, with their
+p50/p95/p99, to ``SERVER_TIMING_SUMMARY_DIR/<pid>.json``. The ``latency_report`` command merges
+the files of all processes.
+
+With ``SERVER_TIMING_PROFILE_THRESHOLD_MS`` set, a ``SERVER_TIMING_PROFILE_SAMPLE_RATE`` share of
+requests runs under a profiler. The profile is kept in ``SERVER_TIMING_PROFILE_DIR`` only when the
+request took longer than the threshold. pyinstrument is used when it is installed, giving HTML
+reports that follow async code. Otherwise cProfile writes ``.prof`` files for ``snakeviz`` or
+``pstats``; it only sees the thread that handles the request.
+"""
+
+import cProfile
+import functools
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+
+try:
+    from pyinstrument import Profiler
+except ImportError:
+    Profiler = None
+
+CATEGORIES = ("db", "template", "cache", "http")
+DESCRIPTIONS = {"db": "Database", "template": "Templates", "cache": "Cache", "http": "Outbound HTTP"}
+LATENCY_SAMPLES = 500
+SUMMARY_INTERVAL = 60
+SUMMARY_MAX_AGE = 15 * 60
+PROFILES_KEPT = 200
+CACHE_METHODS = (
+    "add",
+    "get",
+    "set",
+    "touch",
+    "delete",
+    "get_many",
+    "set_many",
+    "delete_many",
+    "get_or_set",
+    "has_key",
+    "incr",
+    "decr",
+    "clear",
+)
+
+_active_timing = ContextVar("request_timing", default=None)
+_UNSAFE_FILENAME = re.compile(r"[^\w.-]+")
+
+
+class RequestTiming:
+    """Time and call counts per category for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = dict.fromkeys(CATEGORIES, 0.0)
+        self.counts = dict.fromkeys(CATEGORIES, 0)
+        self.total = None
+        self._depth = dict.fromkeys(CATEGORIES, 0)
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started
+        return self.total
+
+    def header(self):
+        """The ``Server-Timing`` value, in milliseconds, with call counts as descriptions."""
+        metrics = [
+            f'{category};dur={self.durations[category] * 1000:.1f};desc="{DESCRIPTIONS[category]} '
+            f'({self.counts[category]})"'
+            for category in CATEGORIES
+            if self.counts[category]
+        ]
+        metrics.append(f'total;dur={self.total * 1000:.1f};desc="Total"')
+        return ", ".join(metrics)
+
+
+@contextmanager
+def measure(category):
+    """Add the block's duration to the active timing; calls made from inside the block are not counted again."""
+    timing = _active_timing.get()
+    if timing is None or timing._depth[category]:
+        yield
+        return
+    timing._depth[category] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing._depth[category] -= 1
+        timing.durations[category] += time.perf_counter() - started
+        timing.counts[category] += 1
+
+
+@contextmanager
+def timing():
+    """Time the block by category, including ``sync_to_async`` threads it awaits."""
+    request_timing = RequestTiming()
+    token = _active_timing.set(request_timing)
+    try:
+        yield request_timing
+    finally:
+        _active_timing.reset(token)
+        request_timing.finish()
+
+
+def _time_query(execute, sql, params, many, context):
+    if _active_timing.get() is None:
+        return execute(sql, params, many, context)
+    with measure("db"):
+        return execute(sql, params, many, context)
+
+
+def install_on_connection(connection):
+    """Add the query timer to a connection once."""
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def _timed(category, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if _active_timing.get() is None:
+            return method(*args, **kwargs)
+        with measure(category):
+            return method(*args, **kwargs)
+
+    wrapper.request_timing = True
+    return wrapper
+
+
+def _patch(cls, name, category):
+    method = getattr(cls, name, None)
+    if method is not None and not getattr(method, "request_timing", False):
+        setattr(cls, name, _timed(category, method))
+
+
+def install():
+    """Time template rendering and the configured cache backends; safe to call more than once."""
+    from django.core.cache import caches
+    from django.db import connections
+    from django.template.base import Template
+
+    _patch(Template, "render", "template")
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        for name in CACHE_METHODS:
+            _patch(backend, name, "cache")
+    for connection in connections.all():
+        install_on_connection(connection)
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of already sorted samples."""
+    if not samples:
+        return None
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def summarize(samples):
+    """
+    ``{"requests", "p50_ms", "p95_ms", "p99_ms", "<category>_ms"}`` for a list of sample rows.
+
+    A row is ``[total_ms, db_ms, template_ms, cache_ms, http_ms]``. The category values are means.
+    """
+    totals = sorted(row[0] for row in samples)
+    summary = {
+        "requests": len(samples),
+        "p50_ms": percentile(totals, 0.5),
+        "p95_ms": percentile(totals, 0.95),
+        "p99_ms": percentile(totals, 0.99),
+    }
+    for index, category in enumerate(CATEGORIES, start=1):
+        summary[f"{category}_ms"] = round(sum(row[index] for row in samples) / len(samples), 2) if samples else None
+    return summary
+
+
+class LatencyWindows:
+    """The last ``LATENCY_SAMPLES`` timings of each view in this process."""
+
+    def __init__(self, size=LATENCY_SAMPLES):
+        self.size = size
+        self._lock = threading.Lock()
+        self._samples = {}
+        self._next_write = time.monotonic() + SUMMARY_INTERVAL
+
+    def record(self, view, request_timing):
+        row = [round(request_timing.total * 1000, 2)]
+        row.extend(round(request_timing.durations[category] * 1000, 2) for category in CATEGORIES)
+        with self._lock:
+            if view not in self._samples:
+                self._samples[view] = deque(maxlen=self.size)
+            self._samples[view].append(row)
+
+    def samples(self):
+        with self._lock:
+            return {view: list(rows) for view, rows in self._samples.items()}
+
+    def summary(self):
+        return {view: summarize(rows) for view, rows in self.samples().items()}
+
+    def write_due(self):
+        """True once every ``SUMMARY_INTERVAL``, for the first caller to ask."""
+        with self._lock:
+            if time.monotonic() < self._next_write:
+                return False
+            self._next_write = time.monotonic() + SUMMARY_INTERVAL
+            return True
+
+    def write(self, directory=None):
+        """Replace this process's summary file; returns its path."""
+        directory = Path(directory or settings.SERVER_TIMING_SUMMARY_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        samples = self.samples()
+        path = directory / f"{os.getpid()}.json"
+        temporary = path.with_suffix(".tmp")
+        temporary.write_text(
+            json.dumps(
+                {
+                    "pid": os.getpid(),
+                    "written": time.time(),
+                    "views": {view: {"summary": summarize(rows), "samples": rows} for view, rows in samples.items()},
+                }
+            )
+        )
+        os.replace(temporary, path)
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+windows = LatencyWindows()
+
+
+def merged_summaries(directory=None, max_age=SUMMARY_MAX_AGE):
+    """
+    Per-view summaries over the samples of every process that wrote a file in the last ``max_age`` seconds.
+
+    Returns ``[{"view", "requests", "p50_ms", ...}]``, slowest p95 first.
+    """
+    directory = Path(directory or settings.SERVER_TIMING_SUMMARY_DIR)
+    samples = {}
+    for path in directory.glob("*.json"):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        if time.time() - data.get("written", 0) > max_age:
+            continue
+        for view, entry in data["views"].items():
+            samples.setdefault(view, []).extend(entry["samples"])
+    ranked = [dict(summarize(rows), view=view) for view, rows in samples.items()]
+    return sorted(ranked, key=lambda view: -(view["p95_ms"] or 0))
+
+
+def start_profile():
+    """Start a profiler for the current request, or return None if another profiler is already running."""
+    profiler = Profiler(async_mode="enabled") if Profiler is not None else cProfile.Profile()
+    try:
+        if Profiler is not None:
+            profiler.start()
+        else:
+            profiler.enable()
+    except (RuntimeError, ValueError):
+        return None
+    return profiler
+
+
+def stop_profile(profiler):
+    if Profiler is not None and isinstance(profiler, Profiler):
+        profiler.stop()
+    else:
+        profiler.disable()
+
+
+def save_profile(profiler, view, request_timing, directory=None):
+    """Write a stopped profile next to the most recent ones; returns its path."""
+    directory = Path(directory or settings.SERVER_TIMING_PROFILE_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    stem = _UNSAFE_FILENAME.sub("_", f"{time.strftime('%Y%m%d-%H%M%S')}-{view}-{request_timing.total * 1000:.0f}ms")
+    if Profiler is not None and isinstance(profiler, Profiler):
+        path = directory / f"{stem}.html"
+        path.write_text(profiler.output_html())
+    else:
+        path = directory / f"{stem}.prof"
+        profiler.dump_stats(path)
+    profiles = [*directory.glob("*.prof"), *directory.glob("*.html")]
+    old = sorted(profiles, key=lambda profile: profile.stat().st_mtime)[:-PROFILES_KEPT]
+    for profile in old:
+        profile.unlink(missing_ok=True)
+    return path
@@ -0,0 +1,134 @@
+"""
+Month calendars of course sessions.
+
+Calendars only need to know which days of a month have sessions. That is fetched for any set of
+courses with one ``TruncDate`` query and cached per (course, year, month). Each course has a
+version in the key, and ``web.signals`` replaces it whenever one of the course's sessions
+changes. The week layout of a month never changes, so it is computed once per process.
+"""
+
+import calendar
+import secrets
+from datetime import MAXYEAR, MINYEAR, date, datetime
+from functools import lru_cache
+
+from django.core.cache import cache
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from web.models import Session
+
+CACHE_TIMEOUT = 60 * 60 * 24 * 7
+# Matches the Sun..Sat header of the calendar templates
+_CALENDAR = calendar.Calendar(firstweekday=calendar.SUNDAY)
+
+
+@lru_cache(maxsize=256)
+def _weeks(year, month):
+    return tuple(tuple(week) for week in _CALENDAR.monthdayscalendar(year, month))
+
+
+def requested_month(params, today):
+    """
+    Read ``year`` and ``month`` from query parameters, falling back to ``today``'s month.
+
+    The first and last years ``date`` supports are refused too, so both adjacent months of the
+    result are valid dates.
+    """
+    try:
+        year, month = int(params.get("year", today.year)), int(params.get("month", today.month))
+        date(year, month, 1)
+    except (TypeError, ValueError):
+        return today.year, today.month
+    if not MINYEAR < year < MAXYEAR:
+        return today.year, today.month
+    return year, month
+
+
+def adjacent_months(year, month):
+    """Return ``((year, month) before, (year, month) after)``."""
+    before = (year - 1, 12) if month == 1 else (year, month - 1)
+    after = (year + 1, 1) if month == 12 else (year, month + 1)
+    return before, after
+
+
+def _version_key(course_id):
+    return f"session_calendar_version:{course_id}"
+
+
+def invalidate_course(course_id):
+    cache.set(_version_key(course_id), secrets.token_hex(8), None)
+
+
+def _month_keys(course_ids, year, month):
+    versions = cache.get_many([_version_key(course_id) for course_id in course_ids])
+    keys = {}
+    for course_id in course_ids:
+        version = versions.get(_version_key(course_id))
+        if version is None:
+            # Nothing cached under a missing version can be current, so any fresh value will do
+            version = secrets.token_hex(8)
+            cache.add(_version_key(course_id), version, None)
+        keys[course_id] = f"session_calendar:{course_id}:{version}:{year}-{month}"
+    return keys
+
+
+def session_days(course_ids, year, month):
+    """Return ``{course_id: set of days in the month with a session}`` using at most one query."""
+    course_ids = list(course_ids)
+    keys = _month_keys(course_ids, year, month)
+    cached = cache.get_many(keys.values())
+    days = {course_id: set(cached[key]) for course_id, key in keys.items() if key in cached}
+
+    missing = [course_id for course_id in course_ids if course_id not in days]
+    if missing:
+        fetched = {course_id: set() for course_id in missing}
+        start = timezone.make_aware(datetime(year, month, 1))
+        end = timezone.make_aware(datetime(*adjacent_months(year, month)[1], 1))
+        rows = (
+            Session.objects.filter(course_id__in=missing, start_time__gte=start, start_time__lt=end)
+            .annotate(day=TruncDate("start_time"))
+            .values_list("course_id", "day")
+            .distinct()
+        )
+        for course_id, day in rows:
+            fetched[course_id].add(day.day)
+        cache.set_many({keys[course_id]: sorted(found) for course_id, found in fetched.items()}, CACHE_TIMEOUT)
+        days.update(fetched)
+    return days
+
+
+def month_grid(year, month, course_ids, today=None):
+    """
+    Return the weeks of a month for one or more courses.
+
+    Each day is ``{"date", "in_month", "has_session", "is_today", "course_ids"}``; days padding
+    the first and last week have ``date`` None.
+    """
+    today = today or timezone.localdate()
+    courses_on = {}
+    for course_id, days in session_days(course_ids, year, month).items():
+        for day in days:
+            courses_on.setdefault(day, []).append(course_id)
+
+    weeks = []
+    for week in _weeks(year, month):
+        calendar_week = []
+        for day in week:
+            if not day:
+                calendar_week.append(
+                    {"date": None, "in_month": False, "has_session": False, "is_today": False, "course_ids": []}
+                )
+                continue
+            current = date(year, month, day)
+            calendar_week.append(
+                {
+                    "date": current,
+                    "in_month": True,
+                    "has_session": day in courses_on,
+                    "is_today": current == today,
+                    "course_ids": courses_on.get(day, []),
+                }
+            )
+        weeks.append(calendar_week)
+    return weeks
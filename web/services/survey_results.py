@@ -0,0 +1,115 @@
+"""
+Aggregated survey results.
+
+All per-choice tallies for a survey come from a single grouped query over
+(question, choice). The computed summary, including the chart JSON, is cached
+per survey and dropped by ``submit_survey`` whenever new responses arrive.
+"""
+
+import json
+
+from django.core.cache import cache
+from django.db.models import Count
+
+from web.models import Choice
+
+SURVEY_RESULTS_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(survey_id):
+    return f"survey_results_{survey_id}"
+
+
+def survey_tallies(survey_id):
+    """Return a queryset of per-choice response counts for a survey, in question and choice order."""
+    return (
+        Choice.objects.filter(question__survey_id=survey_id)
+        .values("question_id", "question__text", "id", "text")
+        .annotate(count=Count("response"))
+        .order_by("question_id", "id")
+    )
+
+
+def compute_survey_results(survey_id):
+    """Build the results summary shown on the survey results page."""
+    questions = {}
+    for row in survey_tallies(survey_id):
+        question = questions.setdefault(
+            row["question_id"],
+            {"question": {"id": row["question_id"], "text": row["question__text"]}, "choices": [], "total": 0},
+        )
+        question["choices"].append({"text": row["text"], "count": row["count"]})
+        question["total"] += row["count"]
+
+    results = []
+    total_participants = 0
+    most_answered_question = None
+    max_responses = 0
+    top_choice = None
+    bottom_choice = None
+    overall_top_choice_count = 0
+    overall_bottom_choice_count = float("inf")
+    total_possible_responses = 0
+    total_actual_responses = 0
+
+    for result in questions.values():
+        question_total = result["total"]
+        if question_total == 0:
+            continue
+
+        total_possible_responses += total_participants * 1  # Each participant could answer this question
+        total_actual_responses += question_total
+
+        if question_total > max_responses:
+            max_responses = question_total
+            most_answered_question = result["question"]
+
+        for choice in result["choices"]:
+            choice["percentage"] = round((choice["count"] / question_total * 100), 1)
+
+            if choice["count"] > overall_top_choice_count:
+                overall_top_choice_count = choice["count"]
+                top_choice = choice
+
+            if choice["count"] > 0 and choice["count"] < overall_bottom_choice_count:
+                overall_bottom_choice_count = choice["count"]
+                bottom_choice = choice
+
+        results.append(result)
+        total_participants = max(total_participants, question_total)
+
+    engagement_score = 0
+    if total_possible_responses > 0:
+        engagement_score = (total_actual_responses / total_possible_responses) * 100
+
+    chart_data = [
+        {
+            "question_id": result["question"]["id"],
+            "labels": [choice["text"] for choice in result["choices"]],
+            "data": [choice["count"] for choice in result["choices"]],
+        }
+        for result in results
+    ]
+
+    return {
+        "results": results,
+        "total_participants": total_participants,
+        "engagement_score": round(engagement_score, 1),
+        "most_answered_question": most_answered_question,
+        "top_choice": top_choice,
+        "bottom_choice": bottom_choice,
+        "chart_data_json": json.dumps(chart_data),
+    }
+
+
+def get_survey_results(survey_id):
+    """Return the cached results summary for a survey, computing it on a miss."""
+    summary = cache.get(_cache_key(survey_id))
+    if summary is None:
+        summary = compute_survey_results(survey_id)
+        cache.set(_cache_key(survey_id), summary, SURVEY_RESULTS_CACHE_TIMEOUT)
+    return summary
+
+
+def invalidate_survey_results(survey_id):
+    cache.delete(_cache_key(survey_id))
@@ -0,0 +1,183 @@
+"""
+Stored oEmbed metadata for YouTube and Vimeo videos.
+
+Video URLs are parsed once, when an ``EducationalVideo`` is saved, into a canonical
+``(provider, video_id)`` key. That key points at a shared ``VideoMetadata`` row, so pages never
+re-parse URLs or call oEmbed while they render. New rows are filled in by a background worker
+after the saving transaction commits. The ``refresh_video_metadata`` command re-fetches stale
+rows in batches.
+"""
+
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from web.models import EducationalVideo, VideoMetadata
+from web.services import http_client
+from web.services.background import run_once_in_background
+
+logger = logging.getLogger(__name__)
+
+REFRESH_AFTER = timedelta(days=30)
+BATCH_SIZE = 50
+MAX_WORKERS = 4
+WORKER_LOCK_KEY = "video_metadata_worker"
+
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+YOUTUBE_HOSTS = ("youtube.com", "www.youtube.com", "m.youtube.com")
+YOUTUBE_SHORT_HOSTS = ("youtu.be", "www.youtu.be")
+VIMEO_HOSTS = ("vimeo.com", "www.vimeo.com", "player.vimeo.com")
+
+
+def parse_video_url(url):
+    """Return ``(provider, video_id)`` for a YouTube or Vimeo URL, or None for anything else."""
+    parsed = urlparse((url or "").strip())
+    host = parsed.netloc.lower()
+    path = parsed.path.strip("/")
+
+    if host in YOUTUBE_SHORT_HOSTS:
+        vid = path.split("/")[0]
+    elif host in YOUTUBE_HOSTS:
+        vid = parse_qs(parsed.query).get("v", [""])[0]
+        if not vid and path.startswith(("embed/", "shorts/")):
+            vid = path.split("/")[1]
+    elif host in VIMEO_HOSTS:
+        vid = path.split("/")[-1]
+        return ("vimeo", vid) if vid.isdigit() else None
+    else:
+        return None
+    return ("youtube", vid) if YOUTUBE_ID.match(vid) else None
+
+
+def canonical_url(provider, video_id):
+    if provider == "youtube":
+        return f"https://www.youtube.com/watch?v={video_id}"
+    return f"https://vimeo.com/{video_id}"
+
+
+def start_worker():
+    return run_once_in_background(WORKER_LOCK_KEY, refresh_video_metadata)
+
+
+def metadata_for_url(url, current=None, schedule=True):
+    """
+    Return the ``VideoMetadata`` row for a video URL, creating it if needed.
+
+    ``current`` is returned unchanged when it already matches the URL, which saves a query.
+    New rows are fetched by the background worker once the transaction commits, unless
+    ``schedule`` is False because the caller fetches them itself.
+    """
+    key = parse_video_url(url)
+    if key is None:
+        return None
+    if current is not None and (current.provider, current.video_id) == key:
+        return current
+    metadata, created = VideoMetadata.objects.get_or_create(provider=key[0], video_id=key[1])
+    if created and schedule:
+        transaction.on_commit(start_worker)
+    return metadata
+
+
+def fetch_oembed(provider, video_id):
+    """
+    Ask the provider's oEmbed endpoint about a video.
+
+    Returns a dict of ``VideoMetadata`` fields, an empty dict when the provider has no details
+    (private or removed videos), or None if the request failed and should be retried later.
+    """
+    if provider == "youtube":
+        endpoint = "https://www.youtube.com/oembed"
+    else:
+        endpoint = "https://vimeo.com/api/oembed.json"
+
+    try:
+        resp = http_client.get(endpoint, params={"url": canonical_url(provider, video_id), "format": "json"}, timeout=3)
+    except requests.RequestException as e:
+        logger.warning(f"oEmbed request for {provider}:{video_id} failed: {e}")
+        return None
+    if resp.status_code >= 500:
+        return None
+    if not resp.ok:
+        return {}
+
+    try:
+        data = resp.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        logger.warning(f"oEmbed response for {provider}:{video_id} is not a JSON object")
+        return None
+    return {
+        "title": (data.get("title") or "").strip()[:200],
+        "description": (data.get("description") or "").strip(),
+        "thumbnail_url": data.get("thumbnail_url") or "",
+        "duration": data.get("duration") or None,
+    }
+
+
+def _apply(metadata, details):
+    for field, value in details.items():
+        setattr(metadata, field, value)
+    metadata.fetched_at = timezone.now()
+
+
+def video_details(url):
+    """
+    Return the ``VideoMetadata`` for a URL, fetching it now if it has never been fetched.
+
+    Used when the details are needed straight away, such as back-filling an upload form. Only
+    a failed fetch is handed to the background worker, so a new URL is fetched once.
+    """
+    metadata = metadata_for_url(url, schedule=False)
+    if metadata is None or metadata.fetched_at is not None:
+        return metadata
+    details = fetch_oembed(metadata.provider, metadata.video_id)
+    if details is None:
+        transaction.on_commit(start_worker)
+    else:
+        _apply(metadata, details)
+        metadata.save()
+    return metadata
+
+
+def link_videos():
+    """Attach metadata rows to videos saved before their URL was parsed; returns how many were linked."""
+    linked = 0
+    for video in EducationalVideo.objects.filter(metadata__isnull=True).only("id", "video_url"):
+        video.save(update_fields=["metadata"])
+        linked += video.metadata_id is not None
+    return linked
+
+
+def refresh_video_metadata(limit=None, max_age=REFRESH_AFTER):
+    """
+    Fetch metadata that was never fetched or is older than ``max_age``, in batches.
+
+    Each batch is fetched concurrently and written with one bulk update. Rows whose request
+    failed are left for the next run. Returns the number of rows refreshed.
+    """
+    stale = VideoMetadata.objects.filter(Q(fetched_at__isnull=True) | Q(fetched_at__lt=timezone.now() - max_age))
+    ids = list(stale.order_by("id").values_list("id", flat=True)[:limit])
+
+    refreshed = 0
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="video-metadata") as executor:
+        for start in range(0, len(ids), BATCH_SIZE):
+            batch = list(VideoMetadata.objects.filter(id__in=ids[start : start + BATCH_SIZE]))
+            results = executor.map(lambda m: fetch_oembed(m.provider, m.video_id), batch)
+            updated = []
+            for metadata, details in zip(batch, results):
+                if details is not None:
+                    _apply(metadata, details)
+                    updated.append(metadata)
+            VideoMetadata.objects.bulk_update(
+                updated, ["title", "description", "thumbnail_url", "duration", "fetched_at"]
+            )
+            refreshed += len(updated)
+    return refreshed
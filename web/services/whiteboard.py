@@ -0,0 +1,322 @@
+"""
+Shared whiteboards.
+
+Clients send strokes as compact binary frames. Coordinates are quantized to whole canvas
+pixels, and every point after the first is a zigzag varint delta from the previous one, so a
+freehand point usually costs two bytes. The server checks each frame and relays the same bytes
+to the other members of the board's room. It then stores the frame for late joiners; each
+connection writes its frames in one bulk insert at most every ``STORE_DELAY`` seconds.
+
+Stored frames are compacted into a PNG snapshot once ``COMPACT_AFTER`` of them have piled up,
+and by the daily ``compact_whiteboards`` job. A late joiner therefore receives one snapshot plus
+at most a short tail of frames, however long the board has been in use.
+
+Any member can draw, but clearing wipes the board for everyone, so only the board's owner and
+the teacher of its class session may do it (see ``can_clear``).
+
+The pending-frame count and each room's member count are atomic counters in the shared cache
+(Redis), so every worker sees the same totals.
+
+Frame layout (all integers are unsigned LEB128 varints unless noted)::
+
+    STROKES   u8 kind=1, then records until the end of the frame
+    CLEAR     u8 kind=2
+    SNAPSHOT  u8 kind=3, u32 version (big-endian), PNG bytes      (server to client only)
+
+    record    u8 tool, u8 width, u8 red, u8 green, u8 blue, count, x0, y0,
+              (count - 1) x (zigzag dx, zigzag dy), and for text: length, UTF-8 bytes
+"""
+
+import math
+import struct
+from dataclasses import dataclass
+from io import BytesIO
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageDraw, ImageFont
+
+from web.models import WhiteboardBoard, WhiteboardFrame
+from web.services.background import run_once_in_background
+
+BOARD_WIDTH = 1500
+BOARD_HEIGHT = 600
+MAX_FRAME_BYTES = 16 * 1024
+MAX_POINTS = 2048
+MAX_TEXT_BYTES = 500
+MAX_SLUG_LENGTH = 64
+MAX_MEMBERS = 40
+MEMBERS_TIMEOUT = 60 * 60 * 12
+COMPACT_AFTER = 200
+STORE_DELAY = 0.25
+HIGHLIGHTER_ALPHA = 77
+
+STROKES, CLEAR, SNAPSHOT = 1, 2, 3
+TOOLS = ("pen", "eraser", "highlighter", "line", "rectangle", "circle", "arrow", "text")
+TEXT = TOOLS.index("text")
+
+
+@dataclass
+class Stroke:
+    tool: int
+    width: int
+    color: tuple
+    points: list
+    text: str = ""
+
+
+def _read_varint(data, pos):
+    value = shift = 0
+    while True:
+        if pos >= len(data) or shift > 28:
+            raise ValueError("Truncated or oversized varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value >> 1 if not value & 1 else -((value + 1) >> 1)
+
+
+def decode_strokes(frame):
+    """Parse a STROKES frame; raises ValueError for anything malformed or outside the board."""
+    if len(frame) > MAX_FRAME_BYTES:
+        raise ValueError("Frame too large")
+    if not frame or frame[0] != STROKES:
+        raise ValueError("Not a strokes frame")
+    strokes = []
+    pos = 1
+    while pos < len(frame):
+        if pos + 5 > len(frame):
+            raise ValueError("Truncated stroke header")
+        tool, width, red, green, blue = frame[pos : pos + 5]
+        pos += 5
+        if tool >= len(TOOLS) or not width:
+            raise ValueError("Unknown tool or zero width")
+        count, pos = _read_varint(frame, pos)
+        if not 0 < count <= MAX_POINTS:
+            raise ValueError("Bad point count")
+        x, pos = _read_varint(frame, pos)
+        y, pos = _read_varint(frame, pos)
+        points = [(x, y)]
+        for _ in range(count - 1):
+            dx, pos = _read_varint(frame, pos)
+            dy, pos = _read_varint(frame, pos)
+            x, y = x + _unzigzag(dx), y + _unzigzag(dy)
+            points.append((x, y))
+        if any(not (0 <= px <= BOARD_WIDTH and 0 <= py <= BOARD_HEIGHT) for px, py in points):
+            raise ValueError("Point outside the board")
+        text = ""
+        if tool == TEXT:
+            length, pos = _read_varint(frame, pos)
+            if length > MAX_TEXT_BYTES or pos + length > len(frame):
+                raise ValueError("Bad text length")
+            text = frame[pos : pos + length].decode("utf-8")
+            pos += length
+        strokes.append(Stroke(tool, width, (red, green, blue), points, text))
+    return strokes
+
+
+def encode_strokes(strokes):
+    """Encode strokes as one STROKES frame; the inverse of ``decode_strokes``."""
+    out = bytearray([STROKES])
+    for stroke in strokes:
+        out += bytes([stroke.tool, stroke.width, *stroke.color])
+        points = [(round(x), round(y)) for x, y in stroke.points]
+        _write_varint(out, len(points))
+        _write_varint(out, points[0][0])
+        _write_varint(out, points[0][1])
+        for (x0, y0), (x1, y1) in zip(points, points[1:]):
+            _write_varint(out, _zigzag(x1 - x0))
+            _write_varint(out, _zigzag(y1 - y0))
+        if stroke.tool == TEXT:
+            text = stroke.text.encode("utf-8")
+            _write_varint(out, len(text))
+            out += text
+    return bytes(out)
+
+
+def snapshot_frame(board):
+    return bytes([SNAPSHOT]) + struct.pack(">I", board.snapshot_version) + bytes(board.snapshot)
+
+
+def _draw(image, stroke):
+    """Draw one stroke the way the browser canvas does."""
+    color = (*stroke.color, 255)
+    if stroke.tool == TOOLS.index("highlighter"):
+        layer = Image.new("RGBA", image.size, (0, 0, 0, 0))
+        ImageDraw.Draw(layer).line(stroke.points, fill=(*stroke.color, HIGHLIGHTER_ALPHA), width=stroke.width)
+        image.alpha_composite(layer)
+        return
+    draw = ImageDraw.Draw(image)
+    tool = TOOLS[stroke.tool]
+    (x0, y0), (x1, y1) = stroke.points[0], stroke.points[-1]
+    if tool in ("pen", "eraser"):
+        # ImageDraw replaces pixels rather than blending, so a transparent line erases
+        fill = (0, 0, 0, 0) if tool == "eraser" else color
+        if len(stroke.points) == 1:
+            draw.point(stroke.points, fill=fill)
+        else:
+            draw.line(stroke.points, fill=fill, width=stroke.width, joint="curve")
+    elif tool in ("line", "arrow"):
+        draw.line([(x0, y0), (x1, y1)], fill=color, width=stroke.width)
+        if tool == "arrow":
+            angle = math.atan2(y1 - y0, x1 - x0)
+            for side in (-1, 1):
+                head = (x1 - 10 * math.cos(angle + side * math.pi / 6), y1 - 10 * math.sin(angle + side * math.pi / 6))
+                draw.line([(x1, y1), head], fill=color, width=stroke.width)
+    elif tool == "rectangle":
+        draw.rectangle([min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1)], outline=color, width=stroke.width)
+    elif tool == "circle":
+        radius = math.hypot(x1 - x0, y1 - y0)
+        draw.ellipse([x0 - radius, y0 - radius, x0 + radius, y0 + radius], outline=color, width=stroke.width)
+    elif tool == "text":
+        draw.text((x0, y0), stroke.text, fill=color, font=ImageFont.load_default(stroke.width * 5), anchor="ls")
+
+
+def compact_board(board_id):
+    """Draw a board's stored frames onto its snapshot and delete them; returns how many were folded in."""
+    board = WhiteboardBoard.objects.get(pk=board_id)
+    frames = list(board.frames.order_by("id").values_list("id", "data"))
+    if not frames:
+        return 0
+
+    # Render outside any transaction so drawing never holds a lock that members' strokes wait on
+    if board.snapshot:
+        image = Image.open(BytesIO(bytes(board.snapshot))).convert("RGBA")
+    else:
+        image = Image.new("RGBA", (BOARD_WIDTH, BOARD_HEIGHT), (0, 0, 0, 0))
+    for _, data in frames:
+        for stroke in decode_strokes(bytes(data)):
+            _draw(image, stroke)
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True)
+
+    last_id = frames[-1][0]
+    with transaction.atomic():
+        # A clear or another compaction since the board was read wins; this result is dropped
+        updated = WhiteboardBoard.objects.filter(pk=board_id, snapshot_version=board.snapshot_version).update(
+            snapshot=buffer.getvalue(),
+            snapshot_version=F("snapshot_version") + 1,
+            updated_at=timezone.now(),
+        )
+        if not updated:
+            return 0
+        WhiteboardFrame.objects.filter(board_id=board_id, id__lte=last_id).delete()
+    return len(frames)
+
+
+def compact_whiteboards():
+    """Compact every board with stored frames; returns how many boards were compacted."""
+    boards = list(WhiteboardBoard.objects.filter(frames__isnull=False).distinct().values_list("id", flat=True))
+    for board_id in boards:
+        compact_board(board_id)
+    return len(boards)
+
+
+def get_board(slug, user):
+    """Return the board for a slug, creating it with ``user`` as its owner."""
+    board, _ = WhiteboardBoard.objects.select_related("session__course").get_or_create(
+        slug=slug, defaults={"owner": user}
+    )
+    if board.owner_id is None:
+        # Boards from before owners were recorded, or whose owner was deleted, go to the next visitor
+        if WhiteboardBoard.objects.filter(pk=board.pk, owner__isnull=True).update(owner=user):
+            board.owner = user
+    return board
+
+
+def can_clear(board, user):
+    """Only the board's owner and the teacher of its class session may wipe it for everyone."""
+    if board.owner_id == user.id:
+        return True
+    return board.session_id is not None and board.session.course.teacher_id == user.id
+
+
+def open_board(slug, user):
+    """Return a board and the frames a new member needs: one snapshot and the strokes stored since."""
+    with transaction.atomic():
+        board = get_board(slug, user)
+        frames = [snapshot_frame(board)] if board.snapshot else []
+        tail = [bytes(data) for data in board.frames.order_by("id").values_list("data", flat=True)]
+    if tail:
+        # Merge the tail into one frame: dropping each frame's kind byte leaves plain records
+        frames.append(bytes([STROKES]) + b"".join(frame[1:] for frame in tail))
+    return board, frames
+
+
+def _increment(key, delta, timeout):
+    """Atomically add to a shared counter, starting it if it is missing or has just expired."""
+    while True:
+        if cache.add(key, delta, timeout):
+            return delta
+        try:
+            return cache.incr(key, delta)
+        except ValueError:
+            # Expired between add() and incr(); start it again
+            continue
+
+
+def _pending_key(board_id):
+    return f"whiteboard_pending:{board_id}"
+
+
+def store_frames(board_id, frames):
+    """Keep checked STROKES frames for late joiners, compacting in the background when enough pile up."""
+    WhiteboardFrame.objects.bulk_create(WhiteboardFrame(board_id=board_id, data=frame) for frame in frames)
+    key = _pending_key(board_id)
+    pending = _increment(key, len(frames), None)
+    # Only the worker that takes the count past the threshold compacts. It subtracts what it saw,
+    # so frames other workers add meanwhile are still counted.
+    if pending - len(frames) < COMPACT_AFTER <= pending:
+        try:
+            cache.decr(key, pending)
+        except ValueError:
+            # The board was cleared meanwhile
+            pass
+        run_once_in_background(f"whiteboard_compact:{board_id}", compact_board, board_id, lock_timeout=60)
+
+
+def clear_board(board_id):
+    with transaction.atomic():
+        WhiteboardFrame.objects.filter(board_id=board_id).delete()
+        WhiteboardBoard.objects.filter(pk=board_id).update(snapshot=b"", snapshot_version=F("snapshot_version") + 1)
+    cache.delete(_pending_key(board_id))
+
+
+def _members_key(slug):
+    return f"whiteboard_members:{slug}"
+
+
+def join_room(slug):
+    """Reserve a place in a board's room; returns False when the room is full."""
+    key = _members_key(slug)
+    if _increment(key, 1, MEMBERS_TIMEOUT) > MAX_MEMBERS:
+        cache.decr(key)
+        return False
+    return True
+
+
+def leave_room(slug):
+    try:
+        cache.decr(_members_key(slug))
+    except ValueError:
+        # The counter expired while the socket was open
+        pass
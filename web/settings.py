@@ -153,7 +153,9 @@ if DEBUG and not TESTING:
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "web.middleware.AsyncWhiteNoiseMiddleware",
+    "web.middleware.ServerTimingMiddleware",
+    "web.middleware.QueryAuditMiddleware",
     "web.middleware.HostnameRewriteMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.locale.LocaleMiddleware",
@@ -170,6 +172,18 @@ MIDDLEWARE = [
 if DEBUG and not TESTING:
     MIDDLEWARE.insert(-2, "django_browser_reload.middleware.BrowserReloadMiddleware")
 
+# Per-request query counts and N+1 warnings; rank the logged routes with `manage.py query_report`
+QUERY_AUDIT = env.bool("QUERY_AUDIT", default=DEBUG and not TESTING)
+QUERY_AUDIT_LOG = env.str("QUERY_AUDIT_LOG", default=str(BASE_DIR / "logs" / "query_audit.jsonl"))
+
+# Server-Timing header for staff and per-view p50/p95/p99; merge the process summaries with `manage.py latency_report`
+SERVER_TIMING = env.bool("SERVER_TIMING", default=not TESTING)
+SERVER_TIMING_SUMMARY_DIR = env.str("SERVER_TIMING_SUMMARY_DIR", default=str(BASE_DIR / "logs" / "latency"))
+# Profile a sample of requests and keep the profiles of those slower than the threshold; 0 turns profiling off
+SERVER_TIMING_PROFILE_THRESHOLD_MS = env.int("SERVER_TIMING_PROFILE_THRESHOLD_MS", default=0)
+SERVER_TIMING_PROFILE_SAMPLE_RATE = env.float("SERVER_TIMING_PROFILE_SAMPLE_RATE", default=0.1)
+SERVER_TIMING_PROFILE_DIR = env.str("SERVER_TIMING_PROFILE_DIR", default=str(BASE_DIR / "logs" / "profiles"))
+
 ROOT_URLCONF = "web.urls"
 
 TEMPLATES = [
@@ -204,15 +218,31 @@ WSGI_APPLICATION = "web.wsgi.application"
 # Add ASGI application configuration
 ASGI_APPLICATION = "web.asgi.application"
 
-# Channels / Redis channel layer configuration (assumes a local Redis unless overridden)
+# Channels layer and cache configuration (assumes a local Redis unless overridden)
 REDIS_URL = env.str("REDIS_URL", default="redis://127.0.0.1:6379/0")
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
-        "CONFIG": {"hosts": [REDIS_URL]},
+        # A whiteboard member receives every other member's strokes; the default of 100 queued
+        # messages per channel overflows within a second in a busy room
+        "CONFIG": {"hosts": [REDIS_URL], "capacity": 1000},
     }
 }
 
+# One cache for every worker process: answer keys, quiz drafts, presence, feed versions and the
+# locks and throttles built on cache.add() are only correct when all workers see the same entries
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+}
+
+if TESTING:
+    # Tests must not need a running Redis
+    CHANNEL_LAYERS = {"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+    CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
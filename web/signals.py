@@ -1,9 +1,33 @@
 from allauth.account.signals import user_signed_up
 from django.core.cache import cache
+from django.db.backends.signals import connection_created
 from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
 
-from .models import CourseProgress, Enrollment, LearningStreak, Session, SessionAttendance
+from .models import (
+    Course,
+    CourseProgress,
+    Enrollment,
+    ForumReply,
+    LearningStreak,
+    Notification,
+    PeerMessage,
+    Profile,
+    QuizOption,
+    QuizQuestion,
+    Session,
+    SessionAttendance,
+    StudyGroupInvite,
+)
+from .services.calendar_feed import bump_schedules, course_audience
+from .services.class_map import invalidate_tiles
+from .services.forum_votes import record_reply_added, record_reply_removed
+from .services.image_derivatives import IMAGE_FIELDS, queue_image
+from .services.live_updates import invite_payload, message_payload, notification_payload, push_counts, push_event
+from .services.query_audit import install as install_query_recorder
+from .services.quiz_grading import invalidate_answer_key
+from .services.request_timing import install_on_connection as install_query_timer
+from .services.session_calendar import invalidate_course
 from .utils import send_slack_message
 
 
@@ -67,3 +91,118 @@ def invalidate_session_cache(sender, instance, **kwargs):
     enrollments = Enrollment.objects.filter(course=instance.course)
     for enrollment in enrollments:
         invalidate_progress_cache(enrollment.student)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=Course)
+def invalidate_course_calendar_feeds(sender, instance, **kwargs):
+    """Rebuild the iCal feeds of everyone who sees this course's sessions."""
+    course = instance if sender is Course else instance.course
+    bump_schedules(course_audience(course))
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+def invalidate_session_calendar(sender, instance, **kwargs):
+    """Rebuild the month calendars of the session's course."""
+    invalidate_course(instance.course_id)
+
+
+@receiver(post_save, sender=Session)
+@receiver(post_delete, sender=Session)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def invalidate_class_map(sender, instance, **kwargs):
+    """Drop the cached map tiles; markers show session, course and teacher details."""
+    invalidate_tiles()
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+@receiver(post_save, sender=Profile)
+def invalidate_user_calendar_feed(sender, instance, **kwargs):
+    """Rebuild a user's iCal feed when they join or leave a course, or become a teacher."""
+    bump_schedules([instance.student_id if sender is Enrollment else instance.user_id])
+
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def invalidate_question_answer_key(sender, instance, **kwargs):
+    """Recompile the quiz answer key when a question is added, edited or removed."""
+    invalidate_answer_key(instance.quiz_id)
+
+
+@receiver(post_save, sender=QuizOption)
+@receiver(post_delete, sender=QuizOption)
+def invalidate_option_answer_key(sender, instance, **kwargs):
+    """Recompile the quiz answer key when an option (or its correctness) changes."""
+    try:
+        quiz_id = instance.question.quiz_id
+    except QuizQuestion.DoesNotExist:
+        # The question is already gone; its own post_delete handles the invalidation
+        return
+    invalidate_answer_key(quiz_id)
+
+
+@receiver(post_save, sender=ForumReply)
+def update_topic_on_reply_added(sender, instance, created, **kwargs):
+    """Keep the topic's reply count and last activity in step with new replies."""
+    if created:
+        record_reply_added(instance)
+
+
+@receiver(post_delete, sender=ForumReply)
+def update_topic_on_reply_removed(sender, instance, **kwargs):
+    """Keep the topic's reply count and last activity in step with deleted replies."""
+    record_reply_removed(instance)
+
+
+@receiver(post_save, sender=Notification)
+def push_notification(sender, instance, created, **kwargs):
+    """Push new notifications, and counter changes when one is marked read, to the user's open pages."""
+    if created:
+        push_event(instance.user_id, "notification", notification_payload(instance))
+    else:
+        push_counts(instance.user_id)
+
+
+@receiver(post_save, sender=PeerMessage)
+def push_peer_message(sender, instance, created, **kwargs):
+    """Tell the receiver about a new message, or refresh their unread count when it is read."""
+    if created:
+        push_event(instance.receiver_id, "message", message_payload(instance))
+    else:
+        push_counts(instance.receiver_id)
+
+
+@receiver(post_save, sender=StudyGroupInvite)
+def push_group_invite(sender, instance, created, **kwargs):
+    """Tell the recipient about a new invite, or refresh their pending count once they respond."""
+    if created:
+        push_event(instance.recipient_id, "invite", invite_payload(instance))
+    else:
+        push_counts(instance.recipient_id)
+
+
+@receiver(post_delete, sender=Notification)
+def push_notification_removed(sender, instance, **kwargs):
+    push_counts(instance.user_id)
+
+
+def queue_image_derivatives(sender, instance, **kwargs):
+    """Queue resized copies of a newly uploaded image once the save commits."""
+    for model, field, spec in IMAGE_FIELDS:
+        if model is sender:
+            queue_image(getattr(instance, field), spec)
+
+
+for model, _, _ in IMAGE_FIELDS:
+    post_save.connect(queue_image_derivatives, sender=model, dispatch_uid=f"image_derivatives_{model.__name__}")
+
+
+@receiver(connection_created)
+def record_queries_on_connection(sender, connection, **kwargs):
+    """Let ``record_queries`` and ``timing`` see the queries of connections opened by any thread."""
+    install_query_recorder(connection)
+    install_query_timer(connection)
@@ -2,9 +2,10 @@ import json
 import logging
 from typing import Optional
 
-import requests
 from django.conf import settings
 
+from web.services import http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,7 +31,7 @@ def send_slack_notification(message: str, channel: Optional[str] = None) -> bool
         if channel:
             payload["channel"] = channel
 
-        response = requests.post(
+        response = http_client.post(
             webhook_url,
             data=json.dumps(payload),
             headers={"Content-Type": "application/json"},
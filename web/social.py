@@ -1,14 +1,27 @@
 import logging
 import random
 import re
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 import requests
 from django.conf import settings
 from django.core.cache import cache
 
+from web.services import http_client
+from web.services.background import run_once_in_background
+
 logger = logging.getLogger(__name__)
 
+# Shared health registry for Nitter instances, refreshed by probe_instances(); one key per instance so
+# concurrent probes never overwrite each other's results
+REGISTRY_KEY_PREFIX = "nitter_instance_health:"
+PROBE_INTERVAL = 10 * 60  # Re-probe instances when the registry is older than this
+PROBE_TIMEOUT = 5
+MAX_FAILURE_STREAK = 3  # Instances failing this many times in a row are skipped until a probe succeeds
+STATS_REFRESH_INTERVAL = 30 * 60
+
 
 class NitterClient:
     """Client for fetching Twitter/X data via Nitter."""
@@ -39,8 +52,17 @@ class NitterClient:
     def __init__(self, username):
         self.username = username
         self.base_url = None
-        self.working_instances = []
-        self._find_working_instances()
+        self.stats_cache_key = f"nitter_stats_{username}"
+
+    @classmethod
+    def _headers(cls):
+        return {
+            "User-Agent": random.choice(cls.USER_AGENTS),
+            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
+            "Accept-Language": "en-US,en;q=0.5",
+            "DNT": "1",
+            "Upgrade-Insecure-Requests": "1",
+        }
 
     def _is_valid_response(self, response_text):
         """Check if the response contains valid profile data."""
@@ -51,106 +73,119 @@ class NitterClient:
         ]
         return any(element in response_text for element in required_elements)
 
-    def _find_working_instances(self):
-        """Try all Nitter instances and collect working ones."""
-        random.shuffle(self.NITTER_INSTANCES)  # Randomize the order to distribute load
-
-        for instance in self.NITTER_INSTANCES:
-            try:
-                headers = {
-                    "User-Agent": random.choice(self.USER_AGENTS),
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                }
-
-                # Try fetching the profile directly with a shorter timeout
-                response = requests.get(
-                    f"{instance}/{self.username}",
-                    headers=headers,
-                    timeout=5,  # Reduced timeout to fail faster
-                    allow_redirects=True,
-                    verify=True,  # Always verify SSL for security
-                )
-                response.raise_for_status()
-
-                if self._is_valid_response(response.text):
-                    logger.info(f"Found working Nitter instance: {instance}")
-                    self.working_instances.append(instance)
-                    if not self.base_url:
-                        self.base_url = instance
-
-            except requests.exceptions.RequestException as e:
-                logger.warning(f"Failed to connect to Nitter instance {instance}: {str(e)}")
-                continue
-            except Exception as e:
-                logger.warning(f"Unexpected error with {instance}: {str(e)}")
-                continue
-
-            # Break after finding 2 working instances to avoid unnecessary checks
-            if len(self.working_instances) >= 2:
-                break
+    # ---- Instance health registry ----
+    @staticmethod
+    def instance_registry():
+        """Return ``{instance: {last_success, last_checked, latency_ms, failures}}`` for probed instances."""
+        keys = {f"{REGISTRY_KEY_PREFIX}{instance}": instance for instance in NitterClient.NITTER_INSTANCES}
+        return {keys[key]: health for key, health in cache.get_many(keys).items()}
+
+    @staticmethod
+    def _record_health(instance, ok, latency):
+        key = f"{REGISTRY_KEY_PREFIX}{instance}"
+        health = cache.get(key) or {"last_success": None, "latency_ms": None, "failures": 0}
+        now = time.time()
+        health["last_checked"] = now
+        if ok:
+            health.update(last_success=now, latency_ms=round(latency * 1000), failures=0)
+        else:
+            health["failures"] += 1
+        cache.set(key, health, None)
+
+    @classmethod
+    def registry_is_stale(cls):
+        registry = cls.instance_registry()
+        if not registry:
+            return True
+        return time.time() - max(health["last_checked"] for health in registry.values()) > PROBE_INTERVAL
+
+    @classmethod
+    def healthy_instances(cls):
+        """Instances that answered recently and are not on a failure streak, fastest first."""
+        registry = cls.instance_registry()
+        healthy = [
+            (health["latency_ms"], instance)
+            for instance, health in registry.items()
+            if health["last_success"] and health["failures"] < MAX_FAILURE_STREAK
+        ]
+        return [instance for _, instance in sorted(healthy)]
 
-        if not self.working_instances:
+    def _probe(self, instance):
+        started = time.monotonic()
+        try:
+            response = http_client.get(
+                f"{instance}/{self.username}",
+                headers=self._headers(),
+                timeout=PROBE_TIMEOUT,
+                retries=0,
+                allow_redirects=True,
+                verify=True,  # Always verify SSL for security
+            )
+            response.raise_for_status()
+            ok = self._is_valid_response(response.text)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Failed to connect to Nitter instance {instance}: {str(e)}")
+            ok = False
+        self._record_health(instance, ok, time.monotonic() - started)
+        return ok
+
+    def probe_instances(self):
+        """Probe every instance concurrently and update the shared registry."""
+        with ThreadPoolExecutor(max_workers=len(self.NITTER_INSTANCES), thread_name_prefix="nitter-probe") as pool:
+            results = list(pool.map(self._probe, self.NITTER_INSTANCES))
+        if not any(results):
             logger.error("No working Nitter instances found")
             logger.error("Tried instances: " + ", ".join(self.NITTER_INSTANCES))
+        return self.healthy_instances()
 
     def get_working_instance(self):
-        """Get a working instance, trying to find new ones if necessary."""
-        if not self.working_instances:
-            self._find_working_instances()
-
-        if self.working_instances:
-            self.base_url = random.choice(self.working_instances)
+        """Get a healthy instance from the registry, spreading load over the two fastest."""
+        instances = self.healthy_instances()
+        if instances:
+            self.base_url = random.choice(instances[:2])
             return self.base_url
         return None
 
+    # ---- Stats ----
     def get_profile_stats(self):
         """
-        Fetch profile statistics from Nitter.
+        Return the last good profile stats immediately.
+
+        Stats older than ``STATS_REFRESH_INTERVAL`` (or missing) are refreshed in a background thread.
         Returns dict with followers, following, tweets count, and last tweet info.
         """
-        if not self.base_url:
-            self.base_url = self.get_working_instance()
-            if not self.base_url:
-                # Return cached data if available
-                cache_key = f"nitter_stats_{self.username}"
-                cached_data = cache.get(cache_key)
-                if cached_data:
-                    logger.info("Using cached data due to Nitter unavailability")
-                    return cached_data
-                return self._get_error_stats("No working Nitter instance available - using fallback data")
-
-        cache_key = f"nitter_stats_{self.username}"
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            return cached_data
-
-        max_retries = 3
-        retry_count = 0
-        last_error = None
-
-        # Store original base_url to restore if needed
-        original_base_url = self.base_url
+        snapshot = cache.get(self.stats_cache_key)
+        if snapshot is None or time.time() - snapshot["fetched_at"] > STATS_REFRESH_INTERVAL:
+            run_once_in_background(f"nitter_refresh_{self.username}", self.refresh_profile_stats)
+        if snapshot is None:
+            return self._get_error_stats("X stats are being fetched - check back shortly")
+        return snapshot["stats"]
+
+    def refresh_profile_stats(self):
+        """Fetch stats from Nitter, probing instances first if the registry is stale, and store the snapshot."""
+        if self.registry_is_stale():
+            self.probe_instances()
+
+        stats = self.fetch_profile_stats()
+        if not stats.get("error"):
+            cache.set(self.stats_cache_key, {"stats": stats, "fetched_at": time.time()}, None)
+        return stats
+
+    def fetch_profile_stats(self):
+        """Fetch profile statistics from Nitter, trying up to three healthy instances."""
+        instances = self.healthy_instances()
+        if not instances:
+            return self._get_error_stats("No working Nitter instance available - using fallback data")
 
-        while retry_count < max_retries:
+        last_error = None
+        for instance in instances[:3]:
+            self.base_url = instance
+            started = time.monotonic()
             try:
-                logger.debug(f"Attempt {retry_count + 1}: Fetching stats from {self.base_url}")
-
-                headers = {
-                    "User-Agent": random.choice(self.USER_AGENTS),
-                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
-                    "Accept-Language": "en-US,en;q=0.5",
-                    "DNT": "1",
-                    "Connection": "keep-alive",
-                    "Upgrade-Insecure-Requests": "1",
-                }
-
-                response = requests.get(
-                    f"{self.base_url}/{self.username}",
-                    headers=headers,
+                logger.debug(f"Fetching stats from {instance}")
+                response = http_client.get(
+                    f"{instance}/{self.username}",
+                    headers=self._headers(),
                     timeout=10,
                     allow_redirects=True,
                     verify=True,  # Always verify SSL for security
@@ -165,41 +200,13 @@ class NitterClient:
                 if stats.get("error"):
                     raise ValueError(stats["error"])
 
-                # Cache the results for 30 minutes
-                cache.set(cache_key, stats, timeout=1800)
+                self._record_health(instance, True, time.monotonic() - started)
                 return stats
 
             except (requests.exceptions.RequestException, ValueError) as e:
                 last_error = str(e)
-                logger.warning(f"Attempt {retry_count + 1} failed: {last_error}")
-
-                # Increment retry count
-                retry_count += 1
-
-                # Try another instance if we have retries left
-                if retry_count < max_retries:
-                    # Remove the current instance from working instances if it failed
-                    if self.base_url in self.working_instances:
-                        self.working_instances.remove(self.base_url)
-
-                    # Get a new working instance
-                    new_base_url = self.get_working_instance()
-                    if new_base_url:
-                        self.base_url = new_base_url
-                        logger.debug(f"Switching to alternate instance: {self.base_url}")
-                    else:
-                        # If no new instance is available, restore the original and break
-                        self.base_url = original_base_url
-                        break
-                else:
-                    # We've exhausted our retries
-                    break
-
-        # If all retries failed, try to return cached data
-        cached_data = cache.get(cache_key)
-        if cached_data:
-            logger.info("Using cached data after retries failed")
-            return cached_data
+                logger.warning(f"Fetching stats from {instance} failed: {last_error}")
+                self._record_health(instance, False, time.monotonic() - started)
 
         return self._get_error_stats("Failed to fetch stats - using fallback data")
 
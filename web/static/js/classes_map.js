@@ -67,82 +67,160 @@ document.addEventListener("DOMContentLoaded", function () {
     }
   }
 
-  // Extract session data from DOM elements
-  function extractSessionData() {
-    var sessionData = [];
-    var sessionElements = document.querySelectorAll(".session-item");
-
-    sessionElements.forEach(function (element) {
-      sessionData.push({
-        lat: parseFloat(element.getAttribute("data-lat")) || 0,
-        lng: parseFloat(element.getAttribute("data-lng")) || 0,
-        title: element.getAttribute("data-title") || "Unnamed Session",
-        date: element.getAttribute("data-date") || "No date specified",
-        location:
-          element.getAttribute("data-location") || "No location specified",
-        teacher: element.getAttribute("data-teacher") || "No teacher specified",
-        course_title:
-          element.getAttribute("data-course-title") || "No course specified",
-        start_time: element.getAttribute("data-start-time") || "TBD",
-        end_time: element.getAttribute("data-end-time") || "TBD",
-        url: element.getAttribute("data-enrollment-url") || "No url specified",
-      });
-    });
-
-    return sessionData;
+  // Load markers for the visible part of the map from the API. Below the
+  // cluster zoom the server sends counts per grid cell instead of sessions.
+  var mapElement = document.getElementById("map");
+  var markerLayer = L.layerGroup().addTo(map);
+  var markers = [];
+  var pendingLocate = null;
+  var loadTimer = null;
+  var loadController = null;
+
+  function escapeHtml(value) {
+    var div = document.createElement("div");
+    div.textContent = value == null ? "" : String(value);
+    return div.innerHTML;
   }
 
-  // Load session locations from extracted data
-  var markers = [];
-  var sessionData = extractSessionData();
-  console.log(sessionData);
-  // Check if we have session data
-  if (sessionData.length > 0) {
-    sessionData.forEach((session) => {
-      if (isNaN(session.lat) || isNaN(session.lng)) {
-        console.warn("Invalid coordinates for session:", session.title);
-        return;
-      }
+  function formatTime(value) {
+    var date = new Date(value);
+    return isNaN(date) ? "TBD" : date.toLocaleString();
+  }
 
-      var popupContent = `
+  function sessionPopup(session) {
+    return `
     <div>
-        <strong>${session.title}</strong><br />
-        ${session.location}<br />
-        <strong>Teacher:</strong> ${session.teacher || "N/A"}<br />
-        <strong>Course:</strong> ${session.course_title || "N/A"}<br />
-        <strong>Start:</strong> ${session.start_time}<br />
-        <strong>End:</strong> ${session.end_time}<br />
+        <strong>${escapeHtml(session.title)}</strong><br />
+        ${escapeHtml(session.location)}<br />
+        <strong>Teacher:</strong> ${escapeHtml(session.teacher || "N/A")}<br />
+        <strong>Course:</strong> ${escapeHtml(session.course_title || "N/A")}<br />
+        <strong>Start:</strong> ${formatTime(session.start_time)}<br />
+        <strong>End:</strong> ${formatTime(session.end_time)}<br />
 
         <div style="margin-top: 10px;">
             <!-- Get Directions Button -->
-            <a href="#" class="directions-btn" data-lat="${
-              session.lat
-            }" data-lng="${session.lng}">
+            <a href="#" class="directions-btn" data-lat="${session.lat}" data-lng="${session.lng}">
                 <button style="padding: 5px 10px; cursor: pointer;">Get Directions</button>
             </a>
 
             <!-- Enroll Button -->
-            <a href="${session.url}" target="_blank">
+            <a href="${escapeHtml(session.url)}" target="_blank">
                 <button style="padding: 5px 10px; cursor: pointer;">Enroll</button>
             </a>
         </div>
     </div>
 `;
+  }
 
-      var marker = L.marker([session.lat, session.lng], {
-        icon: defaultIcon,
-      })
-        .addTo(map)
-        .bindPopup(popupContent);
+  function clusterIcon(count) {
+    var size = count < 10 ? 32 : count < 100 ? 40 : 48;
+    return L.divIcon({
+      html: `<div style="width:${size}px;height:${size}px;line-height:${size}px;border-radius:50%;background:rgba(37,99,235,0.85);color:#fff;font-weight:600;text-align:center;">${count}</div>`,
+      className: "",
+      iconSize: [size, size],
+      iconAnchor: [size / 2, size / 2],
+    });
+  }
 
-      markers.push({
-        lat: session.lat,
-        lng: session.lng,
-        marker: marker,
-      });
+  function highlightLocated() {
+    if (!pendingLocate) return;
+    var selectedMarker = markers.find(
+      (marker) =>
+        marker.lat === pendingLocate.lat && marker.lng === pendingLocate.lng
+    );
+    if (selectedMarker) {
+      selectedMarker.marker.setIcon(highlightedIcon);
+      selectedMarker.marker.openPopup();
+      activeMarker = selectedMarker.marker;
+      pendingLocate = null;
+    }
+  }
+
+  var sessionList = document.getElementById("session-list");
+
+  function listMessage(text) {
+    return `<p class="text-gray-500 dark:text-gray-400">${escapeHtml(text)}</p>`;
+  }
+
+  function sessionItem(session) {
+    return `
+    <li class="p-4 bg-gray-100 dark:bg-gray-700 rounded-lg flex justify-between items-center shadow-md transition hover:bg-gray-200 dark:hover:bg-gray-600">
+      <div>
+        <strong class="text-gray-900 dark:text-white text-lg">${escapeHtml(session.title)}</strong>
+        <p class="text-gray-600 dark:text-gray-300 text-sm">
+          📍 ${escapeHtml(session.location)} | 🕒 ${formatTime(session.start_time)}
+        </p>
+      </div>
+      <button class="px-4 py-2 bg-green-600 text-white text-sm font-semibold rounded-lg hover:bg-green-700 transition locate-btn"
+              data-lat="${session.lat}"
+              data-lng="${session.lng}">📍 Locate</button>
+    </li>
+`;
+  }
+
+  // The list shows the sessions in view; at cluster zooms there are only counts
+  function renderSessionList(data) {
+    if (data.clustered) {
+      sessionList.innerHTML = listMessage("Zoom in to list the sessions in view.");
+    } else if (!data.sessions.length) {
+      sessionList.innerHTML = listMessage("No sessions available.");
+    } else {
+      sessionList.innerHTML = data.sessions.map(sessionItem).join("");
+    }
+  }
+
+  function renderMapData(data) {
+    renderSessionList(data);
+    markerLayer.clearLayers();
+    markers = [];
+    activeMarker = null;
+    data.clusters.forEach((cluster) => {
+      if (cluster.count === 1) {
+        L.marker([cluster.lat, cluster.lng], { icon: defaultIcon })
+          .on("click", () => map.setView([cluster.lat, cluster.lng], data.zoom + 3))
+          .addTo(markerLayer);
+        return;
+      }
+      L.marker([cluster.lat, cluster.lng], { icon: clusterIcon(cluster.count) })
+        .on("click", () => map.setView([cluster.lat, cluster.lng], data.zoom + 2))
+        .addTo(markerLayer);
     });
+    data.sessions.forEach((session) => {
+      var marker = L.marker([session.lat, session.lng], { icon: defaultIcon })
+        .addTo(markerLayer)
+        .bindPopup(sessionPopup(session));
+      markers.push({ lat: session.lat, lng: session.lng, marker: marker });
+    });
+    highlightLocated();
+  }
+
+  function loadMapData() {
+    var params = new URLSearchParams(
+      new FormData(document.getElementById("filter-form"))
+    );
+    params.set("bbox", map.getBounds().toBBoxString());
+    params.set("zoom", map.getZoom());
+    if (loadController) loadController.abort();
+    loadController = new AbortController();
+    fetch(`${mapElement.dataset.apiUrl}?${params}`, {
+      signal: loadController.signal,
+    })
+      .then((response) => {
+        if (!response.ok) throw new Error(`Map data request failed: ${response.status}`);
+        return response.json();
+      })
+      .then(renderMapData)
+      .catch((error) => {
+        if (error.name !== "AbortError") console.error(error);
+      });
   }
 
+  map.on("moveend", function () {
+    clearTimeout(loadTimer);
+    loadTimer = setTimeout(loadMapData, 250);
+  });
+  loadMapData();
+
   // Show 'No results' message if no sessions
   var hasSessionsElement = document.getElementById("session-data");
   var hasSessions =
@@ -189,32 +267,24 @@ document.addEventListener("DOMContentLoaded", function () {
   // Locate Button Click Event
   let activeMarker = null; // Store the currently highlighted marker
 
-  document.querySelectorAll(".locate-btn").forEach((button) => {
-    button.addEventListener("click", function () {
-      var lat = parseFloat(this.getAttribute("data-lat"));
-      var lng = parseFloat(this.getAttribute("data-lng"));
-
-      // Set map view to the new location
-      map.setView([lat, lng], 14);
+  // The list is replaced on every load, so clicks are handled on the list itself
+  sessionList.addEventListener("click", function (event) {
+    var button = event.target.closest(".locate-btn");
+    if (button) {
+      var lat = parseFloat(button.getAttribute("data-lat"));
+      var lng = parseFloat(button.getAttribute("data-lng"));
 
       // Reset the previous marker if any
       if (activeMarker) {
         activeMarker.setIcon(defaultIcon); // Reset to default icon
+        activeMarker = null;
       }
 
-      // Find the marker that matches this location
-      let selectedMarker = markers.find(
-        (marker) =>
-          marker.marker.getLatLng().lat === lat &&
-          marker.marker.getLatLng().lng === lng
-      );
-
-      if (selectedMarker) {
-        selectedMarker.marker.setIcon(highlightedIcon);
-        selectedMarker.marker.openPopup();
-        activeMarker = selectedMarker.marker;
-      }
-    });
+      // The marker is highlighted once the sessions around it have loaded
+      pendingLocate = { lat: lat, lng: lng };
+      map.setView([lat, lng], 14);
+      highlightLocated();
+    }
   });
 
   // Recenter Button
@@ -0,0 +1,55 @@
+/**
+ * Live unread counters and notifications over WebSocket.
+ *
+ * Elements with data-live-count="notifications|messages|invites" show the matching counter.
+ * Every event is also dispatched on document as a "live-notification" CustomEvent so pages
+ * can react to new messages or invites without polling.
+ */
+(function () {
+    const PING_INTERVAL = 30000;
+    const MAX_RETRY_DELAY = 60000;
+    let retryDelay = 1000;
+
+    function updateCounters(counts) {
+        document.querySelectorAll('[data-live-count]').forEach((badge) => {
+            const count = counts[badge.dataset.liveCount];
+            if (count === undefined) {
+                return;
+            }
+            badge.textContent = count > 99 ? '99+' : count;
+            badge.classList.toggle('hidden', count === 0);
+        });
+    }
+
+    function connect() {
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${scheme}://${window.location.host}/ws/notifications/`);
+        let pinger = null;
+
+        socket.addEventListener('open', () => {
+            retryDelay = 1000;
+            pinger = setInterval(() => socket.send(JSON.stringify({ type: 'ping' })), PING_INTERVAL);
+        });
+
+        socket.addEventListener('message', (message) => {
+            const event = JSON.parse(message.data);
+            if (event.counts) {
+                updateCounters(event.counts);
+            }
+            document.dispatchEvent(new CustomEvent('live-notification', { detail: event }));
+        });
+
+        socket.addEventListener('close', (event) => {
+            clearInterval(pinger);
+            // 4401: not signed in any more, so reconnecting would only be rejected again
+            if (event.code !== 4401) {
+                setTimeout(connect, retryDelay);
+                retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+            }
+        });
+    }
+
+    if ('WebSocket' in window) {
+        connect();
+    }
+})();
@@ -0,0 +1,55 @@
+/**
+ * Live presence for a waiting room.
+ *
+ * Connects to the room named by the first [data-waiting-room] element. Participants are counted
+ * as online while the page is open; the heartbeat keeps their presence entry from expiring.
+ * Elements with data-presence-count="participants|online" show the matching count.
+ */
+(function () {
+    const room = document.querySelector('[data-waiting-room]');
+    if (!room || !('WebSocket' in window)) {
+        return;
+    }
+    // Must stay below the server's presence timeout (three heartbeats)
+    const HEARTBEAT_INTERVAL = 20000;
+    const MAX_RETRY_DELAY = 60000;
+    let retryDelay = 1000;
+
+    function updateCounts(state) {
+        document.querySelectorAll('[data-presence-count]').forEach((element) => {
+            const count = state[element.dataset.presenceCount];
+            if (count !== undefined) {
+                element.textContent = count;
+            }
+        });
+    }
+
+    function connect() {
+        const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+        const socket = new WebSocket(`${scheme}://${window.location.host}/ws/waiting-room/${room.dataset.waitingRoom}/`);
+        let heartbeat = null;
+
+        socket.addEventListener('open', () => {
+            retryDelay = 1000;
+            heartbeat = setInterval(() => socket.send(JSON.stringify({ type: 'ping' })), HEARTBEAT_INTERVAL);
+        });
+
+        socket.addEventListener('message', (message) => {
+            const event = JSON.parse(message.data);
+            if (event.type === 'presence') {
+                updateCounts(event);
+            }
+        });
+
+        socket.addEventListener('close', (event) => {
+            clearInterval(heartbeat);
+            // 4401/4403: signed out, left the room or the room closed; retrying would be rejected again
+            if (event.code !== 4401 && event.code !== 4403) {
+                setTimeout(connect, retryDelay);
+                retryDelay = Math.min(retryDelay * 2, MAX_RETRY_DELAY);
+            }
+        });
+    }
+
+    connect();
+})();
@@ -0,0 +1,46 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html, format_html_join
+
+from web.services.image_derivatives import ready_derivatives
+
+register = template.Library()
+
+
+def _srcset(derivatives):
+    return ", ".join(f"{default_storage.url(path)} {width}w" for width, path in derivatives)
+
+
+@register.simple_tag
+def responsive_image(image, sizes="100vw", **attrs):
+    """
+    Render an image field as a ``<picture>`` with WebP and JPEG ``srcset``s.
+
+    Falls back to a plain ``<img>`` of the original until its derivatives are ready. Extra
+    keyword arguments (``alt``, ``class``, ``width``...) become attributes of the ``<img>``.
+
+    Usage: {% responsive_image course.image sizes="300px" alt=course.title class="w-full" %}
+    """
+    if not image:
+        return ""
+    attrs.setdefault("loading", "lazy")
+    attrs.setdefault("decoding", "async")
+    img_attrs = format_html_join(" ", '{}="{}"', attrs.items())
+
+    derivatives = ready_derivatives(image.name)
+    if not derivatives:
+        return format_html('<img src="{}" {} />', image.url, img_attrs)
+
+    jpeg = derivatives["jpeg"]
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}" />'
+        '<img src="{}" srcset="{}" sizes="{}" {} />'
+        "</picture>",
+        _srcset(derivatives["webp"]),
+        sizes,
+        default_storage.url(jpeg[-1][1]),
+        _srcset(jpeg),
+        sizes,
+        img_attrs,
+    )
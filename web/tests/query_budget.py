@@ -0,0 +1,34 @@
+from contextlib import ContextDecorator
+
+from web.services.query_audit import REPEAT_THRESHOLD, record_queries
+
+
+class query_budget(ContextDecorator):
+    """
+    Fail when the wrapped block or test runs more than ``max_queries`` queries, or repeats a query shape.
+
+    Unlike ``assertNumQueries`` the failure lists the queries by call site and the stack of any
+    likely N+1. Seed a few rows of whatever the view lists so an N+1 crosses ``repeat_threshold``.
+    """
+
+    def __init__(self, max_queries, repeat_threshold=REPEAT_THRESHOLD):
+        self.max_queries = max_queries
+        self.repeat_threshold = repeat_threshold
+
+    def __enter__(self):
+        self.recording = record_queries()
+        self.log = self.recording.__enter__()
+        return self.log
+
+    def __exit__(self, exc_type, exc, tb):
+        self.recording.__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+        if len(self.log) > self.max_queries:
+            raise AssertionError(
+                f"{len(self.log)} queries exceed the budget of {self.max_queries}\n"
+                f"{self.log.report(self.repeat_threshold)}"
+            )
+        if self.log.repeated(self.repeat_threshold):
+            raise AssertionError(f"Repeated queries, likely an N+1\n{self.log.report(self.repeat_threshold)}")
+        return False
@@ -0,0 +1,77 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from web.models import Course, Enrollment, Subject, WebRequest
+from web.services import http_client
+
+
+def slow_sendgrid(request):
+    time.sleep(0.3)
+    return http_client.mock_response(200, json_data={"type": "free"})
+
+
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="student", email="student@example.com", password="pass")
+
+    def test_middleware_stack_stays_async(self):
+        # A single sync-only middleware would put every async view back on a thread
+        for path in settings.MIDDLEWARE:
+            self.assertTrue(getattr(import_string(path), "async_capable", False), path)
+
+    async def test_slow_upstream_calls_overlap(self):
+        with patch.dict("os.environ", {"SENDGRID_PASSWORD": "key"}), http_client.mock_transport(slow_sendgrid):
+            started = time.monotonic()
+            responses = await asyncio.gather(*(self.async_client.get(reverse("system_status")) for _ in range(5)))
+            elapsed = time.monotonic() - started
+
+        self.assertEqual([response.status_code for response in responses], [200] * 5)
+        self.assertEqual(responses[0].context["status"]["sendgrid"]["status"], "ok")
+        self.assertLess(elapsed, 1.2)
+        # The tracking middleware still records requests made through the async stack
+        self.assertEqual((await WebRequest.objects.aget(path=reverse("system_status"))).count, 5)
+
+    async def test_fetch_video_title_blocks_private_addresses(self):
+        response = await self.async_client.get(reverse("fetch_video_title"), {"url": "http://10.0.0.8/video"})
+        self.assertEqual(response.status_code, 403)
+
+    async def test_fetch_video_title_keeps_no_state_for_user_hosts(self):
+        page = http_client.mock_response(200, text="<html><title>Lecture 1</title></html>")
+        with http_client.mock_transport(lambda request: page) as transport:
+            response = await self.async_client.get(
+                reverse("fetch_video_title"), {"url": "https://videos.example.com/lecture-1"}
+            )
+            self.assertEqual(response.json(), {"title": "Lecture 1"})
+            self.assertEqual(len(transport.calls), 1)
+            self.assertNotIn("videos.example.com", http_client.metrics())
+
+    @patch("web.views.stripe")
+    async def test_payment_intent_under_async_client(self, stripe):
+        stripe.PaymentIntent.create.return_value.client_secret = "secret"
+        subject = await Subject.objects.acreate(name="Music", slug="music")
+        teacher = await User.objects.acreate(username="teacher")
+        course = await Course.objects.acreate(
+            title="Piano",
+            description="Description",
+            teacher=teacher,
+            learning_objectives="Objectives",
+            price=25,
+            max_students=10,
+            subject=subject,
+        )
+        await Enrollment.objects.acreate(student=self.user, course=course, status="pending")
+        await self.async_client.aforce_login(self.user)
+
+        response = await self.async_client.get(reverse("create_payment_intent", args=[course.slug]))
+
+        self.assertEqual(response.json(), {"clientSecret": "secret"})
+        self.assertEqual(stripe.PaymentIntent.create.call_args.kwargs["amount"], 2500)
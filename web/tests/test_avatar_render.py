@@ -0,0 +1,63 @@
+import json
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from web.models import Avatar
+from web.services import avatar_render
+from web.services.avatar_render import clear_local_cache, minify_svg, render_avatar_svg, render_key
+
+
+class AvatarRenderCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        clear_local_cache()
+        self.renders = patch.object(avatar_render, "_render", wraps=avatar_render._render)
+        self.render_calls = self.renders.start()
+        self.addCleanup(self.renders.stop)
+
+    def test_equivalent_attributes_share_one_render(self):
+        svg, key = render_avatar_svg({"top": "LONG_HAIR_BOB", "hair_color": "#AA0000"})
+        again, same_key = render_avatar_svg({"top": "long_hair_bob", "hair_color": "#aa0000", "eyes": "no-such-eyes"})
+
+        self.assertEqual((again, same_key), (svg, key))
+        self.assertEqual(self.render_calls.call_count, 1)
+        self.assertNotEqual(render_key({"top": "short_curly"}), key)
+
+        # Another process finds the render in the shared cache
+        clear_local_cache()
+        render_avatar_svg({"top": "long_hair_bob", "hair_color": "#aa0000"})
+        self.assertEqual(self.render_calls.call_count, 1)
+
+    def test_minify_keeps_markup(self):
+        svg = '<svg>\n  <!-- a comment -->\n  <g id="a">\n    <path d="M0 0\n      L1 1"/>\n  </g>\n</svg>'
+        self.assertEqual(minify_svg(svg), '<svg><g id="a"><path d="M0 0 L1 1"/></g></svg>')
+
+    def test_unchanged_avatar_skips_render_on_save(self):
+        avatar = Avatar.objects.create(top="short_curly")
+        self.assertEqual(self.render_calls.call_count, 1)
+        self.assertNotIn("\n", avatar.svg)
+
+        avatar.refresh_from_db()
+        avatar.save()
+        self.assertEqual(self.render_calls.call_count, 1)
+
+        avatar.mouth = "smile"
+        avatar.save()
+        self.assertEqual(self.render_calls.call_count, 2)
+        self.assertEqual(avatar.svg_key, render_key({"top": "short_curly", "mouth": "smile"}))
+
+    def test_preview_uses_render_cache(self):
+        user = User.objects.create_user(username="artist", password="pass")
+        self.client.force_login(user)
+        body = json.dumps({"top": "short_curly", "clothing": "blazer_shirt"})
+
+        first = self.client.post(reverse("preview_avatar"), body, content_type="application/json")
+        second = self.client.post(reverse("preview_avatar"), body, content_type="application/json")
+
+        self.assertTrue(first.json()["success"])
+        self.assertEqual(first.json()["avatar_svg"], second.json()["avatar_svg"])
+        self.assertEqual(self.render_calls.call_count, 1)
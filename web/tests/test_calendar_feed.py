@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from web.calendar_sync import generate_ical_feed
+from web.models import Course, Enrollment, Session, Subject
+from web.services.calendar_feed import feed_token
+
+
+class CalendarFeedTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        self.teacher.profile.is_teacher = True
+        self.teacher.profile.save()
+        self.student = User.objects.create_user(username="student", email="student@example.com", password="pass")
+        subject = Subject.objects.create(name="Chemistry", slug="chemistry")
+        self.course = Course.objects.create(
+            title="Organic Chemistry",
+            slug="organic-chemistry",
+            teacher=self.teacher,
+            description="Carbon",
+            learning_objectives="Bonds",
+            price=0,
+            subject=subject,
+            max_students=10,
+            status="published",
+        )
+        start = timezone.now() + timedelta(days=1)
+        self.sessions = [
+            Session.objects.create(
+                course=self.course,
+                title=f"Lecture {i}",
+                description="Lecture",
+                start_time=start + timedelta(days=i),
+                end_time=start + timedelta(days=i, hours=1),
+            )
+            for i in range(3)
+        ]
+        Enrollment.objects.create(student=self.student, course=self.course, status="approved")
+        self.url = reverse("calendar_feed_by_token", args=[feed_token(self.student.profile)])
+
+    def test_feed_is_served_by_token_and_revalidated_with_etag(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Organic Chemistry - Lecture 2")
+        etag = response["ETag"]
+
+        # An unchanged schedule is answered from the cache without loading any sessions
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertFalse([q for q in queries.captured_queries if "web_session" in q["sql"]])
+
+        self.sessions[0].title = "Moved lecture"
+        self.sessions[0].save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertContains(response, "Moved lecture")
+
+        Enrollment.objects.filter(student=self.student).delete()
+        self.assertNotContains(self.client.get(self.url), "Lecture")
+
+    def test_unknown_or_reset_tokens_are_rejected(self):
+        self.assertEqual(self.client.get(reverse("calendar_feed_by_token", args=["nope"])).status_code, 404)
+
+        self.client.force_login(self.student)
+        self.client.post(reverse("reset_calendar_feed"), {"next": "https://evil.example.com/"})
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_regeneration_loads_sessions_in_one_query(self):
+        user = User.objects.get(pk=self.teacher.pk)
+        # One query for the profile, one for the sessions with their course and teacher
+        with self.assertNumQueries(2):
+            feed = generate_ical_feed(user)
+        self.assertEqual(feed.count(b"BEGIN:VEVENT"), 3)
@@ -0,0 +1,175 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from web.calendar_sync import process_calendar_outbox
+from web.models import CalendarSyncOperation, Course, Session, Subject
+
+
+class FakeRequest:
+    def __init__(self, method, kwargs, response):
+        self.method = method
+        self.kwargs = kwargs
+        self.response = response
+
+
+class FakeBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batches.append([request for _, request in self.requests])
+        for request_id, request in self.requests:
+            self.callback(request_id, request.response, None)
+
+
+class FakeCalendarService:
+    """Records the calls the outbox worker makes instead of talking to Google."""
+
+    def __init__(self):
+        self.batches = []
+        self.created = 0
+
+    def events(self):
+        return self
+
+    def insert(self, **kwargs):
+        self.created += 1
+        return FakeRequest("insert", kwargs, {"id": f"event-{self.created}"})
+
+    def update(self, **kwargs):
+        return FakeRequest("update", kwargs, {"id": kwargs["eventId"]})
+
+    def delete(self, **kwargs):
+        return FakeRequest("delete", kwargs, "")
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+
+class CalendarOutboxTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="testpass123")
+        subject = Subject.objects.create(name="Maths", slug="maths")
+        self.course = Course.objects.create(
+            title="Course",
+            description="Description",
+            teacher=teacher,
+            learning_objectives="Objectives",
+            price=10,
+            max_students=10,
+            subject=subject,
+            level="beginner",
+            status="published",
+        )
+
+    def create_session(self, **kwargs):
+        start = timezone.now() + timedelta(days=1)
+        return Session.objects.create(
+            course=self.course,
+            title="Session",
+            description="Live class",
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            **kwargs,
+        )
+
+    def test_save_queues_change_without_calling_google(self):
+        with patch("web.calendar_sync.google_calendar_api", side_effect=AssertionError("synced inline")):
+            with self.captureOnCommitCallbacks() as callbacks:
+                session = self.create_session()
+
+        op = CalendarSyncOperation.objects.get()
+        self.assertEqual((op.session_id, op.action), (session.pk, "upsert"))
+        self.assertEqual(len(callbacks), 1)
+
+        # Saving without touching calendar fields queues nothing and does not reload the session
+        loaded = Session.objects.get(pk=session.pk)
+        with CaptureQueriesContext(connection) as queries:
+            loaded.save()
+        self.assertFalse([q for q in queries if q["sql"].startswith("SELECT") and "web_session" in q["sql"]])
+        self.assertEqual(CalendarSyncOperation.objects.count(), 1)
+
+    def test_in_person_sessions_are_not_queued(self):
+        self.create_session(is_virtual=False)
+        self.assertFalse(CalendarSyncOperation.objects.exists())
+
+    def test_worker_coalesces_edits_into_one_batch(self):
+        first = self.create_session()
+        second = self.create_session()
+        for title in ["Renamed", "Renamed again"]:
+            first.title = title
+            first.save()
+        self.assertEqual(CalendarSyncOperation.objects.count(), 4)
+
+        service = FakeCalendarService()
+        self.assertEqual(process_calendar_outbox(service=service), 2)
+
+        self.assertEqual(len(service.batches), 1)
+        inserts = {request.kwargs["body"]["summary"] for request in service.batches[0]}
+        self.assertEqual(inserts, {"Course - Renamed again", "Course - Session"})
+        self.assertFalse(CalendarSyncOperation.objects.filter(processed_at__isnull=True).exists())
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual({first.meeting_id, second.meeting_id}, {"event-1", "event-2"})
+
+        # The next edit updates the existing event
+        first.start_time += timedelta(hours=2)
+        first.save()
+        process_calendar_outbox(service=service)
+        request = service.batches[1][0]
+        self.assertEqual((request.method, request.kwargs["eventId"]), ("update", first.meeting_id))
+
+    def test_entries_wait_while_google_is_not_configured(self):
+        self.create_session()
+        with patch("web.calendar_sync.google_calendar_api", return_value=None):
+            self.assertEqual(process_calendar_outbox(), 0)
+        op = CalendarSyncOperation.objects.get()
+        self.assertEqual((op.processed_at, op.claimed_at), (None, None))
+
+        self.assertEqual(process_calendar_outbox(service=FakeCalendarService()), 1)
+
+    def test_claimed_entries_are_not_sent_twice(self):
+        session = self.create_session()
+        # Another run claimed the session's entry and is still sending it
+        CalendarSyncOperation.objects.update(claimed_by="other", claimed_at=timezone.now())
+        session.title = "Renamed"
+        session.save()
+
+        service = FakeCalendarService()
+        self.assertEqual(process_calendar_outbox(service=service), 0)
+        self.assertEqual(service.batches, [])
+
+        # A claim left behind by a worker that died is picked up again
+        CalendarSyncOperation.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(process_calendar_outbox(service=service), 1)
+        self.assertEqual(len(service.batches[0]), 1)
+        self.assertFalse(CalendarSyncOperation.objects.filter(processed_at__isnull=True).exists())
+
+    def test_delete_queues_event_removal(self):
+        session = self.create_session()
+        process_calendar_outbox(service=FakeCalendarService())
+        session.refresh_from_db()
+        meeting_id = session.meeting_id
+
+        session.delete()
+        op = CalendarSyncOperation.objects.get(processed_at__isnull=True)
+        self.assertEqual((op.action, op.meeting_id), ("delete", meeting_id))
+
+        service = FakeCalendarService()
+        self.assertEqual(process_calendar_outbox(service=service), 1)
+        request = service.batches[0][0]
+        self.assertEqual((request.method, request.kwargs["eventId"]), ("delete", meeting_id))
@@ -0,0 +1,137 @@
+import re
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import Course, Session, Subject
+from web.services.class_map import MAX_TILES, tiles_for
+
+
+class ClassMapTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        subject = Subject.objects.create(name="Music", slug="music")
+        self.course = Course.objects.create(
+            title="Guitar",
+            slug="guitar",
+            teacher=self.teacher,
+            description="Chords",
+            learning_objectives="Strumming",
+            price=20,
+            subject=subject,
+            max_students=10,
+            level="beginner",
+            status="published",
+        )
+        # Three sessions in Paris, one in Berlin and one in New York
+        self.paris = [self.add_session("Paris", "48.8566", f"2.35{i}") for i in range(3)]
+        self.berlin = self.add_session("Berlin", "52.5200", "13.4050")
+        self.new_york = self.add_session("New York", "40.7128", "-74.0060")
+        self.client.force_login(self.teacher)
+
+    def add_session(self, location, lat, lng):
+        start = timezone.now() + timedelta(days=2)
+        session = Session.objects.create(
+            course=self.course,
+            title=location,
+            description="Lesson",
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            location=location,
+            is_virtual=False,
+        )
+        Session.objects.filter(pk=session.pk).update(latitude=Decimal(lat), longitude=Decimal(lng))
+        session.refresh_from_db()
+        return session
+
+    def get_map(self, **params):
+        return self.client.get(reverse("map_data_api"), params)
+
+    def session_queries(self, queries):
+        # Matches the table however the backend quotes it, but not web_session_* tables
+        return [q for q in queries.captured_queries if re.search(r"\bweb_session\b", q["sql"])]
+
+    def test_low_zoom_returns_clusters_for_the_viewport(self):
+        data = self.get_map(bbox="-20,30,30,60", zoom=4).json()
+        self.assertTrue(data["clustered"])
+        self.assertEqual(data["sessions"], [])
+        counts = sorted(cluster["count"] for cluster in data["clusters"])
+        self.assertEqual(counts, [1, 3])
+        paris = max(data["clusters"], key=lambda cluster: cluster["count"])
+        self.assertAlmostEqual(paris["lat"], 48.8566)
+
+    def test_high_zoom_returns_sessions_inside_the_bbox(self):
+        data = self.get_map(bbox="2.0,48.5,2.7,49.0", zoom=13).json()
+        self.assertFalse(data["clustered"])
+        self.assertEqual({s["id"] for s in data["sessions"]}, {s.id for s in self.paris})
+        self.assertEqual(data["sessions"][0]["teacher"], "teacher")
+
+    def test_tiles_are_cached_until_sessions_change(self):
+        params = {"bbox": "-80,30,20,60", "zoom": 5}
+        self.get_map(**params)
+        with CaptureQueriesContext(connection) as queries:
+            self.get_map(**params)
+        self.assertEqual(self.session_queries(queries), [])
+
+        # Panning only loads the tiles that came into view, with one range query
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_map(bbox="-80,30,40,60", zoom=5).json()
+        self.assertEqual(len(self.session_queries(queries)), 1)
+        self.assertEqual(sum(cluster["count"] for cluster in data["clusters"]), 5)
+
+        self.berlin.delete()
+        data = self.get_map(**params).json()
+        self.assertEqual(sum(cluster["count"] for cluster in data["clusters"]), 4)
+
+    def test_large_viewports_use_coarser_tiles(self):
+        tile_zoom, tiles = tiles_for((-180.0, -90.0, 180.0, 90.0), 10)
+        self.assertLessEqual(len(tiles), MAX_TILES)
+        self.assertLess(tile_zoom, 10)
+
+        data = self.get_map(zoom=3).json()
+        self.assertEqual(sum(cluster["count"] for cluster in data["clusters"]), 5)
+
+    def test_filters_and_invalid_viewports(self):
+        other = Course.objects.create(
+            title="Piano",
+            slug="piano",
+            teacher=self.teacher,
+            description="Keys",
+            learning_objectives="Scales",
+            price=20,
+            subject=self.course.subject,
+            max_students=10,
+            level="advanced",
+            status="published",
+        )
+        self.new_york.course = other
+        self.new_york.save()
+
+        data = self.get_map(bbox="-80,30,20,60", zoom=14, age_group="advanced").json()
+        self.assertEqual([s["id"] for s in data["sessions"]], [self.new_york.id])
+        data = self.get_map(bbox="-80,30,20,60", zoom=14, course=self.course.id).json()
+        self.assertEqual(len(data["sessions"]), 4)
+
+        self.assertEqual(self.get_map(bbox="1,2,3").status_code, 400)
+        self.assertEqual(self.get_map(bbox="10,0,5,1").status_code, 400)
+        self.assertEqual(self.get_map(zoom="near").status_code, 400)
+        self.assertEqual(self.get_map(course="guitar").status_code, 400)
+
+    def test_page_only_checks_whether_any_session_exists(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("classes_map"))
+        self.assertTrue(response.context["has_sessions"])
+        # The session rows come from the map API; the page itself never loads them
+        self.assertNotIn("sessions", response.context)
+        self.assertFalse([q for q in self.session_queries(queries) if "location" in q["sql"].split("FROM")[0]])
+
+        response = self.client.get(reverse("classes_map"), {"age_group": "advanced"})
+        self.assertContains(response, 'data-has-sessions="false"')
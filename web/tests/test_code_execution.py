@@ -0,0 +1,83 @@
+import asyncio
+import json
+import threading
+import time
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from web.services import code_execution
+from web.services.code_execution import fake_executor, run_code
+
+
+def echo(language, code, stdin):
+    return {"stdout": f"{language}:{code}:{stdin}", "stderr": ""}
+
+
+class CodeExecutionGatewayTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("virtual_lab:evaluate_code")
+
+    async def evaluate(self, code, stdin=""):
+        body = json.dumps({"code": code, "language": "python", "stdin": stdin})
+        return await self.async_client.post(self.url, body, content_type="application/json")
+
+    async def test_identical_runs_are_served_from_cache(self):
+        with fake_executor(echo) as executor:
+            first = await self.evaluate("print(1)")
+            second = await self.evaluate("print(1)")
+            other_input = await self.evaluate("print(1)", stdin="x")
+
+        self.assertEqual(first.json(), {"stdout": "python:print(1):", "stderr": "", "cached": False})
+        self.assertTrue(second.json()["cached"])
+        self.assertFalse(other_input.json()["cached"])
+        self.assertEqual(len(executor.calls), 2)
+
+        # A new runtime version is a different cache entry
+        with fake_executor(echo, version="9.9.9") as executor:
+            await self.evaluate("print(1)")
+        self.assertEqual(len(executor.calls), 1)
+
+    async def test_rate_limit_applies_per_client_but_not_to_cached_runs(self):
+        with patch.object(code_execution, "RATE_LIMIT", 2), fake_executor(echo):
+            responses = [await self.evaluate(f"print({n})") for n in range(3)]
+            cached = await self.evaluate("print(0)")
+
+        self.assertEqual([r.status_code for r in responses], [200, 200, 429])
+        self.assertEqual(cached.status_code, 200)
+
+    async def test_full_queue_is_rejected(self):
+        with patch.object(code_execution, "MAX_QUEUED", 0), fake_executor(echo) as executor:
+            response = await self.evaluate("print(1)")
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(executor.calls, [])
+
+    async def test_in_flight_runs_are_bounded_and_waiters_see_their_position(self):
+        lock = threading.Lock()
+        state = {"running": 0, "peak": 0}
+
+        def slow(language, code, stdin):
+            with lock:
+                state["running"] += 1
+                state["peak"] = max(state["peak"], state["running"])
+            time.sleep(0.1)
+            with lock:
+                state["running"] -= 1
+            return echo(language, code, stdin)
+
+        async def collect(n):
+            return [event async for event in run_code("python", f"print({n})", "", f"user:{n}")]
+
+        with patch.object(code_execution, "MAX_IN_FLIGHT", 2), patch.object(code_execution, "POLL_INTERVAL", 0.01):
+            with fake_executor(slow) as executor:
+                runs = await asyncio.gather(*(collect(n) for n in range(6)))
+
+        self.assertEqual(len(executor.calls), 6)
+        self.assertEqual(state["peak"], 2)
+        self.assertTrue(all("stdout" in events[-1] for events in runs))
+        positions = [event["queue_position"] for events in runs for event in events if "queue_position" in event]
+        self.assertIn(4, positions)
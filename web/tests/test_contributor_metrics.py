@@ -0,0 +1,114 @@
+import json
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import ContributorMetrics, GitHubPullRequest
+from web.services import http_client
+from web.services.contributor_metrics import (
+    SEARCH_QUALIFIERS,
+    collect_contributor_metrics,
+    refresh_contributor_metrics,
+)
+
+
+def github_handler(request):
+    if request.url.endswith("/users/octocat"):
+        return http_client.mock_response(200, json_data={"login": "octocat", "name": "Octo Cat", "followers": 7})
+    if "/search/issues" in request.url:
+        items = [{"created_at": "2024-01-02T03:04:05Z"}] if "sort=created" in request.url else []
+        return http_client.mock_response(200, json_data={"total_count": 3, "items": items})
+    if request.url.endswith("/graphql"):
+        body = json.loads(request.body)
+        merged = {
+            "pageInfo": {"hasNextPage": body["variables"]["after"] is None, "endCursor": "page2"},
+            "nodes": [{"additions": 10, "deletions": 4}],
+        }
+        if "oldest" not in body["query"]:
+            return http_client.mock_response(200, json_data={"data": {"merged": merged}})
+        data = {field: {"issueCount": 2} for field in SEARCH_QUALIFIERS}
+        data["oldest"] = {"nodes": [{"createdAt": "2023-05-06T07:08:09Z"}]}
+        data["merged"] = merged
+        return http_client.mock_response(200, json_data={"data": data})
+    return http_client.mock_response(404)
+
+
+class ContributorMetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse("contributor_detail", args=["octocat"])
+        now = timezone.now()
+        GitHubPullRequest.objects.create(
+            repo="alphaonelabs/education-website",
+            number=1,
+            state="open",
+            author_login="Octocat",
+            created_at=now,
+            updated_at=now,
+        )
+
+    def test_unknown_names_are_not_fetched_or_stored(self):
+        with http_client.mock_transport(github_handler) as transport:
+            response = self.client.get(reverse("contributor_detail", args=["not-a-contributor"]))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(transport.calls, [])
+        self.assertFalse(ContributorMetrics.objects.exists())
+
+    @override_settings(GITHUB_TOKEN="")
+    def test_first_visit_fetches_concurrently_and_stores_metrics(self):
+        with http_client.mock_transport(github_handler) as transport:
+            response = self.client.get(self.url)
+            self.assertEqual(len(transport.calls), len(SEARCH_QUALIFIERS) + 2)
+
+            # Later renders read the stored row without calling GitHub
+            self.client.get(self.url)
+            self.assertEqual(len(transport.calls), len(SEARCH_QUALIFIERS) + 2)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["prs_created"], 3)
+        self.assertEqual(response.context["user"]["name"], "Octo Cat")
+        metrics = ContributorMetrics.objects.get(username="octocat")
+        self.assertEqual(metrics.first_contribution_at.year, 2024)
+        self.assertIsNotNone(metrics.refreshed_at)
+
+    def test_token_folds_counts_into_one_graphql_query(self):
+        with http_client.mock_transport(github_handler) as transport:
+            fields, complete = collect_contributor_metrics("octocat", token="secret")
+
+        self.assertTrue(complete)
+        # Profile, the combined GraphQL query, and one extra page of merged PRs
+        self.assertEqual(len(transport.calls), 3)
+        self.assertEqual(fields["pr_reviews"], 2)
+        self.assertEqual((fields["lines_added"], fields["lines_deleted"]), (20, 8))
+        self.assertEqual(fields["first_contribution_at"].year, 2023)
+
+    @override_settings(GITHUB_TOKEN="")
+    def test_failed_refresh_keeps_previous_values(self):
+        refreshed_at = timezone.now() - timedelta(days=1)
+        ContributorMetrics.objects.create(username="octocat", prs_created=9, refreshed_at=refreshed_at)
+
+        with http_client.mock_transport(lambda request: http_client.mock_response(404)):
+            metrics = refresh_contributor_metrics("octocat")
+
+        metrics.refresh_from_db()
+        self.assertEqual(metrics.prs_created, 9)
+        # Left stale so the next page view tries again
+        self.assertEqual(metrics.refreshed_at, refreshed_at)
+
+    def test_stale_metrics_render_and_refresh_in_background(self):
+        ContributorMetrics.objects.create(
+            username="octocat", prs_merged=5, refreshed_at=timezone.now() - timedelta(days=1)
+        )
+
+        with patch("web.services.contributor_metrics.schedule_refresh") as schedule:
+            with http_client.mock_transport(github_handler) as transport:
+                response = self.client.get(self.url)
+
+        self.assertEqual(response.context["prs_merged"], 5)
+        self.assertEqual(transport.calls, [])
+        schedule.assert_called_once_with("octocat")
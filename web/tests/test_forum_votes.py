@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from web.models import ForumCategory, ForumReply, ForumTopic, ForumVote
+
+
+class ForumVoteTallyTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="testpass123")
+        self.voter = User.objects.create_user(username="voter", email="voter@example.com", password="testpass123")
+        self.category = ForumCategory.objects.create(
+            name="General", slug="general", description="Talk", icon="fa-comments"
+        )
+        self.topic = ForumTopic.objects.create(
+            category=self.category, author=self.author, title="Hello", content="First post"
+        )
+        self.client.login(username="voter", password="testpass123")
+
+    def test_topic_vote_updates_tallies(self):
+        url = reverse("topic_vote", args=[self.topic.id])
+
+        response = self.client.post(url, {"vote_type": "up"}, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json(), {"user_vote": "up", "vote_score": 1})
+
+        response = self.client.post(url, {"vote_type": "down"}, HTTP_ACCEPT="application/json")
+        self.assertEqual(response.json(), {"user_vote": "down", "vote_score": -1})
+        self.topic.refresh_from_db()
+        self.assertEqual((self.topic.upvotes, self.topic.downvotes), (0, 1))
+
+        # Voting the same way again removes the vote
+        self.client.post(url, {"vote_type": "down"})
+        self.topic.refresh_from_db()
+        self.assertEqual((self.topic.upvotes, self.topic.downvotes), (0, 0))
+        self.assertFalse(ForumVote.objects.exists())
+
+    def test_reply_vote_updates_tallies(self):
+        reply = ForumReply.objects.create(topic=self.topic, author=self.author, content="Hi")
+
+        response = self.client.post(reverse("reply_vote", args=[reply.id]), {"vote_type": "up"})
+
+        self.assertRedirects(response, reverse("forum_topic", args=[self.category.slug, self.topic.id]))
+        reply.refresh_from_db()
+        self.assertEqual(reply.vote_score(), 1)
+
+    def test_replies_maintain_topic_activity(self):
+        first = ForumReply.objects.create(topic=self.topic, author=self.author, content="One")
+        second = ForumReply.objects.create(topic=self.topic, author=self.voter, content="Two")
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.reply_count, 2)
+        self.assertEqual(self.topic.last_reply, second)
+
+        second.delete()
+        self.topic.refresh_from_db()
+        self.assertEqual(self.topic.reply_count, 1)
+        self.assertEqual(self.topic.last_reply, first)
+        self.assertEqual(self.topic.last_activity_at, first.created_at)
+
+    def test_thread_votes_are_loaded_in_one_query(self):
+        replies = [ForumReply.objects.create(topic=self.topic, author=self.author, content=str(i)) for i in range(5)]
+        for reply in replies[:3]:
+            self.client.post(reverse("reply_vote", args=[reply.id]), {"vote_type": "up"})
+        url = reverse("forum_topic", args=[self.category.slug, self.topic.id])
+
+        response = self.client.get(url)
+        self.assertEqual(response.context["user_reply_votes"], {reply.id: "up" for reply in replies[:3]})
+
+        # Adding replies must not add per-reply vote queries
+        with CaptureQueriesContext(connection) as before:
+            self.client.get(url)
+        ForumReply.objects.create(topic=self.topic, author=self.author, content="more")
+        with CaptureQueriesContext(connection) as after:
+            self.client.get(url)
+        self.assertEqual(len(before.captured_queries), len(after.captured_queries))
+
+    def test_category_listing_uses_maintained_columns(self):
+        for i in range(3):
+            topic = ForumTopic.objects.create(category=self.category, author=self.author, title=f"T{i}", content="x")
+            ForumReply.objects.create(topic=topic, author=self.voter, content="reply")
+        url = reverse("forum_category", args=[self.category.slug])
+        self.client.get(url)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        for i in range(3):
+            topic = ForumTopic.objects.create(category=self.category, author=self.author, title=f"U{i}", content="x")
+            ForumReply.objects.create(topic=topic, author=self.voter, content="reply")
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(url)
+
+        self.assertContains(response, "1 replies")
+        self.assertEqual(len(small.captured_queries), len(large.captured_queries))
@@ -0,0 +1,152 @@
+from datetime import timedelta
+from decimal import Decimal
+from unittest.mock import patch
+
+import requests
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import Course, GeocodeCache, Session, Subject
+from web.services import http_client
+from web.services.geocoding import (
+    FAILED_COOL_OFF,
+    MAX_ATTEMPTS,
+    REQUEST_SLOT_KEY,
+    RETRY_BACKOFF,
+    address_digest,
+    enqueue_addresses,
+    lookup_address,
+    process_geocode_queue,
+)
+
+
+class GeocodingQueueTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="testpass123")
+        subject = Subject.objects.create(name="Maths", slug="maths")
+        self.course = Course.objects.create(
+            title="Course",
+            description="Description",
+            teacher=teacher,
+            learning_objectives="Objectives",
+            price=10,
+            max_students=10,
+            subject=subject,
+            level="beginner",
+            status="published",
+        )
+
+    def create_session(self, location):
+        start = timezone.now() + timedelta(days=1)
+        return Session.objects.create(
+            course=self.course,
+            title="Session",
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+            location=location,
+            is_virtual=False,
+        )
+
+    def test_digest_is_stable_across_formatting(self):
+        self.assertEqual(address_digest("  10 Downing St,  London "), address_digest("10 downing st, london"))
+        self.assertEqual(len(address_digest("London")), 64)
+
+    def test_session_save_queues_instead_of_geocoding(self):
+        with http_client.mock_transport(lambda request: self.fail("geocoded inline")):
+            with self.captureOnCommitCallbacks() as callbacks:
+                session = self.create_session("10 Downing St, London")
+
+        self.assertIsNone(session.latitude)
+        self.assertEqual(GeocodeCache.objects.get().status, "pending")
+        self.assertEqual(len(callbacks), 1)
+
+        # A second session at the same place does not queue the address again
+        self.create_session("10 downing st,  london")
+        self.assertEqual(GeocodeCache.objects.count(), 1)
+
+    def test_worker_resolves_queue_and_fills_sessions(self):
+        first = self.create_session("10 Downing St, London")
+        second = self.create_session("Nowhere at all")
+
+        def nominatim(request):
+            found = "Downing" in request.url
+            return http_client.mock_response(200, json_data=[{"lat": "51.503396", "lon": "-0.127640"}] if found else [])
+
+        with patch("web.services.geocoding.time.sleep"):
+            with http_client.mock_transport(nominatim) as transport:
+                self.assertEqual(process_geocode_queue(), 2)
+                self.assertEqual(process_geocode_queue(), 0)
+
+        self.assertEqual(len(transport.calls), 2)
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual((first.latitude, first.longitude), (Decimal("51.503396"), Decimal("-0.127640")))
+        self.assertIsNone(second.latitude)
+        self.assertEqual(GeocodeCache.objects.get(address_digest=address_digest("Nowhere at all")).status, "not_found")
+
+        # New sessions at a known address get coordinates straight from the cache
+        third = self.create_session("10 DOWNING ST, LONDON")
+        self.assertEqual(third.latitude, Decimal("51.503396"))
+
+    def test_failed_lookups_back_off_and_are_requeued_after_a_cool_off(self):
+        self.create_session("10 Downing St, London")
+        entry = GeocodeCache.objects.get()
+
+        outage = requests.exceptions.ConnectionError("down")
+        with patch("web.services.geocoding.lookup_address", side_effect=outage) as lookup:
+            self.assertEqual(process_geocode_queue(), 1)
+            # The retry waits for its backoff instead of running straight away
+            self.assertEqual(process_geocode_queue(), 0)
+            entry.refresh_from_db()
+            self.assertEqual((entry.status, entry.attempts), ("pending", 1))
+            self.assertGreater(entry.next_attempt_at, timezone.now() + RETRY_BACKOFF / 2)
+
+            for _ in range(MAX_ATTEMPTS - 1):
+                GeocodeCache.objects.update(next_attempt_at=timezone.now())
+                self.assertEqual(process_geocode_queue(), 1)
+        self.assertEqual(lookup.call_count, MAX_ATTEMPTS)
+        entry.refresh_from_db()
+        self.assertEqual(entry.status, "failed")
+
+        # Enqueuing the address again only re-queues it once the cool-off has passed
+        self.assertEqual(enqueue_addresses(["10 Downing St, London"]), 0)
+        GeocodeCache.objects.update(next_attempt_at=timezone.now() - FAILED_COOL_OFF)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(enqueue_addresses(["10 downing st, london"]), 1)
+        self.assertEqual(len(callbacks), 1)
+        entry.refresh_from_db()
+        self.assertEqual((entry.status, entry.attempts, entry.next_attempt_at), ("pending", 0, None))
+
+    def test_requests_wait_for_the_shared_rate_limit_slot(self):
+        # Another worker's request took the slot
+        cache.add(REQUEST_SLOT_KEY, True, 60)
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            if len(sleeps) == 3:
+                cache.delete(REQUEST_SLOT_KEY)
+
+        with patch("web.services.geocoding.time.sleep", side_effect=sleep):
+            with http_client.mock_transport(lambda request: http_client.mock_response(200, json_data=[])):
+                self.assertIsNone(lookup_address("Paris"))
+        self.assertEqual(len(sleeps), 3)
+        # This request now holds the slot
+        self.assertFalse(cache.add(REQUEST_SLOT_KEY, True, 60))
+
+    def test_map_api_never_calls_nominatim(self):
+        located = self.create_session("Paris")
+        Session.objects.filter(pk=located.pk).update(latitude=Decimal("48.8566"), longitude=Decimal("2.3522"))
+        self.create_session("Berlin")
+        GeocodeCache.objects.all().delete()
+
+        self.client.force_login(self.course.teacher)
+        with http_client.mock_transport(lambda request: self.fail("geocoded inline")):
+            response = self.client.get(reverse("map_data_api"))
+
+        self.assertEqual([s["id"] for s in response.json()["sessions"]], [located.id])
+        self.assertEqual(list(GeocodeCache.objects.values_list("address", flat=True)), ["Berlin"])
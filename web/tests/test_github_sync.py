@@ -0,0 +1,73 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from web.models import GitHubPullRequest, GitHubSyncState
+from web.services import http_client
+from web.services.github_sync import contributor_stats, sync_pull_requests
+
+REPO = "AlphaOneLabs/education-website"
+
+
+def pull(number, login, updated_at, state="closed", merged=True):
+    return {
+        "number": number,
+        "title": f"PR {number}",
+        "state": state,
+        "user": {"login": login, "avatar_url": f"https://avatars/{login}", "html_url": f"https://github.com/{login}"},
+        "created_at": "2024-01-01T00:00:00Z",
+        "updated_at": updated_at,
+        "merged_at": updated_at if merged else None,
+    }
+
+
+@override_settings(GITHUB_REPO=REPO, GITHUB_TOKEN="")
+class GitHubSyncTests(TestCase):
+    def test_sync_is_incremental_and_conditional(self):
+        pages = [
+            [pull(2, "alice", "2024-03-01T00:00:00Z"), pull(1, "bob", "2024-02-01T00:00:00Z", merged=False)],
+        ]
+        with http_client.mock_transport(
+            lambda request: http_client.mock_response(200, json_data=pages.pop(0), headers={"ETag": '"v1"'})
+        ):
+            self.assertEqual(sync_pull_requests(), 2)
+
+        state = GitHubSyncState.objects.get(key=f"pulls:{REPO}")
+        self.assertEqual(state.etag, '"v1"')
+
+        # Unchanged: the conditional request is answered with 304 and nothing is stored
+        with http_client.mock_transport(lambda request: http_client.mock_response(304)) as transport:
+            self.assertEqual(sync_pull_requests(), 0)
+        self.assertEqual(transport.calls[0].headers["If-None-Match"], '"v1"')
+
+        # Changed: only pull requests updated since the cursor are written
+        newer = [pull(1, "bob", "2024-04-01T00:00:00Z"), pull(2, "alice", "2024-03-01T00:00:00Z")]
+        newer += [pull(n, "old", "2023-01-01T00:00:00Z") for n in range(100, 198)]
+        with http_client.mock_transport(lambda request: http_client.mock_response(200, json_data=newer)) as transport:
+            self.assertEqual(sync_pull_requests(), 2)
+        self.assertEqual(len(transport.calls), 1)
+        self.assertIsNotNone(GitHubPullRequest.objects.get(number=1).merged_at)
+        self.assertEqual(GitHubPullRequest.objects.count(), 2)
+
+    def test_contributors_page_ranks_from_local_table(self):
+        rows = [
+            pull(1, "alice", "2024-03-01T00:00:00Z"),
+            pull(2, "alice", "2024-03-02T00:00:00Z"),
+            pull(3, "bob", "2024-03-03T00:00:00Z"),
+            pull(4, "bob", "2024-03-04T00:00:00Z", state="open", merged=False),
+            pull(5, "carol", "2024-03-05T00:00:00Z", merged=False),
+            pull(6, "dependabot[bot]", "2024-03-06T00:00:00Z"),
+        ]
+        with http_client.mock_transport(lambda request: http_client.mock_response(200, json_data=rows)):
+            sync_pull_requests()
+
+        with self.assertNumQueries(1):
+            contributor_stats()
+
+        with http_client.mock_transport(lambda request: http_client.mock_response(500)) as transport:
+            response = self.client.get(reverse("contributors_list_view"))
+
+        self.assertEqual(transport.calls, [])
+        contributors = response.context["contributors"]
+        self.assertEqual([c["username"] for c in contributors], ["alice", "bob"])
+        self.assertEqual(contributors[1]["open_pr_count"], 1)
+        self.assertEqual(contributors[1]["smart_score"], 10)
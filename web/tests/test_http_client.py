@@ -0,0 +1,83 @@
+import requests
+from django.core.cache import cache
+from django.test import TestCase
+
+from web.services import http_client
+from web.utils import geocode_address
+
+
+class HttpClientTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_idempotent_requests_are_retried(self):
+        responses = [http_client.mock_response(503), http_client.mock_response(200, json_data={"ok": True})]
+
+        with http_client.mock_transport(lambda request: responses.pop(0)) as transport:
+            response = http_client.get("https://api.example.com/status")
+            metrics = http_client.metrics()["api.example.com"]
+
+        self.assertEqual(response.json(), {"ok": True})
+        self.assertEqual(len(transport.calls), 2)
+        self.assertEqual((metrics["requests"], metrics["errors"], metrics["retries"]), (2, 1, 1))
+
+    def test_posts_are_not_retried_by_default(self):
+        with http_client.mock_transport(lambda request: http_client.mock_response(503)) as transport:
+            response = http_client.post("https://hooks.example.com/notify", json={"text": "hi"})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(transport.calls), 1)
+
+    def test_circuit_opens_after_repeated_failures(self):
+        def refuse(request):
+            raise requests.exceptions.ConnectionError("refused")
+
+        with http_client.mock_transport(refuse) as transport:
+            for _ in range(http_client.client.failure_threshold):
+                with self.assertRaises(requests.exceptions.ConnectionError):
+                    http_client.get("https://down.example.com/", retries=0)
+            calls = len(transport.calls)
+
+            with self.assertRaises(http_client.CircuitOpenError):
+                http_client.get("https://down.example.com/")
+            self.assertEqual(len(transport.calls), calls)
+            self.assertEqual(http_client.metrics()["down.example.com"]["circuit"], "open")
+
+            # Other hosts are unaffected
+            transport.handler = lambda request: http_client.mock_response(200)
+            self.assertEqual(http_client.get("https://up.example.com/").status_code, 200)
+
+    def test_unexpected_errors_end_the_half_open_trial(self):
+        def redirect_loop(request):
+            raise requests.exceptions.TooManyRedirects("loop")
+
+        with http_client.mock_transport(redirect_loop) as transport:
+            for _ in range(http_client.client.failure_threshold):
+                with self.assertRaises(requests.exceptions.TooManyRedirects):
+                    http_client.get("https://loop.example.com/")
+            self.assertEqual(http_client.metrics()["loop.example.com"]["circuit"], "open")
+
+            # The failed trial reopens the circuit instead of leaving it stuck half-open
+            breaker, _, _ = http_client.client._host_state("loop.example.com")
+            breaker.opened_at -= breaker.reset_timeout
+            with self.assertRaises(requests.exceptions.TooManyRedirects):
+                http_client.get("https://loop.example.com/")
+            self.assertFalse(breaker.trial_in_flight)
+
+            breaker.opened_at -= breaker.reset_timeout
+            transport.handler = lambda request: http_client.mock_response(200)
+            self.assertEqual(http_client.get("https://loop.example.com/").status_code, 200)
+            self.assertEqual(http_client.metrics()["loop.example.com"]["circuit"], "closed")
+
+    def test_geocoding_runs_offline_with_default_timeout(self):
+        seen = {}
+
+        def nominatim(request):
+            seen["url"] = request.url
+            return http_client.mock_response(200, json_data=[{"lat": "51.5", "lon": "-0.12"}])
+
+        with http_client.mock_transport(nominatim) as transport:
+            self.assertEqual(geocode_address("London"), (51.5, -0.12))
+
+        self.assertIn("nominatim.openstreetmap.org", seen["url"])
+        self.assertEqual(transport.timeouts, [http_client.DEFAULT_TIMEOUT])
@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+
+from web.models import Course, ImageManifest, Subject
+from web.services import image_derivatives
+from web.services.image_derivatives import process_image_queue, requeue_all
+
+
+def upload(name="photo.png", size=(800, 400), color="red"):
+    buffer = BytesIO()
+    Image.new("RGB", size, color).save(buffer, format="PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        self.subject = Subject.objects.create(name="Art", slug="art")
+
+    def create_course(self, image):
+        return Course.objects.create(
+            title="Painting",
+            description="Description",
+            teacher=self.teacher,
+            learning_objectives="Objectives",
+            price=10,
+            max_students=10,
+            subject=self.subject,
+            image=image,
+        )
+
+    def render(self, course):
+        template = Template('{% load image_tags %}{% responsive_image course.image sizes="300px" alt=course.title %}')
+        return template.render(Context({"course": course}))
+
+    def test_upload_is_stored_as_is_and_queued(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            course = self.create_course(upload())
+
+        with default_storage.open(course.image.name) as original:
+            self.assertEqual(Image.open(original).size, (800, 400))
+        self.assertEqual(ImageManifest.objects.get().status, "pending")
+        self.assertEqual(len(callbacks), 1)
+
+        # Saving again without a new upload queues nothing
+        with self.captureOnCommitCallbacks() as callbacks:
+            course.save()
+        self.assertEqual((ImageManifest.objects.count(), len(callbacks)), (1, 0))
+        self.assertIn(f'src="{course.image.url}"', self.render(course))
+
+    def test_worker_writes_square_webp_and_jpeg_sizes(self):
+        course = self.create_course(upload())
+        self.assertEqual(process_image_queue(), 1)
+
+        manifest = ImageManifest.objects.get()
+        self.assertEqual(manifest.status, "ready")
+        self.assertEqual([width for width, _ in manifest.derivatives["webp"]], [160, 320, 400])
+        width, path = manifest.derivatives["jpeg"][-1]
+        with default_storage.open(path) as derivative:
+            image = Image.open(derivative)
+            self.assertEqual((image.format, image.size), ("JPEG", (400, 400)))
+        with default_storage.open(manifest.derivatives["webp"][0][1]) as derivative:
+            self.assertEqual(Image.open(derivative).format, "WEBP")
+
+        html = self.render(course)
+        self.assertIn('<source type="image/webp"', html)
+        self.assertIn("course-160.webp 160w", html)
+        self.assertIn('sizes="300px"', html)
+        self.assertIn('alt="Painting"', html)
+
+    def test_manifests_left_processing_by_a_dead_worker_are_claimed_again(self):
+        self.create_course(upload())
+        ImageManifest.objects.update(status="processing", claimed_at=timezone.now())
+        # Another worker is still on it
+        self.assertEqual(process_image_queue(), 0)
+
+        ImageManifest.objects.update(claimed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(process_image_queue(), 1)
+        self.assertEqual(ImageManifest.objects.get().status, "ready")
+
+    def test_unchanged_content_is_not_reencoded(self):
+        self.create_course(upload())
+        process_image_queue()
+
+        requeue_all()
+        with patch.object(image_derivatives, "_render", side_effect=AssertionError("re-encoded")):
+            self.assertEqual(process_image_queue(), 1)
+        self.assertEqual(ImageManifest.objects.get().status, "ready")
+
+        # A second course with identical content shares the derivative files
+        self.create_course(upload(name="copy.png"))
+        with patch.object(image_derivatives, "_render", side_effect=AssertionError("re-encoded")):
+            process_image_queue()
+        first, second = ImageManifest.objects.order_by("id")
+        self.assertEqual(first.derivatives, second.derivatives)
@@ -0,0 +1,60 @@
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.test import TestCase
+
+from web.models import Notification, PeerMessage
+from web.notifications import get_user_notifications
+from web.tests.websocket import SocketClient
+
+
+class NotificationConsumerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="learner", email="learner@example.com", password="pass")
+        self.friend = User.objects.create_user(username="friend", email="friend@example.com", password="pass")
+
+    async def connect(self, user):
+        communicator = SocketClient("/ws/notifications/", user)
+        connected, code = await communicator.connect()
+        return communicator, connected, code
+
+    def save_and_commit(self, create):
+        with self.captureOnCommitCallbacks(execute=True):
+            create()
+
+    async def test_anonymous_connections_are_rejected(self):
+        communicator, connected, code = await self.connect(AnonymousUser())
+        self.assertFalse(connected)
+        self.assertEqual(code, 4401)
+
+    async def test_events_carry_payload_and_fresh_counters(self):
+        await sync_to_async(Notification.objects.create)(user=self.user, title="Old", message="Unread")
+        communicator, connected, _ = await self.connect(self.user)
+        self.assertTrue(connected)
+        self.assertEqual(
+            await communicator.receive_json_from(),
+            {"type": "counts", "data": {}, "counts": {"notifications": 1, "messages": 0, "invites": 0}},
+        )
+
+        await sync_to_async(self.save_and_commit)(
+            lambda: PeerMessage.objects.create(sender=self.friend, receiver=self.user, content="hi")
+        )
+        event = await communicator.receive_json_from()
+        self.assertEqual(event["type"], "message")
+        self.assertEqual(event["data"]["sender_id"], self.friend.id)
+        self.assertNotIn("content", event["data"])
+        self.assertEqual(event["counts"]["messages"], 1)
+
+        # Bulk mark-as-read sends no signals, so it pushes the counters explicitly
+        await sync_to_async(self.save_and_commit)(lambda: get_user_notifications(self.user, mark_as_read=True))
+        event = await communicator.receive_json_from()
+        self.assertEqual((event["type"], event["counts"]["notifications"]), ("counts", 0))
+
+        # Other users' events never reach this socket
+        await sync_to_async(self.save_and_commit)(
+            lambda: Notification.objects.create(user=self.friend, title="Theirs", message="x")
+        )
+        self.assertTrue(await communicator.receive_nothing())
+
+        await communicator.send_json_to({"type": "ping"})
+        self.assertEqual(await communicator.receive_json_from(), {"type": "pong"})
+        await communicator.disconnect()
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import PeerMessage
+from web.secure_messaging import encrypt_message_with_random_key
+from web.services.live_updates import unread_counts
+from web.services.message_retention import MESSAGE_LIFETIME, purge_expired_messages
+
+
+class MessageRetentionTests(TestCase):
+    def setUp(self):
+        self.sender = User.objects.create_user(username="sender", email="sender@example.com", password="pass")
+        self.receiver = User.objects.create_user(username="receiver", email="receiver@example.com", password="pass")
+
+    def message(self, text, age, starred=False):
+        content, key = encrypt_message_with_random_key(text)
+        message = PeerMessage.objects.create(
+            sender=self.sender, receiver=self.receiver, content=content, encrypted_key=key, starred=starred
+        )
+        PeerMessage.objects.filter(pk=message.pk).update(created_at=timezone.now() - age)
+        return message
+
+    def test_purge_deletes_expired_messages_in_chunks(self):
+        expired = [self.message(f"old {i}", MESSAGE_LIFETIME + timedelta(hours=i)) for i in range(5)]
+        starred = self.message("keep me", MESSAGE_LIFETIME + timedelta(days=3), starred=True)
+        fresh = self.message("new", timedelta(hours=1))
+        # A gap in the ids, as left by downloaded messages
+        expired[2].delete()
+
+        self.assertEqual(purge_expired_messages(chunk_size=2), 4)
+        self.assertEqual(set(PeerMessage.objects.values_list("id", flat=True)), {starred.id, fresh.id})
+
+        call_command("purge_expired_messages", "--include-starred", stdout=StringIO())
+        self.assertEqual(list(PeerMessage.objects.values_list("id", flat=True)), [fresh.id])
+
+    def test_inbox_only_shows_live_messages(self):
+        self.message("expired", MESSAGE_LIFETIME + timedelta(minutes=1))
+        self.message("starred", MESSAGE_LIFETIME + timedelta(days=1), starred=True)
+        self.message("current", timedelta(days=1))
+        self.assertEqual(unread_counts(self.receiver.id)["messages"], 2)
+
+        self.client.force_login(self.receiver)
+        response = self.client.get(reverse("inbox"))
+        shown = {msg["content"]: msg["expires_in"] for msg in response.context["messages"]}
+        self.assertEqual(set(shown), {"starred", "current"})
+        self.assertEqual(shown["starred"], "never (starred)")
@@ -0,0 +1,74 @@
+import time
+from unittest.mock import patch
+
+import requests
+from django.core.cache import cache
+from django.test import TestCase
+
+from web.services import http_client
+from web.social import MAX_FAILURE_STREAK, NitterClient
+
+PROFILE_HTML = """
+<div class="profile-card"><a class="profile-card-fullname" href="/alpha">Alpha One</a>
+<li class="followers"><span class="profile-stat-num">1,234</span></li>
+<li class="tweets"><span class="profile-stat-num">56</span></li></div>
+"""
+
+
+def nitter_handler(request):
+    if request.url.startswith(("https://nitter.net/", "https://nitter.pw/")):
+        return http_client.mock_response(200, text=PROFILE_HTML)
+    raise requests.exceptions.ConnectTimeout("timed out")
+
+
+class NitterRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = NitterClient("alpha")
+
+    def test_constructing_a_client_does_not_probe(self):
+        with http_client.mock_transport(nitter_handler) as transport:
+            NitterClient("alpha")
+        self.assertEqual(transport.calls, [])
+
+    def test_probe_records_instance_health(self):
+        with http_client.mock_transport(nitter_handler) as transport:
+            healthy = self.client.probe_instances()
+
+        self.assertEqual(len(transport.calls), len(NitterClient.NITTER_INSTANCES))
+        self.assertEqual(sorted(healthy), ["https://nitter.net", "https://nitter.pw"])
+        registry = NitterClient.instance_registry()
+        self.assertIsNotNone(registry["https://nitter.net"]["latency_ms"])
+        self.assertEqual(registry["https://nitter.poast.org"]["failures"], 1)
+        self.assertIsNone(registry["https://nitter.poast.org"]["last_success"])
+        self.assertFalse(NitterClient.registry_is_stale())
+
+    def test_failure_streak_takes_instance_out_of_rotation(self):
+        with http_client.mock_transport(nitter_handler):
+            self.client.probe_instances()
+        for _ in range(MAX_FAILURE_STREAK):
+            NitterClient._record_health("https://nitter.net", False, 0)
+
+        self.assertEqual(NitterClient.healthy_instances(), ["https://nitter.pw"])
+
+    def test_profile_stats_serve_snapshot_and_refresh_in_background(self):
+        with patch("web.social.run_once_in_background") as background:
+            stats = self.client.get_profile_stats()
+        self.assertTrue(stats["error"])
+        background.assert_called_once()
+
+        with http_client.mock_transport(nitter_handler):
+            fresh = self.client.refresh_profile_stats()
+        self.assertEqual((fresh["followers"], fresh["tweets"], fresh["name"]), (1234, 56, "Alpha One"))
+
+        with patch("web.social.run_once_in_background") as background:
+            self.assertEqual(self.client.get_profile_stats(), fresh)
+        background.assert_not_called()
+
+        # An old snapshot is still served while a refresh is scheduled
+        snapshot = cache.get(self.client.stats_cache_key)
+        snapshot["fetched_at"] = time.time() - 24 * 60 * 60
+        cache.set(self.client.stats_cache_key, snapshot, None)
+        with patch("web.social.run_once_in_background") as background:
+            self.assertEqual(self.client.get_profile_stats(), fresh)
+        background.assert_called_once()
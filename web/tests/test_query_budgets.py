@@ -0,0 +1,170 @@
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import (
+    Course,
+    Enrollment,
+    ForumCategory,
+    ForumReply,
+    ForumTopic,
+    Goods,
+    Review,
+    Session,
+    Storefront,
+    Subject,
+)
+from web.services.query_audit import REPEAT_THRESHOLD, query_shape, rank_routes, record_queries
+from web.tests.query_budget import query_budget
+
+SEEDED = 6
+
+
+class ViewQueryBudgetTests(TestCase):
+    """Each view runs a fixed number of queries however many rows it lists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        cls.teacher.profile.is_teacher = True
+        cls.teacher.profile.is_profile_public = True
+        cls.teacher.profile.save()
+        subject = Subject.objects.create(name="Physics", slug="physics")
+        cls.students = [
+            User.objects.create_user(username=f"student{i}", email=f"student{i}@example.com", password="pass")
+            for i in range(SEEDED)
+        ]
+        for student in cls.students:
+            student.profile.is_profile_public = True
+            student.profile.save()
+
+        start = timezone.now() + timedelta(days=1)
+        cls.courses = []
+        for i in range(SEEDED):
+            course = Course.objects.create(
+                title=f"Mechanics {i}",
+                slug=f"mechanics-{i}",
+                teacher=cls.teacher,
+                description="Forces",
+                learning_objectives="Newton",
+                price=10,
+                subject=subject,
+                max_students=50,
+                status="published",
+            )
+            for day in range(SEEDED):
+                Session.objects.create(
+                    course=course,
+                    title=f"Lecture {day}",
+                    description="Lecture",
+                    start_time=start + timedelta(days=day),
+                    end_time=start + timedelta(days=day, hours=1),
+                )
+            for student in cls.students:
+                Enrollment.objects.create(student=student, course=course, status="approved")
+                Review.objects.create(student=student, course=course, rating=4, comment="Good")
+            cls.courses.append(course)
+
+        category = ForumCategory.objects.create(name="Help", slug="help", description="Help", icon="fa-question")
+        cls.topic = ForumTopic.objects.create(category=category, author=cls.teacher, title="Units", content="SI?")
+        for student in cls.students:
+            ForumReply.objects.create(topic=cls.topic, author=student, content="Metres")
+
+        store = Storefront.objects.create(teacher=cls.teacher, name="Lab Shop", description="Kits")
+        for i in range(SEEDED):
+            Goods.objects.create(
+                name=f"Kit {i}", description="Kit", price=5, product_type="physical", stock=3, storefront=store
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def get(self, user, url, budget):
+        self.client.force_login(user)
+        # The first visit creates rows (request tracking, course progress) that later visits reuse
+        self.client.get(url)
+        with query_budget(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_course_detail(self):
+        self.get(self.students[0], reverse("course_detail", args=[self.courses[0].slug]), 33)
+
+    def test_users_list(self):
+        response = self.get(self.teacher, reverse("users_list"), 17)
+        scorecards = {profile.user.username: profile for profile in response.context["page_obj"]}
+        self.assertEqual(
+            (scorecards["teacher"].total_courses, scorecards["teacher"].total_students), (SEEDED, SEEDED**2)
+        )
+        self.assertEqual(scorecards["teacher"].avg_rating, 4.0)
+        self.assertEqual(scorecards["student0"].total_courses, SEEDED)
+
+    def test_teacher_dashboard(self):
+        response = self.get(self.teacher, reverse("teacher_dashboard"), 14)
+        self.assertEqual(response.context["total_students"], SEEDED**2)
+
+    def test_forum_topic(self):
+        self.get(self.teacher, reverse("forum_topic", args=["help", self.topic.id]), 18)
+
+    def test_student_profile(self):
+        response = self.get(self.students[0], reverse("profile"), 14)
+        self.assertEqual(len(response.context["enrollments"]), SEEDED)
+
+    def test_goods_listing(self):
+        self.assertEqual(len(self.get(self.students[0], reverse("goods_listing"), 14).context["products"]), SEEDED)
+
+
+class QueryAuditTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="auditor", email="auditor@example.com", password="pass")
+
+    def test_shape_ignores_values(self):
+        self.assertEqual(
+            query_shape("SELECT * FROM t WHERE id IN (%s, %s, %s) AND name = 'x' LIMIT 21"),
+            query_shape("SELECT * FROM t WHERE id IN (%s)  AND name = 'y' LIMIT 1"),
+        )
+
+    def test_repeated_queries_are_reported_with_their_call_site(self):
+        with record_queries() as log:
+            for _ in range(REPEAT_THRESHOLD):
+                User.objects.filter(pk=self.user.pk).first()
+        (repeat,) = log.repeated()
+        self.assertEqual(repeat["count"], REPEAT_THRESHOLD)
+        self.assertEqual(repeat["stack"][0][0], "web/tests/test_query_budgets.py")
+        self.assertIn("Possible N+1", log.report())
+
+        with self.assertRaisesMessage(AssertionError, "likely an N+1"):
+            with query_budget(10):
+                for _ in range(REPEAT_THRESHOLD):
+                    User.objects.filter(pk=self.user.pk).first()
+        with self.assertRaisesMessage(AssertionError, "exceed the budget of 1"):
+            with query_budget(1):
+                User.objects.count()
+                User.objects.exists()
+
+    def test_middleware_logs_requests_for_the_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = f"{directory}/queries.jsonl"
+            with self.settings(QUERY_AUDIT=True, QUERY_AUDIT_LOG=log_path):
+                self.client.force_login(self.user)
+                self.client.get(reverse("profile"))
+                self.client.get(reverse("profile"))
+                self.client.get(reverse("users_list"))
+
+            with open(log_path) as log_file:
+                ranked = rank_routes(log_file)
+            profile_route = reverse("profile")
+            self.assertEqual({route["route"] for route in ranked}, {profile_route, reverse("users_list")})
+            self.assertEqual(next(r for r in ranked if r["route"] == profile_route)["requests"], 2)
+
+            out = StringIO()
+            call_command("query_report", "--log", log_path, stdout=out)
+            self.assertIn(f"GET {profile_route}", out.getvalue())
@@ -0,0 +1,149 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import Quiz, QuizOption, QuizQuestion, Subject, UserQuiz
+from web.services.quiz_drafts import SUBMIT_GRACE, draft_cookie_name
+
+
+class QuizDraftTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="student", email="student@example.com", password="testpass123")
+        self.subject = Subject.objects.create(name="Science", slug="science")
+        self.quiz = Quiz.objects.create(
+            title="Quiz",
+            creator=self.user,
+            subject=self.subject,
+            status="published",
+            randomize_questions=True,
+            allow_anonymous=True,
+            max_attempts=1,
+        )
+        self.questions = []
+        for i in range(5):
+            question = QuizQuestion.objects.create(quiz=self.quiz, text=f"Question {i}", order=i)
+            QuizOption.objects.create(question=question, text="Right", is_correct=True, order=0)
+            QuizOption.objects.create(question=question, text="Wrong", order=1)
+            self.questions.append(question)
+        self.take_url = reverse("take_quiz", args=[self.quiz.id])
+        self.client.login(username="student", password="testpass123")
+
+    def test_page_loads_do_not_create_attempts(self):
+        first = self.client.get(self.take_url)
+        second = self.client.get(self.take_url)
+
+        self.assertEqual(UserQuiz.objects.count(), 0)
+        # The refresh re-uses the draft, so the shuffled order is stable
+        self.assertEqual([q["id"] for q in first.context["questions"]], [q["id"] for q in second.context["questions"]])
+        self.assertEqual(first.context["draft_token"], second.context["draft_token"])
+
+    def test_anonymous_page_load_does_not_create_attempt(self):
+        self.client.logout()
+        response = self.client.get(reverse("quiz_take_shared", args=[self.quiz.share_code]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserQuiz.objects.count(), 0)
+
+    def test_autosave_starts_attempt_and_restores_answers(self):
+        response = self.client.get(self.take_url)
+        token = response.context["draft_token"]
+        question = self.questions[0]
+        option = question.options.first()
+
+        saved = self.client.post(
+            reverse("quiz_autosave", args=[self.quiz.id]),
+            {"draft_token": token, f"question_{question.id}": str(option.id)},
+        )
+        self.assertEqual(saved.status_code, 200)
+        attempt = UserQuiz.objects.get()
+        self.assertEqual(saved.json()["user_quiz_id"], attempt.id)
+
+        refreshed = self.client.get(self.take_url)
+        restored = {q["id"]: q["saved_answer"] for q in refreshed.context["questions"]}
+        self.assertEqual(restored[question.id], [str(option.id)])
+        self.assertEqual(refreshed.context["user_quiz_id"], attempt.id)
+
+    def test_started_draft_survives_losing_the_cache(self):
+        token = self.client.get(self.take_url).context["draft_token"]
+        question = self.questions[0]
+        option = question.options.first()
+        self.client.post(
+            reverse("quiz_autosave", args=[self.quiz.id]),
+            {"draft_token": token, f"question_{question.id}": str(option.id)},
+        )
+        order = UserQuiz.objects.get().draft["question_order"]
+
+        # Another worker with a cold cache, or a restarted Redis
+        cache.clear()
+        refreshed = self.client.get(self.take_url)
+        self.assertEqual([q["id"] for q in refreshed.context["questions"]], order)
+        restored = {q["id"]: q["saved_answer"] for q in refreshed.context["questions"]}
+        self.assertEqual(restored[question.id], [str(option.id)])
+
+        data = {"draft_token": token}
+        for question in self.questions:
+            data[f"question_{question.id}"] = [str(question.options.get(is_correct=True).id)]
+        self.client.post(self.take_url, data)
+        self.assertIsNone(UserQuiz.objects.get().draft)
+
+    def test_submit_completes_draft_attempt_and_clears_draft(self):
+        token = self.client.get(self.take_url).context["draft_token"]
+        data = {"draft_token": token}
+        for question in self.questions:
+            data[f"question_{question.id}"] = [str(question.options.get(is_correct=True).id)]
+
+        response = self.client.post(self.take_url, data)
+
+        attempt = UserQuiz.objects.get()
+        self.assertRedirects(response, reverse("quiz_results", args=[attempt.id]))
+        self.assertTrue(attempt.completed)
+        self.assertEqual(attempt.score, 100)
+        self.assertEqual(response.cookies[draft_cookie_name(self.quiz)].value, "")
+
+        # The only allowed attempt is used up, so a new draft is refused
+        response = self.client.get(self.take_url)
+        self.assertRedirects(response, reverse("quiz_detail", args=[self.quiz.id]))
+
+    def test_autosave_rejects_tampered_token(self):
+        response = self.client.post(reverse("quiz_autosave", args=[self.quiz.id]), {"draft_token": "forged"})
+
+        self.assertEqual(response.status_code, 410)
+        self.assertEqual(UserQuiz.objects.count(), 0)
+
+    def test_timed_attempt_starts_on_open_and_late_answers_do_not_count(self):
+        self.quiz.time_limit = 10
+        self.quiz.save()
+        token = self.client.get(self.take_url).context["draft_token"]
+        attempt = UserQuiz.objects.get()
+        self.assertFalse(attempt.completed)
+
+        first, second = self.questions[0], self.questions[1]
+        self.client.post(
+            reverse("quiz_autosave", args=[self.quiz.id]),
+            {"draft_token": token, f"question_{first.id}": str(first.options.get(is_correct=True).id)},
+        )
+
+        late = timezone.now() + timedelta(minutes=10, seconds=SUBMIT_GRACE + 1)
+        with patch("web.services.quiz_drafts.timezone.now", return_value=late):
+            refused = self.client.post(
+                reverse("quiz_autosave", args=[self.quiz.id]),
+                {"draft_token": token, f"question_{second.id}": str(second.options.get(is_correct=True).id)},
+            )
+            self.assertEqual(refused.status_code, 403)
+
+            data = {"draft_token": token}
+            for question in self.questions:
+                data[f"question_{question.id}"] = [str(question.options.get(is_correct=True).id)]
+            self.client.post(self.take_url, data)
+
+        # Only the answer autosaved in time is graded
+        attempt.refresh_from_db()
+        self.assertTrue(attempt.completed)
+        self.assertEqual(attempt.score, 20)
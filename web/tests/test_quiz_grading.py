@@ -0,0 +1,89 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from web.models import Quiz, QuizOption, QuizQuestion, Subject, UserQuiz
+from web.services.quiz_grading import build_answer_key, get_answer_key, regrade_attempts
+
+
+class QuizGradingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="student", email="student@example.com", password="testpass123")
+        self.subject = Subject.objects.create(name="Math", slug="math")
+        self.quiz = Quiz.objects.create(title="Quiz", creator=self.user, subject=self.subject, status="published")
+
+        self.multiple = QuizQuestion.objects.create(
+            quiz=self.quiz, text="Pick primes", question_type="multiple", order=1
+        )
+        self.two = QuizOption.objects.create(question=self.multiple, text="2", is_correct=True, order=0)
+        self.three = QuizOption.objects.create(question=self.multiple, text="3", is_correct=True, order=1)
+        self.four = QuizOption.objects.create(question=self.multiple, text="4", order=2)
+
+        self.true_false = QuizQuestion.objects.create(
+            quiz=self.quiz, text="1 is prime", question_type="true_false", points=2, order=2
+        )
+        self.true = QuizOption.objects.create(question=self.true_false, text="True", order=0)
+        self.false = QuizOption.objects.create(question=self.true_false, text="False", is_correct=True, order=1)
+
+    def test_answer_key_is_compiled_in_one_query(self):
+        with self.assertNumQueries(1):
+            answer_key = build_answer_key(self.quiz.id)
+
+        self.assertEqual(answer_key.total_points, 3)
+        self.assertEqual(answer_key.questions[self.multiple.id].correct_option_ids, (self.two.id, self.three.id))
+        self.assertEqual(answer_key.questions[self.true_false.id].correct_option_ids, (self.false.id,))
+
+    def test_answer_key_is_cached_and_invalidated_on_option_change(self):
+        original = get_answer_key(self.quiz)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_answer_key(self.quiz).version, original.version)
+
+        self.four.is_correct = True
+        self.four.save()
+
+        updated = get_answer_key(self.quiz)
+        self.assertNotEqual(updated.version, original.version)
+        self.assertIn(self.four.id, updated.questions[self.multiple.id].correct_option_ids)
+
+    def test_submission_is_graded_against_answer_key(self):
+        self.client.login(username="student", password="testpass123")
+        response = self.client.post(
+            reverse("take_quiz", args=[self.quiz.id]),
+            {
+                f"question_{self.multiple.id}": [str(self.two.id), str(self.three.id)],
+                f"question_{self.true_false.id}": str(self.true.id),
+            },
+        )
+
+        attempt = UserQuiz.objects.filter(quiz=self.quiz, completed=True).get()
+        self.assertRedirects(response, reverse("quiz_results", args=[attempt.id]))
+        answers = json.loads(attempt.answers)
+        self.assertTrue(answers[str(self.multiple.id)]["is_correct"])
+        self.assertFalse(answers[str(self.true_false.id)]["is_correct"])
+        self.assertEqual(attempt.score, 33)
+
+    def test_regrade_attempts_after_answer_key_change(self):
+        answers = {
+            str(self.multiple.id): {"user_answer": [str(self.two.id)], "is_correct": False},
+            str(self.true_false.id): {"user_answer": str(self.true.id), "is_correct": False},
+        }
+        attempt = UserQuiz.objects.create(
+            quiz=self.quiz, user=self.user, completed=True, answers=json.dumps(answers), score=0
+        )
+
+        # Fix the answer key: "1 is prime" was marked the wrong way round
+        self.true.is_correct = True
+        self.true.save()
+        self.false.is_correct = False
+        self.false.save()
+
+        self.assertEqual(regrade_attempts(self.quiz), 1)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 66)
+        self.assertTrue(json.loads(attempt.answers)[str(self.true_false.id)]["is_correct"])
+        self.assertEqual(regrade_attempts(self.quiz), 0)
@@ -1,15 +1,21 @@
 # web/tests/test_securemessaging.py
 
 import datetime
+from unittest.mock import patch
 
 from cryptography.fernet import InvalidToken
 from django.contrib.auth import get_user_model
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
+from web import secure_messaging
 from web.models import PeerMessage
 from web.secure_messaging import (
+    INBOX_PAGE_SIZE,
+    decrypt_for_user,
     decrypt_message,
     decrypt_message_with_random_key,
     encrypt_message,
@@ -120,3 +126,52 @@ class SecureMessagingViewTestCase(TestCase):
         self.assertEqual(response.status_code, 200)
         # Check that the original plaintext appears in the rendered HTML
         self.assertContains(response, original_message)
+
+    def test_inbox_is_paginated_with_bulk_read_receipts(self):
+        sender = User.objects.create_user(username="sender", email="sender@example.com", password="password")
+        now = timezone.now()
+        for i in range(INBOX_PAGE_SIZE + 5):
+            encrypted_message, encrypted_key = encrypt_message_with_random_key(f"message {i}")
+            message = PeerMessage.objects.create(
+                sender=sender, receiver=self.user, content=encrypted_message, encrypted_key=encrypted_key
+            )
+            # Several messages share a timestamp, so the cursor must break ties by id
+            PeerMessage.objects.filter(pk=message.pk).update(created_at=now - datetime.timedelta(minutes=i // 3))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("inbox"))
+        first_page = response.context["messages"]
+        self.assertEqual(len(first_page), INBOX_PAGE_SIZE)
+        # Newest first: the three newest messages share a timestamp and the last one created leads
+        self.assertEqual(first_page[0]["content"], "message 2")
+        updates = [
+            q["sql"]
+            for q in queries.captured_queries
+            if q["sql"].startswith("UPDATE") and "web_peermessage" in q["sql"]
+        ]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(PeerMessage.objects.filter(receiver=self.user, is_read=False).count(), 5)
+
+        response = self.client.get(reverse("inbox"), {"before": response.context["next_cursor"]})
+        second_page = response.context["messages"]
+        self.assertEqual(len(second_page), 5)
+        self.assertIsNone(response.context["next_cursor"])
+        self.assertEqual(second_page[-1]["content"], f"message {INBOX_PAGE_SIZE + 2}")
+        seen = {msg["id"] for msg in first_page + second_page}
+        self.assertEqual(len(seen), INBOX_PAGE_SIZE + 5)
+        self.assertFalse(PeerMessage.objects.filter(receiver=self.user, is_read=False).exists())
+
+        # A garbled cursor starts from the beginning instead of failing
+        self.assertEqual(self.client.get(reverse("inbox"), {"before": "nonsense"}).status_code, 200)
+
+    def test_data_keys_are_unwrapped_once_per_receiver(self):
+        secure_messaging._data_keys.clear()
+        encrypted_message, encrypted_key = encrypt_message_with_random_key("cached")
+        with patch.object(
+            secure_messaging.master_fernet, "decrypt", wraps=secure_messaging.master_fernet.decrypt
+        ) as unwrap:
+            self.assertEqual(decrypt_for_user(1, encrypted_message, encrypted_key), "cached")
+            self.assertEqual(decrypt_for_user(1, encrypted_message, encrypted_key), "cached")
+            self.assertEqual(unwrap.call_count, 1)
+            decrypt_for_user(2, encrypted_message, encrypted_key)
+            self.assertEqual(unwrap.call_count, 2)
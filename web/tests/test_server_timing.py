@@ -0,0 +1,89 @@
+import json
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import TestCase
+from django.urls import reverse
+
+from web.services import http_client
+from web.services.request_timing import install, merged_summaries, summarize, timing, windows
+
+
+class ServerTimingTests(TestCase):
+    def setUp(self):
+        windows.reset()
+        self.user = User.objects.create_user(username="learner", email="learner@example.com", password="pass")
+        self.staff = User.objects.create_user(
+            username="admin", email="admin@example.com", password="pass", is_staff=True
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_categories_are_timed_once_per_call(self):
+        install()
+        page = Template("{% include section %}{% include section %}")
+        with http_client.mock_transport(lambda request: http_client.mock_response(json_data={})):
+            with timing() as request_timing:
+                User.objects.count()
+                cache.set("timed", 1)
+                cache.get_or_set("timed", 2)
+                http_client.get("https://api.example.com/")
+                page.render(Context({"section": Template("{{ name }}")}))
+        self.assertEqual(request_timing.counts, {"db": 1, "template": 1, "cache": 2, "http": 1})
+        self.assertGreater(request_timing.durations["db"], 0)
+        self.assertIn("db;dur=", request_timing.header())
+
+        # Outside a timing nothing is counted
+        cache.get("timed")
+        self.assertEqual(request_timing.counts["cache"], 2)
+
+    def test_header_is_only_sent_to_staff(self):
+        with self.settings(SERVER_TIMING=True, SERVER_TIMING_SUMMARY_DIR=self.directory.name):
+            self.client.force_login(self.user)
+            self.assertNotIn("Server-Timing", self.client.get(reverse("profile")).headers)
+
+            self.client.force_login(self.staff)
+            header = self.client.get(reverse("profile")).headers["Server-Timing"]
+        metrics = {metric.split(";")[0] for metric in header.split(", ")}
+        self.assertLessEqual({"db", "template", "total"}, metrics)
+        self.assertEqual(windows.summary()["profile"]["requests"], 2)
+
+    def test_summaries_from_every_process_are_merged(self):
+        rows = [[float(ms), 1.0, 2.0, 0.0, 0.0] for ms in range(1, 101)]
+        summary = summarize(rows)
+        self.assertEqual((summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]), (51.0, 96.0, 100.0))
+        self.assertEqual(summary["template_ms"], 2.0)
+
+        with self.settings(SERVER_TIMING=True, SERVER_TIMING_SUMMARY_DIR=self.directory.name):
+            self.client.force_login(self.user)
+            self.client.get(reverse("profile"))
+            windows.write()
+            # Another process's summary file
+            (Path(self.directory.name) / "1.json").write_text(
+                json.dumps({"pid": 1, "written": time.time(), "views": {"profile": {"samples": [[5000, 0, 0, 0, 0]]}}})
+            )
+        (profile,) = merged_summaries(self.directory.name)
+        self.assertEqual((profile["view"], profile["requests"], profile["p99_ms"]), ("profile", 2, 5000))
+
+        out = StringIO()
+        call_command("latency_report", "--dir", self.directory.name, stdout=out)
+        self.assertIn("profile", out.getvalue())
+
+    def test_slow_sampled_requests_are_profiled(self):
+        with self.settings(
+            SERVER_TIMING=True,
+            SERVER_TIMING_SUMMARY_DIR=self.directory.name,
+            SERVER_TIMING_PROFILE_DIR=self.directory.name,
+            SERVER_TIMING_PROFILE_THRESHOLD_MS=1,
+            SERVER_TIMING_PROFILE_SAMPLE_RATE=1.0,
+        ):
+            self.client.force_login(self.user)
+            self.client.get(reverse("profile"))
+        (profile,) = [path.name for path in Path(self.directory.name).glob("*.prof")]
+        self.assertIn("-profile-", profile)
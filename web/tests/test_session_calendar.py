@@ -0,0 +1,85 @@
+from datetime import date, datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import Course, Session, Subject
+from web.services.session_calendar import month_grid, session_days
+
+
+class SessionCalendarTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        subject = Subject.objects.create(name="Art", slug="art")
+        self.courses = [
+            Course.objects.create(
+                title=f"Drawing {i}",
+                slug=f"drawing-{i}",
+                teacher=teacher,
+                description="Lines",
+                learning_objectives="Shading",
+                price=0,
+                subject=subject,
+                max_students=10,
+                status="published",
+            )
+            for i in range(2)
+        ]
+        self.add_session(self.courses[0], 3)
+        self.add_session(self.courses[0], 3, hour=15)
+        self.add_session(self.courses[0], 17)
+        self.add_session(self.courses[1], 17)
+        self.add_session(self.courses[1], 1, month=4)
+
+    def add_session(self, course, day, hour=10, month=3):
+        start = timezone.make_aware(datetime(2025, month, day, hour))
+        return Session.objects.create(
+            course=course, title="Class", description="Class", start_time=start, end_time=start + timedelta(hours=1)
+        )
+
+    def test_multi_course_month_in_one_query_then_cached(self):
+        ids = [course.id for course in self.courses]
+        with self.assertNumQueries(1):
+            days = session_days(ids, 2025, 3)
+        self.assertEqual(days, {ids[0]: {3, 17}, ids[1]: {17}})
+        with self.assertNumQueries(0):
+            weeks = month_grid(2025, 3, ids, today=date(2025, 3, 17))
+
+        # March 2025 starts on a Saturday; weeks start on Sunday like the templates' header
+        self.assertEqual([day["date"] for day in weeks[0][:6]], [None] * 6)
+        self.assertEqual(weeks[0][6]["date"], date(2025, 3, 1))
+        seventeenth = weeks[3][1]
+        self.assertEqual(seventeenth["date"], date(2025, 3, 17))
+        self.assertTrue(seventeenth["is_today"])
+        self.assertEqual(sorted(seventeenth["course_ids"]), sorted(ids))
+
+    def test_session_edits_invalidate_only_their_course(self):
+        ids = [course.id for course in self.courses]
+        session_days(ids, 2025, 3)
+        self.add_session(self.courses[1], 25)
+        with self.assertNumQueries(1):
+            days = session_days(ids, 2025, 3)
+        self.assertEqual(days[ids[1]], {17, 25})
+
+    def test_calendar_endpoint(self):
+        url = reverse("course_calendar", args=[self.courses[0].slug])
+        data = self.client.get(url, {"year": 2025, "month": 3}).json()
+        self.assertEqual(data["current_month"], "March 2025")
+        self.assertEqual(
+            (data["prev_month"], data["next_month"]), ({"year": 2025, "month": 2}, {"year": 2025, "month": 4})
+        )
+        session_dates = [day["date"] for week in data["calendar_weeks"] for day in week if day["has_session"]]
+        self.assertEqual(session_dates, ["2025-03-03", "2025-03-17"])
+
+        # Nonsense falls back to the current month instead of failing
+        self.assertEqual(self.client.get(url, {"month": "13"}).status_code, 200)
+        # So do months next to the ends of the date range, which have no neighbour to link to
+        current = timezone.localdate().strftime("%B %Y")
+        detail_url = reverse("course_detail", args=[self.courses[0].slug])
+        for edge in ({"year": 9999, "month": 12}, {"year": 1, "month": 1}):
+            self.assertEqual(self.client.get(url, edge).json()["current_month"], current)
+            self.assertEqual(self.client.get(detail_url, edge).status_code, 200)
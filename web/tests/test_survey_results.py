@@ -0,0 +1,71 @@
+import json
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from web.models import Choice, Question, Response, Survey
+from web.services.survey_results import compute_survey_results
+
+
+class SurveyResultsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", email="author@example.com", password="testpass123")
+        self.voter = User.objects.create_user(username="voter", email="voter@example.com", password="testpass123")
+        self.survey = Survey.objects.create(title="Favourite things", author=self.author)
+
+        self.colour = Question.objects.create(survey=self.survey, text="Colour?", type="mcq")
+        self.red = Choice.objects.create(question=self.colour, text="Red")
+        self.blue = Choice.objects.create(question=self.colour, text="Blue")
+        self.green = Choice.objects.create(question=self.colour, text="Green")
+        self.comment = Question.objects.create(survey=self.survey, text="Anything else?", type="text", required=False)
+
+        Response.objects.create(user=self.author, question=self.colour, choice=self.red)
+
+    def test_results_are_computed_in_one_query(self):
+        for i in range(3):
+            question = Question.objects.create(survey=self.survey, text=f"Extra {i}")
+            for j in range(4):
+                Choice.objects.create(question=question, text=f"Choice {j}")
+
+        with self.assertNumQueries(1):
+            summary = compute_survey_results(self.survey.id)
+
+        self.assertEqual(len(summary["results"]), 1)
+        result = summary["results"][0]
+        self.assertEqual(result["question"]["text"], "Colour?")
+        self.assertEqual([(c["text"], c["count"]) for c in result["choices"]], [("Red", 1), ("Blue", 0), ("Green", 0)])
+        self.assertEqual(summary["top_choice"]["text"], "Red")
+        chart = json.loads(summary["chart_data_json"])
+        self.assertEqual(chart[0]["data"], [1, 0, 0])
+
+    def test_submission_invalidates_cached_results(self):
+        self.client.login(username="voter", password="testpass123")
+        results_url = reverse("survey-results", args=[self.survey.id])
+
+        response = self.client.get(results_url)
+        self.assertEqual(response.context["total_participants"], 1)
+
+        self.client.post(reverse("submit-survey", args=[self.survey.id]), {f"question_{self.colour.id}": self.blue.id})
+
+        response = self.client.get(results_url)
+        self.assertEqual(response.context["total_participants"], 2)
+        counts = {c["text"]: c["count"] for c in response.context["results"][0]["choices"]}
+        self.assertEqual(counts, {"Red": 1, "Blue": 1, "Green": 0})
+
+    def test_csv_export_streams_tallies_for_author_only(self):
+        self.client.login(username="voter", password="testpass123")
+        self.assertEqual(self.client.get(reverse("survey-results-csv", args=[self.survey.id])).status_code, 403)
+
+        self.client.login(username="author", password="testpass123")
+        response = self.client.get(reverse("survey-results-csv", args=[self.survey.id]))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], "question_id,question,choice_id,choice,count")
+        self.assertIn(f"{self.colour.id},Colour?,{self.red.id},Red,1", lines)
+        self.assertEqual(len(lines), 4)
@@ -0,0 +1,123 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import EducationalVideo, Subject, VideoMetadata
+from web.services import http_client, video_metadata
+from web.services.video_metadata import parse_video_url, refresh_video_metadata, video_details
+
+
+def oembed_handler(request):
+    if "youtube.com/oembed" in request.url:
+        return http_client.mock_response(
+            200, json_data={"title": "Intro to Calculus", "thumbnail_url": "https://i.ytimg.com/vi/x/hq.jpg"}
+        )
+    if "12345678" in request.url:
+        return http_client.mock_response(
+            200, json_data={"title": "Cells", "description": "Biology basics", "duration": 312}
+        )
+    if "87654321" in request.url:
+        # A 200 from a misbehaving proxy that is not JSON
+        return http_client.mock_response(200, text="<html>Service unavailable</html>")
+    return http_client.mock_response(503)
+
+
+class VideoMetadataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.subject = Subject.objects.create(name="Math", slug="math", order=1)
+
+    def create_video(self, url, title="Video"):
+        return EducationalVideo.objects.create(title=title, video_url=url, category=self.subject)
+
+    def test_parse_video_url(self):
+        for url in [
+            "https://youtu.be/dQw4w9WgXcQ",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ&t=10",
+            "https://youtube.com/embed/dQw4w9WgXcQ",
+            "https://www.youtube.com/shorts/dQw4w9WgXcQ",
+        ]:
+            self.assertEqual(parse_video_url(url), ("youtube", "dQw4w9WgXcQ"), url)
+        self.assertEqual(parse_video_url("https://vimeo.com/video/12345678"), ("vimeo", "12345678"))
+        self.assertIsNone(parse_video_url("https://example.com/watch?v=dQw4w9WgXcQ"))
+
+    def test_save_links_shared_metadata_without_fetching(self):
+        with http_client.mock_transport(lambda request: self.fail("fetched inline")):
+            with self.captureOnCommitCallbacks() as callbacks:
+                first = self.create_video("https://youtu.be/dQw4w9WgXcQ")
+                second = self.create_video("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+
+        self.assertEqual(first.metadata_id, second.metadata_id)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(first.youtube_id, "dQw4w9WgXcQ")
+        self.assertEqual(first.thumbnail_url, "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg")
+
+        # Videos not linked to metadata yet still show their thumbnail
+        EducationalVideo.objects.filter(pk=first.pk).update(metadata=None)
+        unlinked = EducationalVideo.objects.get(pk=first.pk)
+        self.assertEqual(unlinked.youtube_id, "dQw4w9WgXcQ")
+        self.assertEqual(unlinked.thumbnail_url, "https://img.youtube.com/vi/dQw4w9WgXcQ/hqdefault.jpg")
+
+        # Thumbnails come from the joined metadata, so more videos do not mean more queries (two are request logging)
+        self.client.get(reverse("educational_videos_list"))
+        for n in range(5):
+            self.create_video(f"https://vimeo.com/{10000000 + n}")
+        with self.assertNumQueries(8):
+            response = self.client.get(reverse("educational_videos_list"))
+        self.assertContains(response, "hqdefault.jpg")
+
+    def test_upload_backfills_description_once(self):
+        data = {
+            "title": "Cells",
+            "description": "",
+            "video_url": "https://vimeo.com/12345678",
+            "category": self.subject.id,
+        }
+        with http_client.mock_transport(oembed_handler) as transport:
+            self.client.post(reverse("upload_educational_video"), data)
+            self.client.post(reverse("upload_educational_video"), data)
+            response = self.client.get(reverse("fetch_video_title"), {"url": "https://vimeo.com/12345678"})
+
+        self.assertEqual(len(transport.calls), 1)
+        self.assertEqual(response.json(), {"title": "Cells"})
+        videos = EducationalVideo.objects.all()
+        self.assertEqual([(v.title, v.description) for v in videos], [("Cells", "Biology basics")] * 2)
+        self.assertEqual(VideoMetadata.objects.get().duration, 312)
+
+    def test_refresh_fills_stale_rows_and_keeps_failures_queued(self):
+        self.create_video("https://youtu.be/dQw4w9WgXcQ")
+        self.create_video("https://vimeo.com/87654321")
+        VideoMetadata.objects.create(provider="vimeo", video_id="12345678", title="Old", fetched_at=timezone.now())
+
+        with http_client.mock_transport(oembed_handler):
+            self.assertEqual(refresh_video_metadata(), 1)
+
+        youtube = VideoMetadata.objects.get(provider="youtube")
+        self.assertEqual(
+            (youtube.title, youtube.thumbnail_url), ("Intro to Calculus", "https://i.ytimg.com/vi/x/hq.jpg")
+        )
+        self.assertIsNone(VideoMetadata.objects.get(video_id="87654321").fetched_at)
+
+        # Rows past their refresh age are fetched again
+        VideoMetadata.objects.filter(video_id="12345678").update(fetched_at=timezone.now() - timedelta(days=31))
+        with http_client.mock_transport(oembed_handler):
+            refresh_video_metadata()
+        self.assertEqual(VideoMetadata.objects.get(video_id="12345678").title, "Cells")
+
+    def test_inline_fetch_does_not_also_start_the_worker(self):
+        with patch.object(video_metadata, "start_worker") as start_worker:
+            with http_client.mock_transport(oembed_handler) as transport:
+                with self.captureOnCommitCallbacks(execute=True):
+                    metadata = video_details("https://vimeo.com/12345678")
+                # Not JSON: left for the worker instead of failing
+                with self.captureOnCommitCallbacks(execute=True):
+                    unfetched = video_details("https://vimeo.com/87654321")
+
+        self.assertEqual(metadata.title, "Cells")
+        self.assertIsNone(unfetched.fetched_at)
+        self.assertEqual(len(transport.calls), 2)
+        start_worker.assert_called_once()
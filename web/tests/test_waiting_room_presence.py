@@ -0,0 +1,102 @@
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from web.models import Course, Subject, WaitingRoom
+from web.services import presence
+from web.tests.websocket import SocketClient
+
+
+class WaitingRoomPresenceTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        self.student = User.objects.create_user(username="student", email="student@example.com", password="pass")
+        self.outsider = User.objects.create_user(username="outsider", email="outsider@example.com", password="pass")
+        subject = Subject.objects.create(name="Physics", slug="physics")
+        self.course = Course.objects.create(
+            title="Mechanics",
+            slug="mechanics",
+            teacher=self.teacher,
+            description="Forces",
+            learning_objectives="Newton",
+            price=0,
+            subject=subject,
+            max_students=10,
+            status="published",
+        )
+        self.room = WaitingRoom.objects.create(course=self.course, status="open")
+        self.room.participants.add(self.student)
+        self.path = f"/ws/waiting-room/{self.room.id}/"
+
+    async def test_teacher_sees_participants_come_and_go(self):
+        teacher = SocketClient(self.path, self.teacher)
+        self.assertEqual((await teacher.connect())[0], True)
+        self.assertEqual(await teacher.receive_json_from(), {"type": "presence", "participants": 1, "online": 0})
+
+        student = SocketClient(self.path, self.student)
+        await student.connect()
+        self.assertEqual((await teacher.receive_json_from())["online"], 1)
+        self.assertEqual((await student.receive_json_from())["online"], 1)
+
+        await student.send_json_to({"type": "ping"})
+        self.assertEqual(await student.receive_json_from(), {"type": "pong"})
+        # A heartbeat from someone already online changes nothing for the teacher
+        self.assertTrue(await teacher.receive_nothing())
+
+        await student.disconnect()
+        self.assertEqual((await teacher.receive_json_from())["online"], 0)
+        await teacher.disconnect()
+
+    async def test_only_members_may_connect(self):
+        self.assertEqual(await SocketClient(self.path, self.outsider).connect(), (False, 4403))
+        self.assertEqual((await SocketClient(self.path, AnonymousUser()).connect())[1], 4401)
+
+    async def test_joining_pushes_the_participant_count(self):
+        teacher = SocketClient(self.path, self.teacher)
+        await teacher.connect()
+        await teacher.receive_json_from()
+
+        def join():
+            self.client.force_login(self.outsider)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.get(reverse("join_session_waiting_room", args=[self.course.slug]))
+
+        await sync_to_async(join)()
+        self.assertEqual((await teacher.receive_json_from())["participants"], 2)
+        await teacher.disconnect()
+
+    def test_stale_presence_expires(self):
+        with patch.object(presence.time, "time", return_value=1000):
+            self.assertTrue(presence.touch(self.room.id, self.student.id))
+            self.assertFalse(presence.touch(self.room.id, self.student.id))
+        with patch.object(presence.time, "time", return_value=1000 + presence.PRESENCE_TIMEOUT):
+            self.assertEqual(presence.online_count(self.room.id), 0)
+            self.assertTrue(presence.touch(self.room.id, self.student.id))
+
+    def test_each_participant_has_its_own_entry(self):
+        self.room.participants.add(self.outsider)
+        presence.touch(self.room.id, self.student.id)
+        presence.touch(self.room.id, self.outsider.id)
+        self.assertEqual(presence.online_count(self.room.id), 2)
+
+        # Dropping one participant leaves the other's heartbeat alone
+        presence.drop(self.room.id, self.student.id)
+        self.assertEqual(presence.online_count(self.room.id), 1)
+        self.assertTrue(presence.touch(self.room.id, self.student.id))
+
+    def test_membership_check(self):
+        self.assertTrue(presence.is_participant(self.room.id, self.student.id))
+        self.assertFalse(presence.is_participant(self.room.id, self.outsider.id))
+        self.client.force_login(self.student)
+        response = self.client.get(reverse("course_detail", args=[self.course.slug]))
+        self.assertTrue(response.context["user_in_session_waiting_room"])
+
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse("course_detail", args=[self.course.slug]))
+        self.assertContains(response, f'data-waiting-room="{self.room.id}"')
+        self.assertContains(response, 'data-presence-count="online"')
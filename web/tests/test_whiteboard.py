@@ -0,0 +1,191 @@
+from datetime import timedelta
+from io import BytesIO
+from unittest.mock import patch
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from web.models import Course, Session, Subject, WhiteboardBoard, WhiteboardFrame
+from web.services import whiteboard
+from web.services.whiteboard import CLEAR, SNAPSHOT, STROKES, Stroke, decode_strokes, encode_strokes
+from web.tests.websocket import SocketClient
+
+PEN = whiteboard.TOOLS.index("pen")
+
+
+def pen_stroke(points, color=(255, 0, 0)):
+    return Stroke(PEN, 4, color, points)
+
+
+class StrokeCodecTests(TestCase):
+    def test_round_trip_quantizes_and_delta_encodes(self):
+        freehand = pen_stroke([(10.4, 20.6)] + [(10 + i, 21 + i % 3) for i in range(1, 100)])
+        text = Stroke(whiteboard.TEXT, 3, (0, 0, 0), [(50, 60)], "Hi ✓")
+
+        frame = encode_strokes([freehand, text])
+        decoded = decode_strokes(frame)
+
+        self.assertEqual(decoded[0].points[0], (10, 21))
+        self.assertEqual(decoded[0].points[1:], freehand.points[1:])
+        self.assertEqual((decoded[1].text, decoded[1].points), ("Hi ✓", [(50, 60)]))
+        # Small deltas cost one byte per coordinate
+        self.assertLess(len(encode_strokes([freehand])), 2 * 100 + 12)
+
+    def test_malformed_frames_are_rejected(self):
+        valid = encode_strokes([pen_stroke([(1, 1), (2, 2)])])
+        for frame in [
+            valid[:-1],
+            bytes([CLEAR]) + valid[1:],
+            encode_strokes([pen_stroke([(1, 1), (whiteboard.BOARD_WIDTH + 1, 1)])]),
+            bytes([STROKES, 99]) + valid[2:],
+            valid + b"\x00" * whiteboard.MAX_FRAME_BYTES,
+        ]:
+            with self.assertRaises(ValueError):
+                decode_strokes(frame)
+
+
+class WhiteboardConsumerTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        self.student = User.objects.create_user(username="student", email="student@example.com", password="pass")
+
+    async def join(self, user, board="algebra"):
+        client = SocketClient(f"/ws/whiteboard/{board}/", user)
+        connected, code = await client.connect()
+        return client, connected, code
+
+    async def test_frames_are_relayed_to_the_rest_of_the_room(self):
+        teacher, _, _ = await self.join(self.teacher)
+        student, _, _ = await self.join(self.student)
+        elsewhere, _, _ = await self.join(self.student, board="other")
+
+        frame = encode_strokes([pen_stroke([(5, 5), (6, 7), (9, 9)])])
+        await teacher.send_bytes_to(frame)
+        self.assertEqual(await student.receive_bytes_from(), frame)
+        self.assertTrue(await teacher.receive_nothing())
+        self.assertTrue(await elsewhere.receive_nothing())
+
+        # Malformed frames are neither stored nor relayed
+        await teacher.send_bytes_to(frame[:-1])
+        self.assertTrue(await student.receive_nothing(timeout=2 * whiteboard.STORE_DELAY))
+        self.assertEqual(await WhiteboardFrame.objects.acount(), 1)
+
+        # Only the board's owner, who opened it first, may clear it
+        await student.send_bytes_to(bytes([CLEAR]))
+        self.assertTrue(await teacher.receive_nothing(timeout=2 * whiteboard.STORE_DELAY))
+        self.assertEqual(await WhiteboardFrame.objects.acount(), 1)
+
+        await teacher.send_bytes_to(bytes([CLEAR]))
+        self.assertEqual(await student.receive_bytes_from(), bytes([CLEAR]))
+        self.assertEqual(await WhiteboardFrame.objects.acount(), 0)
+
+        for client in (teacher, student, elsewhere):
+            await client.disconnect()
+
+    async def test_late_joiner_gets_snapshot_and_tail(self):
+        teacher, _, _ = await self.join(self.teacher)
+        for i in range(5):
+            await teacher.send_bytes_to(encode_strokes([pen_stroke([(10 * i, 10), (10 * i + 5, 40)])]))
+        await teacher.receive_nothing(timeout=2 * whiteboard.STORE_DELAY)
+        board = await WhiteboardBoard.objects.aget(slug="algebra")
+        # Stored together in one batch
+        self.assertEqual(await board.frames.acount(), 5)
+
+        self.assertEqual(await sync_to_async(whiteboard.compact_board)(board.id), 5)
+        tail = encode_strokes([pen_stroke([(100, 100), (120, 120)], color=(0, 0, 255))])
+        await teacher.send_bytes_to(tail)
+        await teacher.receive_nothing(timeout=2 * whiteboard.STORE_DELAY)
+
+        student, _, _ = await self.join(self.student)
+        snapshot = await student.receive_bytes_from()
+        self.assertEqual(snapshot[0], SNAPSHOT)
+        image = Image.open(BytesIO(snapshot[5:]))
+        self.assertEqual(image.size, (whiteboard.BOARD_WIDTH, whiteboard.BOARD_HEIGHT))
+        self.assertEqual(image.getpixel((12, 20))[:3], (255, 0, 0))
+        self.assertEqual(await student.receive_bytes_from(), tail)
+        self.assertTrue(await student.receive_nothing())
+
+        await teacher.disconnect()
+        await student.disconnect()
+
+    @patch.object(whiteboard, "MAX_MEMBERS", 1)
+    async def test_room_size_is_capped(self):
+        teacher, connected, _ = await self.join(self.teacher)
+        self.assertTrue(connected)
+        _, connected, code = await self.join(self.student)
+        self.assertEqual((connected, code), (False, 4429))
+
+        # Leaving frees the place
+        await teacher.disconnect()
+        student, connected, _ = await self.join(self.student)
+        self.assertTrue(connected)
+        await student.disconnect()
+
+
+class WhiteboardClearPermissionTests(TestCase):
+    def setUp(self):
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com", password="pass")
+        self.teacher = User.objects.create_user(username="teacher", email="teacher@example.com", password="pass")
+        self.visitor = User.objects.create_user(username="visitor", email="visitor@example.com", password="pass")
+        subject = Subject.objects.create(name="Art", slug="art")
+        course = Course.objects.create(
+            title="Drawing",
+            slug="drawing",
+            teacher=self.teacher,
+            description="Lines",
+            learning_objectives="Shading",
+            price=0,
+            subject=subject,
+            max_students=10,
+        )
+        start = timezone.now() + timedelta(days=1)
+        self.session = Session.objects.create(
+            course=course,
+            title="Still life",
+            description="Fruit",
+            start_time=start,
+            end_time=start + timedelta(hours=1),
+        )
+
+    def page(self, user, **params):
+        self.client.force_login(user)
+        return self.client.get(reverse("shared_whiteboard", args=["studio"]), params)
+
+    def test_only_owner_and_session_teacher_may_clear(self):
+        self.assertTrue(self.page(self.owner).context["can_clear"])
+        self.assertNotContains(self.page(self.visitor), 'id="clearBoard"')
+
+        # Another teacher's session cannot be attached, but the board's own teacher can do it once
+        self.assertFalse(self.page(self.visitor, session=self.session.id).context["can_clear"])
+        self.assertTrue(self.page(self.teacher, session=self.session.id).context["can_clear"])
+        board = WhiteboardBoard.objects.get(slug="studio")
+        self.assertEqual((board.owner, board.session), (self.owner, self.session))
+        self.assertFalse(whiteboard.can_clear(board, self.visitor))
+
+
+class PendingFramesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.board = WhiteboardBoard.objects.create(slug="algebra")
+        self.frame = encode_strokes([pen_stroke([(1, 1), (2, 2)])])
+
+    @patch.object(whiteboard, "COMPACT_AFTER", 3)
+    def test_only_the_batch_crossing_the_threshold_compacts(self):
+        with patch.object(whiteboard, "run_once_in_background") as compact:
+            whiteboard.store_frames(self.board.id, [self.frame] * 2)
+            compact.assert_not_called()
+            whiteboard.store_frames(self.board.id, [self.frame] * 2)
+            compact.assert_called_once()
+            # The count restarts from what the crossing batch saw
+            self.assertEqual(cache.get(whiteboard._pending_key(self.board.id)), 0)
+
+            # An expired counter starts again instead of failing
+            cache.delete(whiteboard._pending_key(self.board.id))
+            whiteboard.store_frames(self.board.id, [self.frame])
+            self.assertEqual(cache.get(whiteboard._pending_key(self.board.id)), 1)
@@ -0,0 +1,38 @@
+import json
+
+from asgiref.testing import ApplicationCommunicator
+from channels.routing import URLRouter
+
+from web.routing import websocket_urlpatterns
+
+application = URLRouter(websocket_urlpatterns)
+
+
+class SocketClient(ApplicationCommunicator):
+    """Minimal WebSocket test client; ``channels.testing`` needs daphne, which is not a dependency."""
+
+    def __init__(self, path, user):
+        scope = {"type": "websocket", "path": path, "headers": [], "subprotocols": [], "user": user}
+        super().__init__(application, scope)
+
+    async def connect(self):
+        """Return ``(accepted, close code)``."""
+        await self.send_input({"type": "websocket.connect"})
+        response = await self.receive_output()
+        return response["type"] == "websocket.accept", response.get("code")
+
+    async def receive_json_from(self):
+        return json.loads((await self.receive_output())["text"])
+
+    async def receive_bytes_from(self):
+        return (await self.receive_output())["bytes"]
+
+    async def send_json_to(self, data):
+        await self.send_input({"type": "websocket.receive", "text": json.dumps(data)})
+
+    async def send_bytes_to(self, data):
+        await self.send_input({"type": "websocket.receive", "bytes": data})
+
+    async def disconnect(self):
+        await self.send_input({"type": "websocket.disconnect", "code": 1000})
+        await self.wait()
@@ -35,6 +35,7 @@ from .views import (
     sales_data,
     streak_detail,
     submit_survey,
+    survey_results_csv,
 )
 
 # Non-prefixed URLs
@@ -139,6 +140,7 @@ urlpatterns += i18n_patterns(
     path("surveys/<int:pk>/delete/", SurveyDeleteView.as_view(), name="survey-delete"),
     path("surveys/<int:pk>/submit/", submit_survey, name="submit-survey"),
     path("surveys/<int:pk>/results/", SurveyResultsView.as_view(), name="survey-results"),
+    path("surveys/<int:pk>/results.csv", survey_results_csv, name="survey-results-csv"),
     # Payment URLs
     path(
         "courses/<slug:slug>/create-payment-intent/",
@@ -204,6 +206,8 @@ urlpatterns += i18n_patterns(
         name="course_analytics",
     ),
     path("calendar/feed/", views.calendar_feed, name="calendar_feed"),
+    path("calendar/feed/reset/", views.reset_calendar_feed, name="reset_calendar_feed"),
+    path("calendar/feed/<str:token>.ics", views.calendar_feed_by_token, name="calendar_feed_by_token"),
     path(
         "calendar/session/<int:session_id>/",
         views.calendar_links,
@@ -357,6 +361,7 @@ urlpatterns += i18n_patterns(
     path("memes/add/", views.add_meme, name="add_meme"),
     path("memes/<slug:slug>/", views.meme_detail, name="meme_detail"),
     path("whiteboard/", views.whiteboard, name="whiteboard"),
+    path("whiteboard/<slug:board>/", views.shared_whiteboard, name="shared_whiteboard"),
     path("gsoc/", views.gsoc_landing_page, name="gsoc_landing_page"),
     path("sync_github_milestones/", views.sync_github_milestones, name="sync_github_milestones"),
     # Team Collaboration URLs
@@ -386,6 +391,7 @@ urlpatterns += i18n_patterns(
     path("quizzes/questions/<int:question_id>/edit/", quiz_views.edit_question, name="edit_question"),
     path("quizzes/questions/<int:question_id>/delete/", quiz_views.delete_question, name="delete_question"),
     path("quizzes/<int:quiz_id>/take/", quiz_views.take_quiz, name="take_quiz"),
+    path("quizzes/<int:quiz_id>/autosave/", quiz_views.autosave_quiz_draft, name="quiz_autosave"),
     path("quizzes/shared/<str:share_code>/", quiz_views.take_quiz_shared, name="quiz_take_shared"),
     path("quizzes/results/<int:user_quiz_id>/", quiz_views.quiz_results, name="quiz_results"),
     path(
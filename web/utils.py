@@ -10,6 +10,8 @@ from django.core.cache import cache
 from django.db import models
 from django.utils import timezone
 
+from web.services import http_client
+
 User = get_user_model()
 logger = logging.getLogger(__name__)
 
@@ -21,7 +23,7 @@ def send_slack_message(message):
         return False
 
     try:
-        response = requests.post(webhook_url, json={"text": message})
+        response = http_client.post(webhook_url, json={"text": message})
         return response.status_code == 200
     except requests.exceptions.RequestException:
         return False
@@ -877,68 +879,41 @@ def geocode_address(address):
     """
     Convert a text address to latitude and longitude coordinates using Nominatim API.
     Returns a tuple of (latitude, longitude) or None if geocoding fails.
-    Follows OpenStreetMap's Nominatim usage policy with built-in rate limiting.
-    """
-    # Rate limiting - ensure we don't exceed 1 request per second
-    rate_limit_key = "nominatim_last_request"
-    last_request_time = cache.get(rate_limit_key)
-
-    if last_request_time:
-        import time
 
-        current_time = time.time()
-        time_since_last_request = current_time - last_request_time
-
-        if time_since_last_request < 1.0:
-            # Sleep to maintain 1 request per second rate limit
-            time.sleep(1.0 - time_since_last_request)
+    Results are stored in GeocodeCache, so every worker process shares them. This call may wait
+    for Nominatim's rate limit; request handlers should enqueue addresses with
+    ``web.services.geocoding.enqueue_addresses`` instead.
+    """
+    from web.models import GeocodeCache
+    from web.services.geocoding import address_digest, cached_coordinates, lookup_address
 
-    if not address:
+    if not address or not address.strip():
         logger.debug("Empty address provided to geocode_address")
         return None
 
-    # Check cache first
-    normalized_address = address.strip().lower()
-    cache_key = f"geocode:{hash(normalized_address)}"
-    cached_result = cache.get(cache_key)
+    cached_result = cached_coordinates(address)
     if cached_result:
         logger.debug(f"Using cached geocoding result for: {address}")
-        return cached_result
-
-    # Nominatim API URL with custom User-Agent as recommended
-    url = "https://nominatim.openstreetmap.org/search"
-    params = {"q": address, "format": "json", "limit": 1}
-
-    # Headers to comply with Nominatim usage policy
-    headers = {"User-Agent": "AlphaOneEducation/1.0 (support@alphaonelabs.com)"}
+        return tuple(float(value) for value in cached_result)
 
     try:
-        # Update last request timestamp
-        import time
-
-        cache.set(rate_limit_key, time.time(), 60 * 5)  # Keep for 5 minutes
-        # Use requests with custom headers and params
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-
-        data = response.json()
-
-        if data:
-            # Get the first result
-            first_result = data[0]
-            result = (float(first_result["lat"]), float(first_result["lon"]))
-
-            # Cache the result for 24 hours
-            cache.set(cache_key, result, 60 * 60 * 24)
-
-            return result
-
-        logger.warning(f"No geocoding results found for address: {address}")
-        return None
-
+        result = lookup_address(address)
     except requests.exceptions.RequestException as e:
         logger.error(f"Request error during geocoding: {e}")
         return None
     except Exception as e:
         logger.error(f"Geocoding error: {e}")
         return None
+
+    if result is None:
+        logger.warning(f"No geocoding results found for address: {address}")
+    GeocodeCache.objects.update_or_create(
+        address_digest=address_digest(address),
+        defaults={
+            "address": address.strip(),
+            "status": "ok" if result else "not_found",
+            "latitude": round(result[0], 6) if result else None,
+            "longitude": round(result[1], 6) if result else None,
+        },
+    )
+    return result
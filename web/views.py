@@ -1,4 +1,5 @@
-import calendar
+import asyncio
+import csv
 import html
 import ipaddress
 import json
@@ -12,7 +13,7 @@ import string
 import subprocess
 import time
 from collections import Counter, defaultdict
-from datetime import timedelta
+from datetime import date, timedelta
 from decimal import Decimal
 from urllib.parse import urlparse
 
@@ -21,6 +22,7 @@ import stripe
 import tweepy
 from allauth.account.models import EmailAddress
 from allauth.account.utils import send_email_confirmation
+from asgiref.sync import sync_to_async
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.admin.utils import NestedObjects
@@ -34,7 +36,7 @@ from django.core.mail import send_mail
 from django.core.management import call_command
 from django.core.paginator import Paginator
 from django.db import IntegrityError, models, router, transaction
-from django.db.models import Avg, Count, Q, Sum
+from django.db.models import Avg, Count, Prefetch, Q, Sum
 from django.db.models.functions import Coalesce
 from django.http import (
     FileResponse,
@@ -44,13 +46,16 @@ from django.http import (
     HttpResponseBadRequest,
     HttpResponseForbidden,
     JsonResponse,
+    StreamingHttpResponse,
 )
-from django.shortcuts import get_object_or_404, redirect, render
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import NoReverseMatch, reverse, reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.utils.crypto import get_random_string
 from django.utils.html import strip_tags
+from django.utils.http import url_has_allowed_host_and_scheme
 from django.utils.text import slugify
 from django.utils.translation import gettext as _
 from django.views import generic
@@ -65,7 +70,7 @@ from django.views.generic import (
     UpdateView,
 )
 
-from .calendar_sync import generate_google_calendar_link, generate_ical_feed, generate_outlook_calendar_link
+from .calendar_sync import generate_google_calendar_link, generate_outlook_calendar_link
 from .decorators import teacher_required
 from .forms import (
     AccountDeleteForm,
@@ -131,7 +136,6 @@ from .models import (
     ForumCategory,
     ForumReply,
     ForumTopic,
-    ForumVote,
     Goods,
     GradeableLink,
     LearningStreak,
@@ -172,6 +176,7 @@ from .models import (
     VideoRequest,
     WaitingRoom,
     WebRequest,
+    WhiteboardBoard,
     default_valid_until,
 )
 from .notifications import (
@@ -183,12 +188,24 @@ from .notifications import (
     send_enrollment_confirmation,
 )
 from .referrals import send_referral_reward_email
+from .services import http_client
+from .services.calendar_feed import cached_feed, feed_token, reset_feed_token
+from .services.class_map import map_tiles, parse_filters, parse_viewport, upcoming_sessions
+from .services.contributor_metrics import contributor_context, get_contributor_metrics
+from .services.forum_votes import cast_vote, thread_votes_for_user
+from .services.github_sync import contributor_stats
+from .services.live_updates import push_counts
+from .services.message_retention import live_messages
+from .services.presence import is_participant, online_count, push_room_state
+from .services.session_calendar import adjacent_months, month_grid, requested_month
+from .services.survey_results import get_survey_results, invalidate_survey_results, survey_tallies
+from .services.video_metadata import video_details
+from .services.whiteboard import MAX_SLUG_LENGTH, can_clear, get_board
 from .social import get_social_stats
 from .utils import (
     cancel_subscription,
     create_leaderboard_context,
     create_subscription,
-    geocode_address,
     get_cached_challenge_entries,
     get_cached_leaderboard_data,
     get_leaderboard,
@@ -523,6 +540,29 @@ def all_leaderboards(request):
         return render(request, "leaderboards/leaderboards.html", context)
 
 
+def progress_by_enrollment(enrollments):
+    """
+    Return ``{enrollment id: CourseProgress}`` with completion counts annotated, creating missing rows.
+
+    Each progress is also set as ``enrollment.progress``, so templates reading it do not query again.
+    """
+    enrollments = list(enrollments)
+    ids = [enrollment.id for enrollment in enrollments]
+    existing = set(CourseProgress.objects.filter(enrollment_id__in=ids).values_list("enrollment_id", flat=True))
+    missing = [enrollment for enrollment in enrollments if enrollment.id not in existing]
+    if missing:
+        CourseProgress.objects.bulk_create(
+            [CourseProgress(enrollment=enrollment) for enrollment in missing], ignore_conflicts=True
+        )
+        # bulk_create skips the post_save signal that clears these
+        cache.delete_many({f"user_progress_{enrollment.student_id}" for enrollment in missing})
+    progress = {p.enrollment_id: p for p in CourseProgress.objects.with_completion().filter(enrollment_id__in=ids)}
+    for enrollment in enrollments:
+        if enrollment.id in progress:
+            enrollment.progress = progress[enrollment.id]
+    return progress
+
+
 @login_required
 def profile(request):
     if request.method == "POST":
@@ -548,16 +588,14 @@ def profile(request):
 
     # Teacher-specific stats
     if request.user.profile.is_teacher:
-        courses = Course.objects.filter(teacher=request.user)
-        total_students = sum(course.enrollments.filter(status="approved").count() for course in courses)
-        avg_rating = 0
-        total_ratings = 0
-        for course in courses:
-            course_ratings = course.reviews.all()
-            if course_ratings:
-                avg_rating += sum(review.rating for review in course_ratings)
-                total_ratings += len(course_ratings)
-        avg_rating = round(avg_rating / total_ratings, 1) if total_ratings > 0 else 0
+        courses = Course.objects.filter(teacher=request.user).annotate(
+            enrollment_count=Count("enrollments", distinct=True),
+            approved_count=Count("enrollments", filter=Q(enrollments__status="approved"), distinct=True),
+            avg_rating=Avg("reviews__rating"),
+        )
+        total_students = sum(course.approved_count for course in courses)
+        avg_rating = Review.objects.filter(course__teacher=request.user).aggregate(avg=Avg("rating"))["avg"]
+        avg_rating = round(avg_rating, 1) if avg_rating is not None else 0
         context.update(
             {
                 "courses": courses,
@@ -567,16 +605,10 @@ def profile(request):
         )
     # Student-specific stats
     else:
-        enrollments = Enrollment.objects.filter(student=request.user).select_related("course")
-        completed_courses = enrollments.filter(status="completed").count()
-        total_progress = 0
-        progress_count = 0
-        for enrollment in enrollments:
-            progress, _ = CourseProgress.objects.get_or_create(enrollment=enrollment)
-            if progress.completion_percentage is not None:
-                total_progress += progress.completion_percentage
-                progress_count += 1
-        avg_progress = round(total_progress / progress_count) if progress_count > 0 else 0
+        enrollments = list(Enrollment.objects.filter(student=request.user).select_related("course__teacher"))
+        completed_courses = sum(enrollment.status == "completed" for enrollment in enrollments)
+        progress = progress_by_enrollment(enrollments).values()
+        avg_progress = round(sum(p.completion_percentage for p in progress) / len(progress)) if progress else 0
         context.update(
             {
                 "enrollments": enrollments,
@@ -747,7 +779,16 @@ def delete_review(request, slug, review_id):
 
 
 def course_detail(request, slug):
-    course = get_object_or_404(Course, slug=slug)
+    # The template lists enrollments with their students and progress, and counts them and the sessions repeatedly
+    enrollments = Enrollment.objects.select_related("student__profile").prefetch_related(
+        Prefetch("progress", queryset=CourseProgress.objects.with_completion())
+    )
+    course = get_object_or_404(
+        Course.objects.select_related("teacher__profile")
+        .annotate(avg_rating=Avg("reviews__rating"))
+        .prefetch_related(Prefetch("enrollments", queryset=enrollments), "sessions"),
+        slug=slug,
+    )
     sessions = course.sessions.all().order_by("start_time")
     now = timezone.now()
     is_teacher = request.user == course.teacher
@@ -772,11 +813,17 @@ def course_detail(request, slug):
     total_sessions = sessions.count()
 
     if is_teacher or is_enrolled:
+        attended = dict(
+            SessionAttendance.objects.filter(session__course=course, status__in=["present", "late"])
+            .values_list("student_id")
+            .annotate(count=Count("id"))
+            .order_by()
+        )
         for enroll in course.enrollments.all():
-            attended_sessions = SessionAttendance.objects.filter(
-                student=enroll.student, session__course=course, status__in=["present", "late"]
-            ).count()
-            student_attendance[enroll.student.id] = {"attended": attended_sessions, "total": total_sessions}
+            student_attendance[enroll.student_id] = {
+                "attended": attended.get(enroll.student_id, 0),
+                "total": total_sessions,
+            }
 
     # Mark past sessions as completed for display
     past_sessions = sessions.filter(end_time__lt=now)
@@ -784,48 +831,13 @@ def course_detail(request, slug):
     sessions = list(future_sessions) + list(past_sessions)  # Show future sessions first
 
     # Calendar data
-    today = timezone.now().date()
-
-    # Get the requested month from query parameters, default to current month
-    try:
-        year = int(request.GET.get("year", today.year))
-        month = int(request.GET.get("month", today.month))
-        current_month = today.replace(year=year, month=month, day=1)
-    except (ValueError, TypeError):
-        current_month = today.replace(day=1)
-
-    # Calculate previous and next month
-    if current_month.month == 1:
-        prev_month = current_month.replace(year=current_month.year - 1, month=12)
-    else:
-        prev_month = current_month.replace(month=current_month.month - 1)
-
-    if current_month.month == 12:
-        next_month = current_month.replace(year=current_month.year + 1, month=1)
-    else:
-        next_month = current_month.replace(month=current_month.month + 1)
-
-    # Get the calendar for current month
-    cal = calendar.monthcalendar(current_month.year, current_month.month)
-
-    # Get all session dates for this course in current month
-    session_dates = set(
-        session.start_time.date()
-        for session in sessions
-        if session.start_time.year == current_month.year and session.start_time.month == current_month.month
-    )
-
-    # Prepare calendar weeks data
-    calendar_weeks = []
-    for week in cal:
-        calendar_week = []
-        for day in week:
-            if day == 0:
-                calendar_week.append({"date": None, "in_month": False, "has_session": False})
-            else:
-                date = current_month.replace(day=day)
-                calendar_week.append({"date": date, "in_month": True, "has_session": date in session_dates})
-        calendar_weeks.append(calendar_week)
+    today = timezone.localdate()
+    year, month = requested_month(request.GET, today)
+    current_month = date(year, month, 1)
+    (prev_year, prev_month_number), (next_year, next_month_number) = adjacent_months(year, month)
+    prev_month = date(prev_year, prev_month_number, 1)
+    next_month = date(next_year, next_month_number, 1)
+    calendar_weeks = month_grid(year, month, [course.id], today)
 
     # Check if the current user has already reviewed this course
     user_review = None
@@ -833,10 +845,10 @@ def course_detail(request, slug):
         user_review = Review.objects.filter(student=request.user, course=course).first()
 
     # Get all reviews That not featured for this course
-    reviews = course.reviews.filter(is_featured=False).order_by("-created_at")
+    reviews = course.reviews.filter(is_featured=False).select_related("student__profile").order_by("-created_at")
 
     # Get the featured review
-    featured_review = Review.objects.filter(is_featured=True, course=course)
+    featured_review = Review.objects.filter(is_featured=True, course=course).select_related("student__profile")
 
     # Get all reviews sum
     reviews_num = reviews.count() + featured_review.count()
@@ -849,18 +861,19 @@ def course_detail(request, slug):
 
     # Get next session for waiting room functionality
     next_session = None
+    session_waiting_room = None
     user_in_session_waiting_room = False
 
     if request.user.is_authenticated:
         # Get the next upcoming session for this course
         next_session = course.sessions.filter(start_time__gt=timezone.now()).order_by("start_time").first()
 
-        # Check if user is in the session waiting room
-        try:
-            session_waiting_room = WaitingRoom.objects.get(course=course, status="open")
-            user_in_session_waiting_room = request.user in session_waiting_room.participants.all()
-        except WaitingRoom.DoesNotExist:
-            user_in_session_waiting_room = False
+        session_waiting_room = WaitingRoom.objects.filter(course=course, status="open").first()
+        if session_waiting_room:
+            user_in_session_waiting_room = is_participant(session_waiting_room.id, request.user.id)
+            if is_teacher:
+                # Starting values for the live counts pushed over the waiting room socket
+                session_waiting_room.online = online_count(session_waiting_room.id)
 
     # Build the absolute discount URL using the discount view's URL name.
     from urllib.parse import urlencode
@@ -891,6 +904,7 @@ def course_detail(request, slug):
         "reviews_num": reviews_num,
         "discount_url": discount_url,
         "next_session": next_session,
+        "session_waiting_room": session_waiting_room,
         "user_in_session_waiting_room": user_in_session_waiting_room,
     }
 
@@ -1114,7 +1128,7 @@ def send_slack_message(message):
 
     payload = {"text": f"```{message}```"}
     try:
-        response = requests.post(webhook_url, json=payload)
+        response = http_client.post(webhook_url, json=payload)
         response.raise_for_status()  # Raise exception for bad status codes
     except Exception as e:
         print(f"Failed to send Slack message: {e}")
@@ -1564,47 +1578,48 @@ def course_search(request):
     return render(request, "courses/search.html", context)
 
 
+def approve_free_enrollment(enrollment):
+    """Approve an enrollment that needs no payment and send the usual notifications."""
+    enrollment.status = "approved"
+    enrollment.save()
+
+    # Send notifications
+    send_enrollment_confirmation(enrollment)
+    notify_teacher_new_enrollment(enrollment)
+
+
 @login_required
-def create_payment_intent(request, slug):
+async def create_payment_intent(request, slug):
     """Create a payment intent for Stripe."""
-    course = get_object_or_404(Course, slug=slug)
+    user = await request.auser()
+    course = await aget_object_or_404(Course, slug=slug)
 
     # Prevent creating payment intents for free courses
     if course.price == 0:
         # Find the enrollment and update its status to approved if it's pending
-        enrollment = get_object_or_404(Enrollment, student=request.user, course=course)
+        enrollment = await aget_object_or_404(Enrollment, student=user, course=course)
         if enrollment.status == "pending":
-            enrollment.status = "approved"
-            enrollment.save()
-
-            # Send notifications
-            send_enrollment_confirmation(enrollment)
-            notify_teacher_new_enrollment(enrollment)
+            await sync_to_async(approve_free_enrollment)(enrollment)
 
         return JsonResponse({"free_course": True, "message": "Enrollment approved for free course"})
 
     # Ensure user has a pending enrollment
-    enrollment = get_object_or_404(Enrollment, student=request.user, course=course, status="pending")
+    enrollment = await aget_object_or_404(Enrollment, student=user, course=course, status="pending")
 
     # Validate price is greater than zero for Stripe
     if course.price <= 0:
-        enrollment.status = "approved"
-        enrollment.save()
-
-        # Send notifications
-        send_enrollment_confirmation(enrollment)
-        notify_teacher_new_enrollment(enrollment)
+        await sync_to_async(approve_free_enrollment)(enrollment)
 
         return JsonResponse({"free_course": True, "message": "Enrollment approved for free course"})
 
     try:
-        # Create a PaymentIntent with the order amount and currency
-        intent = stripe.PaymentIntent.create(
+        # Create a PaymentIntent with the order amount and currency; the Stripe call waits off the event loop
+        intent = await sync_to_async(stripe.PaymentIntent.create, thread_sensitive=False)(
             amount=int(course.price * 100),  # Convert to cents
             currency="usd",
             metadata={
                 "course_id": course.id,
-                "user_id": request.user.id,
+                "user_id": user.id,
             },
         )
         return JsonResponse({"clientSecret": intent.client_secret})
@@ -1965,13 +1980,38 @@ def course_analytics(request, slug):
     return render(request, "courses/analytics.html", context)
 
 
+def _ical_response(request, user):
+    etag, body = cached_feed(user)
+    response = HttpResponse(body, content_type="text/calendar")
+    response["Content-Disposition"] = f'attachment; filename="{settings.SITE_NAME}-schedule.ics"'
+    response["ETag"] = etag
+    # Clients may keep the feed but must revalidate it; an unchanged schedule answers 304
+    patch_cache_control(response, private=True, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
+
+
 @login_required
 def calendar_feed(request):
-    """Generate and serve an iCal feed of the user's course sessions."""
+    """Serve an iCal feed of the user's course sessions."""
+    return _ical_response(request, request.user)
 
-    response = HttpResponse(generate_ical_feed(request.user), content_type="text/calendar")
-    response["Content-Disposition"] = f'attachment; filename="{settings.SITE_NAME}-schedule.ics"'
-    return response
+
+def calendar_feed_by_token(request, token):
+    """Serve a user's iCal feed to calendar clients, which poll without a login session."""
+    profile = get_object_or_404(Profile.objects.select_related("user"), calendar_token=token)
+    return _ical_response(request, profile.user)
+
+
+@login_required
+@require_POST
+def reset_calendar_feed(request):
+    """Replace the secret feed URL, e.g. after it was shared by mistake."""
+    reset_feed_token(request.user.profile)
+    messages.success(request, "Your calendar feed has a new address. Update it in your calendar app.")
+    next_url = request.POST.get("next")
+    if next_url and url_has_allowed_host_and_scheme(next_url, allowed_hosts={request.get_host()}):
+        return redirect(next_url)
+    return redirect("profile")
 
 
 @login_required
@@ -1995,27 +2035,30 @@ def calendar_links(request, session_id):
     if request.headers.get("X-Requested-With") == "XMLHttpRequest":
         return JsonResponse({"links": links})
 
+    feed_url = request.build_absolute_uri(reverse("calendar_feed_by_token", args=[feed_token(request.user.profile)]))
     return render(
         request,
         "courses/calendar_links.html",
         {
             "session": session,
             "calendar_links": links,
+            "feed_url": feed_url,
         },
     )
 
 
 def forum_categories(request):
     """Display all forum categories."""
-    categories = ForumCategory.objects.all()
+    categories = ForumCategory.objects.annotate(topic_total=Count("topics"))
     return render(request, "web/forum/categories.html", {"categories": categories})
 
 
 def forum_category(request, slug):
     """Display topics in a specific category."""
     category = get_object_or_404(ForumCategory, slug=slug)
-    topics = category.topics.all()
-    categories = ForumCategory.objects.all()
+    # Vote and reply counts and last activity are maintained columns, so one query covers the listing
+    topics = category.topics.select_related("author__profile", "last_reply__author")
+    categories = ForumCategory.objects.annotate(topic_total=Count("topics"))
     return render(
         request, "web/forum/category.html", {"category": category, "topics": topics, "categories": categories}
     )
@@ -2024,14 +2067,14 @@ def forum_category(request, slug):
 def forum_topic(request, category_slug, topic_id):
     """Display a forum topic and its replies."""
     topic = get_object_or_404(ForumTopic, id=topic_id, category__slug=category_slug)
-    categories = ForumCategory.objects.all()
+    categories = ForumCategory.objects.annotate(topic_total=Count("topics"))
 
     # Get view count from WebRequest model
     view_count = (
         WebRequest.objects.filter(path=request.path).aggregate(total_views=models.Sum("count"))["total_views"] or 0
     )
     topic.views = view_count
-    topic.save()
+    ForumTopic.objects.filter(pk=topic.pk).update(views=view_count)
 
     # Handle POST requests for replies, voting, and deletion
     if request.method == "POST":
@@ -2057,15 +2100,10 @@ def forum_topic(request, category_slug, topic_id):
             return redirect("forum_category", slug=category_slug)
 
     # Fetch replies after POST handling
-    replies = topic.replies.select_related("author").order_by("created_at")
+    replies = topic.replies.select_related("author__profile").order_by("created_at")
 
-    # Votes handling
-    if request.user.is_authenticated:
-        user_topic_vote = topic.user_vote(request.user)
-        user_reply_votes = {reply.id: reply.user_vote(request.user) for reply in replies}
-    else:
-        user_topic_vote = None
-        user_reply_votes = {}
+    # The user's votes on the topic and all of its replies come from a single query
+    user_topic_vote, user_reply_votes = thread_votes_for_user(request.user, topic)
 
     return render(
         request,
@@ -2180,13 +2218,14 @@ def peer_messages(request, user_id):
             PeerMessage.objects.create(sender=request.user, receiver=peer, content=content)
             messages.success(request, "Message sent!")
 
-    # Get conversation messages
-    messages_list = PeerMessage.objects.filter(
-        (Q(sender=request.user, receiver=peer) | Q(sender=peer, receiver=request.user))
+    # Get conversation messages that have not expired yet
+    messages_list = live_messages(
+        PeerMessage.objects.filter((Q(sender=request.user, receiver=peer) | Q(sender=peer, receiver=request.user)))
     ).order_by("created_at")
 
     # Mark received messages as read
-    messages_list.filter(sender=peer, receiver=request.user, is_read=False).update(is_read=True)
+    if messages_list.filter(sender=peer, receiver=request.user, is_read=False).update(is_read=True):
+        push_counts(request.user.id)
 
     return render(request, "web/peer/messages.html", {"peer": peer, "messages": messages_list})
 
@@ -2461,11 +2500,9 @@ def session_detail(request, session_id):
             next_session = session.course.sessions.filter(start_time__gt=timezone.now()).order_by("start_time").first()
 
             # Check if user is in the session waiting room
-            try:
-                session_waiting_room = WaitingRoom.objects.get(course=session.course, status="open")
-                user_in_session_waiting_room = request.user in session_waiting_room.participants.all()
-            except WaitingRoom.DoesNotExist:
-                user_in_session_waiting_room = False
+            user_in_session_waiting_room = WaitingRoom.objects.filter(
+                course=session.course, status="open", participants=request.user
+            ).exists()
 
         context = {
             "session": session,
@@ -2584,9 +2621,19 @@ def student_dashboard(request):
     # Query achievements for the user.
     achievements = Achievement.objects.filter(student=request.user).order_by("-awarded_at")
 
+    # This month's sessions across every approved course on one calendar
+    today = timezone.localdate()
+    course_titles = {e.course_id: e.course.title for e in enrollments if e.status == "approved"}
+    calendar_weeks = month_grid(today.year, today.month, list(course_titles), today)
+    for week in calendar_weeks:
+        for day in week:
+            day["courses"] = [course_titles[course_id] for course_id in day["course_ids"]]
+
     context = {
         "enrollments": enrollments,
         "upcoming_sessions": upcoming_sessions,
+        "calendar_month": today,
+        "calendar_weeks": calendar_weeks,
         "progress_data": progress_data,
         "avg_progress": avg_progress,
         "streak": streak,
@@ -2604,10 +2651,27 @@ def teacher_dashboard(request):
     This ensures that earnings accurately reflect actual transactions rather than just the
     number of enrolled students. Each payment has a 90% teacher commission rate applied.
     """
-    courses = Course.objects.filter(teacher=request.user)
-    upcoming_sessions = Session.objects.filter(course__teacher=request.user, start_time__gt=timezone.now()).order_by(
-        "start_time"
-    )[:5]
+    approved = Q(enrollments__status="approved")
+    courses = Course.objects.filter(teacher=request.user).annotate(
+        enrollment_count=Count("enrollments", distinct=True),
+        approved_count=Count("enrollments", filter=approved, distinct=True),
+        completed_count=Count("enrollments", filter=approved & Q(enrollments__status="completed"), distinct=True),
+        session_count=Count("sessions", distinct=True),
+    )
+    upcoming_sessions = (
+        Session.objects.filter(course__teacher=request.user, start_time__gt=timezone.now())
+        .select_related("course")
+        .order_by("start_time")[:5]
+    )
+
+    # Earnings are based on completed payments of approved enrollments, not on the enrollment count
+    paid = dict(
+        Payment.objects.filter(
+            enrollment__course__teacher=request.user, enrollment__status="approved", status="completed"
+        )
+        .values_list("enrollment__course_id")
+        .annotate(total=Sum("amount"))
+    )
 
     # Get enrollment and progress stats for each course
     course_stats = []
@@ -2615,22 +2679,13 @@ def teacher_dashboard(request):
     total_completed = 0
     total_earnings = Decimal("0.00")
     for course in courses:
-        enrollments = course.enrollments.filter(status="approved")
-        course_total_students = enrollments.count()
-        course_completed = enrollments.filter(status="completed").count()
+        course_total_students = course.approved_count
+        course_completed = course.completed_count
         total_students += course_total_students
         total_completed += course_completed
 
-        # Calculate earnings based on completed payments instead of enrollment count
-        # Each payment has an amount field which represents the actual amount paid
-        # We apply the teacher's commission rate (90% by default, 10% platform fee)
-        course_earnings = Decimal("0.00")
-        for enrollment in enrollments:
-            # Get all completed payments for this enrollment
-            completed_payments = enrollment.payments.filter(status="completed")
-            for payment in completed_payments:
-                # Apply the 90% teacher commission
-                course_earnings += payment.amount * Decimal("0.9")
+        # Apply the teacher's commission rate (90% by default, 10% platform fee)
+        course_earnings = paid.get(course.id, Decimal("0.00")) * Decimal("0.9")
 
         total_earnings += course_earnings
         course_stats.append(
@@ -3153,7 +3208,8 @@ def edit_topic(request, topic_id):
             topic.content = form.cleaned_data["content"]
             topic.github_issue_url = form.cleaned_data.get("github_issue_url", "")
             topic.github_milestone_url = form.cleaned_data.get("github_milestone_url", "")
-            topic.save()
+            # Only write the edited fields so concurrent vote and reply tallies are not overwritten
+            topic.save(update_fields=["title", "content", "github_issue_url", "github_milestone_url", "updated_at"])
             messages.success(request, "Topic updated successfully!")
             return redirect("forum_topic", category_slug=topic.category.slug, topic_id=topic.id)
     else:
@@ -3200,7 +3256,7 @@ def edit_reply(request, reply_id):
         content = request.POST.get("content")
         if content:
             reply.content = content
-            reply.save()
+            reply.save(update_fields=["content", "updated_at"])
             messages.success(request, "Reply updated successfully.")
             return redirect("forum_topic", category_slug=topic.category.slug, topic_id=topic.id)
 
@@ -3210,53 +3266,26 @@ def edit_reply(request, reply_id):
 def get_course_calendar(request, slug):
     """AJAX endpoint to get calendar data for a course."""
     course = get_object_or_404(Course, slug=slug)
-    today = timezone.now().date()
-    calendar_weeks = []
-
-    # Get current month and year from query parameters
-    year = int(request.GET.get("year", today.year))
-    month = int(request.GET.get("month", today.month))
-    current_month = timezone.datetime(year, month, 1).date()
-
-    # Get previous and next month for navigation
-    if month == 1:
-        prev_month = {"year": year - 1, "month": 12}
-    else:
-        prev_month = {"year": year, "month": month - 1}
-
-    if month == 12:
-        next_month = {"year": year + 1, "month": 1}
-    else:
-        next_month = {"year": year, "month": month + 1}
-
-    # Get sessions for the current month
-    month_sessions = course.sessions.filter(start_time__year=year, start_time__month=month).order_by("start_time")
-
-    # Generate calendar data
-    cal = calendar.monthcalendar(year, month)
-
-    for week in cal:
-        calendar_week = []
-        for day in week:
-            if day == 0:
-                calendar_week.append({"date": None, "has_session": False, "is_today": False})
-            else:
-                date = timezone.datetime(year, month, day).date()
-                sessions_on_day = [s for s in month_sessions if s.start_time.date() == date]
-                calendar_week.append(
-                    {
-                        "date": date.isoformat() if date else None,
-                        "has_session": bool(sessions_on_day),
-                        "is_today": date == today,
-                    }
-                )
-        calendar_weeks.append(calendar_week)
+    today = timezone.localdate()
+    year, month = requested_month(request.GET, today)
+    (prev_year, prev_month), (next_year, next_month) = adjacent_months(year, month)
 
+    calendar_weeks = [
+        [
+            {
+                "date": day["date"].isoformat() if day["date"] else None,
+                "has_session": day["has_session"],
+                "is_today": day["is_today"],
+            }
+            for day in week
+        ]
+        for week in month_grid(year, month, [course.id], today)
+    ]
     data = {
         "calendar_weeks": calendar_weeks,
-        "current_month": current_month.strftime("%B %Y"),
-        "prev_month": prev_month,
-        "next_month": next_month,
+        "current_month": date(year, month, 1).strftime("%B %Y"),
+        "prev_month": {"year": prev_year, "month": prev_month},
+        "next_month": {"year": next_year, "month": next_month},
     }
 
     return JsonResponse(data)
@@ -3346,7 +3375,7 @@ def get_calendar_data(request, share_token):
     return JsonResponse(data)
 
 
-def system_status(request):
+async def system_status(request):
     """Check system status including SendGrid API connectivity and disk space usage."""
     status = {
         "sendgrid": {"status": "unknown", "message": "", "api_key_configured": False},
@@ -3360,7 +3389,7 @@ def system_status(request):
         status["sendgrid"]["api_key_configured"] = True
         try:
             print("Checking SendGrid API...")
-            response = requests.get(
+            response = await http_client.aget(
                 "https://api.sendgrid.com/v3/user/account",
                 headers={"Authorization": f"Bearer {sendgrid_api_key}"},
                 timeout=5,
@@ -3407,7 +3436,10 @@ def system_status(request):
         status["disk_space"]["status"] = "error"
         status["disk_space"]["message"] = f"Error checking disk space: {str(e)}"
 
-    return render(request, "status.html", {"status": status})
+    # Latency and error counters for third-party hosts called since this worker started
+    status["outbound_http"] = sorted(http_client.metrics().items())
+
+    return await sync_to_async(render)(request, "status.html", {"status": status})
 
 
 @login_required
@@ -3788,7 +3820,7 @@ def challenge_submit(request, challenge_id):
 
 
 @require_GET
-def fetch_video_title(request):
+async def fetch_video_title(request):
     """
     Fetch video title from a URL with proper security measures to prevent SSRF attacks.
     """
@@ -3827,12 +3859,13 @@ def fetch_video_title(request):
 
             # Resolve hostname to IP and check if it's private
             try:
-                ip_address = socket.gethostbyname(hostname)
-                ip_obj = ipaddress.ip_address(ip_address)
+                addresses = await asyncio.get_running_loop().getaddrinfo(hostname, None, family=socket.AF_INET)
+                for address in addresses:
+                    ip_obj = ipaddress.ip_address(address[4][0])
 
-                # Check if the IP is private/internal
-                if ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local or ip_obj.is_multicast:
-                    return JsonResponse({"error": "Access to internal/private networks is not allowed"}, status=403)
+                    # Check if the IP is private/internal
+                    if ip_obj.is_private or ip_obj.is_loopback or ip_obj.is_link_local or ip_obj.is_multicast:
+                        return JsonResponse({"error": "Access to internal/private networks is not allowed"}, status=403)
             except (socket.gaierror, ValueError):
                 # If hostname resolution fails or IP parsing fails, continue
                 pass
@@ -3840,12 +3873,18 @@ def fetch_video_title(request):
     except Exception as e:
         return JsonResponse({"error": f"Invalid URL format: {str(e)}"}, status=400)
 
+    # YouTube and Vimeo titles come from the stored oEmbed metadata
+    metadata = await sync_to_async(video_details)(url)
+    if metadata and metadata.title:
+        return JsonResponse({"title": metadata.title})
+
     # Set a timeout to prevent hanging requests
     timeout = 5  # seconds
 
     try:
         # Only allow HEAD and GET methods with limited redirects
-        response = requests.get(
+        # User-supplied hosts must not get circuit breakers or metrics in the shared client
+        response = await http_client.aget_user_supplied(
             url,
             timeout=timeout,
             allow_redirects=True,
@@ -4030,7 +4069,12 @@ class GoodsListingView(ListView):
     paginate_by = 15
 
     def get_queryset(self):
-        queryset = Goods.objects.all()
+        # image_url reads the first image from an id-ordered prefetch instead of querying per product
+        queryset = (
+            Goods.objects.select_related("storefront")
+            .prefetch_related(Prefetch("goods_images", queryset=ProductImage.objects.order_by("id")))
+            .annotate(cart_count=Count("cart_items"))
+        )
         store_name = self.request.GET.get("store_name")
         product_type = self.request.GET.get("product_type")
         category = self.request.GET.get("category")
@@ -4054,15 +4098,6 @@ class GoodsListingView(ListView):
         context = super().get_context_data(**kwargs)
         context["store_names"] = Storefront.objects.values_list("name", flat=True).distinct()
         context["categories"] = Goods.objects.values_list("category", flat=True).distinct()
-
-        # Add cart count for each product
-        products_with_cart_count = []
-        for product in context["products"]:
-            product.cart_count = product.cart_items.count()
-            products_with_cart_count.append(product)
-
-        context["products"] = products_with_cart_count
-
         return context
 
 
@@ -4375,7 +4410,6 @@ def gsoc_landing_page(request):
     """
     import logging
 
-    import requests
     from django.conf import settings
 
     # Initialize an empty list for contributors in case the GitHub API call fails
@@ -4397,7 +4431,7 @@ def gsoc_landing_page(request):
         # Get all closed pull requests - we'll filter for merged ones in code
         # The GitHub API doesn't have a direct 'merged' filter in the query params
         # so we get all closed PRs and then check the 'merged_at' field
-        pull_requests_response = requests.get(
+        pull_requests_response = http_client.get(
             f"{github_repo_url}/pulls",
             params={
                 "state": "closed",  # closed PRs could be either merged or just closed
@@ -4460,7 +4494,28 @@ def gsoc_landing_page(request):
 
 
 def whiteboard(request):
-    return render(request, "whiteboard.html")
+    return render(request, "whiteboard.html", {"new_board": get_random_string(12).lower()})
+
+
+@login_required
+def shared_whiteboard(request, board):
+    """
+    A whiteboard synced live with everyone who opens the same link.
+
+    A teacher opening a new board with ``?session=<id>`` for one of their sessions links it to
+    that session, so they can clear it as well as its owner.
+    """
+    if len(board) > MAX_SLUG_LENGTH:
+        raise Http404("Whiteboard not found")
+    whiteboard_board = get_board(board, request.user)
+    session_id = request.GET.get("session", "")
+    if session_id.isdigit() and whiteboard_board.session_id is None:
+        session = Session.objects.filter(pk=session_id, course__teacher=request.user).select_related("course").first()
+        if session and WhiteboardBoard.objects.filter(pk=whiteboard_board.pk, session__isnull=True).update(
+            session=session
+        ):
+            whiteboard_board.session = session
+    return render(request, "whiteboard.html", {"board": board, "can_clear": can_clear(whiteboard_board, request.user)})
 
 
 def graphing_calculator(request):
@@ -5281,8 +5336,8 @@ def educational_videos_list(request: HttpRequest) -> HttpResponse:
     selected_category = request.GET.get("category")
 
     # Base querysets
-    videos = EducationalVideo.objects.select_related("uploader", "category").order_by("-uploaded_at")
-    video_requests = VideoRequest.objects.select_related("requester", "category", "fulfilled_by").order_by(
+    videos = EducationalVideo.objects.select_related("uploader", "category", "metadata").order_by("-uploaded_at")
+    video_requests = VideoRequest.objects.select_related("requester", "category", "fulfilled_by__metadata").order_by(
         "-created_at"
     )
 
@@ -5329,38 +5384,6 @@ def educational_videos_list(request: HttpRequest) -> HttpResponse:
     return render(request, "videos/list.html", context)
 
 
-def fetch_video_oembed(video_url):
-    """
-    Hits YouTube or Vimeo’s oEmbed endpoint and returns a dict
-    containing 'title' and 'description' (if available).
-    """
-    # YouTube IDs are always 11 chars
-    yt_match = re.search(r"(?:v=|youtu\.be/|embed/|shorts/)([\w-]{11})", video_url)
-    if yt_match:
-        video_id = yt_match.group(1)
-        endpoint = f"https://www.youtube.com/oembed?url=https://www.youtube.com/watch?v={video_id}&format=json"
-    else:
-        # Vimeo URLs look like vimeo.com/12345678…
-        vm_match = re.search(r"vimeo\.com/(?:video/)?(\d+)", video_url)
-        if vm_match:
-            endpoint = f"https://vimeo.com/api/oembed.json?url={video_url}"
-        else:
-            return {}
-
-    try:
-        resp = requests.get(endpoint, timeout=3)
-        if resp.ok:
-            data = resp.json()
-            return {
-                "title": data.get("title", "").strip(),
-                "description": data.get("description", "").strip(),
-            }
-    except requests.RequestException:
-        pass
-
-    return {}
-
-
 def upload_educational_video(request):
     """
     Handles GET → render form, POST → save video.
@@ -5375,11 +5398,11 @@ def upload_educational_video(request):
 
             # auto‑fetch metadata if missing
             if not video.title.strip() or not video.description.strip():
-                info = fetch_video_oembed(video.video_url)
-                if not video.title.strip() and info.get("title"):
-                    video.title = info["title"]
-                if not video.description.strip() and info.get("description"):
-                    video.description = info["description"]
+                video.metadata = video_details(video.video_url)
+                if video.metadata and not video.title.strip() and video.metadata.title:
+                    video.title = video.metadata.title
+                if video.metadata and not video.description.strip() and video.metadata.description:
+                    video.description = video.metadata.description
 
             video.save()
 
@@ -5562,7 +5585,7 @@ def waiting_room_detail(request, waiting_room_id):
     waiting_room = get_object_or_404(WaitingRoom, id=waiting_room_id)
 
     # Check if the user is a participant
-    is_participant = request.user.is_authenticated and request.user in waiting_room.participants.all()
+    user_is_participant = request.user.is_authenticated and is_participant(waiting_room.id, request.user.id)
 
     # Check if the user is the creator
     is_creator = request.user.is_authenticated and request.user == waiting_room.creator
@@ -5572,7 +5595,7 @@ def waiting_room_detail(request, waiting_room_id):
 
     context = {
         "waiting_room": waiting_room,
-        "is_participant": is_participant,
+        "is_participant": user_is_participant,
         "is_creator": is_creator,
         "is_teacher": is_teacher,
         "participant_count": waiting_room.participants.count() + 1,  # Add 1 to include the creator
@@ -5592,8 +5615,9 @@ def join_waiting_room(request, waiting_room_id):
         return redirect("waiting_room_list")
 
     # Add the user as a participant if not already
-    if request.user not in waiting_room.participants.all():
+    if not is_participant(waiting_room.id, request.user.id):
         waiting_room.participants.add(request.user)
+        push_room_state(waiting_room.id)
         messages.success(request, f"You have joined the waiting room: {waiting_room.title}")
     else:
         messages.info(request, "You are already a participant in this waiting room.")
@@ -5607,8 +5631,9 @@ def leave_waiting_room(request, waiting_room_id):
     waiting_room = get_object_or_404(WaitingRoom, id=waiting_room_id)
 
     # Remove the user from participants
-    if request.user in waiting_room.participants.all():
+    if is_participant(waiting_room.id, request.user.id):
         waiting_room.participants.remove(request.user)
+        push_room_state(waiting_room.id)
         messages.success(request, f"You have left the waiting room: {waiting_room.title}")
     else:
         messages.info(request, "You are not a participant in this waiting room.")
@@ -5628,7 +5653,7 @@ def sync_github_milestones(request):
 
     try:
         # Get GitHub milestones
-        response = requests.get(milestones_url)
+        response = http_client.get(milestones_url)
         response.raise_for_status()
         milestones = response.json()
 
@@ -5681,7 +5706,7 @@ def sync_github_milestones(request):
                 # Update existing topic
                 topic.content = content
                 topic.is_pinned = milestone_state == "open"  # Pin open milestones
-                topic.save()
+                topic.save(update_fields=["content", "is_pinned", "updated_at"])
                 updated_count += 1
             else:
                 # Create new topic
@@ -6679,363 +6704,55 @@ def prepare_time_series_data(enrollment, total_sessions):
 
 @login_required
 def classes_map(request):
-    """View for displaying classes near the user."""
-    now = timezone.now()
-    sessions = (
-        Session.objects.filter(Q(start_time__gte=now) | Q(start_time__lte=now, end_time__gte=now))
-        .filter(is_virtual=False, location__isnull=False)
-        .exclude(location="")
-        .order_by("start_time")
-        .select_related("course", "course__teacher")
-    )
-    # Get filter parameters
-    course_id = request.GET.get("course")
-    teaching_style = request.GET.get("teaching_style")
-    # Apply filters
-    if course_id:
-        sessions = sessions.filter(course_id=course_id, status="published")
-    if teaching_style:
-        sessions = sessions.filter(teaching_style=teaching_style)
+    """View for displaying classes near the user; the map and its list load sessions from ``map_data_api``."""
+    try:
+        filters = parse_filters(request.GET)
+    except ValueError:
+        filters = {}
     # Fetch only necessary course fields
     courses = Course.objects.only("id", "title").order_by("title")
     age_groups = Course._meta.get_field("level").choices
-    teaching_styles = list(set(Session.objects.values_list("teaching_style", flat=True)))
-    context = {"sessions": sessions, "courses": courses, "age_groups": age_groups, "teaching_style": teaching_styles}
+    teaching_styles = Session.objects.order_by("teaching_style").values_list("teaching_style", flat=True).distinct()
+    context = {
+        "has_sessions": upcoming_sessions(**filters).exists(),
+        "courses": courses,
+        "age_groups": age_groups,
+        "teaching_style": teaching_styles,
+    }
     return render(request, "web/classes_map.html", context)
 
 
 @login_required
-def map_data_api(request):
-    """API to return all live and ongoing class data in JSON format."""
-    now = timezone.now()
-    sessions = (
-        Session.objects.filter(
-            Q(start_time__gte=now) | Q(start_time__lte=now, end_time__gte=now)  # Future or Live classes
-        )
-        .filter(Q(is_virtual=False) & ~Q(location=""))
-        .select_related("course", "course__teacher")
-    )
-
-    course_id = request.GET.get("course")
-    age_group = request.GET.get("age_group")
-
-    if course_id:
-        sessions = sessions.filter(course__id=course_id, status="published")
-    if age_group:
-        sessions = sessions.filter(course__level=age_group)
-
-    logger.debug(f"API call with filters: course={course_id}, age={age_group}")
-
-    map_data = []
-    sessions_to_update = []
-    # Limit geocoding to a reasonable number per request
-    MAX_GEOCODING_PER_REQUEST = 5
-    geocoding_count = 0
-    geocoding_errors = 0
-    coordinate_errors = 0
-    for session in sessions:
-        if not session.latitude or not session.longitude:
-            if geocoding_count >= MAX_GEOCODING_PER_REQUEST:
-                logger.warning(f"Geocoding limit reached ({MAX_GEOCODING_PER_REQUEST}). Skipping session {session.id}")
-                continue
-            geocoding_count += 1
-            logger.info(f"Geocoding session {session.id} with location: {session.location}")
-            lat, lng = geocode_address(session.location)
-            if lat is not None and lng is not None:
-                session.latitude = lat
-                session.longitude = lng
-                sessions_to_update.append(session)
-            else:
-                geocoding_errors += 1
-                logger.warning(f"Skipping session {session.id} due to failed geocoding")
-                continue
-
-        try:
-            lat = float(session.latitude)
-            lng = float(session.longitude)
-            map_data.append(
-                {
-                    "id": session.id,
-                    "title": session.title,
-                    "course_title": session.course.title,
-                    "teacher": session.course.teacher.get_full_name() or session.course.teacher.username,
-                    "start_time": session.start_time.isoformat(),
-                    "end_time": session.end_time.isoformat(),
-                    "location": session.location,
-                    "lat": lat,
-                    "lng": lng,
-                    "price": str(session.price or session.course.price),
-                    "url": session.get_absolute_url(),
-                    "course": session.course.title,
-                    "level": session.course.get_level_display(),
-                    "is_virtual": session.is_virtual,
-                }
-            )
-        except (ValueError, TypeError):
-            coordinate_errors += 1
-            logger.warning(
-                f"Skipping session {session.id} due to invalid coordinates: "
-                f"lat={session.latitude}, lng={session.longitude}"
-            )
-            continue
-
-    if sessions_to_update:
-        logger.info(f"Batch updating coordinates for {len(sessions_to_update)} sessions")
-        Session.objects.bulk_update(sessions_to_update, ["latitude", "longitude"])  # Batch update
-
-    # Log summary of issues
-    if geocoding_errors > 0 or coordinate_errors > 0:
-        logger.warning(f"Map data issues: {geocoding_errors} geocoding errors, {coordinate_errors} coordinate errors")
-
-    logger.info(f"Found {len(map_data)} sessions with valid coordinates")
-    return JsonResponse({"sessions": map_data})
-
-
-GITHUB_REPO = "alphaonelabs/alphaonelabs-education-website"
-GITHUB_API_BASE = "https://api.github.com"
-
-logger = logging.getLogger(__name__)
-
-
-def github_api_request(endpoint, params=None, headers=None):
+async def map_data_api(request):
     """
-    Make a GitHub API request with consistent error handling and timeout.
-    Returns JSON response on success, empty dict on failure.
-    """
-    try:
-        response = requests.get(endpoint, params=params, headers=headers, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            logger.error(f"Failed API request to {endpoint}: {response.status_code} - {response.text}")
-            return {}
-    except requests.RequestException as e:
-        logger.error(f"Request error for {endpoint}: {e}")
-        return {}
+    API to return the live and upcoming in-person classes inside a map viewport.
 
-
-def get_user_contribution_metrics(username, token):
-    """
-    Use the GitHub GraphQL API to fetch all of the user's merged PRs (across all repos),
-    then filter by the target repo, implementing pagination to ensure complete data.
-    """
-    graphql_endpoint = "https://api.github.com/graphql"
-    headers = {"Authorization": f"Bearer {token}"}
-
-    query = """
-    query($username: String!, $after: String) {
-      user(login: $username) {
-        pullRequests(
-          first: 100
-          after: $after
-          states: MERGED
-          orderBy: { field: CREATED_AT, direction: DESC }
-        ) {
-          totalCount
-          pageInfo {
-            endCursor
-            hasNextPage
-          }
-          nodes {
-            additions
-            deletions
-            createdAt
-            repository {
-              nameWithOwner
-            }
-          }
-        }
-      }
-    }
+    Takes ``bbox`` ("west,south,east,north") and ``zoom``; below ``CLUSTER_BELOW_ZOOM`` the
+    sessions come back as counted clusters.
     """
+    try:
+        bbox, zoom = parse_viewport(request.GET)
+        filters = parse_filters(request.GET)
+    except ValueError:
+        return JsonResponse({"error": "Invalid map viewport or filters"}, status=400)
 
-    all_filtered_prs = []
-    after_cursor = None
-
-    while True:
-        variables = {"username": username, "after": after_cursor}
-        try:
-            response = requests.post(
-                graphql_endpoint, json={"query": query, "variables": variables}, headers=headers, timeout=15
-            )
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("data") and data["data"].get("user"):
-                    pr_data = data["data"]["user"]["pullRequests"]
-                    prs = pr_data["nodes"]
-
-                    # Filter PRs to the target repository (case insensitive)
-                    target_repo = GITHUB_REPO.lower()
-                    filtered_prs = [pr for pr in prs if pr["repository"]["nameWithOwner"].lower() == target_repo]
-                    all_filtered_prs.extend(filtered_prs)
-
-                    # Check if there are more pages
-                    if pr_data["pageInfo"]["hasNextPage"]:
-                        after_cursor = pr_data["pageInfo"]["endCursor"]
-                    else:
-                        break
-                else:
-                    logger.error("No user or PR data found in GraphQL response.")
-                    break
-            else:
-                logger.error(f"GraphQL error: {response.status_code} - {response.text}")
-                break
-        except Exception as e:
-            logger.error(f"GraphQL request error: {e}")
-            break
-
-    # Prepare final result structure
-    final_result = {
-        "data": {"user": {"pullRequests": {"totalCount": len(all_filtered_prs), "nodes": all_filtered_prs}}}
-    }
-    return final_result
+    # Never geocode inline: stored results are used and the rest is queued for the background worker
+    data = await sync_to_async(map_tiles)(bbox, zoom, **filters)
+    if data.pop("queued"):
+        logger.info("Queued session locations for geocoding")
+    return JsonResponse(data)
 
 
-def contributor_detail_view(request, username):
+async def contributor_detail_view(request, username):
     """
     View to display detailed information about a specific GitHub contributor.
-    Only accessible to staff members.
-    """
-    cache_key = f"github_contributor_{username}"
-    cached_data = cache.get(cache_key)
-    if cached_data:
-        return render(request, "web/contributor_detail.html", cached_data)
-
-    token = os.environ.get("GITHUB_TOKEN")
-    headers = {"Authorization": f"token {token}"} if token else {}
-
-    # Initialize variables to store contributor data
-    user_data = {}
-    prs_created = 0
-    prs_merged = 0
-    issues_created = 0
-    pr_reviews = 0
-    pr_comments = 0
-    issue_comments = 0
-    lines_added = 0
-    lines_deleted = 0
-    first_contribution_date = "N/A"
-    issue_assignments = 0
-
-    user_endpoint = f"{GITHUB_API_BASE}/users/{username}"
-    user_data = github_api_request(user_endpoint, headers=headers)
-    if not user_data:
-        logger.error("User profile data could not be retrieved.")
-
-    # Pull requests created
-    prs_created_json = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={"q": f"author:{username} type:pr repo:{GITHUB_REPO}"},
-        headers=headers,
-    )
-    prs_created = prs_created_json.get("total_count", 0)
-
-    # Pull requests merged
-    prs_merged_json = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={"q": f"author:{username} type:pr repo:{GITHUB_REPO} is:merged"},
-        headers=headers,
-    )
-    prs_merged = prs_merged_json.get("total_count", 0)
-
-    # Issues created
-    issues_json = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={"q": f"author:{username} type:issue repo:{GITHUB_REPO}"},
-        headers=headers,
-    )
-    issues_created = issues_json.get("total_count", 0)
-
-    # Pull request reviews
-    reviews_json = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={"q": f"reviewer:{username} type:pr repo:{GITHUB_REPO}"},
-        headers=headers,
-    )
-    pr_reviews = reviews_json.get("total_count", 0)
-
-    # Pull requests with comments
-    pr_comments_json = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={"q": f"commenter:{username} type:pr repo:{GITHUB_REPO}"},
-        headers=headers,
-    )
-    pr_comments = pr_comments_json.get("total_count", 0)
-
-    # Issues with comments
-    issue_comments_json = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={"q": f"commenter:{username} type:issue repo:{GITHUB_REPO}"},
-        headers=headers,
-    )
-    issue_comments = issue_comments_json.get("total_count", 0)
-
-    # Oldest PR creation date
-    prs_oldest = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={
-            "q": f"author:{username} type:pr repo:{GITHUB_REPO}",
-            "sort": "created",
-            "order": "asc",
-            "per_page": 1,
-        },
-        headers=headers,
-    )
-    if prs_oldest.get("total_count", 0) > 0:
-        first_contribution_date = prs_oldest["items"][0].get("created_at", "N/A")
-
-    # Issue assignments
-    issue_assignments_json = github_api_request(
-        f"{GITHUB_API_BASE}/search/issues",
-        params={"q": f"assignee:{username} type:issue repo:{GITHUB_REPO}"},
-        headers=headers,
-    )
-    issue_assignments = issue_assignments_json.get("total_count", 0)
-    metrics = get_user_contribution_metrics(username, token)
-    pr_data = metrics.get("data", {}).get("user", {}).get("pullRequests", {}).get("nodes", [])
-    for pr in pr_data:
-        lines_added += pr.get("additions", 0)
-        lines_deleted += pr.get("deletions", 0)
-
-    # Update user_data with additional metrics
-    user_data.update(
-        {
-            "reactions_received": user_data.get("reactions_received", 0),
-            "mentorship_score": user_data.get("mentorship_score", 0),
-            "collaboration_score": user_data.get("collaboration_score", 0),
-            "issue_assignments": issue_assignments,
-        }
-    )
-
-    # Prepare context for the template
-    context = {
-        "user": user_data,
-        "prs_created": prs_created,
-        "prs_merged": prs_merged,
-        "pr_reviews": pr_reviews,
-        "issues_created": issues_created,
-        "issue_comments": issue_comments,
-        "pr_comments": pr_comments,
-        "lines_added": lines_added,
-        "lines_deleted": lines_deleted,
-        "first_contribution_date": first_contribution_date,
-        "chart_data": {
-            "prs_created": prs_created,
-            "prs_merged": prs_merged,
-            "pr_reviews": pr_reviews,
-            "issues_created": issues_created,
-            "issue_assignments": issue_assignments,
-            "pr_comments": pr_comments,
-            "issue_comments": issue_comments,
-            "lines_added": lines_added,
-            "lines_deleted": lines_deleted,
-            "first_contribution_date": (first_contribution_date if first_contribution_date != "N/A" else "N/A"),
-        },
-    }
 
-    # Cache for 1 hour
-    cache.set(cache_key, context, 3600)
-    return render(request, "web/contributor_detail.html", context)
+    Metrics are read from the ContributorMetrics table and refreshed in the background when stale.
+    """
+    metrics = await sync_to_async(get_contributor_metrics)(username)
+    if metrics is None:
+        raise Http404("No contributor with that username")
+    return await sync_to_async(render)(request, "web/contributor_detail.html", contributor_context(metrics))
 
 
 @login_required
@@ -7457,48 +7174,63 @@ def users_list(request: HttpRequest) -> HttpResponse:
     Display a list of users who have their profile set to public,
     ordered by most recent updates.
     """
-    profiles = Profile.objects.filter(is_profile_public=True).select_related("user").order_by("-updated_at")
-
-    # Add statistics for each user to create fun scorecards
-    for profile in profiles:
-        if profile.is_teacher:
-            # Teacher stats
-            courses = Course.objects.filter(teacher=profile.user).prefetch_related("enrollments", "reviews")
-            profile.total_courses = courses.count()
-            profile.total_students = sum(course.enrollments.filter(status="approved").count() for course in courses)
-            # Get average rating across all courses
-            course_ratings = [course.average_rating for course in courses if course.average_rating > 0]
-            profile.avg_rating = round(sum(course_ratings) / len(course_ratings), 1) if course_ratings else 0
-        else:
-            # Student stats
-            enrollments = Enrollment.objects.filter(student=profile.user).select_related("course")
-            profile.total_courses = enrollments.count()
-            completed_enrollments = enrollments.filter(status="completed")
-            profile.total_completed = completed_enrollments.count()
-
-            # Calculate average progress across all courses
-            total_progress = 0
-            progress_count = 0
-            enrollment_ids = [e.id for e in enrollments]
-            existing_progresses = {
-                p.enrollment_id: p for p in CourseProgress.objects.filter(enrollment_id__in=enrollment_ids)
-            }
-
-            for enrollment in enrollments:
-                progress = existing_progresses.get(enrollment.id)
-                if not progress:
-                    progress = CourseProgress.objects.create(enrollment=enrollment)
-                total_progress += progress.completion_percentage
-                progress_count += 1
-            profile.avg_progress = round(total_progress / progress_count) if progress_count > 0 else 0
-
-            # Add achievements count
-            profile.achievements_count = Achievement.objects.filter(student=profile.user).count()
+    profiles = (
+        Profile.objects.filter(is_profile_public=True)
+        .select_related("user")
+        .prefetch_related("user__groups")
+        .order_by("-updated_at")
+    )
 
     # Pagination: 12 profiles per page
     paginator = Paginator(profiles, 12)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = list(page_obj.object_list)
+
+    # Add statistics for the users on this page to create fun scorecards, a few queries for the whole page
+    teachers = {profile.user_id: profile for profile in page_obj.object_list if profile.is_teacher}
+    students = {profile.user_id: profile for profile in page_obj.object_list if not profile.is_teacher}
+
+    for profile in teachers.values():
+        profile.total_courses, profile.total_students = 0, 0
+    course_ratings = {teacher_id: [] for teacher_id in teachers}
+    courses = (
+        Course.objects.filter(teacher_id__in=teachers)
+        .annotate(
+            approved_count=Count("enrollments", filter=Q(enrollments__status="approved"), distinct=True),
+            avg_rating=Avg("reviews__rating"),
+        )
+        .only("id", "teacher_id")
+    )
+    for course in courses:
+        profile = teachers[course.teacher_id]
+        profile.total_courses += 1
+        profile.total_students += course.approved_count
+        # Get average rating across all courses
+        if course.average_rating > 0:
+            course_ratings[course.teacher_id].append(course.average_rating)
+    for teacher_id, ratings in course_ratings.items():
+        teachers[teacher_id].avg_rating = round(sum(ratings) / len(ratings), 1) if ratings else 0
+
+    enrollments = {student_id: [] for student_id in students}
+    for enrollment in Enrollment.objects.filter(student_id__in=students):
+        enrollments[enrollment.student_id].append(enrollment)
+    progress = progress_by_enrollment(e for own in enrollments.values() for e in own)
+    achievements = dict(
+        Achievement.objects.filter(student_id__in=students)
+        .values_list("student_id")
+        .annotate(count=Count("id"))
+        .order_by()
+    )
+    for student_id, own in enrollments.items():
+        profile = students[student_id]
+        profile.total_courses = len(own)
+        profile.total_completed = sum(enrollment.status == "completed" for enrollment in own)
+        # Calculate average progress across all courses
+        percentages = [progress[enrollment.id].completion_percentage for enrollment in own]
+        profile.avg_progress = round(sum(percentages) / len(percentages)) if percentages else 0
+        # Add achievements count
+        profile.achievements_count = achievements.get(student_id, 0)
 
     context = {
         "page_obj": page_obj,
@@ -7522,20 +7254,10 @@ def topic_vote(request, pk):
             messages.error(request, "Invalid vote type")
             return redirect("topic_vote", pk=topic.id)
 
-        # Check if user already voted on this topic
-        vote, created = ForumVote.objects.get_or_create(
-            user=request.user, topic=topic, defaults={"vote_type": vote_type}
-        )
-
-        if not created:
-            # User already voted, check if they're changing their vote
-            if vote.vote_type == vote_type:
-                # Same vote type, so remove the vote
-                vote.delete()
-            else:
-                # Different vote type, so update the vote
-                vote.vote_type = vote_type
-                vote.save()
+        # Record the vote and update the topic's tallies atomically
+        user_vote, vote_score = cast_vote(request.user, vote_type, topic=topic)
+        if "application/json" in request.headers.get("Accept", ""):
+            return JsonResponse({"user_vote": user_vote, "vote_score": vote_score})
 
         # After processing the vote, redirect back to the topic page
         return redirect("forum_topic", category_slug=topic.category.slug, topic_id=topic.id)
@@ -7560,20 +7282,10 @@ def reply_vote(request, pk):
             messages.error(request, "Invalid vote type")
             return redirect("forum_topic", category_slug=reply.topic.category.slug, topic_id=reply.topic.id)
 
-        # Check if user already voted on this reply
-        vote, created = ForumVote.objects.get_or_create(
-            user=request.user, reply=reply, defaults={"vote_type": vote_type}
-        )
-
-        if not created:
-            # User already voted, check if they're changing their vote
-            if vote.vote_type == vote_type:
-                # Same vote type, so remove the vote
-                vote.delete()
-            else:
-                # Different vote type, so update the vote
-                vote.vote_type = vote_type
-                vote.save()
+        # Record the vote and update the reply's tallies atomically
+        user_vote, vote_score = cast_vote(request.user, vote_type, reply=reply)
+        if "application/json" in request.headers.get("Accept", ""):
+            return JsonResponse({"user_vote": user_vote, "vote_score": vote_score})
 
         # After processing the vote, redirect back to the topic page
         return redirect("forum_topic", category_slug=reply.topic.category.slug, topic_id=reply.topic.id)
@@ -7586,22 +7298,8 @@ def reply_vote(request, pk):
 def topic_detail(request, pk):
     topic = get_object_or_404(ForumTopic, pk=pk)
 
-    # Get the user's vote on this topic if any
-    user_topic_vote = None
-    if request.user.is_authenticated:
-        try:
-            vote = ForumVote.objects.get(topic=topic, user=request.user)
-            user_topic_vote = vote.vote_type
-        except ForumVote.DoesNotExist:
-            pass
-
-    # Get user votes on replies
-    user_reply_votes = {}
-    if request.user.is_authenticated:
-        reply_votes = ForumVote.objects.filter(reply__topic=topic, user=request.user).values_list(
-            "reply_id", "vote_type"
-        )
-        user_reply_votes = dict(reply_votes)
+    # Get the user's votes on this topic and its replies
+    user_topic_vote, user_reply_votes = thread_votes_for_user(request.user, topic)
 
     context = {
         "topic": topic,
@@ -7614,139 +7312,8 @@ def topic_detail(request, pk):
 
 
 def contributors_list_view(request):
-    # Check if cached data is available
-    cached_context = cache.get("contributors_context")
-    if cached_context:
-        return render(request, "web/contributors_list.html", cached_context)
-
-    # Initialize a dictionary to track contributor stats
-    contributor_stats = {}
-
-    # Function to add a contributor to our stats dictionary
-    def add_contributor(username, avatar_url, profile_url):
-        if username not in contributor_stats:
-            contributor_stats[username] = {
-                "username": username,
-                "avatar_url": avatar_url,
-                "profile_url": profile_url,
-                "merged_pr_count": 0,
-                "closed_pr_count": 0,
-                "open_pr_count": 0,
-                "total_pr_count": 0,
-                "prs_url": f"https://github.com/AlphaOneLabs/education-website/pulls?q=is:pr+author:{username}",
-            }
-
-    try:
-        # Fetch closed PRs first (includes both merged and non-merged closed PRs)
-        closed_prs = []
-        for page in range(1, 11):  # Limit to 10 pages to prevent hitting API rate limits
-            response = github_api_request(
-                f"{GITHUB_API_BASE}/repos/AlphaOneLabs/education-website/pulls",
-                params={"state": "closed", "per_page": 100, "page": page},
-            )
-            if not response or len(response) == 0:
-                break
-
-            closed_prs.extend(response)
-            time.sleep(0.5)  # Add delay to avoid hitting rate limits
-
-        # Process closed PRs
-        for pr in closed_prs:
-            username = pr["user"]["login"]
-
-            # Skip bots and specific users
-            if "[bot]" in username or "dependabot" in username or username == "A1L13N":
-                continue
-
-            avatar_url = pr["user"]["avatar_url"]
-            profile_url = pr["user"]["html_url"]
-
-            # Add to our tracking
-            add_contributor(username, avatar_url, profile_url)
-
-            # Update the appropriate count based on whether it was merged
-            if pr["merged_at"]:
-                contributor_stats[username]["merged_pr_count"] += 1
-            else:
-                contributor_stats[username]["closed_pr_count"] += 1
-
-        # Now fetch open PRs
-        open_prs = []
-        for page in range(1, 6):  # Limit to 5 pages for open PRs
-            response = github_api_request(
-                f"{GITHUB_API_BASE}/repos/AlphaOneLabs/education-website/pulls",
-                params={"state": "open", "per_page": 100, "page": page},
-            )
-            if not response or len(response) == 0:
-                break
-
-            open_prs.extend(response)
-            time.sleep(0.5)  # Add delay to avoid hitting rate limits
-
-        # Process open PRs
-        for pr in open_prs:
-            username = pr["user"]["login"]
-
-            # Skip bots and specific users
-            if "[bot]" in username or "dependabot" in username or username == "A1L13N":
-                continue
-
-            avatar_url = pr["user"]["avatar_url"]
-            profile_url = pr["user"]["html_url"]
-
-            # Add to our tracking
-            add_contributor(username, avatar_url, profile_url)
-
-            # Update open PR count
-            contributor_stats[username]["open_pr_count"] += 1
-
-        # Calculate total PR count and filter out users with no merged PRs
-        contributors = []
-        for username, stats in contributor_stats.items():
-            # Skip contributors with no merged PRs
-            if stats["merged_pr_count"] == 0:
-                continue
-
-            # Calculate total PR count
-            stats["total_pr_count"] = stats["merged_pr_count"] + stats["closed_pr_count"] + stats["open_pr_count"]
-
-            # Calculate a smart score that prioritizes merged PRs but penalizes imbalances
-            # Formula: (merged_pr_count * 10) - penalties for imbalanced contributions
-            smart_score = stats["merged_pr_count"] * 10
-
-            # Penalize if closed PRs are more than half of merged PRs (could indicate issues with code quality)
-            if stats["closed_pr_count"] > (stats["merged_pr_count"] / 2):
-                smart_score -= (stats["closed_pr_count"] - (stats["merged_pr_count"] / 2)) * 2
-
-            # Penalize if open PRs are more than merged PRs (could indicate abandonment issues)
-            if stats["open_pr_count"] > stats["merged_pr_count"]:
-                smart_score -= stats["open_pr_count"] - stats["merged_pr_count"]
-
-            # Calculate a contribution ratio: merged/(total) - higher is better
-            if stats["total_pr_count"] > 0:
-                stats["contribution_ratio"] = stats["merged_pr_count"] / stats["total_pr_count"]
-            else:
-                stats["contribution_ratio"] = 0
-
-            # Store the smart score
-            stats["smart_score"] = smart_score
-
-            contributors.append(stats)
-
-        # Sort by smart score (primary) and then by merged PR count (secondary)
-        contributors.sort(key=lambda x: (x["smart_score"], x["merged_pr_count"]), reverse=True)
-
-        # Store the context in cache for 12 hours
-        context = {"contributors": contributors}
-        cache.set("contributors_context", context, 12 * 60 * 60)
-
-        return render(request, "web/contributors_list.html", context)
-
-    except Exception as e:
-        # Log the error
-        print(f"Error fetching contributors: {e}")
-        # Return an empty list in case of error
-        return render(request, "web/contributors_list.html", {"contributors": []})
+    """List contributors ranked from the locally synced pull requests; GitHub is never called here."""
+    return render(request, "web/contributors_list.html", {"contributors": contributor_stats()})
 
 
 @login_required
@@ -7756,7 +7323,9 @@ def video_request_list(request):
     selected_category = request.GET.get("category")
 
     # Base queryset
-    requests = VideoRequest.objects.select_related("requester", "category").order_by("-created_at")
+    requests = VideoRequest.objects.select_related("requester", "category", "fulfilled_by__metadata").order_by(
+        "-created_at"
+    )
 
     # Apply category filter if provided
     if selected_category:
@@ -7911,7 +7480,7 @@ def submit_survey(request, pk):
                         return redirect("survey-detail", pk=survey.id)
             elif question.type == "text":
                 Response.objects.create(
-                    user=request.user, question=question, text_answer=request.POST.get(f"question_{question.id}")
+                    user=request.user, question=question, text_answer=request.POST.get(f"question_{question.id}", "")
                 )
             else:
                 choice_id = request.POST.get(f"question_{question.id}")
@@ -7927,6 +7496,7 @@ def submit_survey(request, pk):
                         messages.error(request, "Invalid choice selected")
                         return redirect("survey-detail", pk=survey.id)
 
+        invalidate_survey_results(survey.id)
         messages.success(request, "Survey submitted successfully!")
         return redirect("survey-results", pk=survey.id)
 
@@ -7941,87 +7511,42 @@ class SurveyResultsView(LoginRequiredMixin, DetailView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        # Process survey results
-        results = []
-        total_participants = 0
-        most_answered_question = None
-        max_responses = 0
-        top_choice = None
-        bottom_choice = None
-        overall_top_choice_count = 0
-        overall_bottom_choice_count = float("inf")
-        total_possible_responses = 0
-        total_actual_responses = 0
-        avg_completion_time = None
-        context["avg_completion_time"] = avg_completion_time
-
-        for question in self.object.question_set.all():
-            choices_data = []
-            question_total = 0
-
-            # Process each choice for this question
-            for choice in question.choice_set.all():
-                count = choice.response_set.count() if hasattr(choice, "response_set") else 0
-
-                question_total += count
-                choices_data.append({"text": choice.text, "count": count})
-
-            if question_total == 0:
-                continue
-            if question_total > 0:
-                total_possible_responses += total_participants * 1  # Each participant could answer this question
-                total_actual_responses += question_total
-
-            if question_total > max_responses:
-                max_responses = question_total
-                most_answered_question = question
-
-            for choice in choices_data:
-                choice["percentage"] = round((choice["count"] / question_total * 100), 1) if question_total > 0 else 0
-
-                if choice["count"] > overall_top_choice_count:
-                    overall_top_choice_count = choice["count"]
-                    top_choice = choice
-
-                if choice["count"] > 0 and choice["count"] < overall_bottom_choice_count:
-                    overall_bottom_choice_count = choice["count"]
-                    bottom_choice = choice
-
-            results.append({"question": question, "choices": choices_data, "total": question_total})
-
-            total_participants = max(total_participants, question_total)
-        engagement_score = 0
-        if total_possible_responses > 0:
-            engagement_score = (total_actual_responses / total_possible_responses) * 100
-
-        context["engagement_score"] = round(engagement_score, 1)
+        # Per-choice tallies come from one grouped query and are cached until the next submission
+        context.update(get_survey_results(self.object.id))
+        context["avg_completion_time"] = None
+
         target_participants = getattr(self.object, "target_participants", 100)  # default to 100 if not set
-        response_rate = (total_participants / target_participants * 100) if target_participants > 0 else 0
+        response_rate = (context["total_participants"] / target_participants * 100) if target_participants > 0 else 0
+        context["response_rate"] = min(response_rate, 100)  # Cap at 100%
+        context["is_creator"] = self.object.author == self.request.user if hasattr(self.object, "author") else False
 
-        context.update(
-            {
-                "results": results,
-                "total_participants": total_participants,
-                "response_rate": min(response_rate, 100),  # Cap at 100%
-                "most_answered_question": most_answered_question,
-                "top_choice": top_choice,
-                "bottom_choice": bottom_choice,
-                "is_creator": self.object.author == self.request.user if hasattr(self.object, "author") else False,
-            }
-        )
+        return context
 
-        chart_data = []
-        for result in results:
-            chart_data.append(
-                {
-                    "question_id": result["question"].id,
-                    "labels": [choice["text"] for choice in result["choices"]],
-                    "data": [choice["count"] for choice in result["choices"]],
-                }
-            )
-        context["chart_data_json"] = json.dumps(chart_data)
 
-        return context
+class _Echo:
+    """File-like object that hands written rows straight back, for streaming CSV responses."""
+
+    def write(self, value):
+        return value
+
+
+@login_required
+def survey_results_csv(request, pk):
+    """Stream the per-choice tallies of a survey as CSV (survey author or staff only)."""
+    survey = get_object_or_404(Survey, pk=pk)
+    if survey.author != request.user and not request.user.is_staff:
+        return HttpResponseForbidden("You don't have permission to export these results.")
+
+    writer = csv.writer(_Echo())
+
+    def rows():
+        yield writer.writerow(["question_id", "question", "choice_id", "choice", "count"])
+        for row in survey_tallies(survey.id).iterator(chunk_size=2000):
+            yield writer.writerow([row["question_id"], row["question__text"], row["id"], row["text"], row["count"]])
+
+    response = StreamingHttpResponse(rows(), content_type="text/csv")
+    response["Content-Disposition"] = f'attachment; filename="survey-{survey.id}-results.csv"'
+    return response
 
 
 class SurveyDeleteView(LoginRequiredMixin, DeleteView):
@@ -8056,8 +7581,9 @@ def join_session_waiting_room(request, course_slug):
         return redirect("course_detail", slug=course_slug)
 
     # Add the user to participants if not already in
-    if request.user not in session_waiting_room.participants.all():
+    if not is_participant(session_waiting_room.id, request.user.id):
         session_waiting_room.participants.add(request.user)
+        push_room_state(session_waiting_room.id)
         next_session = session_waiting_room.get_next_session()
         if next_session:
             next_session_date = next_session.start_time.strftime("%B %d, %Y at %I:%M %p")
@@ -8090,8 +7616,9 @@ def leave_session_waiting_room(request, course_slug):
         return redirect("course_detail", slug=course_slug)
 
     # Remove the user from participants
-    if request.user in session_waiting_room.participants.all():
+    if is_participant(session_waiting_room.id, request.user.id):
         session_waiting_room.participants.remove(request.user)
+        push_room_state(session_waiting_room.id)
         messages.success(request, f"You have left the session waiting room for {course.title}")
     else:
         messages.info(request, "You are not in the session waiting room for this course.")
@@ -20,6 +20,7 @@ from python_avatars import (
 )
 
 from .forms import AvatarForm
+from .services.avatar_render import render_avatar_svg
 
 
 @login_required
@@ -138,22 +139,8 @@ def preview_avatar(request):
     if request.method == "POST":
         try:
             data = json.loads(request.body)
-            avatar = Avatar(
-                style=getattr(AvatarStyle, data.get("style", "CIRCLE").upper(), AvatarStyle.CIRCLE),
-                background_color=data.get("background_color", "#FFFFFF"),
-                top=getattr(HairType, data.get("top", "SHORT_FLAT").upper(), HairType.SHORT_FLAT),
-                eyebrows=getattr(EyebrowType, data.get("eyebrows", "DEFAULT").upper(), EyebrowType.DEFAULT),
-                eyes=getattr(EyeType, data.get("eyes", "DEFAULT").upper(), EyeType.DEFAULT),
-                nose=getattr(NoseType, data.get("nose", "DEFAULT").upper(), NoseType.DEFAULT),
-                mouth=getattr(MouthType, data.get("mouth", "DEFAULT").upper(), MouthType.DEFAULT),
-                facial_hair=getattr(FacialHairType, data.get("facial_hair", "NONE").upper(), FacialHairType.NONE),
-                skin_color=getattr(SkinColor, data.get("skin_color", "LIGHT").upper(), SkinColor.LIGHT),
-                hair_color=data.get("hair_color", "#000000"),
-                accessory=getattr(AccessoryType, data.get("accessory", "NONE").upper(), AccessoryType.NONE),
-                clothing=getattr(ClothingType, data.get("clothing", "HOODIE").upper(), ClothingType.HOODIE),
-                clothing_color=data.get("clothing_color", "#0000FF"),
-            )
-            return JsonResponse({"success": True, "avatar_svg": avatar.render()})
+            svg, _ = render_avatar_svg(data)
+            return JsonResponse({"success": True, "avatar_svg": svg})
         except Exception as e:
             return JsonResponse({"success": False, "error": str(e)}, status=400)
     return JsonResponse({"success": False, "error": "Invalid request method"}, status=405)
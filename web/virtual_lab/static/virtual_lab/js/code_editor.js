@@ -37,13 +37,7 @@ runBtn.addEventListener("click", () => {
     },
     body: JSON.stringify({ code, language, stdin })
   })
-  .then(res => res.json())
-  .then(data => {
-    let out = "";
-    if (data.stderr) out += `ERROR:\n${data.stderr}\n`;
-    if (data.stdout) out += data.stdout;
-    outputEl.textContent = out || "[no output]";
-  })
+  .then(readEvents)
   .catch(err => {
     outputEl.textContent = `Request failed: ${err.message}`;
   })
@@ -51,3 +45,33 @@ runBtn.addEventListener("click", () => {
     runBtn.disabled = false;
   });
 });
+
+// The response is newline-delimited JSON: queue updates while waiting, then the result
+async function readEvents(res) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffered = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    buffered += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffered.split("\n");
+    buffered = done ? "" : lines.pop();
+    lines.filter(line => line.trim()).forEach(line => showEvent(JSON.parse(line)));
+    if (done) break;
+  }
+}
+
+function showEvent(data) {
+  if (data.queue_position) {
+    outputEl.textContent = `Waiting to run… you are number ${data.queue_position} in the queue`;
+    return;
+  }
+  if (data.error) {
+    outputEl.textContent = `ERROR:\n${data.error}`;
+    return;
+  }
+  let out = "";
+  if (data.stderr) out += `ERROR:\n${data.stderr}\n`;
+  if (data.stdout) out += data.stdout;
+  outputEl.textContent = out || "[no output]";
+}
@@ -3,11 +3,12 @@
 import json
 import logging
 
-import requests
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.views.decorators.http import require_POST
 
+from web.services.code_execution import run_code
+
 logger = logging.getLogger(__name__)
 
 
@@ -77,60 +78,51 @@ def ph_indicator_view(request):
     return render(request, "virtual_lab/chemistry/ph_indicator.html")
 
 
-# Piston’s public execute endpoint (rate-limited to 5 req/s) :contentReference[oaicite:0]{index=0}
-PISTON_EXECUTE_URL = "https://emkc.org/api/v2/piston/execute"
-
-LANG_FILE_EXT = {
-    "python": "py",
-    "javascript": "js",
-    "c": "c",
-    "cpp": "cpp",
-}
-
-
 def code_editor_view(request):
     return render(request, "virtual_lab/code_editor/code_editor.html")
 
 
+async def _stream_events(events):
+    async for event in events:
+        yield json.dumps(event) + "\n"
+
+
 @require_POST
-def evaluate_code(request):
+async def evaluate_code(request):
     """
-    Proxy code + stdin to Piston and return its JSON result.
+    Run code + stdin through the execution gateway.
+
+    The response is newline-delimited JSON: ``{"queue_position": n}`` lines while the run waits
+    for a slot, then one ``{"stdout", "stderr", "cached"}`` or ``{"error"}`` line.
     """
-    data = json.loads(request.body)
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"error": "Invalid JSON body"}, status=400)
     source_code = data.get("code", "")
     language = data.get("language", "python")  # e.g. "python","javascript","c","cpp"
     stdin_text = data.get("stdin", "")
 
-    # Package content for Piston
-    ext = LANG_FILE_EXT.get(language, "txt")
-    files = [{"name": f"main.{ext}", "content": source_code}]
-    payload = {
-        "language": language,
-        "version": "*",  # semver selector; '*' picks latest :contentReference[oaicite:1]{index=1}
-        "files": files,
-        "stdin": stdin_text,
-        "args": [],
-    }
-
-    try:
-        resp = requests.post(PISTON_EXECUTE_URL, json=payload, timeout=10)
-        resp.raise_for_status()
-    except requests.RequestException:
-        # Log the full details for your own troubleshooting
-        logger.exception("Failed to call Piston execute endpoint")
-        # Return a safe, generic message to the user
-        return JsonResponse(
-            {"stderr": "Code execution service is currently unavailable. Please try again later."}, status=502
-        )
-
-    result = resp.json()
-    # Piston returns a structure like:
-    # { language, version, run: { stdout, stderr, code, signal, output } }
-    run = result.get("run", {})
-    return JsonResponse(
-        {
-            "stdout": run.get("stdout", run.get("output", "")),
-            "stderr": run.get("stderr", ""),
-        }
-    )
+    user = await request.auser()
+    if user.is_authenticated:
+        client_key = f"user:{user.pk}"
+    else:
+        client_key = f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+    events = run_code(language, source_code, stdin_text, client_key)
+    # Runs that are rejected or answered without waiting get a plain JSON response with a proper status code
+    first = await anext(events)
+    if "error" in first:
+        await events.aclose()
+        return JsonResponse({"error": first["error"]}, status=first["status"])
+    if "queue_position" not in first:
+        await events.aclose()
+        return JsonResponse(first)
+
+    async def remaining():
+        yield first
+        async for event in events:
+            event.pop("status", None)
+            yield event
+
+    return StreamingHttpResponse(_stream_events(remaining()), content_type="application/x-ndjson")